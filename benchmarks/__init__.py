@@ -0,0 +1,4 @@
+"""
+End-to-end pipeline benchmark: synthetic media, local stub services and a
+per-stage resource meter. Run it with ``python benchmarks/run.py``.
+"""
@@ -0,0 +1,136 @@
+"""
+Per-stage resource measurement and baseline comparison.
+
+Each stage records wall time, CPU time of this process plus the ffmpeg
+children it waited for, peak RSS and the size of the files it created or
+changed. Peak RSS comes from ``getrusage`` and is a high-water mark since
+process start, separately for this process and for its largest child, so
+growth shows up in the first stage that pushes the mark higher.
+"""
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+# Absolute slack per metric on top of the relative tolerance, so that
+# sub-second stages and small files do not fail on scheduler noise.
+SLACK = {
+    "wall_seconds": 0.25,
+    "cpu_seconds": 0.25,
+    "peak_rss_bytes": 32 * 1024 * 1024,
+    "child_peak_rss_bytes": 32 * 1024 * 1024,
+    "bytes_written": 1024 * 1024,
+}
+
+
+class StageResult(NamedTuple):
+    """Resources used by one pipeline stage."""
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_bytes: int
+    child_peak_rss_bytes: int
+    bytes_written: int
+
+
+def _cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def snapshot(root: str) -> Dict[str, Tuple[int, int]]:
+    """Size and mtime of every file under ``root``."""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files[path] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def bytes_written(before: Dict[str, Tuple[int, int]], after: Dict[str, Tuple[int, int]]) -> int:
+    """Total size of the files that are new or changed in ``after``."""
+    return sum(size for path, (size, mtime) in after.items() if before.get(path) != (size, mtime))
+
+
+class StageMeter:
+    """Collects a ``StageResult`` per named stage."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.results: Dict[str, StageResult] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Measure the enclosed block as stage ``name``.
+
+        Nothing is recorded if the block raises.
+
+        Args:
+            name (str): Stage name in the results.
+        """
+        files = snapshot(self.root)
+        started = time.perf_counter()
+        cpu = _cpu_seconds()
+        yield
+        wall = time.perf_counter() - started
+        self.results[name] = StageResult(
+            wall_seconds=round(wall, 3),
+            cpu_seconds=round(_cpu_seconds() - cpu, 3),
+            peak_rss_bytes=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT,
+            child_peak_rss_bytes=resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * _RSS_UNIT,
+            bytes_written=bytes_written(files, snapshot(self.root)),
+        )
+
+
+def summarize(results: Dict[str, StageResult]) -> StageResult:
+    """Sums over all stages (maxima for the peak RSS fields)."""
+    rows = list(results.values())
+    return StageResult(
+        wall_seconds=round(sum(r.wall_seconds for r in rows), 3),
+        cpu_seconds=round(sum(r.cpu_seconds for r in rows), 3),
+        peak_rss_bytes=max((r.peak_rss_bytes for r in rows), default=0),
+        child_peak_rss_bytes=max((r.child_peak_rss_bytes for r in rows), default=0),
+        bytes_written=sum(r.bytes_written for r in rows),
+    )
+
+
+def find_regressions(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Compare stage results with a baseline.
+
+    A metric regresses when it exceeds ``baseline * (1 + tolerance)`` plus
+    the metric's absolute ``SLACK``. A stage missing from the results also
+    counts as a regression.
+
+    Args:
+        results (Dict[str, dict]): ``StageResult`` fields per stage.
+        baseline (Dict[str, dict]): The same, from the stored baseline.
+        tolerance (float): Allowed relative growth (e.g., 0.25).
+
+    Returns:
+        List[str]: One line per regression.
+    """
+    regressions = []
+    for stage, expected in baseline.items():
+        measured = results.get(stage)
+        if measured is None:
+            regressions.append(f"{stage}: missing from this run")
+            continue
+        for metric, slack in SLACK.items():
+            if metric not in expected or metric not in measured:
+                continue
+            limit = expected[metric] * (1 + tolerance) + slack
+            if measured[metric] > limit:
+                regressions.append(f"{stage}.{metric}: {measured[metric]:,} vs {expected[metric]:,} baseline")
+    return regressions
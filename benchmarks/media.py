@@ -0,0 +1,224 @@
+"""
+Synthetic sources for the end-to-end benchmark.
+
+Sources are generated with ffmpeg's lavfi ``testsrc2`` (moving test pattern)
+and ``sine`` (beeping tone) inputs in several lengths, resolutions and
+codecs, so a run needs neither network access nor fixture files. Each source
+also gets a replay heatmap and json3 captions derived from its spec, so the
+stub services, the probe and the analyzers all describe the same video.
+"""
+import math
+import os
+import zlib
+from typing import Dict, List, NamedTuple
+
+from src.compilation.ffmpeg_wrapper import base_command, run_ffmpeg
+
+# Encoder arguments per source codec; fast settings, since generating the
+# sources is setup and not part of any measured stage.
+CODEC_ARGS: Dict[str, List[str]] = {
+    "h264": ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "23", "-pix_fmt", "yuv420p"],
+    "hevc": ["-c:v", "libx265", "-preset", "ultrafast", "-crf", "28", "-pix_fmt", "yuv420p", "-tag:v", "hvc1"],
+    "vp9": ["-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-b:v", "1M", "-pix_fmt", "yuv420p"],
+    "mpeg4": ["-c:v", "mpeg4", "-q:v", "5", "-pix_fmt", "yuv420p"],
+}
+HEATMAP_MARKERS = 100
+CAPTION_SECONDS = 4.0
+
+
+class SourceSpec(NamedTuple):
+    """One synthetic source video."""
+    video_id: str
+    seconds: int
+    codec: str
+    resolution: str = "1280x720"
+    fps: int = 30
+
+    @property
+    def title(self) -> str:
+        return f"Synthetic {self.codec} {self.resolution} ({self.seconds}s)"
+
+    @property
+    def peak_fraction(self) -> float:
+        """Where in the source the replay peak sits, stable per video ID."""
+        return 0.2 + (zlib.crc32(self.video_id.encode()) % 600) / 1000.0
+
+
+def _specs(rows: List[tuple]) -> List[SourceSpec]:
+    return [SourceSpec(f"bench{i:06d}", *row) for i, row in enumerate(rows)]
+
+
+SCALES: Dict[str, List[SourceSpec]] = {
+    "small": _specs([
+        (120, "h264"),
+        (90, "vp9", "854x480"),
+        (180, "mpeg4"),
+    ]),
+    "medium": _specs([
+        (120, "h264"),
+        (90, "vp9", "854x480"),
+        (180, "mpeg4"),
+        (600, "h264", "1920x1080"),
+        (300, "hevc", "1920x1080"),
+        (240, "h264", "1280x720", 60),
+    ]),
+    "large": _specs([
+        (120, "h264"),
+        (90, "vp9", "854x480"),
+        (180, "mpeg4"),
+        (600, "h264", "1920x1080"),
+        (300, "hevc", "1920x1080"),
+        (240, "h264", "1280x720", 60),
+        (1800, "h264", "1920x1080"),
+        (900, "vp9", "1280x720"),
+        (1200, "hevc", "1920x1080"),
+        (420, "mpeg4", "854x480"),
+    ]),
+}
+
+
+def build_source_command(spec: SourceSpec, output_path: str) -> List[str]:
+    """
+    Build the ffmpeg command that synthesizes one source.
+
+    Args:
+        spec (SourceSpec): The source to generate.
+        output_path (str): Destination MP4.
+
+    Returns:
+        List[str]: The full command line.
+    """
+    frequency = 220 + zlib.crc32(spec.video_id.encode()) % 660
+    return base_command() + [
+        "-f", "lavfi", "-i", f"testsrc2=size={spec.resolution}:rate={spec.fps}:duration={spec.seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency={frequency}:beep_factor=4:sample_rate=48000:duration={spec.seconds}",
+        *CODEC_ARGS[spec.codec],
+        "-c:a", "aac", "-b:a", "128k", "-ac", "2",
+        "-shortest", "-movflags", "+faststart",
+        output_path,
+    ]
+
+
+def generate_sources(specs: List[SourceSpec], media_dir: str) -> Dict[str, str]:
+    """
+    Generate every source that is not already on disk.
+
+    Args:
+        specs (List[SourceSpec]): Sources to generate.
+        media_dir (str): Directory for the MP4 files (reused across runs).
+
+    Returns:
+        Dict[str, str]: Path per video ID.
+    """
+    os.makedirs(media_dir, exist_ok=True)
+    paths = {}
+    for spec in specs:
+        path = os.path.join(media_dir, f"{spec.video_id}.{spec.codec}.{spec.seconds}s.{spec.resolution}.mp4")
+        if not os.path.exists(path):
+            tmp = f"{path}.part.mp4"
+            run_ffmpeg(build_source_command(spec, tmp), timeout=max(600, spec.seconds * 4))
+            os.replace(tmp, path)
+        paths[spec.video_id] = path
+    return paths
+
+
+def heatmap(spec: SourceSpec) -> List[dict]:
+    """Replay heatmap in yt-dlp's ``info["heatmap"]`` layout, peaking at ``peak_fraction``."""
+    step = spec.seconds / HEATMAP_MARKERS
+    peak = spec.peak_fraction * spec.seconds
+    width = max(spec.seconds / 20, step)
+    return [
+        {
+            "start_time": i * step,
+            "end_time": (i + 1) * step,
+            "value": round(0.1 + 0.9 * math.exp(-(((i + 0.5) * step - peak) / width) ** 2), 4),
+        }
+        for i in range(HEATMAP_MARKERS)
+    ]
+
+
+def transcript_json3(spec: SourceSpec) -> dict:
+    """Captions in YouTube's json3 layout, livelier around the replay peak."""
+    events = []
+    peak = spec.peak_fraction * spec.seconds
+    count = int(spec.seconds // CAPTION_SECONDS)
+    for i in range(count):
+        start = i * CAPTION_SECONDS
+        if abs(start - peak) < 15:
+            text = f"No way, did you see that?! Moment {i} is unbelievable!"
+        else:
+            text = f"Line {i} of the {spec.codec} test pattern keeps moving across the screen."
+        events.append({
+            "tStartMs": int(start * 1000),
+            "dDurationMs": int(CAPTION_SECONDS * 1000),
+            "segs": [{"utf8": text}],
+        })
+    return {"events": events}
+
+
+def build_section_command(source_path: str, start: float, end: float, output_path: str) -> List[str]:
+    """Cut a time range out of a source without re-encoding, as yt-dlp does for ranges."""
+    return base_command() + [
+        "-ss", f"{start:.3f}", "-to", f"{end:.3f}", "-i", source_path,
+        "-map", "0", "-c", "copy", "-avoid_negative_ts", "make_zero",
+        output_path,
+    ]
+
+
+def build_normalize_command(
+    input_path: str,
+    output_path: str,
+    start: float,
+    duration: float,
+    resolution: str,
+    fps: int,
+    audio_filter: str,
+    preset: str,
+    crf: int,
+    sample_rate: int,
+) -> List[str]:
+    """
+    Re-encode a clip to the render's stream layout so segments can be concatenated.
+
+    Sources arrive in different codecs, sizes and frame rates; the concat
+    demuxer needs identical parameters across segments.
+    """
+    width, _, height = resolution.partition("x")
+    return base_command() + [
+        "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", input_path,
+        "-vf", (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,fps={fps},format=yuv420p"),
+        "-af", f"{audio_filter},aresample={sample_rate}",
+        "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+        "-c:a", "aac", "-b:a", "192k", "-ar", str(sample_rate), "-ac", "2",
+        output_path,
+    ]
+
+
+def build_card_command(
+    narration_path: str,
+    output_path: str,
+    seconds: float,
+    resolution: str,
+    fps: int,
+    audio_filter: str,
+    preset: str,
+    sample_rate: int,
+) -> List[str]:
+    """Build a title-card segment: a solid frame under the narration for one clip."""
+    return base_command() + [
+        "-f", "lavfi", "-i", f"color=c=0x101820:s={resolution}:r={fps}:d={seconds:.3f}",
+        "-i", narration_path,
+        "-af", f"{audio_filter},aresample={sample_rate},apad",
+        "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "192k", "-ar", str(sample_rate), "-ac", "2",
+        "-shortest", output_path,
+    ]
+
+
+def build_tts_stub_command(seconds: float, output_path: str, sample_rate: int = 22050) -> List[str]:
+    """Stand-in for a TTS voice: a mono tone as long as the line would take to speak."""
+    return base_command() + [
+        "-f", "lavfi", "-i", f"sine=frequency=180:beep_factor=2:sample_rate={sample_rate}:duration={seconds:.3f}",
+        "-ac", "1", output_path,
+    ]
@@ -0,0 +1,422 @@
+"""
+End-to-end pipeline benchmark on synthetic media with local stub services.
+
+Generates lavfi sources (cached in ``--media-dir``), starts the stub
+services and runs discovery, probe, analysis, acquisition, narration,
+compilation, shorts, thumbnails and upload with the real pipeline modules.
+Each stage's wall time, CPU, peak RSS and bytes written are printed and
+stored as JSON. With ``--baseline`` the run fails if a stage regressed by
+more than ``--tolerance``.
+
+Narration uses the Piper CLI when ``--piper-model`` is given; otherwise a
+tone as long as the spoken line stands in for the voice.
+
+Usage:
+    python benchmarks/run.py --scale small
+    python benchmarks/run.py --scale medium --write-baseline benchmarks/baseline.medium.json
+    python benchmarks/run.py --scale medium --baseline benchmarks/baseline.medium.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import aiohttp  # noqa: E402
+
+from benchmarks.measure import StageMeter, StageResult, find_regressions, summarize  # noqa: E402
+from benchmarks.media import (  # noqa: E402
+    SCALES,
+    SourceSpec,
+    build_card_command,
+    build_normalize_command,
+    build_tts_stub_command,
+    generate_sources,
+)
+from benchmarks.stubs import LocalYoutubeDL, StubServices  # noqa: E402
+from src.acquisition.sections import SectionDownload, SectionDownloader, SourceProbe  # noqa: E402
+from src.acquisition.source_store import SourceStore  # noqa: E402
+from src.analysis.most_replayed import MostReplayedAnalyzer  # noqa: E402
+from src.analysis.transcript import TranscriptAnalyzer, load_json3  # noqa: E402
+from src.compilation.compiler import RenderOutputs, VideoCompiler  # noqa: E402
+from src.compilation.ffmpeg_wrapper import get_media_info, run_ffmpeg, run_ffmpeg_async  # noqa: E402
+from src.compilation.loudness import LoudnessCatalog  # noqa: E402
+from src.compilation.smart_crop import SmartCropPlanner  # noqa: E402
+from src.config import (  # noqa: E402
+    AudioConfig,
+    BrandingConfig,
+    DiscoveryConfig,
+    GeneralConfig,
+    LLMConfig,
+    LLMProviderConfig,
+    StorageConfig,
+    TelegramConfig,
+    VideoConfig,
+)
+from src.database import Clip, DiscoveredVideo, PipelineRun, get_session, init_db  # noqa: E402
+from src.discovery.fanout import DiscoveryFanout  # noqa: E402
+from src.discovery.http import ConditionalClient  # noqa: E402
+from src.discovery.reddit_source import RedditSource  # noqa: E402
+from src.discovery.youtube_source import YouTubeSource  # noqa: E402
+from src.llm.client import LLMClient  # noqa: E402
+from src.publishing.telegram_notifier import TelegramNotifier  # noqa: E402
+from src.thumbnails.frame_selector import FrameSelector  # noqa: E402
+from src.utils.rate_limit import TokenBucket  # noqa: E402
+
+NICHE = "benchmark"
+RUN_KEY = "benchmark"
+WORDS_PER_SECOND = 2.5
+CARD_PAUSE_SECONDS = 0.5
+NORMALIZE_WORKERS = 2
+SHORTS = 2
+# The stubs impose no rate limits, so the buckets only need to stay out of the way.
+STUB_REQUESTS_PER_SECOND = 1000.0
+
+
+class PipelineBenchmark:
+    """Runs each pipeline stage once over the synthetic sources, measuring every stage."""
+
+    def __init__(self, specs: Sequence[SourceSpec], paths: Dict[str, str], stubs: StubServices,
+                 work_dir: str, args: argparse.Namespace):
+        self.specs = {spec.video_id: spec for spec in specs}
+        self.paths = paths
+        self.stubs = stubs
+        self.meter = StageMeter(work_dir)
+        self.piper_model: Optional[str] = args.piper_model
+
+        self.general = GeneralConfig(
+            working_dir=os.path.join(work_dir, "working"),
+            archive_dir=os.path.join(work_dir, "archive"),
+            log_dir=os.path.join(work_dir, "logs"),
+        )
+        self.video = VideoConfig(
+            resolution=args.resolution, preset=args.preset, target_clips=len(specs),
+            clip_duration_min=20, clip_duration_max=40, shorts_duration_max=30, teaser_duration_sec=10,
+        )
+        self.audio = AudioConfig()
+        self.discovery = DiscoveryConfig(
+            youtube_api_key="benchmark", youtube_regions=["US", "GB"],
+            reddit_subreddits={NICHE: ["videos", "gaming"]},
+            min_views=0, min_viral_score=0.0, max_candidates_per_niche=50,
+        )
+        self.llm = LLMConfig(
+            primary=LLMProviderConfig(name="stub", base_url=f"{stubs.url}/v1", model="stub",
+                                      max_retries=1, timeout_seconds=60),
+            prompt_dir=os.path.join(ROOT, "config", "prompts"),
+        )
+        self.telegram = TelegramConfig(bot_token="123456:benchmark", authorized_user_ids=[1, 2])
+        os.makedirs(self.general.working_dir, exist_ok=True)
+        self.engine = init_db(os.path.join(work_dir, "benchmark.db"))
+        self.downloader = SectionDownloader(
+            self.video, self.general,
+            ydl_factory=partial(LocalYoutubeDL, self.specs, self.paths),
+            store=SourceStore(self.general, StorageConfig()),
+        )
+
+        self.row_ids: Dict[str, int] = {}
+        self.probes: Dict[str, SourceProbe] = {}
+        self.clips: Dict[str, Tuple[float, float, str]] = {}
+        self.sections: Dict[str, SectionDownload] = {}
+        self.narration: Dict[str, str] = {}
+        self.outputs: Optional[RenderOutputs] = None
+
+    def _path(self, *parts: str) -> str:
+        path = os.path.join(self.general.working_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    async def run(self) -> Dict[str, StageResult]:
+        """
+        Run all stages in pipeline order.
+
+        Returns:
+            Dict[str, StageResult]: Measurements per stage.
+
+        Raises:
+            RuntimeError: If a stage produced nothing for the next one.
+        """
+        async with aiohttp.ClientSession() as session:
+            stages = [
+                ("discovery", partial(self.discover, session)),
+                ("probe", self.probe),
+                ("analysis", partial(self.analyze, session)),
+                ("acquisition", self.acquire),
+                ("narration", self.narrate),
+                ("compilation", self.compile),
+                ("shorts", self.shorts),
+                ("thumbnails", self.thumbnails),
+                ("upload", self.upload),
+            ]
+            for name, stage in stages:
+                print(f"  {name} ...", flush=True)
+                with self.meter.stage(name):
+                    await stage()
+        return self.meter.results
+
+    def _save_discovered(self, rows: List[DiscoveredVideo]) -> Dict[str, int]:
+        session = get_session(self.engine)
+        try:
+            session.add_all(rows)
+            session.commit()
+            return {row.video_id: row.id for row in rows}
+        finally:
+            session.close()
+
+    async def discover(self, session: aiohttp.ClientSession) -> None:
+        client = ConditionalClient(session)
+        youtube = YouTubeSource(
+            client, self.discovery.youtube_api_key, TokenBucket(STUB_REQUESTS_PER_SECOND),
+            self.discovery.youtube_daily_quota_limit, base_url=f"{self.stubs.url}/youtube/v3",
+        )
+        reddit = RedditSource(
+            client, TokenBucket(STUB_REQUESTS_PER_SECOND), self.discovery.reddit_user_agent,
+            self.discovery.reddit_min_score, base_url=self.stubs.url,
+        )
+        fanout = DiscoveryFanout(youtube, reddit, self.discovery)
+        batch = await fanout.discover(
+            self.discovery.youtube_regions, self.discovery.reddit_subreddits[NICHE], ["benchmark highlights"],
+        )
+        order, scores = batch.rank(self.discovery)
+        rows = batch.to_discovered_videos(order, scores, NICHE)
+        self.row_ids = await asyncio.to_thread(self._save_discovered, rows)
+        missing = set(self.specs) - set(self.row_ids)
+        if missing:
+            raise RuntimeError(f"Discovery did not rank the synthetic sources {sorted(missing)}")
+
+    async def probe(self) -> None:
+        probes = await asyncio.gather(*(self.downloader.probe(video_id) for video_id in self.specs))
+        self.probes = {probe.video_id: probe for probe in probes}
+
+    async def analyze(self, session: aiohttp.ClientSession) -> None:
+        replayed = MostReplayedAnalyzer(session, self.video, watch_url=f"{self.stubs.url}/watch")
+        peaks = await replayed.find_moments(self.specs)
+        for video_id, (peak, *_) in peaks.items():
+            self.clips[video_id] = (peak.start, peak.end, "most_replayed")
+
+        transcripts = {
+            video_id: (probe.title, load_json3(probe.subtitle_path))
+            for video_id, probe in self.probes.items()
+            if video_id not in self.clips and probe.subtitle_path
+        }
+        if transcripts:
+            moments = await TranscriptAnalyzer(LLMClient(self.llm), self.video).analyze(transcripts)
+            for video_id, moment in moments.items():
+                self.clips[video_id] = (moment.start, moment.end, "transcript")
+        if not self.clips:
+            raise RuntimeError("Analysis chose no clips")
+
+    async def acquire(self) -> None:
+        sections = await asyncio.gather(*(
+            self.downloader.download_section(self.probes[video_id], start, end, run_id=RUN_KEY)
+            for video_id, (start, end, _) in self.clips.items()
+        ))
+        self.sections = {section.video_id: section for section in sections}
+
+    def _speak(self, text: str, path: str) -> None:
+        if self.piper_model:
+            subprocess.run(
+                ["piper", "--model", self.piper_model, "--output_file", path],
+                input=text.encode(), capture_output=True, check=True,
+            )
+        else:
+            run_ffmpeg(build_tts_stub_command(len(text.split()) / WORDS_PER_SECOND, path))
+
+    async def narrate(self) -> None:
+        for rank, video_id in enumerate(reversed(list(self.clips)), 1):
+            text = f"Number {rank}. {self.probes[video_id].title}. Watch what happens next."
+            path = self._path("narration", f"{video_id}.wav")
+            await asyncio.to_thread(self._speak, text, path)
+            self.narration[video_id] = path
+
+    async def compile(self) -> None:
+        catalog = LoudnessCatalog(self.audio, self.engine)
+        slots = asyncio.Semaphore(NORMALIZE_WORKERS)
+        vc, sample_rate = self.video, self.audio.output_sample_rate
+
+        async def segments_for(video_id: str) -> Tuple[List[str], float]:
+            start, end, _ = self.clips[video_id]
+            section, voice = self.sections[video_id], self.narration[video_id]
+            voice_filter, clip_filter = await asyncio.gather(
+                catalog.filter_for(voice, "narration"), catalog.filter_for(section.path, "clip"),
+            )
+            voice_seconds = float((await asyncio.to_thread(get_media_info, voice))["duration"] or 0.0)
+            card_seconds = voice_seconds + CARD_PAUSE_SECONDS
+            card, clip = self._path("segments", f"{video_id}.card.mp4"), self._path("segments", f"{video_id}.clip.mp4")
+            async with slots:
+                await run_ffmpeg_async(build_card_command(
+                    voice, card, card_seconds, vc.resolution, vc.fps, voice_filter, vc.preset, sample_rate,
+                ))
+                await run_ffmpeg_async(build_normalize_command(
+                    section.path, clip, start - section.start, end - start, vc.resolution, vc.fps,
+                    clip_filter, vc.preset, vc.crf, sample_rate,
+                ))
+            return [card, clip], card_seconds + end - start
+
+        # Countdown order: the best clip plays last.
+        parts = await asyncio.gather(*(segments_for(video_id) for video_id in reversed(list(self.clips))))
+        segments = [path for paths, _ in parts for path in paths]
+        duration = sum(seconds for _, seconds in parts)
+        self.outputs = await VideoCompiler(vc, self.audio).render(
+            segments, self._path("render", "benchmark.mp4"), expected_duration=duration,
+        )
+
+    async def shorts(self) -> None:
+        planner = SmartCropPlanner(self.video)
+        for video_id in list(self.clips)[:SHORTS]:
+            start, end, _ = self.clips[video_id]
+            section = self.sections[video_id]
+            info = await asyncio.to_thread(get_media_info, section.path)
+            await planner.render(
+                section.path, self._path("shorts", f"{video_id}.mp4"), start - section.start,
+                min(end - start, self.video.shorts_duration_max), info,
+            )
+
+    async def thumbnails(self) -> None:
+        branding = BrandingConfig()
+        video_id = next(iter(self.clips))
+        start, end, _ = self.clips[video_id]
+        section = self.sections[video_id]
+        info = await asyncio.to_thread(get_media_info, section.path)
+        await FrameSelector(branding).select_best_frames(
+            section.path, start - section.start, end - start, int(info["width"]), int(info["height"]),
+            self._path("thumbnails", "frames"), count=branding.thumbnail_variants,
+        )
+
+    def _record_run(self) -> int:
+        final = self.outputs.final_path
+        info = get_media_info(final)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        session = get_session(self.engine)
+        try:
+            run = PipelineRun(
+                niche=NICHE, cycle_start=now - timedelta(hours=6), cycle_end=now, status="review",
+                video_file_path=final, video_duration_seconds=info["duration"],
+                video_file_size_bytes=os.path.getsize(final),
+            )
+            session.add(run)
+            session.flush()
+            for rank, (video_id, (start, end, method)) in enumerate(self.clips.items(), 1):
+                session.add(Clip(
+                    pipeline_run_id=run.id, discovered_video_id=self.row_ids[video_id], rank_position=rank,
+                    start_time_seconds=start, end_time_seconds=end, clip_duration_seconds=end - start,
+                    extraction_method=method, clip_file_path=self.sections[video_id].path,
+                ))
+            session.commit()
+            return run.id
+        finally:
+            session.close()
+
+    async def upload(self) -> None:
+        from telegram import Bot
+
+        run_id = await asyncio.to_thread(self._record_run)
+        async with Bot(self.telegram.bot_token, base_url=f"{self.stubs.url}/bot") as bot:
+            notifier = TelegramNotifier(self.telegram, self.engine, self.general.project_name, bot=bot)
+            await notifier.send_teaser(run_id, self.outputs.teaser_path)
+            await notifier.send_full_video(run_id, self.outputs)
+
+
+async def run_benchmark(specs: Sequence[SourceSpec], paths: Dict[str, str], work_dir: str,
+                        args: argparse.Namespace) -> Tuple[Dict[str, StageResult], Dict[str, Any]]:
+    """Run the pipeline against fresh stub services."""
+    async with StubServices(specs) as stubs:
+        results = await PipelineBenchmark(specs, paths, stubs, work_dir, args).run()
+        return results, stubs.stats()
+
+
+def environment() -> Dict[str, Any]:
+    """Machine and tool versions, so results are only compared like with like."""
+    try:
+        ffmpeg = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.split("\n")[0]
+    except OSError:
+        ffmpeg = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": ffmpeg,
+    }
+
+
+def print_table(stages: Dict[str, dict], total: dict) -> None:
+    print(f"{'stage':<12} {'wall s':>8} {'cpu s':>8} {'rss MB':>8} {'child MB':>9} {'written MB':>11}")
+    for name, row in [*stages.items(), ("total", total)]:
+        print(f"{name:<12} {row['wall_seconds']:>8.2f} {row['cpu_seconds']:>8.2f} "
+              f"{row['peak_rss_bytes'] / 2 ** 20:>8.1f} {row['child_peak_rss_bytes'] / 2 ** 20:>9.1f} "
+              f"{row['bytes_written'] / 2 ** 20:>11.1f}")
+
+
+def write_json(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Source set (default: small)")
+    parser.add_argument("--media-dir", default=os.path.join(ROOT, "benchmarks", ".media"),
+                        help="Cache for the generated sources (default: benchmarks/.media)")
+    parser.add_argument("--work-dir", help="Working directory to keep (default: a temporary one)")
+    parser.add_argument("--resolution", default="1280x720", help="Render resolution (default: 1280x720)")
+    parser.add_argument("--preset", default="veryfast", help="x264 preset for renders (default: veryfast)")
+    parser.add_argument("--piper-model", help="Piper voice model; without it narration is a stub tone")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "latest.json"),
+                        help="Results file (default: benchmarks/results/latest.json)")
+    parser.add_argument("--baseline", help="Fail on regressions against this results file")
+    parser.add_argument("--write-baseline", help="Also write the results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    specs = SCALES[args.scale]
+    print(f"Generating {len(specs)} sources in {args.media_dir} ...", flush=True)
+    paths = generate_sources(specs, args.media_dir)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pipeline-bench-")
+    try:
+        stages, services = asyncio.run(run_benchmark(specs, paths, work_dir, args))
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    total = summarize(stages)
+    results = {
+        "scale": args.scale,
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "environment": environment(),
+        "stages": {name: result._asdict() for name, result in stages.items()},
+        "total": total._asdict(),
+        "services": services,
+    }
+    print_table(results["stages"], results["total"])
+    write_json(args.output, results)
+    if args.write_baseline:
+        write_json(args.write_baseline, results)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"Baseline is for scale {baseline.get('scale')!r}, not {args.scale!r}.")
+            return 2
+        regressions = find_regressions(results["stages"], baseline["stages"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""
+Local stand-ins for the external services the pipeline talks to.
+
+``StubServices`` is one aiohttp server with the YouTube Data API, Reddit
+listings, YouTube watch pages, an OpenAI-compatible chat endpoint and the
+Telegram Bot API, all answering from the synthetic source specs. The real
+clients are pointed at it through their ``base_url`` parameters, so the
+benchmark measures the pipeline's own request handling and parsing.
+``LocalYoutubeDL`` replaces ``yt_dlp.YoutubeDL`` for media: it answers probes
+from the specs and "downloads" ranges by cutting the generated files.
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+from aiohttp import web
+
+from benchmarks.media import SourceSpec, build_section_command, heatmap, transcript_json3
+from src.compilation.ffmpeg_wrapper import run_ffmpeg
+
+PAGE_SIZE = 50
+# Watch pages are megabytes of HTML after the player data.
+WATCH_PAGE_TRAILER = b"<!-- related videos, comments and scripts -->" * 40_000
+_ITEM_HEADER = re.compile(r"^=== \[(\w+)\]", re.MULTILINE)
+_LINE_START = re.compile(r"^\[(\d+(?:\.\d+)?)\]", re.MULTILINE)
+
+
+def _published(hours_ago: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(hours=hours_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class StubServices:
+    """One local HTTP server answering for YouTube, Reddit, the LLM and Telegram."""
+
+    def __init__(self, sources: Sequence[SourceSpec], filler_videos: int = 150, llm_delay: float = 0.0):
+        self.sources = {spec.video_id: spec for spec in sources}
+        self.filler = [f"fill{i:07d}" for i in range(filler_videos)]
+        self.llm_delay = llm_delay
+        self.requests: Counter = Counter()
+        self.bytes_received = 0
+        self.url = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_get("/youtube/v3/videos", self.youtube_videos)
+        app.router.add_get("/youtube/v3/search", self.youtube_search)
+        app.router.add_get("/r/{subreddit}/{sort}.json", self.reddit_listing)
+        app.router.add_get("/watch", self.watch_page)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/bot{token}/{method}", self.telegram)
+        return app
+
+    async def start(self) -> str:
+        """Start listening on a free local port and return the base URL."""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+        self.url = f"http://127.0.0.1:{self._runner.addresses[0][1]}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "StubServices":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests per endpoint and request bytes received, for the results file."""
+        return {"requests": dict(sorted(self.requests.items())), "bytes_received": self.bytes_received}
+
+    # YouTube Data API
+
+    def _video(self, video_id: str) -> dict:
+        spec = self.sources.get(video_id)
+        if spec is not None:
+            views, hours, seconds, title = 2_000_000, 3.0, spec.seconds, spec.title
+        else:
+            n = int(video_id[4:])
+            views, hours, seconds, title = 5_000 + 997 * n, 2.0 + n % 48, 60 + n % 900, f"Filler video {n}"
+        return {
+            "id": video_id,
+            "snippet": {
+                "title": title,
+                "channelId": f"UC{video_id[-4:]}",
+                "channelTitle": f"Channel {video_id[-4:]}",
+                "publishedAt": _published(hours),
+                "categoryId": "20",
+            },
+            "statistics": {
+                "viewCount": str(views),
+                "likeCount": str(views // 25),
+                "commentCount": str(views // 400),
+            },
+            "contentDetails": {"duration": f"PT{seconds // 60}M{seconds % 60}S"},
+        }
+
+    async def youtube_videos(self, request: web.Request) -> web.Response:
+        self.requests["youtube.videos"] += 1
+        if "id" in request.query:
+            ids = [i for i in request.query["id"].split(",") if i in self.sources or i.startswith("fill")]
+            return web.json_response({"items": [self._video(i) for i in ids]})
+        chart = list(self.sources) + self.filler
+        start = int(request.query.get("pageToken", 0))
+        end = start + min(int(request.query.get("maxResults", PAGE_SIZE)), PAGE_SIZE)
+        body: Dict[str, Any] = {"items": [self._video(i) for i in chart[start:end]]}
+        if end < len(chart):
+            body["nextPageToken"] = str(end)
+        return web.json_response(body)
+
+    async def youtube_search(self, request: web.Request) -> web.Response:
+        self.requests["youtube.search"] += 1
+        ids = list(self.sources) + self.filler[:20]
+        limit = int(request.query.get("maxResults", PAGE_SIZE))
+        return web.json_response({"items": [{"id": {"kind": "youtube#video", "videoId": i}} for i in ids[:limit]]})
+
+    # Reddit
+
+    async def reddit_listing(self, request: web.Request) -> web.Response:
+        self.requests["reddit.listing"] += 1
+        children = [
+            {"data": {"url": f"https://youtu.be/{video_id}", "score": 1500, "title": f"Look at {video_id}"}}
+            for video_id in list(self.sources)[::2]
+        ]
+        children += [
+            {"data": {"url": f"https://www.youtube.com/watch?v={video_id}", "score": 40 + i, "title": "meh"}}
+            for i, video_id in enumerate(self.filler[:30])
+        ]
+        children.append({"data": {"url": "https://example.com/article", "score": 9000, "title": "not a video"}})
+        return web.json_response({"data": {"children": children, "after": None}})
+
+    # Watch pages ("Most replayed")
+
+    async def watch_page(self, request: web.Request) -> web.StreamResponse:
+        self.requests["youtube.watch"] += 1
+        spec = self.sources.get(request.query.get("v", ""))
+        head = b'<!DOCTYPE html><html><head><title>Stub - YouTube</title></head><body><script>'
+        if spec is not None and list(self.sources).index(spec.video_id) % 3 != 2:
+            # Every third source has no heatmap, so the transcript path is exercised too.
+            markers = [
+                {
+                    "startMillis": str(int(entry["start_time"] * 1000)),
+                    "durationMillis": str(int((entry["end_time"] - entry["start_time"]) * 1000)),
+                    "intensityScoreNormalized": entry["value"],
+                }
+                for entry in heatmap(spec)
+            ]
+            head += b'var ytInitialData={"frameworkUpdates":{"markers":'
+            head += json.dumps(markers, separators=(",", ":")).encode() + b"}};"
+        resp = web.StreamResponse()
+        resp.content_type = "text/html"
+        await resp.prepare(request)
+        body = head + b"</script>" + WATCH_PAGE_TRAILER
+        try:
+            for i in range(0, len(body), 64 * 1024):
+                await resp.write(body[i:i + 64 * 1024])
+            await resp.write_eof()
+        except ConnectionResetError:
+            pass  # the scanner hangs up once it has the markers
+        return resp
+
+    # OpenAI-compatible chat completions
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        self.requests["llm.chat"] += 1
+        raw = await request.read()
+        self.bytes_received += len(raw)
+        body = json.loads(raw)
+        if self.llm_delay:
+            await asyncio.sleep(self.llm_delay)
+        prompt = body["messages"][-1]["content"]
+        headers = list(_ITEM_HEADER.finditer(prompt))
+        results = []
+        for i, header in enumerate(headers):
+            block = prompt[header.end():headers[i + 1].start() if i + 1 < len(headers) else len(prompt)]
+            first = _LINE_START.search(block)
+            start = float(first.group(1)) if first else 0.0
+            results.append({"id": header.group(1), "start": start, "end": start + 30, "reason": "loudest reaction"})
+        return web.json_response({
+            "id": f"chatcmpl-{self.requests['llm.chat']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps({"results": results})},
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20 * len(results),
+                      "total_tokens": len(prompt) // 4 + 20 * len(results)},
+        })
+
+    # Telegram Bot API
+
+    async def telegram(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.requests[f"telegram.{method}"] += 1
+        raw = await request.read()
+        self.bytes_received += len(raw)
+        if method == "getMe":
+            result: Any = {"id": 1, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+        else:
+            result = {
+                "message_id": self.requests[f"telegram.{method}"],
+                "date": int(time.time()),
+                "chat": {"id": 1, "type": "private"},
+            }
+        return web.json_response({"ok": True, "result": result})
+
+
+class LocalYoutubeDL:
+    """
+    Stands in for ``yt_dlp.YoutubeDL`` over the generated sources.
+
+    Use with ``functools.partial(LocalYoutubeDL, specs, paths)`` as the
+    ``ydl_factory`` of ``SectionDownloader``.
+    """
+
+    def __init__(self, specs: Dict[str, SourceSpec], paths: Dict[str, str], options: dict):
+        self.specs = specs
+        self.paths = paths
+        self.options = options
+
+    def __enter__(self) -> "LocalYoutubeDL":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+    def sanitize_info(self, info: dict) -> dict:
+        return info
+
+    def _output(self, video_id: str, ext: str) -> str:
+        return self.options["outtmpl"].replace("%(id)s", video_id).replace("%(ext)s", ext)
+
+    def extract_info(self, url: str, download: bool = True) -> dict:
+        video_id = parse_qs(urlparse(url).query)["v"][0]
+        spec, source = self.specs[video_id], self.paths[video_id]
+        info: Dict[str, Any] = {
+            "id": video_id,
+            "title": spec.title,
+            "duration": spec.seconds,
+            "tbr": os.path.getsize(source) * 8 / spec.seconds / 1000,
+            "heatmap": heatmap(spec),
+        }
+        if self.options.get("skip_download"):
+            path = self._output(video_id, "en.json3")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(transcript_json3(spec), f)
+            info["requested_subtitles"] = {"en": {"ext": "json3", "filepath": path}}
+            return info
+
+        path = self._output(video_id, "mp4")
+        ranges = self.options.get("download_ranges")
+        sections: List[dict] = list(ranges(info, self)) if ranges is not None else []
+        if sections:
+            lo, hi = sections[0]["start_time"], sections[0]["end_time"]
+        else:
+            lo, hi = 0.0, float(spec.seconds)
+        run_ffmpeg(build_section_command(source, lo, min(hi, math.ceil(spec.seconds)), path))
+        info["requested_downloads"] = [{"filepath": path}]
+        return info
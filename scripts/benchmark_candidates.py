@@ -0,0 +1,104 @@
+"""
+Compare memory and build time of discovery candidates stored as a list of
+pydantic models versus a CandidateBatch.
+
+Usage:
+    python scripts/benchmark_candidates.py --items 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel  # noqa: E402
+
+from src.discovery.candidates import SOURCE_TRENDING, CandidateBatchBuilder  # noqa: E402
+
+
+class CandidateModel(BaseModel):
+    """One candidate per object, as a naive pydantic implementation would hold it."""
+    video_id: str
+    title: str
+    channel_id: str
+    channel_name: str
+    source: str
+    view_count: int
+    like_count: int
+    comment_count: int
+    published_at: datetime
+    duration_seconds: int
+    category_id: int
+    reddit_score: int
+    view_velocity: float
+
+
+def synthetic_items(n: int, channels: int) -> List[tuple]:
+    """Raw API-like tuples with realistic string lengths and channel reuse."""
+    rng = random.Random(0)
+    now = time.time()
+    items = []
+    for i in range(n):
+        ch = rng.randrange(channels)
+        items.append((
+            f"{i:011d}", f"Unbelievable moment number {i} caught on stream #{rng.randrange(1000)}",
+            f"UC{ch:022d}", f"Channel {ch}", rng.randrange(10_000, 5_000_000),
+            rng.randrange(100, 200_000), rng.randrange(10, 20_000),
+            now - rng.uniform(0, 6 * 3600), rng.randrange(30, 3600), 20,
+        ))
+    return items
+
+
+def build_models(items: List[tuple]) -> list:
+    return [
+        CandidateModel(
+            video_id=v, title=t, channel_id=c, channel_name=cn, source="youtube_trending",
+            view_count=views, like_count=likes, comment_count=comments,
+            published_at=datetime.fromtimestamp(pub, tz=timezone.utc), duration_seconds=dur,
+            category_id=cat, reddit_score=0, view_velocity=views / 3.0,
+        )
+        for v, t, c, cn, views, likes, comments, pub, dur, cat in items
+    ]
+
+
+def build_batch(items: List[tuple]):
+    builder = CandidateBatchBuilder()
+    for v, t, c, cn, views, likes, comments, pub, dur, cat in items:
+        builder.add(v, t, c, cn, SOURCE_TRENDING, views, likes, comments, pub, dur, cat,
+                    view_velocity=views / 3.0)
+    return builder.build()
+
+
+def measure(build: Callable, items: List[tuple]) -> Tuple[float, float]:
+    """Peak traced memory (MB) retained by the result, and build time (s)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(items)
+    elapsed = time.perf_counter() - started
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained / 1e6, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--channels", type=int, default=5_000)
+    args = parser.parse_args()
+
+    items = synthetic_items(args.items, args.channels)
+    print(f"{args.items:,} candidates, {args.channels:,} distinct channels")
+    print(f"{'representation':<22} {'memory MB':>10} {'build s':>8}")
+    for name, build in [("pydantic models", build_models), ("CandidateBatch", build_batch)]:
+        mb, seconds = measure(build, items)
+        print(f"{name:<22} {mb:>10.1f} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
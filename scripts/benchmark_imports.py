@@ -0,0 +1,124 @@
+"""
+Measure import cost per entry-point role with ``python -X importtime``.
+
+Each case runs in a fresh interpreter. The reported time is the sum of the
+cumulative import times of top-level imports, excluding interpreter startup
+(``site`` and ``encodings``). With ``--baseline`` the run fails if a case
+got slower than the baseline by more than ``--tolerance``.
+
+Usage:
+    python scripts/benchmark_imports.py
+    python scripts/benchmark_imports.py --write-baseline scripts/import_baseline.json
+    python scripts/benchmark_imports.py --baseline scripts/import_baseline.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_MODULES = {"site", "encodings", "_frozen_importlib_external", "zipimport"}
+
+# Everything a monolithic entry point would import up front.
+ALL_SUBSYSTEMS = [
+    "src.config", "src.database", "src.orchestrator.config_service", "src.orchestrator.storage",
+    "src.compilation.compiler", "src.publishing.telegram_notifier", "src.publishing.file_server",
+    "src.analytics.channel_analytics", "src.analytics.weight_optimizer",
+    "src.acquisition.downloader", "telegram",
+]
+
+
+def cases(database: str) -> Dict[str, List[str]]:
+    """Interpreter arguments for each measured role."""
+    main = ["-m", "src.main", "--database", database]
+    return {
+        "help": ["-m", "src.main", "--help"],
+        "init-db": main + ["init-db"],
+        "status": main + ["status"],
+        "serve-review (imports)": ["-c", "import src.main, src.config, src.publishing.file_server"],
+        "all subsystems": ["-c", "import " + ", ".join(ALL_SUBSYSTEMS)],
+    }
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Sum top-level cumulative import times from ``-X importtime`` output.
+
+    Args:
+        stderr (str): Captured stderr of the measured process.
+
+    Returns:
+        Tuple[float, List[Tuple[str, float]]]: Total milliseconds and the
+        top-level modules with their cumulative milliseconds.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):
+            continue  # nested import, already counted by its parent
+        name = name.strip()
+        if name not in STARTUP_MODULES:
+            modules.append((name, int(cumulative) / 1000))
+    return sum(ms for _, ms in modules), modules
+
+
+def measure(args: List[str], repeat: int) -> Tuple[float, List[Tuple[str, float]]]:
+    """Best-of-``repeat`` import time for one case."""
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode not in (0, 1):
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+        total, modules = parse_importtime(result.stderr)
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports to list per case")
+    parser.add_argument("--baseline", help="Fail on regressions against this JSON file")
+    parser.add_argument("--write-baseline", help="Write results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, case_args in cases(os.path.join(tmp, "bench.db")).items():
+            total, modules = measure(case_args, args.repeat)
+            results[name] = round(total, 1)
+            heaviest = sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]
+            print(f"{name:<24} {total:>8.1f} ms   "
+                  + ", ".join(f"{mod} {ms:.0f}" for mod, ms in heaviest))
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = [
+            f"{name}: {results[name]:.1f} ms vs {limit:.1f} ms baseline"
+            for name, limit in baseline.items()
+            if name in results and results[name] > limit * (1 + args.tolerance)
+        ]
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
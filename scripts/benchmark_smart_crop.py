@@ -0,0 +1,57 @@
+"""
+Measure smart-crop planning speed against realtime on synthetic frames.
+
+Decoding is ffmpeg's job; this times only the NumPy planning stage, which
+is the part the Python process pays for on every Short.
+
+Usage:
+    python scripts/benchmark_smart_crop.py --seconds 60 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compilation.smart_crop import SmartCropPlanner  # noqa: E402
+from src.config import VideoConfig  # noqa: E402
+
+
+def synthetic_frames(seconds: float, fps: float, width: int, height: int) -> np.ndarray:
+    """Noisy frames with a bright subject wandering horizontally."""
+    rng = np.random.default_rng(0)
+    count = int(seconds * fps)
+    frames = rng.integers(30, 70, size=(count, height, width), dtype=np.uint8)
+    xs = (width / 2 + width / 3 * np.sin(np.arange(count) / (fps * 4))).astype(int)
+    for i, x in enumerate(xs):
+        frames[i, height // 3:2 * height // 3, max(x - 8, 0):x + 8] = 240
+    return frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    config = VideoConfig()
+    planner = SmartCropPlanner(config)
+    width, height = planner.analysis_size(1920, 1080)
+    frames = synthetic_frames(args.seconds, config.smart_crop_analysis_fps, width, height)
+    planner.plan_frames(frames, 1920, 1080)
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        plan = planner.plan_frames(frames, 1920, 1080)
+    elapsed = (time.perf_counter() - started) / args.repeat
+    print(f"frames:     {len(frames)} at {width}x{height}")
+    print(f"keyframes:  {len(plan.times)}")
+    print(f"plan time:  {elapsed * 1000:.1f} ms for {args.seconds:.0f} s of video")
+    print(f"speed:      {args.seconds / elapsed:.0f}x realtime")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Index the background music library by mood and loudness.
+
+Scans ``audio.music_dir/<mood>/`` and measures new or changed tracks with
+ffmpeg's loudnorm, several at a time, writing ``audio.music_index_path``.
+Renders then normalize music in one pass from the index.
+
+Usage:
+    python scripts/index_music_library.py --workers 8
+    python scripts/index_music_library.py --force
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compilation.music_library import MusicLibrary  # noqa: E402
+from src.config import load_config  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--config", default="config/config.yaml", help="Config file (default: config/config.yaml)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel measurements (default: audio.loudness_workers)")
+    parser.add_argument("--force", action="store_true", help="Re-measure every track")
+    args = parser.parse_args()
+
+    library = MusicLibrary(load_config(args.config).audio)
+    started = time.perf_counter()
+    measured, removed, failed = asyncio.run(library.refresh(workers=args.workers, force=args.force))
+    elapsed = time.perf_counter() - started
+
+    print(f"measured: {measured}  removed: {removed}  failed: {failed}  ({elapsed:.1f} s)")
+    for mood in library.moods():
+        tracks = library.tracks(mood)
+        minutes = sum(t.duration or 0.0 for t in tracks) / 60
+        print(f"  {mood:<12} {len(tracks):>4} tracks  {minutes:7.1f} min")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,14 @@
 """
-Acquisition package init.
-"""
\ No newline at end of file
+Acquisition package: downloading source media.
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "Downloader": "src.acquisition.downloader",
+    "SectionDownloader": "src.acquisition.sections",
+    "SourceKey": "src.acquisition.source_store",
+    "SourceStore": "src.acquisition.source_store",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
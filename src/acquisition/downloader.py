@@ -5,7 +5,8 @@ import os
 import aiohttp
 from typing import Optional
 from dotenv import load_dotenv
-from utils.logging import get_logger
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
 
 load_dotenv()
 
@@ -26,6 +27,7 @@ class Downloader:
             await self.session.close()
             logger.info("Downloader shut down.")
 
+    @timed("download")
     async def download_media(self, url: str, destination_path: str) -> bool:
         """
         Download media from a given URL to a specified path.
@@ -51,6 +53,7 @@ class Downloader:
                             if not chunk:
                                 break
                             f.write(chunk)
+                            increment("download_bytes", len(chunk))
                     logger.info(f"Media downloaded successfully to {destination_path}.")
                     return True
                 else:
@@ -0,0 +1,286 @@
+"""
+Two-phase source acquisition: probe first, then download only the clip.
+
+Only a 20-90 second window of each source ends up in a video, so pulling
+the whole file (up to ``max_source_duration_seconds``) wastes bandwidth and
+working-tier space. Phase one fetches metadata, the "Most replayed" heatmap
+and json3 captions, plus low-bitrate audio when energy analysis needs it.
+Phase two downloads just the chosen range, padded so the cut can land on
+keyframes, at full quality via yt-dlp's ``download_ranges``.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from src.acquisition.source_store import SourceKey, SourceStore
+from src.analysis.most_replayed import Heatmap, heatmap_from_info
+from src.config import GeneralConfig, VideoConfig
+from src.orchestrator.storage import StorageManager
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
+
+logger = get_logger(__name__)
+
+WATCH_URL = "https://www.youtube.com/watch?v={}"
+# Muxing and container overhead on top of the stream bitrates.
+_SIZE_MARGIN = 1.2
+
+
+class SourceProbe(NamedTuple):
+    """What phase one learned about a source."""
+    video_id: str
+    title: str
+    duration: float
+    heatmap: Optional[Heatmap]
+    subtitle_path: Optional[str]
+    audio_path: Optional[str]
+    bitrate_kbps: float
+
+
+class SectionDownload(NamedTuple):
+    """A downloaded section and where it sits in the source."""
+    video_id: str
+    path: str
+    start: float
+    end: float
+
+
+def section_range(start: float, end: float, duration: float, padding: float) -> Tuple[float, float]:
+    """
+    Pad a clip range and clamp it to the source.
+
+    Args:
+        start (float): Clip start in seconds.
+        end (float): Clip end in seconds.
+        duration (float): Source duration (0 if unknown).
+        padding (float): Seconds to add on each side.
+
+    Returns:
+        Tuple[float, float]: The range to download.
+    """
+    lo = max(0.0, start - padding)
+    hi = end + padding
+    if duration > 0:
+        hi = min(hi, duration)
+    return lo, max(hi, lo)
+
+
+def _downloaded_path(info: Dict[str, Any]) -> Optional[str]:
+    downloads = info.get("requested_downloads") or []
+    return downloads[0].get("filepath") if downloads else info.get("filepath")
+
+
+class SectionDownloader:
+    """Probes sources and downloads only the time ranges clips need."""
+
+    def __init__(
+        self,
+        config: VideoConfig,
+        general: GeneralConfig,
+        storage: Optional[StorageManager] = None,
+        ydl_factory: Optional[Callable[[dict], Any]] = None,
+        store: Optional[SourceStore] = None,
+        shared_slots: Optional[asyncio.Semaphore] = None,
+    ):
+        """
+        Args:
+            config (VideoConfig): Source format, section padding and
+                ``downloads_per_run``, the parallel downloads of this downloader.
+            general (GeneralConfig): Working directory.
+            storage (Optional[StorageManager]): Admission control for downloads.
+            ydl_factory (Optional[Callable[[dict], Any]]): ``YoutubeDL`` stand-in.
+            store (Optional[SourceStore]): Shared store for downloaded sections.
+            shared_slots (Optional[asyncio.Semaphore]): Process-wide download
+                slots shared by every run's downloader, sized from
+                ``scheduler.max_concurrent_downloads``.
+        """
+        self.config = config
+        self.storage = storage
+        self.store = store
+        self.probe_dir = os.path.join(general.working_dir, "probe")
+        self.download_dir = os.path.join(general.working_dir, "downloads")
+        self._ydl_factory = ydl_factory
+        self._run_slots = asyncio.Semaphore(config.downloads_per_run)
+        self._shared_slots = shared_slots
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """Hold one of this downloader's slots and, if shared, one of the process-wide ones."""
+        async with self._run_slots:
+            if self._shared_slots is None:
+                yield
+            else:
+                async with self._shared_slots:
+                    yield
+
+    def _run_ydl(self, options: dict, url: str, download: bool) -> Dict[str, Any]:
+        if self._ydl_factory is None:
+            from yt_dlp import YoutubeDL
+
+            self._ydl_factory = YoutubeDL
+        base = {"quiet": True, "no_warnings": True, "noplaylist": True, "socket_timeout": 30, "retries": 3}
+        with self._ydl_factory({**base, **options}) as ydl:
+            return ydl.sanitize_info(ydl.extract_info(url, download=download))
+
+    @timed("acquisition_probe")
+    async def probe(self, video_id: str, with_audio: bool = False) -> SourceProbe:
+        """
+        Phase one: metadata, heatmap, captions and optionally low-bitrate audio.
+
+        Args:
+            video_id (str): YouTube video ID.
+            with_audio (bool): Also fetch a small audio-only file for energy analysis.
+
+        Returns:
+            SourceProbe: The probe result.
+        """
+        url = WATCH_URL.format(video_id)
+        os.makedirs(self.probe_dir, exist_ok=True)
+        info = await asyncio.to_thread(self._run_ydl, {
+            "format": self.config.source_format,
+            "skip_download": True,
+            "writesubtitles": True,
+            "writeautomaticsub": True,
+            "subtitleslangs": ["en"],
+            "subtitlesformat": "json3",
+            "outtmpl": os.path.join(self.probe_dir, "%(id)s.%(ext)s"),
+        }, url, True)
+        subtitles = (info.get("requested_subtitles") or {}).get("en") or {}
+        audio_path = None
+        if with_audio:
+            async with self._slot():
+                audio = await asyncio.to_thread(self._run_ydl, {
+                    "format": self.config.probe_audio_format,
+                    "outtmpl": os.path.join(self.probe_dir, "%(id)s.audio.%(ext)s"),
+                }, url, True)
+            audio_path = _downloaded_path(audio)
+            if audio_path:
+                increment("acquisition_probe_audio_bytes", os.path.getsize(audio_path))
+        return SourceProbe(
+            video_id=video_id,
+            title=info.get("title", ""),
+            duration=float(info.get("duration") or 0),
+            heatmap=heatmap_from_info(info.get("heatmap")),
+            subtitle_path=subtitles.get("filepath"),
+            audio_path=audio_path,
+            bitrate_kbps=float(info.get("tbr") or 0),
+        )
+
+    def predict_bytes(self, probe: SourceProbe, seconds: float) -> int:
+        """Expected size of ``seconds`` of the source at the selected format."""
+        if probe.bitrate_kbps > 0:
+            return int(probe.bitrate_kbps * 1000 / 8 * seconds * _SIZE_MARGIN)
+        if self.storage is not None:
+            return self.storage.predict_download_bytes(seconds)
+        return 0
+
+    async def _download_range(self, probe: SourceProbe, lo: float, hi: float, stem: str) -> str:
+        from yt_dlp.utils import download_range_func
+
+        options = {
+            "format": self.config.source_format,
+            "merge_output_format": "mp4",
+            "outtmpl": f"{stem}.%(ext)s",
+        }
+        if self.config.section_download:
+            options["download_ranges"] = download_range_func(None, [(lo, hi)])
+        nbytes = self.predict_bytes(probe, hi - lo)
+        url = WATCH_URL.format(probe.video_id)
+
+        async with self._slot():
+            if self.storage is not None:
+                async with self.storage.reserve(nbytes, f"{stem}.mp4", purpose="download"):
+                    info = await asyncio.to_thread(self._run_ydl, options, url, True)
+            else:
+                info = await asyncio.to_thread(self._run_ydl, options, url, True)
+        path = _downloaded_path(info)
+        if not path:
+            raise RuntimeError(f"yt-dlp produced no file for {probe.video_id} [{lo:.1f}-{hi:.1f}]")
+        return path
+
+    @timed("acquisition_section")
+    async def download_section(
+        self, probe: SourceProbe, start: float, end: float, run_id: Optional[str] = None
+    ) -> SectionDownload:
+        """
+        Phase two: download one padded time range at full quality.
+
+        With a source store and a ``run_id``, the range is taken from (or
+        added to) the store and held for that pipeline run.
+
+        Args:
+            probe (SourceProbe): Phase-one result for the source.
+            start (float): Clip start in seconds.
+            end (float): Clip end in seconds.
+            run_id (Optional[str]): Pipeline run that will use the file.
+
+        Returns:
+            SectionDownload: The downloaded file and its range in the source.
+
+        Raises:
+            RuntimeError: If yt-dlp reports no output file.
+        """
+        lo, hi = section_range(start, end, probe.duration, self.config.section_padding_seconds)
+        if not self.config.section_download:
+            lo, hi = 0.0, probe.duration
+
+        if self.store is not None and run_id is not None:
+            if self.config.section_download:
+                key = SourceKey(probe.video_id, self.config.source_format, int(lo * 1000), int(hi * 1000))
+            else:
+                key = SourceKey(probe.video_id, self.config.source_format)
+
+            fetched = False
+
+            async def fetch(stem: str) -> str:
+                nonlocal fetched
+                fetched = True
+                return await self._download_range(probe, lo, hi, stem)
+
+            path = (await self.store.acquire(key, run_id, fetch)).path
+            if not fetched:
+                # Stored earlier, or downloaded by a concurrent run this one joined.
+                logger.info(f"Reusing stored {probe.video_id} [{lo:.1f}s-{hi:.1f}s].")
+                return SectionDownload(probe.video_id, path, lo, hi)
+        else:
+            os.makedirs(self.download_dir, exist_ok=True)
+            stem = os.path.join(self.download_dir, f"{probe.video_id}.{int(lo * 1000)}-{int(hi * 1000)}")
+            path = await self._download_range(probe, lo, hi, stem)
+            if self.storage is not None:
+                self.storage.register_source(path)
+        increment("acquisition_section_seconds", hi - lo)
+        increment("acquisition_skipped_seconds", max(probe.duration - (hi - lo), 0.0))
+        logger.info(f"Downloaded {probe.video_id} [{lo:.1f}s-{hi:.1f}s] of {probe.duration:.0f}s to {path}.")
+        return SectionDownload(probe.video_id, path, lo, hi)
+
+    async def acquire(
+        self,
+        video_id: str,
+        choose: Callable[[SourceProbe], Awaitable[Optional[Tuple[float, float]]]],
+        with_audio: bool = False,
+        run_id: Optional[str] = None,
+    ) -> Optional[SectionDownload]:
+        """
+        Probe a source, let ``choose`` pick the clip range, and download it.
+
+        Args:
+            video_id (str): YouTube video ID.
+            choose (Callable[[SourceProbe], Awaitable[Optional[Tuple[float, float]]]]):
+                Returns the clip (start, end) from the probe, or None to skip.
+            with_audio (bool): Fetch low-bitrate audio in phase one.
+            run_id (Optional[str]): Pipeline run holding the stored section.
+
+        Returns:
+            Optional[SectionDownload]: The section, or None if the source was
+            too long or no range was chosen.
+        """
+        probe = await self.probe(video_id, with_audio)
+        if probe.duration > self.config.max_source_duration_seconds:
+            logger.info(f"Skipping {video_id}: {probe.duration:.0f}s exceeds max_source_duration_seconds.")
+            return None
+        clip = await choose(probe)
+        if clip is None:
+            logger.info(f"No clip range chosen for {video_id}.")
+            return None
+        return await self.download_section(probe, *clip, run_id=run_id)
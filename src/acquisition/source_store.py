@@ -0,0 +1,314 @@
+"""
+Shared store for downloaded source media.
+
+Entries are addressed by what they contain (video ID, format selector and
+time section), not by which pipeline run asked for them, so two niches
+picking the same video, or the next cycle picking it again, reuse one file.
+Pipeline runs take references instead of owning files; concurrent requests
+for a missing entry wait on a single transfer. Unreferenced entries are
+removed once they are older than ``source_max_age_hours`` or when the
+``StorageManager`` needs room. Each entry's ffprobe result is kept in a JSON
+sidecar so validation runs once per file.
+"""
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set
+
+from src.config import GeneralConfig, StorageConfig
+from src.orchestrator.storage import StorageManager
+from src.utils.logging import get_logger
+from src.utils.metrics import increment
+
+logger = get_logger(__name__)
+
+FULL_SOURCE = -1
+
+# Receives a path without extension and returns the file it wrote.
+Fetcher = Callable[[str], Awaitable[str]]
+Prober = Callable[[str], Dict[str, object]]
+
+
+class SourceKey(NamedTuple):
+    """Identity of a stored source: video, format and section (in ms; -1 for the whole video)."""
+    video_id: str
+    format: str
+    start_ms: int = FULL_SOURCE
+    end_ms: int = FULL_SOURCE
+
+    @property
+    def digest(self) -> str:
+        """Stable file name for the entry."""
+        raw = f"{self.video_id}|{self.format}|{self.start_ms}|{self.end_ms}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+
+class SourceEntry:
+    """A stored file with its cached media info."""
+
+    __slots__ = ("key", "path", "size", "media_info", "created_at", "last_used")
+
+    def __init__(self, key: SourceKey, path: str, size: int, media_info: Dict[str, object],
+                 created_at: float, last_used: float):
+        self.key = key
+        self.path = path
+        self.size = size
+        self.media_info = media_info
+        self.created_at = created_at
+        self.last_used = last_used
+
+    def to_json(self) -> dict:
+        return {
+            "key": list(self.key),
+            "path": os.path.basename(self.path),
+            "size": self.size,
+            "media_info": self.media_info,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+        }
+
+
+def _default_prober(path: str) -> Dict[str, object]:
+    from src.compilation.ffmpeg_wrapper import get_media_info
+
+    return get_media_info(path)
+
+
+class SourceStore:
+    """Reference-counted, single-flight store of source downloads on the working tier."""
+
+    def __init__(
+        self,
+        general: GeneralConfig,
+        config: StorageConfig,
+        storage: Optional[StorageManager] = None,
+        prober: Prober = _default_prober,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.root = os.path.join(general.working_dir, "sources")
+        self.config = config
+        self.storage = storage
+        self._prober = prober
+        self._clock = clock
+        self._entries: Dict[str, SourceEntry] = {}
+        self._by_path: Dict[str, str] = {}
+        self._refs: Dict[str, Set[str]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Runs waiting on each in-flight transfer; held as soon as the entry exists.
+        self._waiting: Dict[str, Set[str]] = {}
+        os.makedirs(self.root, exist_ok=True)
+        if storage is not None:
+            storage.add_eviction_listener(self._on_evicted)
+        self._scan()
+
+    def _sidecar(self, digest: str) -> str:
+        return os.path.join(self.root, f"{digest}.json")
+
+    def _scan(self) -> None:
+        """Load entries left by earlier processes, oldest use first."""
+        loaded = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.root, name)) as f:
+                    data = json.load(f)
+                entry = SourceEntry(
+                    SourceKey(*data["key"]), os.path.join(self.root, data["path"]), data["size"],
+                    data["media_info"], data["created_at"], data["last_used"],
+                )
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable source sidecar {name}: {e}")
+                continue
+            if os.path.exists(entry.path):
+                loaded.append(entry)
+            else:
+                os.remove(os.path.join(self.root, name))
+        for entry in sorted(loaded, key=lambda e: e.last_used):
+            self._add(entry)
+        if loaded:
+            logger.info(f"Source store has {len(loaded)} entries from earlier runs.")
+
+    def _add(self, entry: SourceEntry) -> None:
+        digest = entry.key.digest
+        self._entries[digest] = entry
+        self._by_path[entry.path] = digest
+        if self.storage is not None:
+            self.storage.register_source(entry.path)
+
+    def _write_sidecar(self, entry: SourceEntry) -> None:
+        tmp = self._sidecar(entry.key.digest) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry.to_json(), f)
+        os.replace(tmp, self._sidecar(entry.key.digest))
+
+    def _on_evicted(self, path: str) -> None:
+        digest = self._by_path.pop(path, None)
+        if digest is not None:
+            self._entries.pop(digest, None)
+            try:
+                os.remove(self._sidecar(digest))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: SourceKey) -> Optional[SourceEntry]:
+        """The stored entry for ``key``, if present."""
+        entry = self._entries.get(key.digest)
+        if entry is not None and not os.path.exists(entry.path):
+            self._on_evicted(entry.path)
+            return None
+        return entry
+
+    def references(self, key: SourceKey) -> Set[str]:
+        """Pipeline runs currently holding ``key``."""
+        return set(self._refs.get(key.digest, ()))
+
+    async def acquire(self, key: SourceKey, run_id: str, fetch: Fetcher) -> SourceEntry:
+        """
+        Get an entry for a pipeline run, fetching it once if it is missing.
+
+        Args:
+            key (SourceKey): What to get.
+            run_id (str): Pipeline run taking the reference.
+            fetch (Fetcher): Downloads to the given path stem and returns the
+                written file; only called if no transfer for ``key`` exists.
+
+        Returns:
+            SourceEntry: The entry, held until ``release`` or ``release_run``.
+
+        Raises:
+            Exception: Whatever ``fetch`` or validation raised.
+        """
+        entry = self.get(key)
+        if entry is None:
+            digest = key.digest
+            future = self._inflight.get(digest)
+            if future is None:
+                increment("source_store_misses")
+                self._waiting[digest] = set()
+                future = asyncio.ensure_future(self._fetch(key, fetch))
+                self._inflight[digest] = future
+                future.add_done_callback(lambda _: self._inflight.pop(digest, None))
+            else:
+                increment("source_store_joined")
+            waiting = self._waiting.setdefault(digest, set())
+            waiting.add(run_id)
+            try:
+                entry = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                waiting.discard(run_id)
+                raise
+            # _fetch already took this run's reference.
+            return entry
+        increment("source_store_hits")
+        self._hold(entry, run_id)
+        return entry
+
+    async def _fetch(self, key: SourceKey, fetch: Fetcher) -> SourceEntry:
+        stem = os.path.join(self.root, f"{key.digest}.part")
+        try:
+            written = await fetch(stem)
+            media_info = await asyncio.to_thread(self._prober, written)
+        except BaseException:
+            self._waiting.pop(key.digest, None)
+            self._remove_partials(stem)
+            raise
+        ext = os.path.splitext(written)[1] or ".mp4"
+        path = os.path.join(self.root, key.digest + ext)
+        os.replace(written, path)
+        now = self._clock()
+        entry = SourceEntry(key, path, os.path.getsize(path), media_info, now, now)
+        self._write_sidecar(entry)
+        self._add(entry)
+        # Hold the entry for every waiting run before yielding to the loop: a
+        # reservation elsewhere could otherwise evict it before they resume.
+        for run_id in self._waiting.pop(key.digest, ()):
+            self._hold(entry, run_id)
+        logger.info(f"Stored source {key.video_id} [{key.start_ms}-{key.end_ms}] ({entry.size} bytes).")
+        return entry
+
+    @staticmethod
+    def _remove_partials(stem: str) -> None:
+        """Delete whatever a failed or cancelled fetch left under ``stem``."""
+        for path in glob.glob(glob.escape(stem) + ".*"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _hold(self, entry: SourceEntry, run_id: str) -> None:
+        holders = self._refs.setdefault(entry.key.digest, set())
+        if run_id not in holders:
+            holders.add(run_id)
+            if self.storage is not None:
+                self.storage.acquire_source(entry.path)
+        entry.last_used = self._clock()
+        self._write_sidecar(entry)
+
+    def release(self, key: SourceKey, run_id: str) -> None:
+        """
+        Drop a pipeline run's reference to an entry. The file stays for reuse.
+
+        Args:
+            key (SourceKey): The entry.
+            run_id (str): The pipeline run.
+        """
+        digest = key.digest
+        holders = self._refs.get(digest)
+        if not holders or run_id not in holders:
+            return
+        holders.discard(run_id)
+        if not holders:
+            del self._refs[digest]
+        entry = self._entries.get(digest)
+        if entry is not None and self.storage is not None:
+            self.storage.release_source(entry.path)
+
+    def release_run(self, run_id: str) -> int:
+        """
+        Drop every reference a pipeline run holds (its cleanup step).
+
+        Args:
+            run_id (str): The pipeline run.
+
+        Returns:
+            int: References released.
+        """
+        held = [self._entries[d].key for d, runs in list(self._refs.items())
+                if run_id in runs and d in self._entries]
+        for key in held:
+            self.release(key, run_id)
+        return len(held)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Delete unreferenced entries not used for ``source_max_age_hours``.
+
+        Args:
+            now (Optional[float]): Current time (default: the store's clock).
+
+        Returns:
+            int: Bytes freed.
+        """
+        now = self._clock() if now is None else now
+        cutoff = now - self.config.source_max_age_hours * 3600
+        freed = 0
+        stale: List[SourceEntry] = [
+            e for d, e in self._entries.items() if d not in self._refs and e.last_used < cutoff
+        ]
+        for entry in stale:
+            try:
+                os.remove(entry.path)
+                freed += entry.size
+            except FileNotFoundError:
+                pass
+            if self.storage is not None:
+                self.storage.forget_source(entry.path)
+            self._on_evicted(entry.path)
+        if stale:
+            increment("source_store_pruned_bytes", freed)
+            logger.info(f"Pruned {len(stale)} unused source entries ({freed} bytes).")
+        return freed
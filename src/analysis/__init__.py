@@ -1,3 +1,13 @@
 """
-Analysis package init
-"""
\ No newline at end of file
+Analysis package: finding the clip-worthy moment in each source video.
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "MostReplayedAnalyzer": "src.analysis.most_replayed",
+    "Transcript": "src.analysis.transcript",
+    "TranscriptAnalyzer": "src.analysis.transcript",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -1,6 +1,317 @@
 """
-Identifies peak moments in videos.
+Identifies peak moments in videos from YouTube's "Most replayed" heatmap.
+
+The heatmap sits in the watch page's initial data (SPEC §4.3, method 1),
+either as ``heatMarkers`` under ``playerOverlayRenderer`` or, on newer pages,
+as a ``markers`` list of ``startMillis``/``intensityScoreNormalized`` entries.
+Watch pages are several megabytes, so the page is streamed through a small
+scanner that stops reading as soon as the marker array has closed. Results,
+including "no heatmap", are cached per video ID for a TTL.
 """
-class MostReplayedAnalyzer:
+import asyncio
+import codecs
+import json
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import aiohttp
+import numpy as np
+
+from src.config import VideoConfig
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
+
+logger = get_logger(__name__)
+
+WATCH_URL = "https://www.youtube.com/watch"
+CHUNK_SIZE = 64 * 1024
+MAX_CACHED = 4096
+# Array openers for the two page layouts, newest first.
+_MARKER_KEYS = ('"markers":[{"startMillis"', '"heatMarkers":[')
+_REQUEST_HEADERS = {
+    "Accept-Language": "en-US,en;q=0.9",
+    "Cookie": "CONSENT=YES+cb; SOCS=CAI",
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+}
+
+
+class Heatmap(NamedTuple):
+    """Replay intensity per marker; markers tile the video."""
+    starts: np.ndarray
+    durations: np.ndarray
+    intensity: np.ndarray
+
+    @property
+    def duration(self) -> float:
+        """Video length covered by the markers, in seconds."""
+        return float(self.starts[-1] + self.durations[-1]) if len(self.starts) else 0.0
+
+
+class Peak(NamedTuple):
+    """A clip-length window ranked by replay intensity."""
+    start: float
+    end: float
+    score: float
+
+
+class HeatmapScanner:
+    """Incrementally finds and extracts the heatmap JSON array from streamed HTML."""
+
     def __init__(self):
-        pass
\ No newline at end of file
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._key = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: Optional[Tuple[str, list]] = None
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Consume a chunk of the page.
+
+        Args:
+            chunk (bytes): Next bytes of the HTML.
+
+        Returns:
+            bool: True once the marker array is complete (``result`` is set).
+        """
+        if self.result is not None:
+            return True
+        self._buffer += self._decoder.decode(chunk)
+        if not self._key:
+            for key in _MARKER_KEYS:
+                found = self._buffer.find(key)
+                if found != -1:
+                    self._key = key
+                    self._buffer = self._buffer[found + key.index("["):]
+                    break
+            else:
+                # Keep just enough to match a key split across chunks.
+                self._buffer = self._buffer[-max(map(len, _MARKER_KEYS)):]
+                return False
+        return self._scan()
+
+    def _scan(self) -> bool:
+        text = self._buffer
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.result = (self._key, json.loads(text[:i + 1]))
+                    self._buffer = ""
+                    return True
+        self._pos = len(text)
+        return False
+
+
+def parse_markers(key: str, markers: list) -> Heatmap:
+    """
+    Convert either marker layout to arrays in seconds.
+
+    Args:
+        key (str): Which of the layouts matched.
+        markers (list): The decoded marker array.
+
+    Returns:
+        Heatmap: Markers sorted by start time.
+    """
+    if key.startswith('"heatMarkers"'):
+        rows = [m.get("heatMarkerRenderer", m) for m in markers]
+        fields = ("timeRangeStartMillis", "markerDurationMillis", "heatMarkerIntensityScoreNormalized")
+    else:
+        rows = markers
+        fields = ("startMillis", "durationMillis", "intensityScoreNormalized")
+    data = np.array([[float(row.get(f, 0)) for f in fields] for row in rows], dtype=np.float64).reshape(-1, 3)
+    data = data[np.argsort(data[:, 0], kind="stable")]
+    return Heatmap(data[:, 0] / 1000.0, data[:, 1] / 1000.0, data[:, 2].astype(np.float32))
+
+
+def heatmap_from_info(entries: Optional[list]) -> Optional[Heatmap]:
+    """
+    Convert yt-dlp's ``info["heatmap"]`` (start_time/end_time/value in seconds).
+
+    Args:
+        entries (Optional[list]): The heatmap entries, if yt-dlp found any.
+
+    Returns:
+        Optional[Heatmap]: The heatmap, or None if there are no entries.
+    """
+    if not entries:
+        return None
+    data = np.array(
+        [[float(e.get("start_time", 0)), float(e.get("end_time", 0)), float(e.get("value", 0))] for e in entries],
+        dtype=np.float64,
+    )
+    data = data[np.argsort(data[:, 0], kind="stable")]
+    return Heatmap(data[:, 0], data[:, 1] - data[:, 0], data[:, 2].astype(np.float32))
+
+
+def find_peaks(heatmap: Heatmap, length: float, top_k: int = 1, resolution: float = 0.5) -> List[Peak]:
+    """
+    Highest-intensity non-overlapping windows of ``length`` seconds.
+
+    The marker intensities are resampled onto a ``resolution`` grid, window
+    sums come from one prefix sum, and windows are picked greedily.
+
+    Args:
+        heatmap (Heatmap): Replay intensity.
+        length (float): Window length in seconds.
+        top_k (int): Number of windows (default: 1).
+        resolution (float): Grid step in seconds (default: 0.5).
+
+    Returns:
+        List[Peak]: Windows by descending score; score is mean intensity.
+    """
+    duration = heatmap.duration
+    if duration <= 0:
+        return []
+    length = min(length, duration)
+    grid = np.arange(0.0, duration, resolution)
+    marker = np.clip(np.searchsorted(heatmap.starts, grid, side="right") - 1, 0, len(heatmap.starts) - 1)
+    samples = heatmap.intensity[marker].astype(np.float64)
+    width = max(1, int(round(length / resolution)))
+    sums = np.concatenate(([0.0], np.cumsum(samples)))
+    window = (sums[width:] - sums[:-width]) / width
+    taken = np.zeros(len(samples), dtype=bool)
+    peaks: List[Peak] = []
+    for i in np.argsort(-window, kind="stable").tolist():
+        if len(peaks) >= top_k:
+            break
+        if taken[i:i + width].any():
+            continue
+        taken[i:i + width] = True
+        start = float(grid[i])
+        peaks.append(Peak(start, min(start + length, duration), float(window[i])))
+    return peaks
+
+
+class MostReplayedAnalyzer:
+    """Fetches, caches and ranks "Most replayed" heatmaps."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        config: VideoConfig,
+        watch_url: str = WATCH_URL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.session = session
+        self.config = config
+        self.watch_url = watch_url
+        self.ttl_seconds = config.most_replayed_cache_ttl_hours * 3600.0
+        self._clock = clock
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Heatmap]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._slots = asyncio.Semaphore(config.most_replayed_concurrency)
+        self.bytes_read = 0
+
+    def _cached(self, video_id: str) -> Tuple[bool, Optional[Heatmap]]:
+        entry = self._cache.get(video_id)
+        if entry is None or self._clock() - entry[0] >= self.ttl_seconds:
+            return False, None
+        self._cache.move_to_end(video_id)
+        return True, entry[1]
+
+    def _store(self, video_id: str, heatmap: Optional[Heatmap]) -> None:
+        self._cache[video_id] = (self._clock(), heatmap)
+        self._cache.move_to_end(video_id)
+        while len(self._cache) > MAX_CACHED:
+            self._cache.popitem(last=False)
+
+    async def fetch(self, video_id: str) -> Optional[Heatmap]:
+        """
+        Heatmap for a video, from cache or the watch page.
+
+        Concurrent requests for the same video share one download.
+
+        Args:
+            video_id (str): YouTube video ID.
+
+        Returns:
+            Optional[Heatmap]: The heatmap, or None if the video has none or
+            the page could not be read.
+        """
+        hit, heatmap = self._cached(video_id)
+        if hit:
+            increment("most_replayed_cache_hits")
+            return heatmap
+        future = self._inflight.get(video_id)
+        if future is None:
+            future = asyncio.ensure_future(self._download(video_id))
+            self._inflight[video_id] = future
+            future.add_done_callback(lambda _: self._inflight.pop(video_id, None))
+        return await asyncio.shield(future)
+
+    @timed("most_replayed_fetch")
+    async def _download(self, video_id: str) -> Optional[Heatmap]:
+        scanner = HeatmapScanner()
+        try:
+            async with self._slots:
+                async with self.session.get(
+                    self.watch_url, params={"v": video_id}, headers=_REQUEST_HEADERS
+                ) as resp:
+                    if resp.status != 200:
+                        logger.warning(f"Watch page for {video_id} returned {resp.status}.")
+                        return None
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        self.bytes_read += len(chunk)
+                        if scanner.feed(chunk):
+                            # Leaving the block releases the connection without reading the rest.
+                            break
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"Could not read heatmap for {video_id}: {e}")
+            return None
+        heatmap = parse_markers(*scanner.result) if scanner.result is not None else None
+        increment("most_replayed_found" if heatmap is not None else "most_replayed_missing")
+        self._store(video_id, heatmap)
+        return heatmap
+
+    async def fetch_many(self, video_ids: Iterable[str]) -> Dict[str, Optional[Heatmap]]:
+        """
+        Heatmaps for many videos, at most ``most_replayed_concurrency`` downloads at a time.
+
+        Args:
+            video_ids (Iterable[str]): Video IDs.
+
+        Returns:
+            Dict[str, Optional[Heatmap]]: Heatmap (or None) per video ID.
+        """
+        ids = list(dict.fromkeys(video_ids))
+        heatmaps = await asyncio.gather(*(self.fetch(video_id) for video_id in ids))
+        return dict(zip(ids, heatmaps))
+
+    async def find_moments(self, video_ids: Iterable[str], top_k: int = 1) -> Dict[str, List[Peak]]:
+        """
+        Best clip windows per video by replay intensity.
+
+        Window length is ``clip_duration_min``; videos without a heatmap are
+        left out so the next extraction method can handle them.
+
+        Args:
+            video_ids (Iterable[str]): Video IDs.
+            top_k (int): Windows per video (default: 1).
+
+        Returns:
+            Dict[str, List[Peak]]: Peaks per video ID.
+        """
+        heatmaps = await self.fetch_many(video_ids)
+        return {
+            video_id: find_peaks(heatmap, self.config.clip_duration_min, top_k)
+            for video_id, heatmap in heatmaps.items()
+            if heatmap is not None
+        }
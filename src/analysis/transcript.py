@@ -0,0 +1,307 @@
+"""
+Transcript windowing for LLM clip selection (SPEC §4.3, method 2).
+
+An hour of json3 captions can be larger than the local model's context, so
+the transcript is never sent whole. It is parsed into flat NumPy columns
+(start, end, offset into one text buffer), every segment-aligned window of
+``transcript_window_seconds`` is scored cheaply, and only the best
+non-overlapping windows that fit a token budget derived from the provider's
+``max_tokens`` are rendered into the prompt. Prompt size, and so LLM latency,
+stays flat however long the source is.
+"""
+import json
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from src.config import VideoConfig
+from src.llm.prompts import CHARS_PER_TOKEN
+from src.utils.logging import get_logger
+
+if TYPE_CHECKING:
+    from src.llm.client import LLMClient, Moment
+
+logger = get_logger(__name__)
+
+_MARKER = re.compile(r"\[(?:laughter|laughing|laughs|applause|cheering|cheers|screaming|gasps?)\]", re.IGNORECASE)
+_EXCITEMENT = re.compile(
+    r"\b(?:oh my god|omg|no way|what the|holy|insane|unbelievable|incredible|wow|look at|watch this)\b|!",
+    re.IGNORECASE,
+)
+_TITLE_WORD = re.compile(r"[a-z0-9']{4,}")
+# Tokens a "[123.4] " line prefix adds.
+_LINE_OVERHEAD_TOKENS = 3
+
+MARKER_WEIGHT = 3.0
+KEYWORD_WEIGHT = 1.0
+TITLE_WEIGHT = 0.5
+ENERGY_WEIGHT = 2.0
+
+
+class Transcript:
+    """Caption segments as parallel arrays over one text buffer."""
+
+    __slots__ = ("starts", "ends", "offsets", "text")
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, offsets: np.ndarray, text: str):
+        self.starts = starts
+        self.ends = ends
+        # offsets[i]:offsets[i + 1] is segment i; the last entry is len(text).
+        self.offsets = offsets
+        self.text = text
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def duration(self) -> float:
+        """End of the last caption in seconds."""
+        return float(self.ends[-1]) if len(self) else 0.0
+
+    def segment(self, i: int) -> str:
+        """Text of segment ``i``."""
+        return self.text[self.offsets[i]:self.offsets[i + 1]]
+
+    def segment_tokens(self) -> np.ndarray:
+        """Estimated prompt tokens per segment, including its timestamp prefix."""
+        return np.diff(self.offsets) // CHARS_PER_TOKEN + 1 + _LINE_OVERHEAD_TOKENS
+
+    def render(self, first: int, last: int) -> str:
+        """Segments ``first`` to ``last`` (exclusive) as ``[start] text`` lines."""
+        return "\n".join(f"[{self.starts[i]:.1f}] {self.segment(i)}" for i in range(first, last))
+
+
+def parse_json3(data: Union[bytes, str, dict]) -> Transcript:
+    """
+    Parse YouTube json3 captions.
+
+    Args:
+        data (Union[bytes, str, dict]): The json3 document.
+
+    Returns:
+        Transcript: Non-empty caption events in time order.
+    """
+    doc = json.loads(data) if isinstance(data, (bytes, str)) else data
+    starts: List[float] = []
+    ends: List[float] = []
+    offsets: List[int] = [0]
+    parts: List[str] = []
+    size = 0
+    for event in doc.get("events", []):
+        text = " ".join("".join(seg.get("utf8", "") for seg in event.get("segs", ())).split())
+        if not text:
+            continue
+        start = event.get("tStartMs", 0) / 1000.0
+        starts.append(start)
+        ends.append(start + event.get("dDurationMs", 0) / 1000.0)
+        parts.append(text)
+        size += len(text)
+        offsets.append(size)
+    order = np.argsort(np.asarray(starts, dtype=np.float64), kind="stable")
+    if len(order) and not np.all(order[:-1] < order[1:]):
+        parts = [parts[i] for i in order]
+        lengths = np.diff(np.asarray(offsets))[order]
+        offsets = [0, *np.cumsum(lengths).tolist()]
+    return Transcript(
+        np.asarray(starts, dtype=np.float64)[order],
+        np.asarray(ends, dtype=np.float64)[order],
+        np.asarray(offsets, dtype=np.int64),
+        "".join(parts),
+    )
+
+
+def load_json3(path: Union[str, Path]) -> Transcript:
+    """Parse a json3 subtitle file written by yt-dlp."""
+    return parse_json3(Path(path).read_bytes())
+
+
+def _count_per_segment(pattern: re.Pattern, transcript: Transcript) -> np.ndarray:
+    """Matches of ``pattern`` per segment, from one pass over the whole text."""
+    positions = [m.start() for m in pattern.finditer(transcript.text)]
+    if not positions:
+        return np.zeros(len(transcript), dtype=np.float64)
+    segments = np.searchsorted(transcript.offsets, positions, side="right") - 1
+    return np.bincount(segments, minlength=len(transcript)).astype(np.float64)
+
+
+def segment_scores(
+    transcript: Transcript,
+    title: str = "",
+    energy: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Cheap interest score per segment.
+
+    Combines laughter/applause markers, excitement keywords, words shared
+    with the title, and (if given) audio energy above the track's median at
+    the segment's midpoint.
+
+    Args:
+        transcript (Transcript): Parsed captions.
+        title (str): Video title.
+        energy (Optional[Tuple[np.ndarray, np.ndarray]]): Audio energy as
+            (times in seconds, RMS values).
+
+    Returns:
+        np.ndarray: Score per segment.
+    """
+    scores = MARKER_WEIGHT * _count_per_segment(_MARKER, transcript)
+    scores += KEYWORD_WEIGHT * _count_per_segment(_EXCITEMENT, transcript)
+    title_words = sorted(set(_TITLE_WORD.findall(title.lower())), key=len, reverse=True)
+    if title_words:
+        pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, title_words)) + r")\b", re.IGNORECASE)
+        scores += TITLE_WEIGHT * _count_per_segment(pattern, transcript)
+    if energy is not None and len(energy[0]):
+        times, values = np.asarray(energy[0], dtype=np.float64), np.asarray(energy[1], dtype=np.float64)
+        spread = values.std() or 1.0
+        level = (np.interp((transcript.starts + transcript.ends) / 2, times, values) - np.median(values)) / spread
+        scores += ENERGY_WEIGHT * np.clip(level, 0.0, None)
+    return scores
+
+
+class Window(NamedTuple):
+    """A run of segments ``[first, last)`` picked for the prompt."""
+    first: int
+    last: int
+    score: float
+    tokens: int
+
+
+def select_windows(
+    transcript: Transcript,
+    scores: np.ndarray,
+    window_seconds: float,
+    top_k: int,
+    token_budget: int,
+) -> List[Window]:
+    """
+    Best non-overlapping windows that fit the token budget, in time order.
+
+    Every segment starts a candidate window covering the following
+    ``window_seconds``; window scores and token counts come from prefix
+    sums, so this is linear in the number of segments.
+
+    Args:
+        transcript (Transcript): Parsed captions.
+        scores (np.ndarray): Score per segment.
+        window_seconds (float): Window length.
+        top_k (int): Maximum windows.
+        token_budget (int): Maximum total tokens.
+
+    Returns:
+        List[Window]: The chosen windows.
+    """
+    n = len(transcript)
+    if n == 0:
+        return []
+    first = np.arange(n)
+    last = np.searchsorted(transcript.starts, transcript.starts + window_seconds, side="left")
+    last = np.maximum(last, first + 1)
+    score_sums = np.concatenate(([0.0], np.cumsum(scores)))
+    token_sums = np.concatenate(([0], np.cumsum(transcript.segment_tokens())))
+    window_scores = score_sums[last] - score_sums[first]
+    window_tokens = token_sums[last] - token_sums[first]
+
+    taken = np.zeros(n, dtype=bool)
+    chosen: List[Window] = []
+    remaining = token_budget
+    # Ties go to the earliest window, which keeps quiet transcripts deterministic.
+    for i in np.lexsort((first, -window_scores)).tolist():
+        if len(chosen) >= top_k or remaining <= 0:
+            break
+        lo, hi = i, int(last[i])
+        if taken[lo:hi].any():
+            continue
+        tokens = int(window_tokens[i])
+        while tokens > remaining and hi - lo > 1:
+            hi -= 1
+            tokens = int(token_sums[hi] - token_sums[lo])
+        if tokens > remaining:
+            continue
+        taken[lo:hi] = True
+        remaining -= tokens
+        chosen.append(Window(lo, hi, float(window_scores[i]), tokens))
+    return sorted(chosen)
+
+
+def transcript_token_budget(max_tokens: int, ratio: float) -> int:
+    """Transcript tokens allowed per video: a share of the client's ``max_tokens``."""
+    return max(1, int(max_tokens * ratio))
+
+
+def build_excerpt(
+    transcript: Transcript,
+    title: str,
+    config: VideoConfig,
+    token_budget: int,
+    energy: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> str:
+    """
+    Prompt-ready excerpt of the most promising parts of a transcript.
+
+    Args:
+        transcript (Transcript): Parsed captions.
+        title (str): Video title.
+        config (VideoConfig): Window length and count.
+        token_budget (int): Maximum tokens for the excerpt.
+        energy (Optional[Tuple[np.ndarray, np.ndarray]]): Audio energy as
+            (times, values).
+
+    Returns:
+        str: Timestamped lines, with "..." between windows.
+    """
+    windows = select_windows(
+        transcript,
+        segment_scores(transcript, title, energy),
+        config.transcript_window_seconds,
+        config.transcript_top_windows,
+        token_budget,
+    )
+    return "\n...\n".join(transcript.render(w.first, w.last) for w in windows)
+
+
+class TranscriptAnalyzer:
+    """Finds the best moment in many transcripts with batched, size-capped LLM prompts."""
+
+    def __init__(self, llm: "LLMClient", config: VideoConfig):
+        self.llm = llm
+        self.config = config
+        # The smallest limit across providers: a hedged request may be answered by the fallback.
+        self.token_budget = transcript_token_budget(llm.max_tokens, config.transcript_token_budget_ratio)
+
+    async def analyze(
+        self,
+        videos: Mapping[str, Tuple[str, Transcript]],
+        energy: Optional[Mapping[str, Tuple[np.ndarray, np.ndarray]]] = None,
+    ) -> Dict[str, "Moment"]:
+        """
+        Pick a clip range per video.
+
+        Args:
+            videos (Mapping[str, Tuple[str, Transcript]]): (title, transcript) per video ID.
+            energy (Optional[Mapping[str, Tuple[np.ndarray, np.ndarray]]]):
+                Audio energy per video ID, where available.
+
+        Returns:
+            Dict[str, Moment]: Moment per video ID, clamped to the clip length limits.
+        """
+        energy = energy or {}
+        excerpts = {}
+        for video_id, (title, transcript) in videos.items():
+            excerpt = build_excerpt(transcript, title, self.config, self.token_budget, energy.get(video_id))
+            if excerpt:
+                excerpts[video_id] = (title, excerpt)
+        moments = await self.llm.find_moments_batch(
+            excerpts, self.config.clip_duration_min, self.config.clip_duration_max
+        )
+        return {
+            video_id: self._clamp(moment, videos[video_id][1].duration)
+            for video_id, moment in moments.items()
+        }
+
+    def _clamp(self, moment: "Moment", duration: float) -> "Moment":
+        length = min(max(moment.end - moment.start, self.config.clip_duration_min), self.config.clip_duration_max)
+        start = max(0.0, min(moment.start, duration - length)) if duration else moment.start
+        return moment._replace(start=start, end=start + length)
@@ -1 +1,13 @@
-"""Placeholder for src.analytics package."""
+"""
+Channel analytics ingestion and the scoring-weight optimizer.
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "AnalyticsStore": "src.analytics.channel_analytics",
+    "ChannelAnalytics": "src.analytics.channel_analytics",
+    "WeightOptimizer": "src.analytics.weight_optimizer",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
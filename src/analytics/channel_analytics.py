@@ -1 +1,439 @@
-"""Placeholder: Channel performance tracker."""
+"""
+Channel performance tracker.
+
+Polls YouTube Analytics for every uploaded video and keeps the results in a
+compact columnar store (NumPy arrays in a single ``.npz`` file) instead of
+ORM rows. Daily metrics are ingested incrementally from a per-video
+high-water mark, refetching the last few days each poll because YouTube
+revises them until they are final; retention curves are stored as one fixed-size row per video.
+Aggregations for the Telegram ``/stats`` command run vectorized over these
+arrays.
+"""
+import asyncio
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Protocol, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from src.database import Clip, PipelineRun, get_session
+from src.utils.logging import get_logger
+from src.utils.metrics import timed
+
+logger = get_logger(__name__)
+
+# YouTube reports audienceWatchRatio at elapsedVideoTimeRatio 0.01 .. 1.00.
+RETENTION_POINTS = 100
+MAX_CLIPS = 16
+EPOCH = date(1970, 1, 1)
+# YouTube Analytics figures for the most recent days are provisional.
+PROVISIONAL_DAYS = 3
+
+_DAILY_COLUMNS = {
+    "video_idx": np.int32,
+    "day": np.int32,
+    "views": np.int64,
+    "likes": np.int64,
+    "comments": np.int64,
+    "avg_view_duration": np.float32,
+    "ctr": np.float32,
+    "subscribers": np.int32,
+}
+
+
+def _to_day(value: date) -> int:
+    """Convert a date to days since the Unix epoch."""
+    return (value - EPOCH).days
+
+
+def _from_day(day: int) -> date:
+    """Convert days since the Unix epoch to a date."""
+    return EPOCH + timedelta(days=int(day))
+
+
+def estimate_clip_boundaries(clip_durations: Sequence[float], total_duration: float) -> np.ndarray:
+    """
+    Estimate where each clip starts in the final video, as a fraction of its length.
+
+    Narration, labels and transitions are assumed to be spread evenly across
+    the gaps before, between and after the clips.
+
+    Args:
+        clip_durations (Sequence[float]): Clip durations in playback order.
+        total_duration (float): Duration of the final video in seconds.
+
+    Returns:
+        np.ndarray: Start ratios in [0, 1], one per clip.
+    """
+    durations = np.asarray(clip_durations, dtype=np.float64)
+    if durations.size == 0 or total_duration <= 0:
+        return np.empty(0, dtype=np.float32)
+    gap = max(total_duration - durations.sum(), 0.0) / (durations.size + 1)
+    starts = gap * np.arange(1, durations.size + 1) + np.concatenate(([0.0], np.cumsum(durations)[:-1]))
+    return np.clip(starts / total_duration, 0.0, 1.0).astype(np.float32)
+
+
+class AnalyticsSource(Protocol):
+    """Interface of a per-channel analytics data source."""
+
+    def fetch_daily(self, video_id: str, start: date, end: date) -> List[Dict[str, float]]:
+        """
+        Return one dict per day with day, views, likes, comments, avg_view_duration, ctr, subscribers.
+
+        ``ctr`` is NaN when the source has no impressions data.
+        """
+
+    def fetch_retention(self, video_id: str) -> np.ndarray:
+        """Return the audience watch ratio at RETENTION_POINTS evenly spaced positions."""
+
+
+class YouTubeAnalyticsSource:
+    """AnalyticsSource backed by a YouTube Analytics API v2 service object."""
+
+    DAILY_METRICS = "views,likes,comments,averageViewDuration,subscribersGained"
+
+    def __init__(self, service):
+        self.service = service
+
+    def fetch_daily(self, video_id: str, start: date, end: date) -> List[Dict[str, float]]:
+        """
+        Fetch daily metrics for a video.
+
+        Args:
+            video_id (str): YouTube video ID.
+            start (date): First day to fetch (inclusive).
+            end (date): Last day to fetch (inclusive).
+
+        Returns:
+            List[Dict[str, float]]: One entry per reported day. ``ctr`` is NaN
+            because impression CTR is not exposed by the Analytics API.
+        """
+        response = self.service.reports().query(
+            ids="channel==MINE",
+            startDate=start.isoformat(),
+            endDate=end.isoformat(),
+            metrics=self.DAILY_METRICS,
+            dimensions="day",
+            filters=f"video=={video_id}",
+        ).execute()
+        rows = []
+        for day, views, likes, comments, avg_duration, subscribers in response.get("rows", []):
+            rows.append({
+                "day": _to_day(date.fromisoformat(day)),
+                "views": views,
+                "likes": likes,
+                "comments": comments,
+                "avg_view_duration": avg_duration,
+                "ctr": float("nan"),
+                "subscribers": subscribers,
+            })
+        return rows
+
+    def fetch_retention(self, video_id: str) -> np.ndarray:
+        """
+        Fetch the lifetime audience retention curve for a video.
+
+        Args:
+            video_id (str): YouTube video ID.
+
+        Returns:
+            np.ndarray: float32 array of RETENTION_POINTS watch ratios (NaN where missing).
+        """
+        response = self.service.reports().query(
+            ids="channel==MINE",
+            startDate="2005-01-01",
+            endDate=date.today().isoformat(),
+            metrics="audienceWatchRatio",
+            dimensions="elapsedVideoTimeRatio",
+            filters=f"video=={video_id}",
+        ).execute()
+        curve = np.full(RETENTION_POINTS, np.nan, dtype=np.float32)
+        for ratio, watch_ratio in response.get("rows", []):
+            index = min(int(round(float(ratio) * RETENTION_POINTS)) - 1, RETENTION_POINTS - 1)
+            curve[max(index, 0)] = watch_ratio
+        return curve
+
+
+class AnalyticsStore:
+    """Columnar store for per-video analytics, persisted as one ``.npz`` file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.video_ids = np.empty(0, dtype="U16")
+        self.niches = np.empty(0, dtype="U32")
+        self.high_water = np.empty(0, dtype=np.int32)
+        self.retention = np.empty((0, RETENTION_POINTS), dtype=np.float32)
+        self.boundaries = np.empty((0, MAX_CLIPS), dtype=np.float32)
+        self.daily = {name: np.empty(0, dtype=dtype) for name, dtype in _DAILY_COLUMNS.items()}
+        self._index: Dict[str, int] = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        """Load all arrays from disk."""
+        with np.load(self.path) as data:
+            self.video_ids = data["video_ids"]
+            self.niches = data["niches"]
+            self.high_water = data["high_water"]
+            self.retention = data["retention"]
+            self.boundaries = data["boundaries"]
+            self.daily = {name: data[f"daily_{name}"] for name in _DAILY_COLUMNS}
+        self._index = {vid: i for i, vid in enumerate(self.video_ids.tolist())}
+
+    def save(self) -> None:
+        """Persist all arrays atomically."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            video_ids=self.video_ids,
+            niches=self.niches,
+            high_water=self.high_water,
+            retention=self.retention,
+            boundaries=self.boundaries,
+            **{f"daily_{name}": values for name, values in self.daily.items()},
+        )
+        os.replace(tmp_path, self.path)
+
+    def ensure_video(self, video_id: str, niche: str) -> int:
+        """
+        Return the row index of a video, adding it if it is new.
+
+        Args:
+            video_id (str): YouTube video ID.
+            niche (str): Niche of the channel the video belongs to.
+
+        Returns:
+            int: Row index in the per-video arrays.
+        """
+        index = self._index.get(video_id)
+        if index is not None:
+            return index
+        index = len(self.video_ids)
+        self._index[video_id] = index
+        self.video_ids = np.append(self.video_ids, np.array([video_id], dtype=self.video_ids.dtype))
+        self.niches = np.append(self.niches, np.array([niche], dtype=self.niches.dtype))
+        self.high_water = np.append(self.high_water, np.int32(-1))
+        self.retention = np.vstack([self.retention, np.full((1, RETENTION_POINTS), np.nan, np.float32)])
+        self.boundaries = np.vstack([self.boundaries, np.full((1, MAX_CLIPS), np.nan, np.float32)])
+        return index
+
+    def set_boundaries(self, index: int, ratios: np.ndarray) -> None:
+        """Store clip start ratios for a video (truncated to MAX_CLIPS)."""
+        row = np.full(MAX_CLIPS, np.nan, dtype=np.float32)
+        ratios = np.asarray(ratios, dtype=np.float32)[:MAX_CLIPS]
+        row[:ratios.size] = ratios
+        self.boundaries[index] = row
+
+    def append_daily(self, index: int, rows: List[Dict[str, float]]) -> None:
+        """
+        Add daily metric rows for a video and advance its high-water mark.
+
+        A row for a day the video already has replaces the stored one, so
+        refetched provisional days are updated rather than counted twice.
+
+        Args:
+            index (int): Row index of the video.
+            rows (List[Dict[str, float]]): Rows as returned by ``AnalyticsSource.fetch_daily``.
+        """
+        if not rows:
+            return
+        new = {name: np.fromiter((row.get(name, 0) for row in rows), dtype=dtype, count=len(rows))
+               for name, dtype in _DAILY_COLUMNS.items() if name != "video_idx"}
+        new["video_idx"] = np.full(len(rows), index, dtype=np.int32)
+        keep = ~((self.daily["video_idx"] == index) & np.isin(self.daily["day"], new["day"]))
+        self.daily = {name: np.concatenate([self.daily[name][keep], new[name]]) for name in _DAILY_COLUMNS}
+        self.high_water[index] = max(int(self.high_water[index]), int(new["day"].max()))
+
+    def niche_mask(self, niche: Optional[str]) -> np.ndarray:
+        """Boolean mask over videos for a niche (all videos if None)."""
+        if niche is None:
+            return np.ones(len(self.video_ids), dtype=bool)
+        return self.niches == niche
+
+
+class ChannelAnalytics:
+    """Ingests YouTube Analytics incrementally and answers aggregate queries."""
+
+    def __init__(self, engine: Engine, store: AnalyticsStore, sources: Dict[str, AnalyticsSource]):
+        """
+        Args:
+            engine (Engine): Database engine (read-only use).
+            store (AnalyticsStore): Columnar analytics store.
+            sources (Dict[str, AnalyticsSource]): Analytics source per niche/channel.
+        """
+        self.engine = engine
+        self.store = store
+        self.sources = sources
+
+    def _uploaded_videos(self) -> Dict[str, dict]:
+        """
+        Load uploaded videos with their clip durations in one query.
+
+        Returns:
+            Dict[str, dict]: niche, duration and ordered clip durations per YouTube video ID.
+        """
+        stmt = (
+            select(
+                PipelineRun.youtube_video_id,
+                PipelineRun.niche,
+                PipelineRun.video_duration_seconds,
+                Clip.clip_duration_seconds,
+            )
+            .outerjoin(Clip, Clip.pipeline_run_id == PipelineRun.id)
+            .where(PipelineRun.youtube_video_id.is_not(None))
+            .order_by(PipelineRun.id, Clip.rank_position.desc())
+        )
+        session = get_session(self.engine)
+        try:
+            rows = session.execute(stmt).all()
+        finally:
+            session.close()
+
+        videos: Dict[str, dict] = {}
+        for video_id, niche, duration, clip_duration in rows:
+            entry = videos.setdefault(video_id, {"niche": niche, "duration": duration, "clips": []})
+            if clip_duration is not None:
+                entry["clips"].append(clip_duration)
+        return videos
+
+    @timed("analytics_ingest")
+    def ingest(self, today: Optional[date] = None) -> int:
+        """
+        Fetch new daily metrics since each video's high-water mark.
+
+        The last ``PROVISIONAL_DAYS`` days are fetched again on every poll
+        and replace the stored rows, since YouTube keeps revising them.
+        Retention curves are refetched only for videos that received daily
+        data, since the curve cannot have changed otherwise.
+
+        Args:
+            today (Optional[date]): Last day to fetch (default: today).
+
+        Returns:
+            int: Number of daily rows ingested.
+        """
+        today = today or date.today()
+        ingested = 0
+        for video_id, info in self._uploaded_videos().items():
+            source = self.sources.get(info["niche"])
+            if source is None:
+                continue
+            index = self.store.ensure_video(video_id, info["niche"])
+            if info["duration"] and np.isnan(self.store.boundaries[index, 0]):
+                self.store.set_boundaries(index, estimate_clip_boundaries(info["clips"], info["duration"]))
+
+            last = int(self.store.high_water[index])
+            if last >= 0:
+                start = min(_from_day(last + 1), today - timedelta(days=PROVISIONAL_DAYS))
+            else:
+                start = today - timedelta(days=90)
+            if start > today:
+                continue
+            try:
+                with timed("youtube_analytics_api"):
+                    rows = source.fetch_daily(video_id, start, today)
+                self.store.append_daily(index, rows)
+                if rows:
+                    self.store.retention[index] = source.fetch_retention(video_id)
+                ingested += len(rows)
+            except Exception as e:
+                logger.error(f"Failed to ingest analytics for {video_id}: {e}")
+        self.store.save()
+        logger.info(f"Ingested {ingested} analytics rows.")
+        return ingested
+
+    async def ingest_async(self, today: Optional[date] = None) -> int:
+        """Run ``ingest`` in a worker thread so the event loop is not blocked."""
+        return await asyncio.to_thread(self.ingest, today)
+
+    def retention_at_clip_starts(self, niche: Optional[str] = None) -> np.ndarray:
+        """
+        Mean audience retention at each clip start, averaged over a niche's videos.
+
+        Args:
+            niche (Optional[str]): Niche to aggregate (default: all).
+
+        Returns:
+            np.ndarray: float32 array of length MAX_CLIPS (NaN where no data).
+        """
+        mask = self.store.niche_mask(niche)
+        curves = self.store.retention[mask]
+        bounds = self.store.boundaries[mask]
+        if curves.size == 0:
+            return np.full(MAX_CLIPS, np.nan, dtype=np.float32)
+        valid = ~np.isnan(bounds)
+        idx = np.clip(np.rint(np.nan_to_num(bounds) * RETENTION_POINTS).astype(np.int64) - 1, 0, RETENTION_POINTS - 1)
+        values = np.take_along_axis(curves, idx, axis=1)
+        values = np.where(valid, values, np.nan)
+        counts = np.sum(~np.isnan(values), axis=0)
+        sums = np.nansum(values, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan).astype(np.float32)
+
+    def ctr_trend(self, niche: Optional[str] = None, days: int = 28,
+                  today: Optional[date] = None) -> Dict[str, float]:
+        """
+        Daily CTR trend over the last ``days`` days.
+
+        Only sources that report impressions CTR contribute. The Analytics
+        API behind ``YouTubeAnalyticsSource`` does not, so with that source
+        this returns NaN; it is kept out of ``stats_summary`` for that reason.
+
+        Args:
+            niche (Optional[str]): Niche to aggregate (default: all).
+            days (int): Window length in days (default: 28).
+            today (Optional[date]): End of the window (default: today).
+
+        Returns:
+            Dict[str, float]: ``mean`` CTR and ``slope`` per day (NaN without data).
+        """
+        end = _to_day(today or date.today())
+        daily = self.store.daily
+        in_niche = self.store.niche_mask(niche)[daily["video_idx"]] if daily["day"].size else np.empty(0, bool)
+        mask = in_niche & (daily["day"] > end - days) & ~np.isnan(daily["ctr"])
+        if not mask.any():
+            return {"mean": float("nan"), "slope": float("nan")}
+        offsets = daily["day"][mask] - (end - days + 1)
+        ctr = daily["ctr"][mask].astype(np.float64)
+        per_day_sum = np.bincount(offsets, weights=ctr, minlength=days)
+        per_day_n = np.bincount(offsets, minlength=days)
+        has = per_day_n > 0
+        per_day = per_day_sum[has] / per_day_n[has]
+        slope = np.polyfit(np.nonzero(has)[0], per_day, 1)[0] if has.sum() >= 2 else float("nan")
+        return {"mean": float(ctr.mean()), "slope": float(slope)}
+
+    def stats_summary(self, days: int = 7, today: Optional[date] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Per-niche totals for the Telegram ``/stats`` command.
+
+        Args:
+            days (int): Window length in days (default: 7).
+            today (Optional[date]): End of the window (default: today).
+
+        Returns:
+            Dict[str, Dict[str, float]]: views, watch_hours, subscribers and
+            videos per niche over the window.
+        """
+        end = _to_day(today or date.today())
+        daily = self.store.daily
+        niche_names, niche_codes = np.unique(self.store.niches, return_inverse=True)
+        if not niche_names.size or not daily["day"].size:
+            return {}
+        mask = daily["day"] > end - days
+        codes = niche_codes[daily["video_idx"][mask]]
+        views = daily["views"][mask].astype(np.float64)
+        watch = views * daily["avg_view_duration"][mask] / 3600.0
+        n = niche_names.size
+        totals = {
+            "views": np.bincount(codes, weights=views, minlength=n),
+            "watch_hours": np.bincount(codes, weights=watch, minlength=n),
+            "subscribers": np.bincount(codes, weights=daily["subscribers"][mask], minlength=n),
+            "videos": np.bincount(niche_codes, minlength=n),
+        }
+        return {
+            str(name): {key: float(values[i]) for key, values in totals.items()}
+            for i, name in enumerate(niche_names)
+        }
@@ -0,0 +1,330 @@
+"""
+Offline refit of the discovery scoring weights.
+
+Joins every clip that made it into an uploaded video back to its discovery
+record and to the video's measured performance, then fits the five
+``DiscoveryConfig.scoring_weight_*`` values with a constrained least-squares
+objective (non-negative, summing to 1). The result is a proposed config diff
+with backtest metrics, to be sent for approval rather than applied directly.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from src.analytics.channel_analytics import RETENTION_POINTS, AnalyticsStore
+from src.config import SCORING_WEIGHT_KEYS, DiscoveryConfig
+from src.database import Clip, DiscoveredVideo, PipelineRun, get_session
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MIN_SAMPLES = 30
+
+
+@dataclass
+class TrainingData:
+    """Feature matrix, targets and time order for the weight fit."""
+    features: np.ndarray
+    targets: np.ndarray
+    order: np.ndarray
+
+
+@dataclass
+class WeightProposal:
+    """Proposed scoring weights with backtest metrics."""
+    current: Dict[str, float]
+    proposed: Dict[str, float]
+    metrics: Dict[str, float] = field(default_factory=dict)
+    n_samples: int = 0
+
+    def config_diff(self) -> List[str]:
+        """
+        Describe the change as ``discovery.<key>: old -> new`` lines.
+
+        Returns:
+            List[str]: One line per weight that changes.
+        """
+        return [
+            f"discovery.{key}: {self.current[key]:.2f} -> {self.proposed[key]:.2f}"
+            for key in SCORING_WEIGHT_KEYS
+            if round(self.current[key], 2) != round(self.proposed[key], 2)
+        ]
+
+
+def project_to_simplex(v: np.ndarray) -> np.ndarray:
+    """
+    Euclidean projection onto the probability simplex (w >= 0, sum(w) == 1).
+
+    Args:
+        v (np.ndarray): Vector to project.
+
+    Returns:
+        np.ndarray: The closest point on the simplex.
+    """
+    u = np.sort(v)[::-1]
+    cumulative = np.cumsum(u) - 1.0
+    rho = np.nonzero(u - cumulative / np.arange(1, v.size + 1) > 0)[0][-1]
+    theta = cumulative[rho] / (rho + 1.0)
+    return np.maximum(v - theta, 0.0)
+
+
+def fit_weights(
+    features: np.ndarray,
+    targets: np.ndarray,
+    prior: np.ndarray,
+    l2_to_prior: float = 0.1,
+    iterations: int = 500,
+) -> np.ndarray:
+    """
+    Fit simplex-constrained weights by projected gradient descent.
+
+    Minimizes ``mean((X w - y)^2) + l2_to_prior * ||w - prior||^2`` subject
+    to ``w >= 0`` and ``sum(w) == 1``.
+
+    Args:
+        features (np.ndarray): Feature matrix of shape (n, k).
+        targets (np.ndarray): Targets of shape (n,).
+        prior (np.ndarray): Current weights, used as shrinkage target and start.
+        l2_to_prior (float): Shrinkage strength (default: 0.1).
+        iterations (int): Gradient steps (default: 500).
+
+    Returns:
+        np.ndarray: Fitted weights of shape (k,).
+    """
+    n = features.shape[0]
+    gram = features.T @ features / n
+    xty = features.T @ targets / n
+    step = 1.0 / (2.0 * (np.linalg.eigvalsh(gram)[-1] + l2_to_prior))
+    w = project_to_simplex(prior.astype(np.float64))
+    for _ in range(iterations):
+        gradient = 2.0 * (gram @ w - xty) + 2.0 * l2_to_prior * (w - prior)
+        w = project_to_simplex(w - step * gradient)
+    return w
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """Return 0..1 ranks of the values."""
+    ranks = np.empty(values.size, dtype=np.float64)
+    ranks[np.argsort(values, kind="stable")] = np.arange(values.size)
+    return ranks / max(values.size - 1, 1)
+
+
+def _spearman(a: np.ndarray, b: np.ndarray) -> float:
+    """Spearman rank correlation (NaN if either side is constant)."""
+    ra, rb = _rank(a), _rank(b)
+    if ra.std() == 0 or rb.std() == 0:
+        return float("nan")
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def _group_max(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Per-group maximum broadcast back to each element."""
+    maxima = np.zeros(n_groups, dtype=np.float64)
+    np.maximum.at(maxima, groups, values)
+    return maxima[groups]
+
+
+def _group_rank(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """0..1 rank of each value within its group."""
+    order = np.lexsort((values, groups))
+    sorted_groups = groups[order]
+    starts = np.searchsorted(sorted_groups, sorted_groups, side="left")
+    ends = np.searchsorted(sorted_groups, sorted_groups, side="right")
+    ranks = np.empty(values.size, dtype=np.float64)
+    ranks[order] = (np.arange(values.size) - starts) / np.maximum(ends - starts - 1, 1)
+    return ranks
+
+
+class WeightOptimizer:
+    """Batch job that proposes new discovery scoring weights from history."""
+
+    def __init__(self, engine: Engine, store: AnalyticsStore, discovery_config: DiscoveryConfig):
+        self.engine = engine
+        self.store = store
+        self.discovery_config = discovery_config
+
+    def _query(self) -> Dict[str, np.ndarray]:
+        """
+        Load the clip/discovery/run join as column arrays in one query.
+
+        Returns:
+            Dict[str, np.ndarray]: One array per selected column.
+        """
+        stmt = (
+            select(
+                DiscoveredVideo.view_velocity,
+                DiscoveredVideo.view_count,
+                DiscoveredVideo.like_count,
+                DiscoveredVideo.comment_count,
+                DiscoveredVideo.discovery_source,
+                DiscoveredVideo.discovered_at,
+                PipelineRun.niche,
+                PipelineRun.cycle_end,
+                PipelineRun.youtube_video_id,
+                PipelineRun.video_duration_seconds,
+                Clip.rank_position,
+                Clip.clip_duration_seconds,
+            )
+            .join(Clip, Clip.discovered_video_id == DiscoveredVideo.id)
+            .join(PipelineRun, PipelineRun.id == Clip.pipeline_run_id)
+            .where(PipelineRun.youtube_video_id.is_not(None))
+            .order_by(PipelineRun.id, Clip.rank_position.desc())
+        )
+        session = get_session(self.engine)
+        try:
+            rows = session.execute(stmt).all()
+        finally:
+            session.close()
+        names = [c.name for c in stmt.selected_columns]
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        return {name: np.array(col, dtype=object) for name, col in zip(names, columns)}
+
+    def build_training_data(self) -> TrainingData:
+        """
+        Compute the five scoring features and a performance target per clip.
+
+        Features mirror the scorer's inputs from what discovery stores:
+        per-niche normalized view velocity, a Reddit-source indicator, like
+        ratio, per-niche normalized comment velocity and recency within the
+        lookback window. The target is the share of the audience retained
+        across the clip's position in the final video, falling back to the
+        video's total views when no retention curve is available. Targets
+        are ranked within each niche so niches of different sizes compare.
+
+        Returns:
+            TrainingData: Features (n, 5), targets (n,) and chronological order.
+        """
+        cols = self._query()
+        n = cols["niche"].size
+        if n == 0:
+            return TrainingData(np.empty((0, 5)), np.empty(0), np.empty(0, dtype=np.int64))
+
+        def num(name: str) -> np.ndarray:
+            return np.array([np.nan if v is None else v for v in cols[name]], dtype=np.float64)
+
+        _, niche_codes = np.unique(cols["niche"].astype(str), return_inverse=True)
+        n_niches = int(niche_codes.max()) + 1
+        views = np.nan_to_num(num("view_count"))
+        velocity = np.nan_to_num(num("view_velocity"))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            like_ratio = np.where(views > 0, np.nan_to_num(num("like_count")) / views, 0.0)
+            comment_velocity = np.where(views > 0, velocity * np.nan_to_num(num("comment_count")) / views, 0.0)
+            velocity_norm = velocity / np.maximum(_group_max(velocity, niche_codes, n_niches), 1e-9)
+            comment_norm = comment_velocity / np.maximum(_group_max(comment_velocity, niche_codes, n_niches), 1e-9)
+        reddit = np.array(["reddit" in (s or "") for s in cols["discovery_source"]], dtype=np.float64)
+        cycle_end = cols["cycle_end"].astype("datetime64[s]")
+        discovered = cols["discovered_at"].astype("datetime64[s]")
+        age_hours = (cycle_end - discovered).astype(np.float64) / 3600.0
+        recency = 1.0 - np.clip(age_hours / self.discovery_config.lookback_hours, 0.0, 1.0)
+        features = np.column_stack([velocity_norm, reddit, like_ratio, comment_norm, recency])
+
+        targets, has_retention = self._targets(cols, niche_codes)
+        # Rank retention-based and view-based targets separately within each
+        # niche so the two scales are never compared directly.
+        groups = niche_codes * 2 + has_retention.astype(np.int64)
+        order = np.argsort(cycle_end, kind="stable")
+        return TrainingData(features, _group_rank(targets, groups), order)
+
+    def _targets(self, cols: Dict[str, np.ndarray], niche_codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-clip performance: retention kept across the clip, else log total video views.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Targets and a mask of retention-based targets.
+        """
+        store = self.store
+        n = niche_codes.size
+        video_ids = cols["youtube_video_id"].astype(str)
+        lookup = {vid: i for i, vid in enumerate(store.video_ids.tolist())}
+        store_idx = np.array([lookup.get(v, -1) for v in video_ids], dtype=np.int64)
+        known = store_idx >= 0
+
+        views_per_video = np.zeros(len(store.video_ids), dtype=np.float64)
+        if store.daily["views"].size:
+            np.add.at(views_per_video, store.daily["video_idx"], store.daily["views"])
+        targets = np.where(known, np.log1p(views_per_video[np.maximum(store_idx, 0)]), 0.0)
+
+        # Position of each clip within its run, in playback order.
+        first = np.r_[True, video_ids[1:] != video_ids[:-1]]
+        run_start = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+        slot = np.arange(n) - run_start
+        safe_idx = np.maximum(store_idx, 0)
+        in_range = known & (slot < store.boundaries.shape[1])
+        start_ratio = np.where(in_range, store.boundaries[safe_idx, np.minimum(slot, store.boundaries.shape[1] - 1)], np.nan)
+        duration = np.array([v or np.nan for v in cols["video_duration_seconds"]], dtype=np.float64)
+        clip_dur = np.array([v or 0.0 for v in cols["clip_duration_seconds"]], dtype=np.float64)
+        end_ratio = start_ratio + clip_dur / duration
+
+        def at(ratio: np.ndarray) -> np.ndarray:
+            idx = np.clip(np.rint(np.nan_to_num(ratio) * RETENTION_POINTS).astype(np.int64) - 1, 0, RETENTION_POINTS - 1)
+            return store.retention[safe_idx, idx] if store.retention.size else np.full(n, np.nan)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            kept = at(end_ratio) / at(start_ratio)
+        has_retention = in_range & np.isfinite(kept) & ~np.isnan(start_ratio)
+        return np.where(has_retention, kept, targets), has_retention
+
+    def propose(self, holdout_fraction: float = 0.2, l2_to_prior: float = 0.1) -> WeightProposal:
+        """
+        Fit new weights on older history and backtest them on the newest.
+
+        Args:
+            holdout_fraction (float): Newest share of samples held out (default: 0.2).
+            l2_to_prior (float): Shrinkage toward the current weights (default: 0.1).
+
+        Returns:
+            WeightProposal: Current and proposed weights with backtest metrics.
+
+        Raises:
+            ValueError: If there is not enough history to fit.
+        """
+        data = self.build_training_data()
+        n = data.targets.size
+        if n < MIN_SAMPLES:
+            raise ValueError(f"Not enough history to refit weights ({n} clips, need {MIN_SAMPLES}).")
+
+        current = np.array([getattr(self.discovery_config, k) for k in SCORING_WEIGHT_KEYS])
+        split = int(n * (1.0 - holdout_fraction))
+        train, test = data.order[:split], data.order[split:]
+        fitted = fit_weights(data.features[train], data.targets[train], current, l2_to_prior)
+        # Refit on all data for the proposal once the backtest is computed.
+        final = fit_weights(data.features, data.targets, current, l2_to_prior)
+        proposed = self._round_to_simplex(final)
+
+        X_test, y_test = data.features[test], data.targets[test]
+        top = y_test >= np.quantile(y_test, 0.75)
+        k = max(int(top.sum()), 1)
+
+        def precision_at_k(w: np.ndarray) -> float:
+            picked = np.argsort(X_test @ w)[::-1][:k]
+            return float(top[picked].mean())
+
+        metrics = {
+            "spearman_current": _spearman(X_test @ current, y_test),
+            "spearman_proposed": _spearman(X_test @ fitted, y_test),
+            "top_quartile_precision_current": precision_at_k(current),
+            "top_quartile_precision_proposed": precision_at_k(fitted),
+            "train_samples": float(train.size),
+            "test_samples": float(test.size),
+        }
+
+        proposed_dict = dict(zip(SCORING_WEIGHT_KEYS, proposed.tolist()))
+        # Same constraint as config loading; raises if the proposal is invalid.
+        DiscoveryConfig.model_validate({**self.discovery_config.model_dump(), **proposed_dict})
+        logger.info(f"Proposed scoring weights from {n} clips: {proposed_dict}")
+        return WeightProposal(
+            current=dict(zip(SCORING_WEIGHT_KEYS, current.tolist())),
+            proposed=proposed_dict,
+            metrics=metrics,
+            n_samples=n,
+        )
+
+    @staticmethod
+    def _round_to_simplex(weights: np.ndarray, decimals: int = 2) -> np.ndarray:
+        """Round weights for the config file while keeping their sum at exactly 1."""
+        rounded = np.round(weights, decimals)
+        rounded[np.argmax(rounded)] += round(1.0 - rounded.sum(), decimals)
+        return np.round(rounded, decimals)
@@ -1 +1,18 @@
-"""Placeholder for src.compilation package."""
+"""
+Video compilation: final render, review previews and the ffmpeg wrapper.
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "FFmpegError": "src.compilation.ffmpeg_wrapper",
+    "FrameRing": "src.compilation.frame_ring",
+    "FrameRingError": "src.compilation.frame_ring",
+    "LoudnessCatalog": "src.compilation.loudness",
+    "MusicLibrary": "src.compilation.music_library",
+    "RenderOutputs": "src.compilation.compiler",
+    "SmartCropPlanner": "src.compilation.smart_crop",
+    "VideoCompiler": "src.compilation.compiler",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -1 +1,192 @@
-"""Placeholder: Video compilation pipeline."""
+"""
+Video compilation pipeline.
+
+Renders the assembled segments into the final video and, from the same
+decode, a low-bitrate review proxy and a short teaser for Telegram review.
+"""
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from src.compilation.ffmpeg_wrapper import build_render_with_previews_command, run_ffmpeg_async
+from src.config import AudioConfig, VideoConfig
+from src.orchestrator.storage import StorageManager
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+PreviewCallback = Callable[[str], Awaitable[None]]
+
+# Extra output time to wait past the teaser length before treating the teaser
+# as complete, so that its last fragment has been flushed by the muxer.
+TEASER_READY_MARGIN_SECONDS = 2.0
+
+
+@dataclass
+class RenderOutputs:
+    """Files produced by a single render pass."""
+    final_path: str
+    proxy_path: str
+    teaser_path: str
+
+
+def _preview_paths(output_path: str) -> RenderOutputs:
+    """
+    Derive proxy and teaser paths next to the final render.
+
+    Args:
+        output_path (str): Path of the final render.
+
+    Returns:
+        RenderOutputs: Final, proxy and teaser paths.
+    """
+    stem, ext = os.path.splitext(output_path)
+    return RenderOutputs(
+        final_path=output_path,
+        proxy_path=f"{stem}.proxy{ext or '.mp4'}",
+        teaser_path=f"{stem}.teaser{ext or '.mp4'}",
+    )
+
+
+def write_concat_list(segment_paths: List[str], list_path: str) -> str:
+    """
+    Write an ffconcat list for the given segments.
+
+    Args:
+        segment_paths (List[str]): Ordered segment files.
+        list_path (str): Destination of the list file.
+
+    Returns:
+        str: The list file path.
+
+    Raises:
+        ValueError: If no segments are given.
+    """
+    if not segment_paths:
+        raise ValueError("At least one segment is required to render a video.")
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_path
+
+
+class VideoCompiler:
+    """Renders assembled segments into the final video and review previews."""
+
+    def __init__(
+        self,
+        video_config: VideoConfig,
+        audio_config: AudioConfig,
+        storage: Optional[StorageManager] = None,
+    ):
+        self.video_config = video_config
+        self.audio_config = audio_config
+        self.storage = storage
+
+    async def render(
+        self,
+        segment_paths: List[str],
+        output_path: str,
+        on_teaser_ready: Optional[PreviewCallback] = None,
+        timeout: int = 3600,
+        expected_duration: Optional[float] = None,
+    ) -> RenderOutputs:
+        """
+        Render the final video, the review proxy and the teaser in one pass.
+
+        ``on_teaser_ready`` is scheduled as soon as ffmpeg's output time has
+        passed the teaser length, while the main encode keeps running. It is
+        awaited before this method returns so that failures are not lost.
+
+        With a storage manager, the predicted output size is reserved on the
+        working tier before ffmpeg starts.
+
+        Args:
+            segment_paths (List[str]): Ordered, already-normalized segments.
+            output_path (str): Path of the final render.
+            on_teaser_ready (Optional[PreviewCallback]): Called with the teaser path.
+            timeout (int): Render timeout in seconds (default: 3600).
+            expected_duration (Optional[float]): Expected output length, used to
+                size the storage reservation (default: ``target_duration_max``).
+
+        Returns:
+            RenderOutputs: Paths of the final render, proxy and teaser.
+
+        Raises:
+            FFmpegError: If the render fails.
+            InsufficientStorageError: If space for the render cannot be reserved.
+        """
+        if self.storage is None:
+            return await self._render(segment_paths, output_path, on_teaser_ready, timeout)
+        duration = expected_duration or self.video_config.target_duration_max
+        async with self.storage.reserve(
+            self.storage.predict_render_bytes(duration), path=output_path, purpose="render"
+        ):
+            return await self._render(segment_paths, output_path, on_teaser_ready, timeout)
+
+    async def _render(
+        self,
+        segment_paths: List[str],
+        output_path: str,
+        on_teaser_ready: Optional[PreviewCallback],
+        timeout: int,
+    ) -> RenderOutputs:
+        """Run the single-pass render; see ``render``."""
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        outputs = _preview_paths(output_path)
+        list_path = write_concat_list(segment_paths, f"{os.path.splitext(output_path)[0]}.ffconcat")
+
+        vc = self.video_config
+        command = build_render_with_previews_command(
+            concat_list_path=list_path,
+            output_path=outputs.final_path,
+            proxy_path=outputs.proxy_path,
+            teaser_path=outputs.teaser_path,
+            resolution=vc.resolution,
+            fps=vc.fps,
+            codec=vc.codec,
+            crf=vc.crf,
+            preset=vc.preset,
+            pixel_format=vc.pixel_format,
+            audio_codec=vc.audio_codec,
+            audio_bitrate=vc.audio_bitrate,
+            sample_rate=self.audio_config.output_sample_rate,
+            proxy_height=vc.proxy_height,
+            proxy_video_bitrate=vc.proxy_video_bitrate,
+            proxy_audio_bitrate=vc.proxy_audio_bitrate,
+            teaser_duration=vc.teaser_duration_sec,
+        )
+
+        teaser_task: Optional[asyncio.Task] = None
+        ready_at = vc.teaser_duration_sec + TEASER_READY_MARGIN_SECONDS
+
+        async def _on_progress(seconds: float) -> None:
+            nonlocal teaser_task
+            if on_teaser_ready is not None and teaser_task is None and seconds >= ready_at:
+                logger.info(f"Teaser ready at {seconds:.1f}s of output: {outputs.teaser_path}")
+                # Run the callback in its own task so a slow upload never
+                # stalls the progress pipe (and with it, ffmpeg).
+                teaser_task = asyncio.create_task(on_teaser_ready(outputs.teaser_path))
+
+        try:
+            await run_ffmpeg_async(command, timeout=timeout, on_progress=_on_progress)
+        except Exception:
+            if teaser_task is not None:
+                teaser_task.cancel()
+            raise
+        finally:
+            if os.path.exists(list_path):
+                os.remove(list_path)
+
+        if on_teaser_ready is not None:
+            if teaser_task is None:
+                # Output shorter than the teaser: it is only complete now.
+                await on_teaser_ready(outputs.teaser_path)
+            else:
+                await teaser_task
+
+        logger.info(f"Rendered {outputs.final_path} with proxy and teaser.")
+        return outputs
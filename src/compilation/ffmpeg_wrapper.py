@@ -1 +1,487 @@
-"""Placeholder: FFmpeg command builder."""
+"""
+FFmpeg command builder and runner.
+
+All video and audio processing shells out to ffmpeg/ffprobe through this
+module so that command construction, error reporting and timeouts are
+handled in one place.
+"""
+import asyncio
+import json
+import os
+import subprocess
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.utils.logging import get_logger
+from src.utils.metrics import timed
+
+logger = get_logger(__name__)
+
+FFMPEG_BINARY = "ffmpeg"
+FFPROBE_BINARY = "ffprobe"
+DEFAULT_TIMEOUT_SECONDS = 600
+
+ProgressCallback = Callable[[float], Awaitable[None]]
+
+
+class FFmpegError(RuntimeError):
+    """Raised when an ffmpeg or ffprobe invocation fails."""
+
+    def __init__(self, message: str, stderr: str = ""):
+        super().__init__(f"{message}: {stderr.strip()}" if stderr else message)
+        self.stderr = stderr
+
+
+def _check_inputs(paths: List[str]) -> None:
+    """
+    Validate that all input files exist before building a command.
+
+    Args:
+        paths (List[str]): Input file paths.
+
+    Raises:
+        FileNotFoundError: If any input file does not exist.
+    """
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Input file not found: {path}")
+
+
+def base_command() -> List[str]:
+    """
+    Return the common ffmpeg prefix used by every command.
+
+    Returns:
+        List[str]: ffmpeg binary with overwrite and quiet logging flags.
+    """
+    return [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error"]
+
+
+def run_ffmpeg(args: List[str], timeout: int = DEFAULT_TIMEOUT_SECONDS) -> subprocess.CompletedProcess:
+    """
+    Run an ffmpeg command synchronously.
+
+    Args:
+        args (List[str]): Full command line, including the ffmpeg binary.
+        timeout (int): Timeout in seconds (default: 600).
+
+    Returns:
+        subprocess.CompletedProcess: The completed process.
+
+    Raises:
+        FFmpegError: If ffmpeg exits with a non-zero status or times out.
+    """
+    try:
+        with timed("ffmpeg"):
+            result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        raise FFmpegError(f"ffmpeg timed out after {timeout} seconds") from e
+    if result.returncode != 0:
+        raise FFmpegError(f"ffmpeg exited with status {result.returncode}", result.stderr)
+    return result
+
+
+def _parse_progress_time(line: str) -> Optional[float]:
+    """
+    Parse an ``out_time_us``/``out_time_ms`` line from ``-progress`` output.
+
+    Args:
+        line (str): A single ``key=value`` progress line.
+
+    Returns:
+        Optional[float]: Output time in seconds, or None for other keys.
+    """
+    key, _, value = line.partition("=")
+    if key not in ("out_time_us", "out_time_ms"):
+        return None
+    try:
+        # ffmpeg reports both keys in microseconds.
+        return int(value) / 1_000_000
+    except ValueError:
+        return None
+
+
+async def run_ffmpeg_async(
+    args: List[str],
+    timeout: int = DEFAULT_TIMEOUT_SECONDS,
+    on_progress: Optional[ProgressCallback] = None,
+) -> None:
+    """
+    Run an ffmpeg command without blocking the event loop.
+
+    When ``on_progress`` is given, ``-progress pipe:1`` is appended and the
+    callback receives the current output time in seconds as ffmpeg reports it.
+
+    Args:
+        args (List[str]): Full command line, including the ffmpeg binary.
+        timeout (int): Timeout in seconds (default: 600).
+        on_progress (Optional[ProgressCallback]): Awaited with the output time.
+
+    Raises:
+        FFmpegError: If ffmpeg exits with a non-zero status or times out.
+    """
+    if on_progress is not None:
+        args = args[:1] + ["-progress", "pipe:1", "-nostats"] + args[1:]
+
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE if on_progress else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def _pump_progress() -> None:
+        assert process.stdout is not None
+        async for raw_line in process.stdout:
+            seconds = _parse_progress_time(raw_line.decode(errors="replace").strip())
+            if seconds is not None:
+                await on_progress(seconds)
+
+    async def _wait() -> bytes:
+        if on_progress is not None:
+            _, stderr = await asyncio.gather(_pump_progress(), process.stderr.read())
+        else:
+            stderr = await process.stderr.read()
+        await process.wait()
+        return stderr
+
+    try:
+        with timed("ffmpeg"):
+            stderr = await asyncio.wait_for(_wait(), timeout=timeout)
+    except asyncio.TimeoutError as e:
+        process.kill()
+        await process.wait()
+        raise FFmpegError(f"ffmpeg timed out after {timeout} seconds") from e
+
+    if process.returncode != 0:
+        raise FFmpegError(
+            f"ffmpeg exited with status {process.returncode}", stderr.decode(errors="replace")
+        )
+
+
+def get_media_info(path: str, timeout: int = 60) -> Dict[str, object]:
+    """
+    Probe a media file with ffprobe.
+
+    Args:
+        path (str): Path to the media file.
+        timeout (int): Timeout in seconds (default: 60).
+
+    Returns:
+        Dict[str, object]: duration, width, height, video_codec, fps,
+        audio_codec and audio_channels (None where a stream is absent).
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        FFmpegError: If ffprobe fails.
+    """
+    _check_inputs([path])
+    args = [
+        FFPROBE_BINARY, "-v", "error", "-print_format", "json",
+        "-show_format", "-show_streams", path,
+    ]
+    try:
+        with timed("ffprobe"):
+            result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        raise FFmpegError(f"ffprobe timed out after {timeout} seconds") from e
+    if result.returncode != 0:
+        raise FFmpegError(f"ffprobe exited with status {result.returncode}", result.stderr)
+    return parse_probe_output(result.stdout)
+
+
+def parse_probe_output(raw: str) -> Dict[str, object]:
+    """
+    Reduce ffprobe JSON output to the fields the pipeline uses.
+
+    Args:
+        raw (str): ffprobe ``-print_format json`` output.
+
+    Returns:
+        Dict[str, object]: Normalized media information.
+    """
+    data = json.loads(raw)
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    fps = None
+    if video and video.get("avg_frame_rate", "0/0") != "0/0":
+        num, _, den = video["avg_frame_rate"].partition("/")
+        fps = float(num) / float(den or 1)
+
+    duration = data.get("format", {}).get("duration")
+    return {
+        "duration": float(duration) if duration is not None else None,
+        "width": video.get("width") if video else None,
+        "height": video.get("height") if video else None,
+        "video_codec": video.get("codec_name") if video else None,
+        "fps": fps,
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "audio_channels": audio.get("channels") if audio else None,
+    }
+
+
+def build_render_with_previews_command(
+    concat_list_path: str,
+    output_path: str,
+    proxy_path: str,
+    teaser_path: str,
+    resolution: str,
+    fps: int,
+    codec: str,
+    crf: int,
+    preset: str,
+    pixel_format: str,
+    audio_codec: str,
+    audio_bitrate: str,
+    sample_rate: int,
+    proxy_height: int = 480,
+    proxy_video_bitrate: str = "400k",
+    proxy_audio_bitrate: str = "64k",
+    teaser_duration: float = 30.0,
+) -> List[str]:
+    """
+    Build one ffmpeg command that writes the final render, a low-bitrate
+    proxy and a short teaser from a single decode of the inputs.
+
+    The decoded video and audio are split three ways inside the filter graph.
+    The teaser branch is trimmed and muxed as fragmented MP4 so it is playable
+    while the main encode is still running.
+
+    Args:
+        concat_list_path (str): ffconcat list of the assembled segments.
+        output_path (str): Path of the full-quality render.
+        proxy_path (str): Path of the low-bitrate review proxy.
+        teaser_path (str): Path of the teaser preview.
+        resolution (str): Final resolution as ``WIDTHxHEIGHT``.
+        fps (int): Output frame rate.
+        codec (str): Video codec for the final render.
+        crf (int): CRF for the final render.
+        preset (str): Encoder preset for the final render.
+        pixel_format (str): Output pixel format.
+        audio_codec (str): Audio codec for all outputs.
+        audio_bitrate (str): Audio bitrate for the final render.
+        sample_rate (int): Output audio sample rate.
+        proxy_height (int): Height of the proxy and teaser (default: 480).
+        proxy_video_bitrate (str): Proxy/teaser video bitrate (default: "400k").
+        proxy_audio_bitrate (str): Proxy/teaser audio bitrate (default: "64k").
+        teaser_duration (float): Teaser length in seconds (default: 30.0).
+
+    Returns:
+        List[str]: The full command line.
+
+    Raises:
+        FileNotFoundError: If the concat list does not exist.
+        ValueError: If the resolution string is malformed.
+    """
+    _check_inputs([concat_list_path])
+    width, sep, height = resolution.partition("x")
+    if not sep or not width.isdigit() or not height.isdigit():
+        raise ValueError(f"Invalid resolution: {resolution}")
+
+    filter_graph = ";".join([
+        f"[0:v]fps={fps},scale={width}:{height},format={pixel_format},split=3[vmain][vproxy][vteaser]",
+        f"[vproxy]scale=-2:{proxy_height}[vp]",
+        f"[vteaser]trim=0:{teaser_duration},setpts=PTS-STARTPTS,scale=-2:{proxy_height}[vt]",
+        f"[0:a]aresample={sample_rate},asplit=3[amain][aproxy][ateaser]",
+        f"[ateaser]atrim=0:{teaser_duration},asetpts=PTS-STARTPTS[at]",
+    ])
+    gop = str(fps * 2)
+    proxy_video = [
+        "-c:v", "libx264", "-preset", "veryfast", "-b:v", proxy_video_bitrate,
+        "-maxrate", proxy_video_bitrate, "-bufsize", proxy_video_bitrate,
+        "-pix_fmt", pixel_format, "-g", gop,
+        "-c:a", audio_codec, "-b:a", proxy_audio_bitrate,
+    ]
+
+    return base_command() + [
+        "-f", "concat", "-safe", "0", "-i", concat_list_path,
+        "-filter_complex", filter_graph,
+        # Final render
+        "-map", "[vmain]", "-map", "[amain]",
+        "-c:v", codec, "-crf", str(crf), "-preset", preset, "-pix_fmt", pixel_format,
+        "-c:a", audio_codec, "-b:a", audio_bitrate, "-movflags", "+faststart",
+        output_path,
+        # Review proxy
+        "-map", "[vp]", "-map", "[aproxy]", *proxy_video, "-movflags", "+faststart",
+        proxy_path,
+        # Teaser: fragmented so it can be sent before the trailer is written
+        "-map", "[vt]", "-map", "[at]", *proxy_video,
+        "-movflags", "+frag_keyframe+empty_moov+default_base_moof",
+        "-frag_duration", "1000000", "-flush_packets", "1",
+        teaser_path,
+    ]
+
+
+def build_raw_frames_command(
+    input_path: str,
+    start: float,
+    duration: float,
+    width: int,
+    height: int,
+    fps: float,
+    pixel_format: str = "gray",
+) -> List[str]:
+    """
+    Build a command that streams a downscaled section to stdout as raw frames.
+
+    Frames are packed ``pixel_format`` (``gray``: 1 byte per pixel, ``rgb24``:
+    3), so the reader can map them straight into a NumPy array.
+
+    Args:
+        input_path (str): Source media.
+        start (float): Section start in seconds.
+        duration (float): Section length in seconds.
+        width (int): Frame width.
+        height (int): Frame height.
+        fps (float): Frame rate to sample at.
+        pixel_format (str): Raw pixel format (default: "gray").
+
+    Returns:
+        List[str]: The full command line.
+
+    Raises:
+        FileNotFoundError: If the input does not exist.
+    """
+    _check_inputs([input_path])
+    return base_command() + [
+        "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", input_path,
+        "-an", "-vf", f"fps={fps},scale={width}:{height}:flags=area,format={pixel_format}",
+        "-f", "rawvideo", "-pix_fmt", pixel_format, "pipe:1",
+    ]
+
+
+async def run_ffmpeg_pipe(args: List[str], timeout: int = DEFAULT_TIMEOUT_SECONDS) -> bytes:
+    """
+    Run an ffmpeg command that writes to stdout and return what it wrote.
+
+    Args:
+        args (List[str]): Full command line, including the ffmpeg binary.
+        timeout (int): Timeout in seconds (default: 600).
+
+    Returns:
+        bytes: Everything ffmpeg wrote to stdout.
+
+    Raises:
+        FFmpegError: If ffmpeg exits with a non-zero status or times out.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        with timed("ffmpeg"):
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError as e:
+        process.kill()
+        await process.wait()
+        raise FFmpegError(f"ffmpeg timed out after {timeout} seconds") from e
+    if process.returncode != 0:
+        raise FFmpegError(
+            f"ffmpeg exited with status {process.returncode}", stderr.decode(errors="replace")
+        )
+    return stdout
+
+
+def build_vertical_crop_command(
+    input_path: str,
+    output_path: str,
+    start: float,
+    duration: float,
+    crop_filter: str,
+    resolution: str,
+    fps: int,
+    codec: str,
+    crf: int,
+    preset: str,
+    pixel_format: str,
+    audio_codec: str,
+    audio_bitrate: str,
+) -> List[str]:
+    """
+    Build the single full-resolution pass that applies a planned crop path.
+
+    Args:
+        input_path (str): Source media.
+        output_path (str): Vertical output file.
+        start (float): Section start in seconds.
+        duration (float): Section length in seconds.
+        crop_filter (str): ``crop=...`` filter with a time-varying x expression.
+        resolution (str): Output resolution as ``WIDTHxHEIGHT``.
+        fps (int): Output frame rate.
+        codec (str): Video codec.
+        crf (int): CRF.
+        preset (str): Encoder preset.
+        pixel_format (str): Output pixel format.
+        audio_codec (str): Audio codec.
+        audio_bitrate (str): Audio bitrate.
+
+    Returns:
+        List[str]: The full command line.
+
+    Raises:
+        FileNotFoundError: If the input does not exist.
+        ValueError: If the resolution string is malformed.
+    """
+    _check_inputs([input_path])
+    width, sep, height = resolution.partition("x")
+    if not sep or not width.isdigit() or not height.isdigit():
+        raise ValueError(f"Invalid resolution: {resolution}")
+    return base_command() + [
+        "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", input_path,
+        "-vf", f"{crop_filter},scale={width}:{height},setsar=1,fps={fps},format={pixel_format}",
+        "-c:v", codec, "-crf", str(crf), "-preset", preset, "-pix_fmt", pixel_format,
+        "-c:a", audio_codec, "-b:a", audio_bitrate, "-movflags", "+faststart",
+        output_path,
+    ]
+
+
+def build_frame_extract_command(input_path: str, timestamp: float, output_path: str) -> List[str]:
+    """
+    Build a command that decodes one frame at full resolution to an image.
+
+    Seeking before the input makes ffmpeg jump to the nearest keyframe and
+    decode forward only as far as ``timestamp``.
+
+    Args:
+        input_path (str): Source media.
+        timestamp (float): Frame time in seconds.
+        output_path (str): Image file (format from the extension, e.g. ``.png``).
+
+    Returns:
+        List[str]: The full command line.
+
+    Raises:
+        FileNotFoundError: If the input does not exist.
+    """
+    _check_inputs([input_path])
+    return base_command() + [
+        "-ss", f"{timestamp:.3f}", "-i", input_path, "-frames:v", "1", "-an", output_path,
+    ]
+
+
+def build_loudness_analysis_command(
+    input_path: str, target_lufs: float, loudness_range: float, true_peak: float
+) -> List[str]:
+    """
+    Build a ``loudnorm`` measurement pass that decodes audio only.
+
+    loudnorm prints its JSON summary at info level, so this command keeps
+    ffmpeg's default log level; the summary ends up on stderr.
+
+    Args:
+        input_path (str): Media to measure.
+        target_lufs (float): Integrated loudness target (affects ``target_offset``).
+        loudness_range (float): Loudness range target.
+        true_peak (float): True-peak ceiling in dBTP.
+
+    Returns:
+        List[str]: The full command line.
+
+    Raises:
+        FileNotFoundError: If the input does not exist.
+    """
+    _check_inputs([input_path])
+    return [
+        FFMPEG_BINARY, "-hide_banner", "-nostats", "-i", input_path, "-vn", "-sn", "-dn",
+        "-af", f"loudnorm=I={target_lufs}:LRA={loudness_range}:TP={true_peak}:print_format=json",
+        "-f", "null", "-",
+    ]
@@ -0,0 +1,387 @@
+"""
+One decode, many analysers: a shared-memory frame ring (SPEC §4.7, §4.9).
+
+Crop planning and thumbnail scoring look at the same downscaled frames of a
+clip. ``fan_out`` runs the decoder once and reads its rawvideo output
+straight into the slots of a ``multiprocessing.shared_memory`` ring. One
+worker process per consumer reads the slots in place as NumPy views, so the
+consumers run on separate cores. Frames are neither pickled nor copied
+between processes; the pipe read that fills a slot is the only copy.
+
+Every consumer has a pair of semaphores. The writer takes a free slot from
+each consumer before it overwrites the slot, so the slowest consumer holds
+the decoder back and nothing is dropped. A consumer waits for the next
+sequence number to be filled, and hands the slot back when it moves on:
+
+    saliency, scores = await analyze_section(
+        path, start, duration, width, height, fps=5.0,
+        consumers=[stream_saliency, partial(stream_scores, stride=5)],
+    )
+"""
+import asyncio
+import multiprocessing
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.synchronize import Semaphore
+from typing import Any, BinaryIO, Callable, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from src.compilation.ffmpeg_wrapper import DEFAULT_TIMEOUT_SECONDS, FFmpegError, build_raw_frames_command
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
+
+logger = get_logger(__name__)
+
+DEFAULT_SLOTS = 16
+# Bytes per pixel of the raw formats the analysers use.
+CHANNELS = {"gray": 1, "rgb24": 3}
+# How long the writer waits on a consumer that is alive but not reading.
+STALL_TIMEOUT_SECONDS = 120.0
+
+# Header layout (int64 fields), followed by one sequence number per slot.
+_WRITTEN, _DONE, _HEADER_FIELDS = 0, 1, 2
+
+
+class FrameRingError(RuntimeError):
+    """Raised when a consumer fails, dies or stops reading."""
+
+
+class RingLayout(NamedTuple):
+    """Where a ring lives and the shape of its frames; cheap to send to workers."""
+    name: str
+    height: int
+    width: int
+    channels: int
+    slots: int
+
+    @property
+    def frame_shape(self) -> tuple:
+        return (self.height, self.width) if self.channels == 1 else (self.height, self.width, self.channels)
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.height * self.width * self.channels
+
+    @property
+    def header_bytes(self) -> int:
+        return 8 * (_HEADER_FIELDS + self.slots)
+
+
+class Frame(NamedTuple):
+    """A frame in the ring. ``pixels`` is a view that is valid until the reader moves on."""
+    seq: int
+    pixels: np.ndarray
+
+
+class FrameRing:
+    """Fixed-size frame slots in shared memory, plus a small int64 header."""
+
+    def __init__(self, layout: RingLayout, shm: shared_memory.SharedMemory, owner: bool):
+        self.layout = layout
+        self._shm = shm
+        self._owner = owner
+        self.header = np.ndarray((_HEADER_FIELDS + layout.slots,), dtype=np.int64, buffer=shm.buf)
+        self.frames = np.ndarray(
+            (layout.slots, *layout.frame_shape), dtype=np.uint8, buffer=shm.buf, offset=layout.header_bytes,
+        )
+
+    @classmethod
+    def create(cls, width: int, height: int, channels: int, slots: int = DEFAULT_SLOTS) -> "FrameRing":
+        """
+        Allocate a new ring; the creator unlinks it on ``close``.
+
+        Args:
+            width (int): Frame width.
+            height (int): Frame height.
+            channels (int): Bytes per pixel.
+            slots (int): Frames the ring holds (default: 16).
+
+        Returns:
+            FrameRing: The empty ring.
+
+        Raises:
+            ValueError: If a dimension is not positive.
+        """
+        if min(width, height, channels, slots) < 1:
+            raise ValueError("Frame ring dimensions must be positive.")
+        size = 8 * (_HEADER_FIELDS + slots) + slots * width * height * channels
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(RingLayout(shm.name, height, width, channels, slots), shm, owner=True)
+        ring.header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, layout: RingLayout) -> "FrameRing":
+        """Open an existing ring in a worker process."""
+        return cls(layout, shared_memory.SharedMemory(name=layout.name), owner=False)
+
+    def slot_buffer(self, slot: int) -> memoryview:
+        """Writable bytes of one slot, for reading a pipe straight into it."""
+        start = self.layout.header_bytes + slot * self.layout.frame_bytes
+        return self._shm.buf[start:start + self.layout.frame_bytes]
+
+    def close(self) -> None:
+        """Drop this process's mapping (and the segment itself, for the creator)."""
+        del self.header, self.frames
+        try:
+            self._shm.close()
+        except BufferError:
+            # A consumer still holds a frame view; the mapping goes with the process.
+            pass
+        if self._owner:
+            self._shm.unlink()
+
+
+class FrameReader:
+    """
+    One consumer's cursor over the ring.
+
+    Iterating yields every frame in order. A frame's pixels may be read in
+    place until the next frame is requested; copy anything kept longer.
+    """
+
+    def __init__(self, ring: FrameRing, free: Semaphore, filled: Semaphore):
+        self.ring = ring
+        self.seq = 0
+        self._free = free
+        self._filled = filled
+        self._holding = False
+        self._done = False
+
+    def __iter__(self) -> Iterator[Frame]:
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def next_frame(self) -> Optional[Frame]:
+        """
+        Hand back the current slot and wait for the next frame.
+
+        Returns:
+            Optional[Frame]: The frame, or None at the end of the stream.
+
+        Raises:
+            FrameRingError: If the writer overwrote a slot this reader still needed.
+        """
+        self.release()
+        if self._done:
+            return None
+        self._filled.acquire()
+        if self.seq >= int(self.ring.header[_WRITTEN]):
+            self._done = True
+            return None
+        slot = self.seq % self.ring.layout.slots
+        written = int(self.ring.header[_HEADER_FIELDS + slot])
+        if written != self.seq:
+            raise FrameRingError(f"Slot {slot} holds frame {written}, expected {self.seq}")
+        self._holding = True
+        frame = Frame(self.seq, self.ring.frames[slot])
+        self.seq += 1
+        return frame
+
+    def release(self) -> None:
+        """Give the slot of the current frame back to the writer."""
+        if self._holding:
+            self._holding = False
+            self._free.release()
+
+
+def _consume(layout: RingLayout, free: Semaphore, filled: Semaphore,
+             consumer: Callable[[FrameReader], Any], results: Any, index: int) -> None:
+    ring = FrameRing.attach(layout)
+    reader = FrameReader(ring, free, filled)
+    try:
+        try:
+            outcome = (index, consumer(reader), None)
+        except Exception as e:
+            outcome = (index, None, f"{type(e).__name__}: {e}")
+        # Keep taking frames until the end, so a consumer that finished or
+        # failed early never holds the writer back.
+        for _ in reader:
+            pass
+        results.put(outcome)
+    finally:
+        reader.release()
+        ring.close()
+
+
+def _read_into(stream: BinaryIO, buffer: memoryview) -> int:
+    filled = 0
+    while filled < len(buffer):
+        n = stream.readinto(buffer[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def _wait_for_slot(free: Semaphore, worker: Any, stall_timeout: float) -> None:
+    waited_since = time.monotonic()
+    while not free.acquire(timeout=0.5):
+        if not worker.is_alive():
+            raise FrameRingError(f"Consumer process {worker.name} exited with code {worker.exitcode}")
+        if time.monotonic() - waited_since > stall_timeout:
+            raise FrameRingError(f"Consumer process {worker.name} stopped reading frames")
+
+
+def _write(stream: BinaryIO, ring: FrameRing, frees: List[Semaphore], filleds: List[Semaphore],
+           workers: List[Any], stall_timeout: float) -> int:
+    slots = ring.layout.slots
+    seq = 0
+    try:
+        while True:
+            slot = seq % slots
+            for free, worker in zip(frees, workers):
+                _wait_for_slot(free, worker, stall_timeout)
+            view = ring.slot_buffer(slot)
+            try:
+                complete = _read_into(stream, view) == len(view)
+            finally:
+                view.release()
+            if not complete:
+                break
+            ring.header[_HEADER_FIELDS + slot] = seq
+            seq += 1
+            ring.header[_WRITTEN] = seq
+            for filled in filleds:
+                filled.release()
+    finally:
+        ring.header[_DONE] = 1
+        # One extra post per reader: waking up with nothing new written means the end.
+        for filled in filleds:
+            filled.release()
+    return seq
+
+
+@timed("frame_ring_fan_out")
+def fan_out(
+    args: List[str],
+    width: int,
+    height: int,
+    channels: int,
+    consumers: Sequence[Callable[[FrameReader], Any]],
+    slots: int = DEFAULT_SLOTS,
+    timeout: int = DEFAULT_TIMEOUT_SECONDS,
+    stall_timeout: float = STALL_TIMEOUT_SECONDS,
+) -> List[Any]:
+    """
+    Decode once and run every consumer on the frames in its own process.
+
+    Consumers are called with a ``FrameReader`` in a spawned worker, so they
+    must be picklable (module-level functions or ``functools.partial`` of
+    one), and so must their return values.
+
+    Args:
+        args (List[str]): Decoder command writing packed raw frames to stdout.
+        width (int): Frame width.
+        height (int): Frame height.
+        channels (int): Bytes per pixel.
+        consumers (Sequence[Callable[[FrameReader], Any]]): Analysers to run.
+        slots (int): Ring size in frames (default: 16).
+        timeout (int): Limit for the whole decode in seconds (default: 600).
+        stall_timeout (float): Limit for one consumer to free a slot (default: 120).
+
+    Returns:
+        List[Any]: Each consumer's result, in order.
+
+    Raises:
+        FFmpegError: If the decoder fails or times out.
+        FrameRingError: If a consumer raises, dies or stops reading.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    ring = FrameRing.create(width, height, channels, slots)
+    frees = [ctx.Semaphore(slots) for _ in consumers]
+    filleds = [ctx.Semaphore(0) for _ in consumers]
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_consume, args=(ring.layout, frees[i], filleds[i], consumer, results, i),
+                    name=f"frame-consumer-{i}", daemon=True)
+        for i, consumer in enumerate(consumers)
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=stderr)
+            watchdog = threading.Timer(timeout, process.kill)
+            watchdog.start()
+            try:
+                frames = _write(process.stdout, ring, frees, filleds, workers, stall_timeout)
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+                expired = watchdog.finished.is_set()
+                watchdog.cancel()
+            if expired:
+                raise FFmpegError(f"Decoder timed out after {timeout} seconds")
+            if returncode != 0:
+                stderr.seek(0)
+                raise FFmpegError(
+                    f"Decoder exited with status {returncode}", stderr.read().decode(errors="replace")
+                )
+
+        outcomes = {}
+        for _ in workers:
+            try:
+                index, value, error = results.get(timeout=stall_timeout)
+            except queue.Empty as e:
+                raise FrameRingError("Consumers did not report a result") from e
+            outcomes[index] = (value, error)
+        for worker in workers:
+            worker.join()
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        ring.close()
+
+    increment("frame_ring_frames", frames)
+    for index, (_, error) in sorted(outcomes.items()):
+        if error is not None:
+            raise FrameRingError(f"Consumer {index} failed: {error}")
+    logger.debug(f"Fanned {frames} frames out to {len(workers)} consumers.")
+    return [outcomes[i][0] for i in range(len(workers))]
+
+
+async def analyze_section(
+    path: str,
+    start: float,
+    duration: float,
+    width: int,
+    height: int,
+    fps: float,
+    consumers: Sequence[Callable[[FrameReader], Any]],
+    pixel_format: str = "rgb24",
+    slots: int = DEFAULT_SLOTS,
+) -> List[Any]:
+    """
+    Decode a section once at analysis size and run every consumer on it.
+
+    Args:
+        path (str): Source media.
+        start (float): Section start in seconds.
+        duration (float): Section length in seconds.
+        width (int): Analysis width.
+        height (int): Analysis height.
+        fps (float): Frame rate to sample at.
+        consumers (Sequence[Callable[[FrameReader], Any]]): Analysers to run.
+        pixel_format (str): "rgb24" or "gray" (default: "rgb24").
+        slots (int): Ring size in frames (default: 16).
+
+    Returns:
+        List[Any]: Each consumer's result, in order.
+
+    Raises:
+        FFmpegError: If decoding fails.
+        FrameRingError: If a consumer fails.
+    """
+    args = build_raw_frames_command(path, start, duration, width, height, fps, pixel_format)
+    return await asyncio.to_thread(fan_out, args, width, height, CHANNELS[pixel_format], consumers, slots)
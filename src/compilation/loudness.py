@@ -0,0 +1,248 @@
+"""
+Measure-once loudness normalization.
+
+Two-pass ``loudnorm`` decodes every input twice on every render, although
+clips re-rendered after ``/skip``, narration and library music do not change
+between renders. Each asset is measured once, the stats are kept in the
+``asset_loudness`` table (music keeps them in its library index), and
+renders apply ``loudnorm`` in linear mode with the stored values, a single
+pass that only scales the gain.
+"""
+import asyncio
+import json
+import os
+import re
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+from src.compilation.ffmpeg_wrapper import FFmpegError, build_loudness_analysis_command, run_ffmpeg
+from src.config import AudioConfig
+from src.database import get_asset_loudness, get_session, save_asset_loudness
+from src.utils.logging import get_logger
+from src.utils.metrics import increment
+
+logger = get_logger(__name__)
+
+_DURATION = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+class LoudnessStats(NamedTuple):
+    """loudnorm measurement of one asset."""
+    integrated_lufs: float
+    loudness_range: float
+    true_peak: float
+    threshold: float
+    target_offset: float
+    target_lufs: float
+
+
+def parse_loudnorm_output(stderr: str, target_lufs: float) -> LoudnessStats:
+    """
+    Read the JSON summary loudnorm prints at the end of a measurement pass.
+
+    Args:
+        stderr (str): ffmpeg's stderr.
+        target_lufs (float): Target the pass was run with.
+
+    Returns:
+        LoudnessStats: The measurement.
+
+    Raises:
+        ValueError: If no summary is found (e.g., the input has no audio).
+    """
+    end = stderr.rfind("}")
+    start = stderr.rfind("{", 0, end)
+    if start == -1 or end == -1:
+        raise ValueError("No loudnorm summary in ffmpeg output")
+    data = json.loads(stderr[start:end + 1])
+    # Silent input reports "-inf"; float() accepts it.
+    return LoudnessStats(
+        integrated_lufs=float(data["input_i"]),
+        loudness_range=float(data["input_lra"]),
+        true_peak=float(data["input_tp"]),
+        threshold=float(data["input_thresh"]),
+        target_offset=float(data["target_offset"]),
+        target_lufs=target_lufs,
+    )
+
+
+def parse_duration(stderr: str) -> Optional[float]:
+    """Input duration from ffmpeg's stream summary, if printed."""
+    match = _DURATION.search(stderr)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def measure_loudness(path: str, config: AudioConfig, target_lufs: float) -> Tuple[LoudnessStats, Optional[float]]:
+    """
+    Run one loudnorm measurement pass.
+
+    Args:
+        path (str): Media to measure.
+        config (AudioConfig): Loudness range and true-peak targets.
+        target_lufs (float): Integrated loudness target.
+
+    Returns:
+        Tuple[LoudnessStats, Optional[float]]: The stats and the input duration.
+
+    Raises:
+        FFmpegError: If ffmpeg fails or prints no summary.
+    """
+    result = run_ffmpeg(build_loudness_analysis_command(
+        path, target_lufs, config.loudness_range, config.loudness_true_peak,
+    ))
+    try:
+        stats = parse_loudnorm_output(result.stderr, target_lufs)
+    except (ValueError, KeyError) as e:
+        raise FFmpegError(f"Could not measure loudness of {path}: {e}", result.stderr) from e
+    increment("loudness_measurements")
+    return stats, parse_duration(result.stderr)
+
+
+def loudnorm_filter(stats: Optional[LoudnessStats], target_lufs: float, config: AudioConfig) -> str:
+    """
+    ``loudnorm`` filter for a render.
+
+    With stats this is the linear, single-pass form; without, loudnorm falls
+    back to its one-pass dynamic mode.
+
+    Args:
+        stats (Optional[LoudnessStats]): Stored measurement of the input.
+        target_lufs (float): Integrated loudness target.
+        config (AudioConfig): Loudness range and true-peak targets.
+
+    Returns:
+        str: The filter.
+    """
+    base = f"loudnorm=I={target_lufs}:LRA={config.loudness_range}:TP={config.loudness_true_peak}"
+    if stats is None or stats.integrated_lufs == float("-inf"):
+        return base
+    # target_offset is relative to the target it was measured for.
+    offset = stats.target_offset if stats.target_lufs == target_lufs else 0.0
+    return (
+        f"{base}:measured_I={stats.integrated_lufs}:measured_LRA={stats.loudness_range}"
+        f":measured_TP={stats.true_peak}:measured_thresh={stats.threshold}"
+        f":offset={offset}:linear=true:print_format=none"
+    )
+
+
+def asset_key(path: str) -> str:
+    """
+    Identity of an asset's current contents: absolute path, size and mtime.
+
+    A file rewritten in place gets a new key, so stale stats are never used.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class LoudnessCatalog:
+    """Loudness stats per asset: memory, then the database, then one measurement."""
+
+    def __init__(
+        self,
+        config: AudioConfig,
+        engine: Optional[Engine] = None,
+        measure: Callable[[str, AudioConfig, float], Tuple[LoudnessStats, Optional[float]]] = measure_loudness,
+    ):
+        self.config = config
+        self.engine = engine
+        self._measure = measure
+        self._cache: Dict[str, LoudnessStats] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def targets(self) -> Dict[str, float]:
+        """Integrated loudness target per asset kind."""
+        return {
+            "clip": self.config.clip_audio_lufs,
+            "narration": self.config.narration_lufs,
+            "music": self.config.background_music_lufs,
+        }
+
+    def _load(self, key: str) -> Optional[LoudnessStats]:
+        if self.engine is None:
+            return None
+        session = get_session(self.engine)
+        try:
+            row = get_asset_loudness(session, key)
+            if row is None:
+                return None
+            return LoudnessStats(*(getattr(row, field) for field in LoudnessStats._fields))
+        finally:
+            session.close()
+
+    def _save(self, key: str, path: str, stats: LoudnessStats) -> None:
+        if self.engine is None:
+            return
+        session = get_session(self.engine)
+        try:
+            save_asset_loudness(session, key, path, stats._asdict())
+        finally:
+            session.close()
+
+    async def stats(self, path: str, target_lufs: float) -> LoudnessStats:
+        """
+        Loudness of an asset, measured at most once per content version.
+
+        Concurrent requests for the same asset share one measurement.
+
+        Args:
+            path (str): Media file.
+            target_lufs (float): Target for a new measurement.
+
+        Returns:
+            LoudnessStats: The stats.
+
+        Raises:
+            FFmpegError: If the asset has to be measured and ffmpeg fails.
+        """
+        key = asset_key(path)
+        cached = self._cache.get(key)
+        if cached is not None:
+            increment("loudness_cache_hits")
+            return cached
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._resolve(key, path, target_lufs))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _resolve(self, key: str, path: str, target_lufs: float) -> LoudnessStats:
+        stats = await asyncio.to_thread(self._load, key)
+        if stats is None:
+            stats, _ = await asyncio.to_thread(self._measure, path, self.config, target_lufs)
+            await asyncio.to_thread(self._save, key, path, stats)
+        else:
+            increment("loudness_cache_hits")
+        self._cache[key] = stats
+        return stats
+
+    async def filter_for(self, path: str, kind: str) -> str:
+        """
+        Single-pass ``loudnorm`` filter for an asset.
+
+        Args:
+            path (str): Media file.
+            kind (str): "clip", "narration" or "music".
+
+        Returns:
+            str: The filter.
+
+        Raises:
+            KeyError: If ``kind`` is unknown.
+        """
+        target = self.targets[kind]
+        try:
+            stats: Optional[LoudnessStats] = await self.stats(path, target)
+        except FFmpegError as e:
+            logger.warning(f"Using dynamic loudnorm for {path}: {e}")
+            stats = None
+        return loudnorm_filter(stats, target, self.config)
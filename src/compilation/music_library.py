@@ -0,0 +1,174 @@
+"""
+Background music library index (SPEC §4.6).
+
+Tracks live in ``music_dir/<mood>/``. The index, a JSON file next to them,
+records each track's mood, duration and loudness so that renders pick music
+and normalize it without decoding the file first. Indexing measures tracks
+in parallel and skips those whose size and mtime are unchanged.
+"""
+import asyncio
+import json
+import os
+import random
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.compilation.loudness import LoudnessStats, loudnorm_filter, measure_loudness
+from src.config import AudioConfig
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".aac", ".wav", ".flac", ".ogg", ".opus")
+INDEX_VERSION = 1
+
+
+class MusicTrack(NamedTuple):
+    """One indexed track; ``path`` is relative to the music directory."""
+    path: str
+    mood: str
+    duration: Optional[float]
+    size: int
+    mtime_ns: int
+    loudness: LoudnessStats
+
+
+class MusicLibrary:
+    """Mood-tagged music tracks with stored loudness."""
+
+    def __init__(
+        self,
+        config: AudioConfig,
+        measure: Callable[[str, AudioConfig, float], Tuple[LoudnessStats, Optional[float]]] = measure_loudness,
+    ):
+        self.config = config
+        self.music_dir = config.music_dir
+        self.index_path = config.music_index_path
+        self._measure = measure
+        self._tracks: Dict[str, MusicTrack] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Read the index file, if there is one."""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                logger.info(f"Music index {self.index_path} has an old format; it will be rebuilt.")
+                return
+            self._tracks = {
+                row["path"]: MusicTrack(
+                    row["path"], row["mood"], row["duration"], row["size"], row["mtime_ns"],
+                    LoudnessStats(**row["loudness"]),
+                )
+                for row in data["tracks"]
+            }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable music index {self.index_path}: {e}")
+
+    def save(self) -> None:
+        """Write the index atomically."""
+        rows = [
+            {**track._asdict(), "loudness": track.loudness._asdict()}
+            for track in sorted(self._tracks.values(), key=lambda t: t.path)
+        ]
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": INDEX_VERSION, "tracks": rows}, f, indent=1)
+        os.replace(tmp, self.index_path)
+
+    def _scan(self) -> Dict[str, Tuple[str, os.stat_result]]:
+        found = {}
+        for mood in sorted(os.listdir(self.music_dir)) if os.path.isdir(self.music_dir) else []:
+            mood_dir = os.path.join(self.music_dir, mood)
+            if not os.path.isdir(mood_dir):
+                continue
+            for name in sorted(os.listdir(mood_dir)):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    rel = f"{mood}/{name}"
+                    found[rel] = (mood, os.stat(os.path.join(mood_dir, name)))
+        return found
+
+    async def refresh(self, workers: Optional[int] = None, force: bool = False) -> Tuple[int, int, int]:
+        """
+        Bring the index in line with the files on disk.
+
+        New or changed tracks are measured, at most ``workers`` at a time;
+        each measurement is an ffmpeg process, so they run truly in parallel.
+
+        Args:
+            workers (Optional[int]): Concurrent measurements (default: ``loudness_workers``).
+            force (bool): Re-measure every track.
+
+        Returns:
+            Tuple[int, int, int]: Tracks measured, removed and failed.
+        """
+        found = self._scan()
+        removed = [path for path in self._tracks if path not in found]
+        for path in removed:
+            del self._tracks[path]
+        pending = [
+            (path, mood, st) for path, (mood, st) in found.items()
+            if force or path not in self._tracks
+            or (self._tracks[path].size, self._tracks[path].mtime_ns) != (st.st_size, st.st_mtime_ns)
+        ]
+        slots = asyncio.Semaphore(workers or self.config.loudness_workers)
+        target = self.config.background_music_lufs
+
+        async def index(path: str, mood: str, st: os.stat_result) -> bool:
+            async with slots:
+                try:
+                    stats, duration = await asyncio.to_thread(
+                        self._measure, os.path.join(self.music_dir, path), self.config, target,
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not index {path}: {e}")
+                    return False
+            self._tracks[path] = MusicTrack(path, mood, duration, st.st_size, st.st_mtime_ns, stats)
+            return True
+
+        results = await asyncio.gather(*(index(*item) for item in pending))
+        measured = sum(results)
+        if measured or removed:
+            self.save()
+        logger.info(f"Music index: {measured} measured, {len(removed)} removed, {len(self._tracks)} tracks.")
+        return measured, len(removed), len(results) - measured
+
+    def tracks(self, mood: Optional[str] = None) -> List[MusicTrack]:
+        """Indexed tracks, optionally of one mood."""
+        return [t for t in self._tracks.values() if mood is None or t.mood == mood]
+
+    def moods(self) -> List[str]:
+        """Moods with at least one track."""
+        return sorted({t.mood for t in self._tracks.values()})
+
+    def pick(self, mood: str, min_duration: float = 0.0, exclude: Iterable[str] = (),
+             rng: Optional[random.Random] = None) -> Optional[MusicTrack]:
+        """
+        A random track of a mood, preferring ones long enough to avoid looping.
+
+        Args:
+            mood (str): Mood directory name.
+            min_duration (float): Preferred minimum length in seconds.
+            exclude (Iterable[str]): Track paths to avoid (e.g., used last cycle).
+            rng (Optional[random.Random]): Random source (default: module random).
+
+        Returns:
+            Optional[MusicTrack]: A track, or None if the mood has none.
+        """
+        excluded = set(exclude)
+        candidates = [t for t in self.tracks(mood) if t.path not in excluded] or self.tracks(mood)
+        if not candidates:
+            return None
+        long_enough = [t for t in candidates if (t.duration or 0.0) >= min_duration]
+        return (rng or random).choice(long_enough or candidates)
+
+    def absolute_path(self, track: MusicTrack) -> str:
+        """Path of a track on disk."""
+        return os.path.join(self.music_dir, track.path)
+
+    def filter_for(self, track: MusicTrack) -> str:
+        """Single-pass ``loudnorm`` filter for a track from its indexed stats."""
+        return loudnorm_filter(track.loudness, self.config.background_music_lufs, self.config)
@@ -0,0 +1,390 @@
+"""
+Motion-driven crop planning for vertical Shorts (SPEC §4.9).
+
+Planning never touches full-resolution pixels in Python. ffmpeg decodes the
+section once into a small grayscale rawvideo pipe; NumPy turns frame
+differences into per-column saliency, picks the best crop window per frame
+with a prefix sum, and smooths the resulting path. The path is reduced to a
+few keyframes and emitted as a piecewise-linear ``crop`` x expression, so a
+single ffmpeg pass applies it at full resolution.
+"""
+import asyncio
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.compilation.ffmpeg_wrapper import (
+    build_raw_frames_command,
+    build_vertical_crop_command,
+    get_media_info,
+    run_ffmpeg_async,
+    run_ffmpeg_pipe,
+)
+from src.compilation.frame_ring import Frame
+from src.config import VideoConfig
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
+
+logger = get_logger(__name__)
+
+# Weight of static detail (horizontal gradients) relative to motion.
+DETAIL_WEIGHT = 0.15
+# Share of the window score given to staying near the frame centre.
+CENTER_BIAS = 0.1
+# Frames whose motion is below this share of the section mean keep the previous target.
+QUIET_MOTION_RATIO = 0.2
+# Luma weights (BT.601) for analysing RGB frames.
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+# Allowed deviation between the smoothed path and its keyframed version, in source pixels.
+KEYFRAME_TOLERANCE_PX = 4.0
+
+
+class CropPlan(NamedTuple):
+    """A crop window of fixed size whose left edge moves along keyframes."""
+    crop_width: int
+    crop_height: int
+    times: np.ndarray
+    x: np.ndarray
+
+    def x_at(self, t) -> np.ndarray:
+        """Left edge of the crop at time(s) ``t``, as the expression evaluates it."""
+        return np.interp(t, self.times, self.x)
+
+    def expression(self) -> str:
+        """Piecewise-linear x expression over ffmpeg's per-frame ``t``."""
+        return _segment_expression(self.times, self.x, 0, len(self.times) - 1)
+
+    def filter(self) -> str:
+        """The ``crop`` filter applying this plan."""
+        return f"crop=w={self.crop_width}:h={self.crop_height}:x='{self.expression()}':y=0"
+
+
+def _segment_expression(times: np.ndarray, x: np.ndarray, lo: int, hi: int) -> str:
+    # Balanced if() tree: nesting depth grows with log2 of the keyframe count.
+    if lo == hi:
+        return f"{x[lo]:.1f}"
+    if hi - lo == 1:
+        t0, t1, x0, x1 = times[lo], times[hi], x[lo], x[hi]
+        if abs(x1 - x0) < 0.05:
+            return f"{x0:.1f}"
+        slope = (x1 - x0) / (t1 - t0)
+        return f"{x0:.1f}+{slope:.4f}*(clip(t,{t0:.3f},{t1:.3f})-{t0:.3f})"
+    mid = (lo + hi) // 2
+    left = _segment_expression(times, x, lo, mid)
+    right = _segment_expression(times, x, mid, hi)
+    return f"if(lt(t,{times[mid]:.3f}),{left},{right})"
+
+
+def crop_width_for(source_width: int, source_height: int, resolution: str) -> int:
+    """
+    Width of a full-height crop with the output's aspect ratio.
+
+    Args:
+        source_width (int): Source width in pixels.
+        source_height (int): Source height in pixels.
+        resolution (str): Output resolution as ``WIDTHxHEIGHT``.
+
+    Returns:
+        int: Even crop width, at most the source width.
+
+    Raises:
+        ValueError: If the resolution string is malformed.
+    """
+    width, sep, height = resolution.partition("x")
+    if not sep or not width.isdigit() or not height.isdigit():
+        raise ValueError(f"Invalid resolution: {resolution}")
+    crop = int(round(source_height * int(width) / int(height) / 2)) * 2
+    return min(crop, source_width - source_width % 2)
+
+
+def column_saliency(frames: np.ndarray) -> np.ndarray:
+    """
+    Per-column saliency of each analysis frame.
+
+    Motion is the absolute difference to the previous frame; a small share
+    of horizontal gradient keeps static subjects from being ignored.
+
+    Args:
+        frames (np.ndarray): Grayscale frames, shape (n, height, width), uint8.
+
+    Returns:
+        np.ndarray: Saliency, shape (n, width), float32.
+    """
+    signed = frames.astype(np.int16)
+    motion = np.abs(np.diff(signed, axis=0)).sum(axis=1, dtype=np.float32)
+    motion = np.concatenate([motion[:1], motion]) if len(motion) else np.zeros(frames.shape[::2], np.float32)
+    detail = np.abs(np.diff(signed, axis=2)).sum(axis=1, dtype=np.float32)
+    return _combine_saliency(motion, np.pad(detail, ((0, 0), (0, 1)), mode="edge"))
+
+
+def _combine_saliency(motion: np.ndarray, detail: np.ndarray) -> np.ndarray:
+    scale = motion.mean() / max(float(detail.mean()), 1e-6)
+    return motion + DETAIL_WEIGHT * scale * detail
+
+
+def stream_saliency(frames: Iterable[Frame]) -> np.ndarray:
+    """
+    ``column_saliency`` over a stream of frames, holding one frame at a time.
+
+    Works as a ``frame_ring`` consumer: RGB frames are reduced to luma, and
+    only one column row per frame is kept.
+
+    Args:
+        frames (Iterable[Frame]): Grayscale (h, w) or RGB (h, w, 3) frames in order.
+
+    Returns:
+        np.ndarray: Saliency, shape (n, width), float32.
+    """
+    motion, detail = [], []
+    previous = None
+    for frame in frames:
+        pixels = frame.pixels
+        luma = pixels.astype(np.float32) if pixels.ndim == 2 else pixels @ _LUMA
+        detail.append(np.abs(np.diff(luma, axis=1)).sum(axis=0, dtype=np.float32))
+        if previous is not None:
+            motion.append(np.abs(luma - previous).sum(axis=0, dtype=np.float32))
+        previous = luma
+    if not detail:
+        return np.zeros((0, 0), np.float32)
+    motion_rows = np.array(motion[:1] + motion if motion else [np.zeros_like(detail[0])])
+    detail_rows = np.pad(np.array(detail), ((0, 0), (0, 1)), mode="edge")
+    return _combine_saliency(motion_rows, detail_rows)
+
+
+def window_centers(saliency: np.ndarray, window: int) -> np.ndarray:
+    """
+    Centre of the highest-saliency window of ``window`` columns per frame.
+
+    Frames with little motion get NaN so the previous target is held.
+
+    Args:
+        saliency (np.ndarray): Per-column saliency, shape (n, width).
+        window (int): Crop width in analysis columns.
+
+    Returns:
+        np.ndarray: Window centres in analysis columns, shape (n,).
+    """
+    n, width = saliency.shape
+    window = min(max(window, 1), width)
+    sums = np.concatenate([np.zeros((n, 1), np.float64), np.cumsum(saliency, axis=1, dtype=np.float64)], axis=1)
+    scores = sums[:, window:] - sums[:, :-window]
+    centers = np.arange(scores.shape[1]) + window / 2.0
+    prior = 1.0 - np.abs(centers - width / 2.0) / (width / 2.0)
+    totals = scores.max(axis=1, keepdims=True)
+    scores = scores + CENTER_BIAS * totals * prior
+    best = centers[np.argmax(scores, axis=1)]
+    energy = saliency.sum(axis=1)
+    best[energy < QUIET_MOTION_RATIO * max(float(energy.mean()), 1e-6)] = np.nan
+    return best
+
+
+def smooth_path(centers: np.ndarray, fps: float, smoothing_seconds: float, max_step: float,
+                default: float) -> np.ndarray:
+    """
+    Turn per-frame targets into a steady camera path.
+
+    Held (NaN) targets are interpolated, a moving average removes jitter
+    and each step is clamped to ``max_step`` so pans stay slow.
+
+    Args:
+        centers (np.ndarray): Target centres, NaN where held.
+        fps (float): Analysis frame rate.
+        smoothing_seconds (float): Moving-average window.
+        max_step (float): Largest move between consecutive samples.
+        default (float): Centre to use if no frame has a target.
+
+    Returns:
+        np.ndarray: Smoothed centres, same shape as ``centers``.
+    """
+    valid = ~np.isnan(centers)
+    if not valid.any():
+        return np.full(len(centers), default)
+    index = np.arange(len(centers))
+    path = np.interp(index, index[valid], centers[valid])
+    taps = max(int(round(smoothing_seconds * fps)) | 1, 1)
+    if taps > 1 and len(path) > 1:
+        padded = np.pad(path, taps // 2, mode="edge")
+        path = np.convolve(padded, np.ones(taps) / taps, mode="valid")
+    steps = np.diff(path)
+    if np.abs(steps).max(initial=0.0) <= max_step:
+        return path
+    # Rate limiting depends on where the camera already is; this runs over a
+    # few hundred analysis samples, not over pixels.
+    limited = path.copy()
+    for i in range(1, len(limited)):
+        limited[i] = limited[i - 1] + min(max(path[i] - limited[i - 1], -max_step), max_step)
+    return limited
+
+
+def keyframes(times: np.ndarray, values: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Indices of samples whose linear interpolation stays within ``tolerance``.
+
+    Args:
+        times (np.ndarray): Sample times.
+        values (np.ndarray): Sample values.
+        tolerance (float): Largest allowed deviation.
+
+    Returns:
+        np.ndarray: Keyframe indices, always including the first and last.
+    """
+    n = len(values)
+    keep = [0]
+    start = 0
+    while start < n - 1:
+        end = start + 1
+        # Gallop forward, then back off to the last segment that fits.
+        step = 1
+        while end + step < n and _fits(times, values, start, end + step, tolerance):
+            end += step
+            step *= 2
+        while step > 1:
+            step //= 2
+            if end + step < n and _fits(times, values, start, end + step, tolerance):
+                end += step
+        keep.append(end)
+        start = end
+    return np.asarray(keep)
+
+
+def _fits(times: np.ndarray, values: np.ndarray, lo: int, hi: int, tolerance: float) -> bool:
+    line = np.interp(times[lo:hi + 1], (times[lo], times[hi]), (values[lo], values[hi]))
+    return bool(np.abs(line - values[lo:hi + 1]).max() <= tolerance)
+
+
+class SmartCropPlanner:
+    """Plans and renders motion-following vertical crops."""
+
+    def __init__(self, config: VideoConfig):
+        self.config = config
+
+    def analysis_size(self, source_width: int, source_height: int) -> Tuple[int, int]:
+        """Analysis frame size: ``smart_crop_analysis_width`` wide, source aspect, even."""
+        width = min(self.config.smart_crop_analysis_width, source_width)
+        height = max(2, int(round(width * source_height / source_width / 2)) * 2)
+        return width, height
+
+    async def read_frames(self, path: str, start: float, duration: float, width: int, height: int) -> np.ndarray:
+        """
+        Decode a section into low-resolution grayscale frames through one pipe.
+
+        Args:
+            path (str): Source media.
+            start (float): Section start in seconds.
+            duration (float): Section length in seconds.
+            width (int): Analysis width.
+            height (int): Analysis height.
+
+        Returns:
+            np.ndarray: Frames, shape (n, height, width), uint8.
+
+        Raises:
+            FFmpegError: If ffmpeg fails.
+        """
+        raw = await run_ffmpeg_pipe(build_raw_frames_command(
+            path, start, duration, width, height, self.config.smart_crop_analysis_fps,
+        ))
+        frame_bytes = width * height
+        count = len(raw) // frame_bytes
+        return np.frombuffer(raw, dtype=np.uint8, count=count * frame_bytes).reshape(count, height, width)
+
+    def plan_frames(self, frames: np.ndarray, source_width: int, source_height: int) -> CropPlan:
+        """
+        Plan a crop path from analysis frames.
+
+        Args:
+            frames (np.ndarray): Grayscale analysis frames, shape (n, h, w).
+            source_width (int): Source width in pixels.
+            source_height (int): Source height in pixels.
+
+        Returns:
+            CropPlan: The keyframed crop path in source pixels.
+        """
+        if len(frames) < 2:
+            return self.plan_saliency(np.zeros((len(frames), 1), np.float32), source_width, source_height)
+        return self.plan_saliency(column_saliency(frames), source_width, source_height)
+
+    def plan_saliency(self, saliency: np.ndarray, source_width: int, source_height: int) -> CropPlan:
+        """
+        Plan a crop path from per-column saliency.
+
+        This is the part of ``plan_frames`` after the pixels, for saliency
+        computed elsewhere (e.g., by ``stream_saliency`` on a frame ring).
+
+        Args:
+            saliency (np.ndarray): Saliency, shape (n, analysis width).
+            source_width (int): Source width in pixels.
+            source_height (int): Source height in pixels.
+
+        Returns:
+            CropPlan: The keyframed crop path in source pixels.
+        """
+        crop_width = crop_width_for(source_width, source_height, self.config.shorts_resolution)
+        max_x = float(source_width - crop_width)
+        fps = self.config.smart_crop_analysis_fps
+        if len(saliency) < 2 or max_x <= 0:
+            return CropPlan(crop_width, source_height, np.zeros(1), np.array([max_x / 2]))
+
+        analysis_width = saliency.shape[1]
+        ratio = source_width / analysis_width
+        window = int(round(crop_width / ratio))
+        centers = window_centers(saliency, window)
+        max_step = self.config.smart_crop_max_pan_per_second * analysis_width / fps
+        path = smooth_path(centers, fps, self.config.smart_crop_smoothing_seconds, max_step, analysis_width / 2)
+        x = np.clip(path * ratio - crop_width / 2, 0.0, max_x)
+        times = np.arange(len(x)) / fps
+        keep = keyframes(times, x, KEYFRAME_TOLERANCE_PX)
+        increment("smart_crop_keyframes", len(keep))
+        return CropPlan(crop_width, source_height, times[keep], x[keep])
+
+    @timed("smart_crop_plan")
+    async def plan(self, path: str, start: float, duration: float,
+                   media_info: Optional[Dict[str, object]] = None) -> CropPlan:
+        """
+        Plan a crop path for one section of a source.
+
+        Args:
+            path (str): Source media.
+            start (float): Section start in seconds.
+            duration (float): Section length in seconds.
+            media_info (Optional[Dict[str, object]]): Cached ffprobe result, if known.
+
+        Returns:
+            CropPlan: The keyframed crop path.
+
+        Raises:
+            FFmpegError: If decoding fails.
+        """
+        info = media_info or await asyncio.to_thread(get_media_info, path)
+        source_width, source_height = int(info["width"]), int(info["height"])
+        width, height = self.analysis_size(source_width, source_height)
+        frames = await self.read_frames(path, start, duration, width, height)
+        return self.plan_frames(frames, source_width, source_height)
+
+    async def render(self, path: str, output_path: str, start: float, duration: float,
+                     media_info: Optional[Dict[str, object]] = None) -> CropPlan:
+        """
+        Plan a crop and write the vertical clip in one full-resolution pass.
+
+        Args:
+            path (str): Source media.
+            output_path (str): Vertical output file.
+            start (float): Section start in seconds.
+            duration (float): Section length in seconds.
+            media_info (Optional[Dict[str, object]]): Cached ffprobe result, if known.
+
+        Returns:
+            CropPlan: The plan that was applied.
+
+        Raises:
+            FFmpegError: If planning or rendering fails.
+        """
+        plan = await self.plan(path, start, duration, media_info)
+        c = self.config
+        args = build_vertical_crop_command(
+            path, output_path, start, duration, plan.filter(), c.shorts_resolution, c.fps,
+            c.codec, c.crf, c.preset, c.pixel_format, c.audio_codec, c.audio_bitrate,
+        )
+        await run_ffmpeg_async(args)
+        logger.info(f"Rendered vertical clip {output_path} with {len(plan.times)} crop keyframes.")
+        return plan
@@ -1,24 +1,42 @@
-from typing import Any, Dict, List, Optional, Union
-from pydantic import BaseModel, ValidationError, Field, model_validator
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pydantic import BaseModel, ConfigDict, ValidationError, Field, model_validator
 import yaml
+import hashlib
 import os
 import re
+import threading
 import logging
 
 logger = logging.getLogger("config")
 logging.basicConfig(level=logging.INFO)
 
+# libyaml's C loader is several times faster than the pure-Python one.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_ENV_VAR_PATTERN = re.compile(r"\$\{(\w+)\}")
 
-class GeneralConfig(BaseModel):
+
+class _ConfigModel(BaseModel):
+    """Frozen base for config sections: ``load_config`` hands every caller the same instance."""
+
+    model_config = ConfigDict(frozen=True)
+
+
+class GeneralConfig(_ConfigModel):
     project_name: str = "Last SiX Hours"
     log_level: str = "INFO"
     log_dir: str = "logs"
     working_dir: str = "working"
     archive_dir: str = "archive"
     timezone: str = "UTC"
+    log_async: bool = True
+    log_queue_size: int = 10000
+    log_overflow: str = "drop"
+    log_per_module_files: bool = True
+    metrics_file: str = "logs/metrics.jsonl"
+    metrics_export_interval_seconds: float = 300.0
 
 
-class LLMProviderConfig(BaseModel):
+class LLMProviderConfig(_ConfigModel):
     name: str
     base_url: str
     api_key: str = ""
@@ -27,14 +45,24 @@ class LLMProviderConfig(BaseModel):
     temperature: float = 0.7
     timeout_seconds: int = 120
     max_retries: int = 3
+    context_window: int = 32768
 
 
-class LLMConfig(BaseModel):
+class LLMConfig(_ConfigModel):
     primary: LLMProviderConfig
     fallback: Optional[LLMProviderConfig] = None
-
-
-class VoiceConfig(BaseModel):
+    prompt_dir: str = "config/prompts"
+    batch_max_items: int = 40
+    batch_concurrency: int = 2
+    hedge_requests: bool = True
+    hedge_min_samples: int = 20
+    hedge_min_delay_seconds: float = 2.0
+    latency_window: int = 200
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 60.0
+
+
+class VoiceConfig(_ConfigModel):
     name: str
     engine: str
     reference_audio: str = ""
@@ -42,14 +70,14 @@ class VoiceConfig(BaseModel):
     speed: float = 1.0
 
 
-class TTSEngineConfig(BaseModel):
+class TTSEngineConfig(_ConfigModel):
     name: str
     model_path: str
     device: str = "cuda:0"
     sample_rate: int = 22050
 
 
-class TTSConfig(BaseModel):
+class TTSConfig(_ConfigModel):
     primary_engine: str
     fallback_engine: str = "piper"
     engines: List[TTSEngineConfig]
@@ -57,7 +85,7 @@ class TTSConfig(BaseModel):
     voices: List[VoiceConfig]
 
 
-class AudioConfig(BaseModel):
+class AudioConfig(_ConfigModel):
     narration_lufs: float = -16.0
     clip_audio_lufs: float = -26.0
     background_music_lufs: float = -32.0
@@ -67,9 +95,14 @@ class AudioConfig(BaseModel):
     music_fade_sec: float = 3.0
     output_sample_rate: int = 48000
     output_channels: int = 2
+    loudness_range: float = 11.0
+    loudness_true_peak: float = -1.5
+    music_dir: str = "assets/music"
+    music_index_path: str = "assets/music/index.json"
+    loudness_workers: int = 4
 
 
-class VideoConfig(BaseModel):
+class VideoConfig(_ConfigModel):
     target_duration_min: int = 480
     target_duration_max: int = 600
     target_clips: int = 10
@@ -86,20 +119,56 @@ class VideoConfig(BaseModel):
     transition_duration: float = 0.5
     fade_duration: float = 0.5
     max_source_duration_seconds: int = 3600
+    source_format: str = "bestvideo[height<=1080]+bestaudio/best[height<=1080]"
+    section_download: bool = True
+    section_padding_seconds: float = 5.0
+    probe_audio_format: str = "worstaudio[abr>=48]/worstaudio"
+    downloads_per_run: int = 3
     clip_extraction_methods_priority: List[str] = ["most_replayed", "transcript", "audio_energy", "scene_detection"]
+    transcript_window_seconds: int = 90
+    transcript_top_windows: int = 4
+    transcript_token_budget_ratio: float = 0.5
+    most_replayed_cache_ttl_hours: float = 6.0
+    most_replayed_concurrency: int = 8
     shorts_count_per_video: int = 2
     shorts_duration_min: int = 30
     shorts_duration_max: int = 60
-
-
-class DiscoveryConfig(BaseModel):
+    shorts_resolution: str = "1080x1920"
+    smart_crop_analysis_width: int = 160
+    smart_crop_analysis_fps: float = 5.0
+    smart_crop_smoothing_seconds: float = 1.5
+    smart_crop_max_pan_per_second: float = 0.15
+    proxy_height: int = 480
+    proxy_video_bitrate: str = "400k"
+    proxy_audio_bitrate: str = "64k"
+    teaser_duration_sec: int = 30
+
+
+SCORING_WEIGHT_KEYS = [
+    "scoring_weight_view_velocity",
+    "scoring_weight_reddit",
+    "scoring_weight_like_ratio",
+    "scoring_weight_comment_velocity",
+    "scoring_weight_recency",
+]
+
+
+class DiscoveryConfig(_ConfigModel):
     lookback_hours: int = 6
     max_candidates_per_niche: int = 30
     min_views: int = 10000
     min_viral_score: float = 0.4
     youtube_daily_quota_limit: int = 10000
+    youtube_api_key: str = ""
+    youtube_regions: List[str] = Field(default_factory=lambda: ["US"])
+    youtube_requests_per_second: float = 10.0
+    shared_cache_ttl_minutes: int = 30
     reddit_subreddits: Dict[str, List[str]]
     reddit_min_score: int = 100
+    reddit_requests_per_minute: int = 60
+    reddit_listing_pages: int = 2
+    reddit_user_agent: str = "viral-channel-discovery/1.0"
+    niche_keywords: Dict[str, List[str]] = Field(default_factory=dict)
     scoring_weight_view_velocity: float = 0.30
     scoring_weight_reddit: float = 0.20
     scoring_weight_like_ratio: float = 0.15
@@ -107,23 +176,14 @@ class DiscoveryConfig(BaseModel):
     scoring_weight_recency: float = 0.20
 
     @model_validator(mode="after")
-    def validate_scoring_weights(cls, values: Dict[str, Any]) -> Dict[str, Any]:
-        total_weight = sum(
-            values.get(key, 0)
-            for key in [
-                "scoring_weight_view_velocity",
-                "scoring_weight_reddit",
-                "scoring_weight_like_ratio",
-                "scoring_weight_comment_velocity",
-                "scoring_weight_recency",
-            ]
-        )
+    def validate_scoring_weights(self) -> "DiscoveryConfig":
+        total_weight = sum(getattr(self, key) for key in SCORING_WEIGHT_KEYS)
         if not 0.99 <= total_weight <= 1.01:
             raise ValueError("Scoring weights must sum to approximately 1.0")
-        return values
+        return self
 
 
-class ChannelConfig(BaseModel):
+class ChannelConfig(_ConfigModel):
     name: str
     niche: str
     enabled: bool = True
@@ -136,30 +196,59 @@ class ChannelConfig(BaseModel):
     youtube_search_queries: List[str]
 
 
-class TelegramConfig(BaseModel):
+class TelegramConfig(_ConfigModel):
     bot_token: str
     authorized_user_ids: List[int]
     review_timeout_hours: int = 2
     reminder_after_hours: float = 1.0
     quiet_hours_start: int = 23
     quiet_hours_end: int = 7
+    max_upload_bytes: int = 50 * 1024 * 1024
+
+
+class ReviewServerConfig(_ConfigModel):
+    host: str = "0.0.0.0"
+    port: int = 8080
+    public_base_url: str = "http://localhost:8080"
+    secret_key: str = ""
+    link_ttl_hours: float = 6.0
+    metrics_enabled: bool = False
 
 
-class YouTubeUploadConfig(BaseModel):
+class YouTubeUploadConfig(_ConfigModel):
     chunk_size_bytes: int = 10485760
     max_retries: int = 3
     default_privacy: str = "private"
     default_language: str = "en"
 
 
-class SchedulerConfig(BaseModel):
+class SchedulerConfig(_ConfigModel):
     max_concurrent_pipelines: int = 2
     max_concurrent_downloads: int = 4
     max_concurrent_renders: int = 1
+    max_concurrent_tts: int = 1
     job_store_path: str = "data/scheduler_jobs.sqlite"
 
 
-class BrandingConfig(BaseModel):
+class StorageConfig(_ConfigModel):
+    min_free_gb: float = 50.0
+    reserve_headroom_gb: float = 10.0
+    archive_retention_days: int = 30
+    archive_throughput_mb_per_sec: float = 100.0
+    source_bitrate_mbps: float = 8.0
+    render_bitrate_mbps: float = 12.0
+    reservation_timeout_seconds: float = 1800.0
+    source_max_age_hours: float = 24.0
+
+
+class RetentionConfig(_ConfigModel):
+    archive_after_days: int = 30
+    maintenance_interval_hours: float = 24.0
+    vacuum_pages: int = 2000
+    analysis_limit: int = 1000
+
+
+class BrandingConfig(_ConfigModel):
     channel_display_name: str = "LAST SIX HOURS"
     font_path: str = "assets/fonts/default.ttf"
     title_font_size: int = 72
@@ -170,9 +259,12 @@ class BrandingConfig(BaseModel):
     background_color: str = "#000000"
     watermark_path: str = ""
     watermark_opacity: float = 0.3
+    thumbnail_variants: int = 3
+    thumbnail_analysis_width: int = 256
+    thumbnail_saturation_boost: float = 1.18
 
 
-class AppConfig(BaseModel):
+class AppConfig(_ConfigModel):
     general: GeneralConfig
     llm: LLMConfig
     tts: TTSConfig
@@ -181,41 +273,100 @@ class AppConfig(BaseModel):
     discovery: DiscoveryConfig
     channels: List[ChannelConfig]
     telegram: TelegramConfig
+    review_server: ReviewServerConfig = Field(default_factory=ReviewServerConfig)
     youtube_upload: YouTubeUploadConfig
     scheduler: SchedulerConfig
+    storage: StorageConfig = Field(default_factory=StorageConfig)
+    retention: RetentionConfig = Field(default_factory=RetentionConfig)
     branding: BrandingConfig
 
 
-def _substitute_env_vars(data: Union[Dict, List, str]) -> Union[Dict, List, str]:
+def _substitute_env_vars(
+    data: Union[Dict, List, str], referenced: Optional[Dict[str, Optional[str]]] = None
+) -> Union[Dict, List, str]:
     """
     Recursively substitute ${VAR_NAME} patterns in configuration values.
 
     Args:
         data (Union[Dict, List, str]): Configuration data.
+        referenced (Optional[Dict[str, Optional[str]]]): If given, filled with
+            every variable name seen and the value it was resolved to.
 
     Returns:
         Union[Dict, List, str]: Configuration data with substituted environment variables.
     """
     if isinstance(data, dict):
-        return {key: _substitute_env_vars(value) for key, value in data.items()}
+        return {key: _substitute_env_vars(value, referenced) for key, value in data.items()}
     elif isinstance(data, list):
-        return [_substitute_env_vars(item) for item in data]
+        return [_substitute_env_vars(item, referenced) for item in data]
     elif isinstance(data, str):
-        matches = re.findall(r"\$\{(\w+)\}", data)
-        for match in matches:
-            env_value = os.getenv(match)
+        if "${" not in data:
+            return data
+
+        def _replace(match: "re.Match[str]") -> str:
+            name = match.group(1)
+            env_value = os.getenv(name)
+            if referenced is not None:
+                referenced[name] = env_value
             if env_value is None:
-                logger.warning(f"Environment variable {match} is not set. Keeping placeholder.")
-            else:
-                data = data.replace(f"${{{match}}}", env_value)
-        return data
+                logger.warning(f"Environment variable {name} is not set. Keeping placeholder.")
+                return match.group(0)
+            return env_value
+
+        return _ENV_VAR_PATTERN.sub(_replace, data)
     return data
 
 
+class _CachedConfig:
+    """A validated config together with what it was derived from."""
+
+    __slots__ = ("stat_key", "digest", "env", "config")
+
+    def __init__(self, stat_key: Tuple[int, int], digest: str,
+                 env: Dict[str, Optional[str]], config: "AppConfig"):
+        self.stat_key = stat_key
+        self.digest = digest
+        self.env = env
+        self.config = config
+
+    def env_unchanged(self) -> bool:
+        return all(os.getenv(name) == value for name, value in self.env.items())
+
+
+_config_cache: Dict[str, _CachedConfig] = {}
+_config_cache_lock = threading.Lock()
+
+
+def _parse_config(raw: bytes) -> Tuple["AppConfig", Dict[str, Optional[str]]]:
+    """
+    Parse, substitute and validate raw YAML bytes.
+
+    Returns:
+        Tuple[AppConfig, Dict[str, Optional[str]]]: The config and the
+        environment variables it references.
+
+    Raises:
+        ValidationError: If the configuration data is invalid.
+    """
+    raw_config = yaml.load(raw, Loader=YAML_LOADER)
+    referenced: Dict[str, Optional[str]] = {}
+    substituted_config = _substitute_env_vars(raw_config, referenced)
+    try:
+        return AppConfig.model_validate(substituted_config), referenced
+    except ValidationError as e:
+        logger.error("Configuration validation failed", exc_info=e)
+        raise e
+
+
 def load_config(path: str = "config/config.yaml") -> AppConfig:
     """
     Load configuration from YAML file with environment variable substitution.
 
+    The validated config is cached per path. A call only re-reads the file if
+    its mtime or size changed, and only re-validates if the content hash or a
+    referenced environment variable changed. The result is shared between
+    callers, so the models are frozen; derive changes with ``model_copy``.
+
     Args:
         path (str): Path to the YAML configuration file.
 
@@ -229,12 +380,22 @@ def load_config(path: str = "config/config.yaml") -> AppConfig:
     if not os.path.exists(path):
         raise FileNotFoundError(f"Configuration file not found: {path}")
 
-    with open(path, "r", encoding="utf-8") as file:
-        raw_config = yaml.safe_load(file)
-
-    substituted_config = _substitute_env_vars(raw_config)
-    try:
-        return AppConfig.model_validate(substituted_config)
-    except ValidationError as e:
-        logger.error("Configuration validation failed", exc_info=e)
-        raise e
\ No newline at end of file
+    key = os.path.abspath(path)
+    st = os.stat(path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+    with _config_cache_lock:
+        cached = _config_cache.get(key)
+        if cached is not None and cached.stat_key == stat_key and cached.env_unchanged():
+            return cached.config
+
+        with open(path, "rb") as file:
+            raw = file.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached is not None and cached.digest == digest and cached.env_unchanged():
+            # Touched but not edited.
+            cached.stat_key = stat_key
+            return cached.config
+
+        config, referenced = _parse_config(raw)
+        _config_cache[key] = _CachedConfig(stat_key, digest, referenced, config)
+        return config
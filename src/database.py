@@ -1,11 +1,14 @@
 import os
+from functools import partial
 from sqlalchemy import (
-    create_engine, String, Integer, Float, Text, DateTime, ForeignKey, Index, Column
+    create_engine, select, insert, delete, event, func, literal_column, text, union_all,
+    String, Integer, Float, Text, DateTime, ForeignKey, Index, Column, MetaData, Table
 )
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, Session, sessionmaker
-from sqlalchemy.engine import Engine
-from datetime import datetime
-from typing import Optional, List
+from sqlalchemy.engine import Engine, Row
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, List, Set
 import logging
 
 # Configure logging
@@ -41,7 +44,10 @@ class DiscoveredVideo(Base):
 
     __table_args__ = (
         Index("idx_discovered_videos_niche", "niche", "discovered_at"),
-        Index("idx_discovered_videos_processed", "processed"),
+        # Partial indexes: the pending path and the retention scan only ever
+        # touch their own side of the processed flag.
+        Index("idx_discovered_videos_processed", "niche", "discovered_at", sqlite_where=text("processed = 0")),
+        Index("idx_discovered_videos_archivable", "discovered_at", sqlite_where=text("processed != 0")),
     )
 
 class PipelineRun(Base):
@@ -85,14 +91,108 @@ class Clip(Base):
         Index("idx_clips_pipeline", "pipeline_run_id"),
     )
 
+class ReviewLog(Base):
+    __tablename__ = "review_log"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    pipeline_run_id: Mapped[int] = mapped_column(ForeignKey("pipeline_runs.id"), nullable=False)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    responded_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    action: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    response_detail: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    auto_held: Mapped[int] = mapped_column(Integer, default=0)
+
+class ConfigOverride(Base):
+    __tablename__ = "config_overrides"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_by: Mapped[str] = mapped_column(String, default="system")
+
+class AssetLoudness(Base):
+    """Loudness measured once per media asset, reused by every later render."""
+    __tablename__ = "asset_loudness"
+
+    asset_key: Mapped[str] = mapped_column(String, primary_key=True)
+    path: Mapped[str] = mapped_column(String, nullable=False)
+    integrated_lufs: Mapped[float] = mapped_column(Float, nullable=False)
+    loudness_range: Mapped[float] = mapped_column(Float, nullable=False)
+    true_peak: Mapped[float] = mapped_column(Float, nullable=False)
+    threshold: Mapped[float] = mapped_column(Float, nullable=False)
+    target_offset: Mapped[float] = mapped_column(Float, nullable=False)
+    target_lufs: Mapped[float] = mapped_column(Float, nullable=False)
+    measured_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class PipelineStageTiming(Base):
+    """How long one stage of a pipeline run took, for capacity planning."""
+    __tablename__ = "pipeline_stage_timings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    pipeline_run_id: Mapped[int] = mapped_column(ForeignKey("pipeline_runs.id"), nullable=False)
+    stage: Mapped[str] = mapped_column(String, nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    duration_seconds: Mapped[float] = mapped_column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("idx_stage_timings_stage", "stage", "started_at"),
+    )
+
+class DiscoveryDailyStat(Base):
+    """Per-day discovery totals for rows moved to the archive database."""
+    __tablename__ = "discovery_daily_stats"
+
+    day: Mapped[str] = mapped_column(String, primary_key=True)
+    niche: Mapped[str] = mapped_column(String, primary_key=True)
+    discovery_source: Mapped[str] = mapped_column(String, primary_key=True)
+    processed: Mapped[int] = mapped_column(Integer, primary_key=True)
+    videos: Mapped[int] = mapped_column(Integer, nullable=False)
+    viral_score_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    view_velocity_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    view_count_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+    max_viral_score: Mapped[float] = mapped_column(Float, nullable=False)
+
+# Cold storage: processed discovery rows move to a second SQLite file that is
+# attached to every connection under this schema name.
+ARCHIVE_SCHEMA = "archive"
+archive_metadata = MetaData()
+ArchivedVideos: Table = DiscoveredVideo.__table__.to_metadata(archive_metadata, schema=ARCHIVE_SCHEMA)
+
 # Helper Functions
-def init_db(db_path: str) -> Engine:
+def archive_path_for(db_path: str) -> str:
+    """Default archive database location: next to the main database."""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.db'}"
+
+def _on_connect(archive_path: Optional[str], dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        # Takes effect for new database files; maintain_database() converts old ones.
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if archive_path:
+            cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_path,))
+            cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.auto_vacuum = INCREMENTAL")
+    finally:
+        cursor.close()
+
+def _drop_full_processed_index(engine: Engine) -> None:
+    # Databases created before the partial pending index have a full index
+    # under the same name, which create_all() would leave in place.
+    with engine.begin() as conn:
+        sql = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_discovered_videos_processed'"
+        )).scalar()
+        if sql and "WHERE" not in sql.upper():
+            conn.execute(text("DROP INDEX idx_discovered_videos_processed"))
+
+def init_db(db_path: str, archive_path: Optional[str] = None) -> Engine:
     """
     Create SQLAlchemy engine, create all tables and indexes.
     Returns the Engine instance.
 
     Args:
         db_path (str): Path to the SQLite database file.
+        archive_path (Optional[str]): Archive database to attach for retention, if any.
 
     Returns:
         Engine: SQLAlchemy Engine instance.
@@ -101,7 +201,14 @@ def init_db(db_path: str) -> Engine:
         if not db_path:
             raise ValueError("Database path cannot be empty.")
         engine = create_engine(f"sqlite:///{db_path}", echo=False, future=True)
+        event.listen(engine, "connect", partial(_on_connect, archive_path))
+        _drop_full_processed_index(engine)
         Base.metadata.create_all(engine)
+        # create_all() only adds indexes with new tables; add later ones to old databases.
+        for index in DiscoveredVideo.__table__.indexes:
+            index.create(engine, checkfirst=True)
+        if archive_path:
+            archive_metadata.create_all(engine)
         logger.info("Database initialized successfully.")
         return engine
     except Exception as e:
@@ -139,11 +246,51 @@ def get_pending_videos(session: Session, niche: str) -> List[DiscoveredVideo]:
     try:
         if not niche:
             raise ValueError("Niche cannot be empty.")
-        return session.query(DiscoveredVideo).filter_by(niche=niche, processed=0).all()
+        # A literal 0 (not a bound parameter) lets SQLite use the partial index.
+        return session.query(DiscoveredVideo).filter(
+            DiscoveredVideo.niche == niche, DiscoveredVideo.processed == literal_column("0")
+        ).all()
     except Exception as e:
         logger.error(f"Failed to fetch pending videos for niche '{niche}': {e}")
         raise
 
+def get_review_summary_rows(session: Session, pipeline_run_id: int) -> List[Row]:
+    """
+    Fetch everything the review message needs for a pipeline run in one query.
+
+    Rows are ordered by rank descending, matching the countdown order of the
+    video. A run without clips yields a single row whose clip columns are None.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        pipeline_run_id (int): The pipeline run to summarize.
+
+    Returns:
+        List[Row]: Rows with niche, cycle_start, cycle_end, video_duration_seconds,
+        video_file_size_bytes, rank_position, clip_duration_seconds,
+        content_id_risk, title and channel_name.
+    """
+    stmt = (
+        select(
+            PipelineRun.niche,
+            PipelineRun.cycle_start,
+            PipelineRun.cycle_end,
+            PipelineRun.video_duration_seconds,
+            PipelineRun.video_file_size_bytes,
+            Clip.rank_position,
+            Clip.clip_duration_seconds,
+            Clip.content_id_risk,
+            DiscoveredVideo.title,
+            DiscoveredVideo.channel_name,
+        )
+        .select_from(PipelineRun)
+        .outerjoin(Clip, Clip.pipeline_run_id == PipelineRun.id)
+        .outerjoin(DiscoveredVideo, DiscoveredVideo.id == Clip.discovered_video_id)
+        .where(PipelineRun.id == pipeline_run_id)
+        .order_by(Clip.rank_position.desc())
+    )
+    return list(session.execute(stmt).all())
+
 def mark_video_processed(session: Session, video_id: str, status: int) -> None:
     """
     Update a video's processed status (1=used, 2=skipped, 3=rejected).
@@ -170,6 +317,72 @@ def mark_video_processed(session: Session, video_id: str, status: int) -> None:
         session.rollback()
         raise
 
+def get_config_overrides(session: Session) -> Dict[str, str]:
+    """
+    Get all runtime config overrides.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+
+    Returns:
+        Dict[str, str]: Raw override values keyed by dotted config path.
+    """
+    rows = session.execute(select(ConfigOverride.key, ConfigOverride.value)).all()
+    return {key: value for key, value in rows}
+
+def set_config_override(session: Session, key: str, value: str, updated_by: str = "system") -> None:
+    """
+    Insert or update a runtime config override.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        key (str): Dotted config path (e.g., "discovery.min_views").
+        value (str): Raw value as YAML text.
+        updated_by (str): Who made the change (default: "system").
+
+    Raises:
+        ValueError: If the key is empty.
+    """
+    try:
+        if not key:
+            raise ValueError("Override key cannot be empty.")
+        override = session.get(ConfigOverride, key)
+        if override is None:
+            override = ConfigOverride(key=key)
+            session.add(override)
+        override.value = value
+        override.updated_at = datetime.utcnow()
+        override.updated_by = updated_by
+        session.commit()
+        logger.info(f"Config override {key} set by {updated_by}.")
+    except Exception as e:
+        logger.error(f"Failed to set config override {key}: {e}")
+        session.rollback()
+        raise
+
+def delete_config_override(session: Session, key: str) -> bool:
+    """
+    Remove a runtime config override.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        key (str): Dotted config path.
+
+    Returns:
+        bool: True if an override was removed.
+    """
+    try:
+        override = session.get(ConfigOverride, key)
+        if override is None:
+            return False
+        session.delete(override)
+        session.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to delete config override {key}: {e}")
+        session.rollback()
+        raise
+
 def log_error(session: Session, module: str, error_type: str, message: str,
               pipeline_run_id: Optional[int] = None, stack_trace: Optional[str] = None) -> None:
     """
@@ -204,4 +417,319 @@ def log_error(session: Session, module: str, error_type: str, message: str,
     except Exception as e:
         logger.error(f"Failed to log error in module {module}: {e}")
         session.rollback()
-        raise
\ No newline at end of file
+        raise
+
+def get_asset_loudness(session: Session, asset_key: str) -> Optional[AssetLoudness]:
+    """
+    Get stored loudness for an asset.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        asset_key (str): Asset identity (path, size and modification time).
+
+    Returns:
+        Optional[AssetLoudness]: The measurement, or None if not measured yet.
+    """
+    return session.get(AssetLoudness, asset_key)
+
+def save_asset_loudness(session: Session, asset_key: str, path: str, stats: Dict[str, float]) -> None:
+    """
+    Insert or replace the loudness measurement of an asset.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        asset_key (str): Asset identity (path, size and modification time).
+        path (str): Asset path, for reference.
+        stats (Dict[str, float]): integrated_lufs, loudness_range, true_peak,
+            threshold, target_offset and target_lufs.
+
+    Raises:
+        ValueError: If the asset key is empty.
+    """
+    try:
+        if not asset_key:
+            raise ValueError("Asset key cannot be empty.")
+        row = session.get(AssetLoudness, asset_key)
+        if row is None:
+            row = AssetLoudness(asset_key=asset_key)
+            session.add(row)
+        row.path = path
+        for field, value in stats.items():
+            setattr(row, field, value)
+        row.measured_at = datetime.utcnow()
+        session.commit()
+    except Exception as e:
+        logger.error(f"Failed to save loudness for {path}: {e}")
+        session.rollback()
+        raise
+
+def record_stage_timing(session: Session, pipeline_run_id: int, stage: str,
+                        started_at: datetime, duration_seconds: float) -> None:
+    """
+    Record how long a pipeline stage took.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        pipeline_run_id (int): The pipeline run.
+        stage (str): Stage name (e.g., "render").
+        started_at (datetime): When the stage started (UTC).
+        duration_seconds (float): Wall time of the stage, excluding time queued for resources.
+
+    Raises:
+        ValueError: If the stage name is empty or the duration is negative.
+    """
+    try:
+        if not stage or duration_seconds < 0:
+            raise ValueError("Stage timing needs a stage name and a non-negative duration.")
+        session.add(PipelineStageTiming(
+            pipeline_run_id=pipeline_run_id,
+            stage=stage,
+            started_at=started_at,
+            duration_seconds=duration_seconds,
+        ))
+        session.commit()
+    except Exception as e:
+        logger.error(f"Failed to record {stage} timing for run {pipeline_run_id}: {e}")
+        session.rollback()
+        raise
+
+def get_stage_durations(session: Session, since: Optional[datetime] = None) -> Dict[str, List[float]]:
+    """
+    Measured stage durations, plus review and whole-run times.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        since (Optional[datetime]): Only samples started after this time (UTC).
+
+    Returns:
+        Dict[str, List[float]]: Durations in seconds per stage. Review times
+        from the review log are under "review" (answered reviews only), and
+        the ``started_at`` to ``completed_at`` time of finished pipeline runs,
+        less their answered review time, is under "pipeline".
+    """
+    stmt = select(PipelineStageTiming.stage, PipelineStageTiming.duration_seconds)
+    if since is not None:
+        stmt = stmt.where(PipelineStageTiming.started_at >= since)
+    durations: Dict[str, List[float]] = {}
+    for stage, seconds in session.execute(stmt):
+        durations.setdefault(stage, []).append(seconds)
+
+    reviews = select(ReviewLog.pipeline_run_id, ReviewLog.sent_at, ReviewLog.responded_at).where(
+        ReviewLog.responded_at.is_not(None)
+    )
+    if since is not None:
+        reviews = reviews.where(ReviewLog.sent_at >= since)
+    review_seconds: Dict[int, float] = {}
+    for run_id, sent_at, responded_at in session.execute(reviews):
+        seconds = (responded_at - sent_at).total_seconds()
+        durations.setdefault("review", []).append(seconds)
+        review_seconds[run_id] = review_seconds.get(run_id, 0.0) + seconds
+
+    runs = select(PipelineRun.id, PipelineRun.started_at, PipelineRun.completed_at).where(
+        PipelineRun.started_at.is_not(None), PipelineRun.completed_at.is_not(None)
+    )
+    if since is not None:
+        runs = runs.where(PipelineRun.started_at >= since)
+    for run_id, started_at, completed_at in session.execute(runs):
+        seconds = (completed_at - started_at).total_seconds() - review_seconds.get(run_id, 0.0)
+        if seconds > 0:
+            durations.setdefault("pipeline", []).append(seconds)
+    return durations
+
+def _archive_attached(session: Session) -> bool:
+    return any(row[1] == ARCHIVE_SCHEMA for row in session.execute(text("PRAGMA database_list")))
+
+def archive_discovered_videos(session: Session, older_than_days: int, now: Optional[datetime] = None,
+                              batch_size: int = 5000) -> int:
+    """
+    Move old processed discovery rows into the archive database.
+
+    Rows with ``processed != 0`` discovered more than ``older_than_days`` ago
+    are copied to the archive, added to ``discovery_daily_stats`` and deleted
+    from the hot table, one batch per transaction. Rows that clips still
+    reference stay hot, because the review summary and weight optimizer join
+    on them.
+
+    Args:
+        session (Session): Session on an engine opened with an archive_path.
+        older_than_days (int): Minimum age of the rows to move.
+        now (Optional[datetime]): Reference time (UTC; default: now).
+        batch_size (int): Rows per transaction (default: 5000).
+
+    Returns:
+        int: Number of rows moved.
+
+    Raises:
+        ValueError: If no archive database is attached or the age is negative.
+    """
+    try:
+        if older_than_days < 0:
+            raise ValueError("Retention age cannot be negative.")
+        if not _archive_attached(session):
+            raise ValueError("No archive database attached; open the engine with init_db(path, archive_path).")
+        cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+        candidates = (
+            select(DiscoveredVideo.id)
+            .where(
+                DiscoveredVideo.processed != literal_column("0"),
+                DiscoveredVideo.discovered_at < cutoff,
+                DiscoveredVideo.id.not_in(
+                    select(Clip.discovered_video_id).where(Clip.discovered_video_id.is_not(None))
+                ),
+            )
+            .order_by(DiscoveredVideo.id)
+            .limit(batch_size)
+        )
+        source = func.coalesce(DiscoveredVideo.discovery_source, "unknown")
+        day = func.date(DiscoveredVideo.discovered_at)
+        columns = [c.name for c in DiscoveredVideo.__table__.columns]
+        moved = 0
+        while True:
+            ids = list(session.scalars(candidates))
+            if not ids:
+                break
+            batch = DiscoveredVideo.id.in_(ids)
+            totals = sqlite_insert(DiscoveryDailyStat).from_select(
+                ["day", "niche", "discovery_source", "processed", "videos",
+                 "viral_score_sum", "view_velocity_sum", "view_count_sum", "max_viral_score"],
+                select(
+                    day, DiscoveredVideo.niche, source, DiscoveredVideo.processed, func.count(),
+                    func.coalesce(func.sum(DiscoveredVideo.viral_score), 0.0),
+                    func.coalesce(func.sum(DiscoveredVideo.view_velocity), 0.0),
+                    func.coalesce(func.sum(DiscoveredVideo.view_count), 0),
+                    func.coalesce(func.max(DiscoveredVideo.viral_score), 0.0),
+                ).where(batch).group_by(day, DiscoveredVideo.niche, source, DiscoveredVideo.processed),
+            )
+            excluded = totals.excluded
+            session.execute(totals.on_conflict_do_update(
+                index_elements=["day", "niche", "discovery_source", "processed"],
+                set_={
+                    "videos": DiscoveryDailyStat.videos + excluded.videos,
+                    "viral_score_sum": DiscoveryDailyStat.viral_score_sum + excluded.viral_score_sum,
+                    "view_velocity_sum": DiscoveryDailyStat.view_velocity_sum + excluded.view_velocity_sum,
+                    "view_count_sum": DiscoveryDailyStat.view_count_sum + excluded.view_count_sum,
+                    "max_viral_score": func.max(DiscoveryDailyStat.max_viral_score, excluded.max_viral_score),
+                },
+            ))
+            session.execute(
+                insert(ArchivedVideos).prefix_with("OR REPLACE").from_select(
+                    columns, select(*(DiscoveredVideo.__table__.c[c] for c in columns)).where(batch)
+                )
+            )
+            session.execute(delete(DiscoveredVideo).where(batch))
+            session.commit()
+            moved += len(ids)
+        if moved:
+            logger.info(f"Archived {moved} discovered videos older than {older_than_days} days.")
+        return moved
+    except Exception as e:
+        logger.error(f"Failed to archive discovered videos: {e}")
+        session.rollback()
+        raise
+
+def get_known_video_ids(session: Session, video_ids: Iterable[str]) -> Set[str]:
+    """
+    Which of the given video IDs were discovered before, hot or archived.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        video_ids (Iterable[str]): Candidate video IDs.
+
+    Returns:
+        Set[str]: The IDs already in the database.
+    """
+    ids = list(set(video_ids))
+    if not ids:
+        return set()
+    known = set(session.scalars(select(DiscoveredVideo.video_id).where(DiscoveredVideo.video_id.in_(ids))))
+    if _archive_attached(session):
+        known.update(session.scalars(select(ArchivedVideos.c.video_id).where(ArchivedVideos.c.video_id.in_(ids))))
+    return known
+
+def get_discovery_daily_stats(session: Session, niche: Optional[str] = None) -> List[Row]:
+    """
+    Discovery totals per day, niche, source and processed status.
+
+    Combines the stored totals of archived rows with the rows still in the
+    hot table, so the figures do not change when rows are archived.
+
+    Args:
+        session (Session): SQLAlchemy Session instance.
+        niche (Optional[str]): Only this niche, if given.
+
+    Returns:
+        List[Row]: Rows with day, niche, discovery_source, processed, videos,
+        viral_score_sum, view_velocity_sum, view_count_sum and max_viral_score,
+        ordered by day.
+    """
+    source = func.coalesce(DiscoveredVideo.discovery_source, "unknown")
+    day = func.date(DiscoveredVideo.discovered_at)
+    hot = select(
+        day.label("day"), DiscoveredVideo.niche, source.label("discovery_source"), DiscoveredVideo.processed,
+        func.count().label("videos"),
+        func.coalesce(func.sum(DiscoveredVideo.viral_score), 0.0).label("viral_score_sum"),
+        func.coalesce(func.sum(DiscoveredVideo.view_velocity), 0.0).label("view_velocity_sum"),
+        func.coalesce(func.sum(DiscoveredVideo.view_count), 0).label("view_count_sum"),
+        func.coalesce(func.max(DiscoveredVideo.viral_score), 0.0).label("max_viral_score"),
+    ).group_by(day, DiscoveredVideo.niche, source, DiscoveredVideo.processed)
+    cold = select(
+        DiscoveryDailyStat.day, DiscoveryDailyStat.niche, DiscoveryDailyStat.discovery_source,
+        DiscoveryDailyStat.processed, DiscoveryDailyStat.videos, DiscoveryDailyStat.viral_score_sum,
+        DiscoveryDailyStat.view_velocity_sum, DiscoveryDailyStat.view_count_sum, DiscoveryDailyStat.max_viral_score,
+    )
+    if niche is not None:
+        hot = hot.where(DiscoveredVideo.niche == niche)
+        cold = cold.where(DiscoveryDailyStat.niche == niche)
+    both = union_all(hot, cold).subquery()
+    keys = (both.c.day, both.c.niche, both.c.discovery_source, both.c.processed)
+    stmt = select(
+        *keys,
+        func.sum(both.c.videos).label("videos"),
+        func.sum(both.c.viral_score_sum).label("viral_score_sum"),
+        func.sum(both.c.view_velocity_sum).label("view_velocity_sum"),
+        func.sum(both.c.view_count_sum).label("view_count_sum"),
+        func.max(both.c.max_viral_score).label("max_viral_score"),
+    ).group_by(*keys).order_by(*keys)
+    return list(session.execute(stmt).all())
+
+def maintain_database(engine: Engine, vacuum_pages: int = 2000, analysis_limit: int = 1000) -> Dict[str, int]:
+    """
+    Return free pages to the file system and refresh planner statistics.
+
+    Runs a bounded ``incremental_vacuum`` and an ``ANALYZE`` limited to
+    ``analysis_limit`` rows per index on the main database and, if attached,
+    the archive. A database created before incremental auto-vacuum was
+    enabled is converted once with a full VACUUM.
+
+    Args:
+        engine (Engine): SQLAlchemy Engine instance.
+        vacuum_pages (int): Most pages to free per database and run (default: 2000).
+        analysis_limit (int): Rows sampled per index by ANALYZE (default: 1000).
+
+    Returns:
+        Dict[str, int]: Pages freed per database ("main", "archive").
+    """
+    freed: Dict[str, int] = {}
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            schemas = [row[1] for row in conn.execute(text("PRAGMA database_list")) if row[1] != "temp"]
+            conn.execute(text(f"PRAGMA analysis_limit = {int(analysis_limit)}"))
+            for schema in schemas:
+                before = conn.execute(text(f"PRAGMA {schema}.freelist_count")).scalar()
+                if conn.execute(text(f"PRAGMA {schema}.auto_vacuum")).scalar() != 2:
+                    logger.info(f"Converting the {schema} database to incremental auto-vacuum.")
+                    conn.execute(text(f"PRAGMA {schema}.auto_vacuum = INCREMENTAL"))
+                    conn.execute(text(f"VACUUM {schema}"))
+                else:
+                    # Each step of this pragma frees one page and it returns no rows,
+                    # so a plain execute stops after the first; executescript runs it through.
+                    conn.connection.driver_connection.executescript(
+                        f"PRAGMA {schema}.incremental_vacuum({int(vacuum_pages)});"
+                    )
+                freed[schema] = before - conn.execute(text(f"PRAGMA {schema}.freelist_count")).scalar()
+                conn.execute(text(f"ANALYZE {schema}"))
+        logger.info(f"Database maintenance freed {freed} pages.")
+        return freed
+    except Exception as e:
+        logger.error(f"Database maintenance failed: {e}")
+        raise
@@ -1,3 +1,19 @@
 """
 Discovery package for discovering viral content from various sources.
-"""
\ No newline at end of file
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "CandidateBatch": "src.discovery.candidates",
+    "CandidateBatchBuilder": "src.discovery.candidates",
+    "ChannelTable": "src.discovery.candidates",
+    "DiscoveryFanout": "src.discovery.fanout",
+    "NicheClassifier": "src.discovery.niche",
+    "RawCandidate": "src.discovery.candidates",
+    "RedditSource": "src.discovery.reddit_source",
+    "SharedDiscoveryCache": "src.discovery.shared",
+    "YouTubeSource": "src.discovery.youtube_source",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,415 @@
+"""
+Compact candidate storage for the discovery stage.
+
+A cycle can see tens of thousands of raw items (trending lists for every
+region, search results, Reddit posts). Instead of one pydantic or ORM object
+per item, candidates are accumulated column-wise in ``array.array`` buffers
+by ``CandidateBatchBuilder`` (merging duplicates as they arrive) and frozen
+into a ``CandidateBatch`` of NumPy arrays for vectorized scoring. Channel IDs
+are interned into a shared ``ChannelTable``. ``DiscoveredVideo`` rows are only
+created for the final top-N, skipping videos the database already knows,
+including those moved to the retention archive.
+"""
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src.config import DiscoveryConfig
+from src.database import DiscoveredVideo, get_known_video_ids
+
+SOURCE_TRENDING = 1
+SOURCE_SEARCH = 2
+SOURCE_REDDIT = 4
+SOURCE_NAMES = {
+    SOURCE_TRENDING: "youtube_trending",
+    SOURCE_SEARCH: "youtube_search",
+    SOURCE_REDDIT: "reddit",
+}
+
+# Column name -> (array.array typecode, NumPy dtype).
+_COLUMNS: Dict[str, Tuple[str, type]] = {
+    "channel_idx": ("i", np.int32),
+    "view_count": ("q", np.int64),
+    "like_count": ("q", np.int64),
+    "comment_count": ("q", np.int64),
+    "published_at": ("d", np.float64),
+    "duration_seconds": ("i", np.int32),
+    "category_id": ("h", np.int16),
+    "reddit_score": ("i", np.int32),
+    "view_velocity": ("f", np.float32),
+    "sources": ("B", np.uint8),
+}
+# Counts that are merged by taking the larger observation.
+_MAX_MERGED = ("view_count", "like_count", "comment_count", "reddit_score", "view_velocity")
+
+
+class RawCandidate(NamedTuple):
+    """One candidate as returned by a source, in ``CandidateBatchBuilder.add`` order."""
+    video_id: str
+    title: str
+    channel_id: str
+    channel_name: str
+    source: int
+    view_count: int = 0
+    like_count: int = 0
+    comment_count: int = 0
+    published_at: float = 0.0
+    duration_seconds: int = 0
+    category_id: int = 0
+    reddit_score: int = 0
+    view_velocity: Optional[float] = None
+
+
+def source_label(mask: int) -> str:
+    """
+    Render a source bitmask as the ``discovery_source`` column value.
+
+    Args:
+        mask (int): OR of the ``SOURCE_*`` flags.
+
+    Returns:
+        str: Comma-separated source names (e.g., "youtube_trending,reddit").
+    """
+    return ",".join(name for flag, name in SOURCE_NAMES.items() if mask & flag)
+
+
+class ChannelTable:
+    """Interns channel IDs to small integers shared by every batch of a cycle."""
+
+    __slots__ = ("ids", "names", "_index")
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def intern(self, channel_id: str, name: str) -> int:
+        """
+        Return the index for a channel, adding it on first sight.
+
+        Args:
+            channel_id (str): YouTube channel ID.
+            name (str): Channel display name.
+
+        Returns:
+            int: Stable index into ``ids`` and ``names``.
+        """
+        idx = self._index.get(channel_id)
+        if idx is None:
+            idx = len(self.ids)
+            self._index[channel_id] = idx
+            self.ids.append(channel_id)
+            self.names.append(name)
+        return idx
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class CandidateBatchBuilder:
+    """Accumulates candidates column-wise, merging repeated video IDs in place."""
+
+    __slots__ = ("channels", "titles", "_rows", "_columns")
+
+    def __init__(self, channels: Optional[ChannelTable] = None):
+        self.channels = channels if channels is not None else ChannelTable()
+        self.titles: List[str] = []
+        # Insertion-ordered, so its keys double as the video ID column.
+        self._rows: Dict[str, int] = {}
+        self._columns = {name: array(code) for name, (code, _) in _COLUMNS.items()}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(
+        self,
+        video_id: str,
+        title: str,
+        channel_id: str,
+        channel_name: str,
+        source: int,
+        view_count: int = 0,
+        like_count: int = 0,
+        comment_count: int = 0,
+        published_at: float = 0.0,
+        duration_seconds: int = 0,
+        category_id: int = 0,
+        reddit_score: int = 0,
+        view_velocity: Optional[float] = None,
+    ) -> int:
+        """
+        Add a candidate, or merge it into an existing row for the same video.
+
+        Merging keeps the largest counts seen and ORs the source flags, so a
+        video found in several regions and on Reddit ends up as one row.
+
+        Args:
+            video_id (str): YouTube video ID.
+            title (str): Video title.
+            channel_id (str): YouTube channel ID.
+            channel_name (str): Channel display name.
+            source (int): One of the ``SOURCE_*`` flags.
+            view_count (int): Views at discovery time.
+            like_count (int): Likes at discovery time.
+            comment_count (int): Comments at discovery time.
+            published_at (float): Upload time as a Unix timestamp.
+            duration_seconds (int): Video length.
+            category_id (int): YouTube category ID (0 if unknown).
+            reddit_score (int): Score of the Reddit post linking the video.
+            view_velocity (Optional[float]): Views per hour; estimated from
+                ``view_count`` and age when not given.
+
+        Returns:
+            int: Row index of the candidate.
+        """
+        if view_velocity is None:
+            age_hours = max((time.time() - published_at) / 3600.0, 1.0) if published_at else 0.0
+            view_velocity = view_count / age_hours if age_hours else 0.0
+        values = {
+            "view_count": view_count,
+            "like_count": like_count,
+            "comment_count": comment_count,
+            "reddit_score": reddit_score,
+            "view_velocity": view_velocity,
+        }
+        cols = self._columns
+        row = self._rows.get(video_id)
+        if row is not None:
+            for name in _MAX_MERGED:
+                if values[name] > cols[name][row]:
+                    cols[name][row] = values[name]
+            cols["sources"][row] |= source
+            if not cols["published_at"][row]:
+                cols["published_at"][row] = published_at
+            if not cols["duration_seconds"][row]:
+                cols["duration_seconds"][row] = duration_seconds
+            if not cols["category_id"][row]:
+                cols["category_id"][row] = category_id
+            return row
+
+        row = len(self._rows)
+        self._rows[video_id] = row
+        self.titles.append(title)
+        cols["channel_idx"].append(self.channels.intern(channel_id, channel_name))
+        cols["published_at"].append(published_at)
+        cols["duration_seconds"].append(duration_seconds)
+        cols["category_id"].append(category_id)
+        cols["sources"].append(source)
+        for name in _MAX_MERGED:
+            cols[name].append(values[name])
+        return row
+
+    def extend(self, candidates: Iterable[RawCandidate]) -> None:
+        """Add every candidate from a source page."""
+        for candidate in candidates:
+            self.add(*candidate)
+
+    def build(self) -> "CandidateBatch":
+        """
+        Freeze the accumulated rows into NumPy arrays.
+
+        Returns:
+            CandidateBatch: The batch; the builder can keep accumulating.
+        """
+        arrays = {
+            name: np.array(self._columns[name], dtype=dtype)
+            for name, (_, dtype) in _COLUMNS.items()
+        }
+        video_ids = np.array(list(self._rows), dtype="S") if self._rows else np.empty(0, dtype="S11")
+        return CandidateBatch(self.channels, video_ids, list(self.titles), arrays)
+
+
+class CandidateBatch:
+    """Struct-of-arrays view of discovery candidates."""
+
+    __slots__ = ("channels", "video_ids", "titles") + tuple(_COLUMNS)
+
+    def __init__(
+        self,
+        channels: ChannelTable,
+        video_ids: np.ndarray,
+        titles: List[str],
+        arrays: Dict[str, np.ndarray],
+    ):
+        self.channels = channels
+        self.video_ids = video_ids
+        self.titles = titles
+        for name in _COLUMNS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self) -> int:
+        return len(self.video_ids)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the batch's own arrays and strings."""
+        total = self.video_ids.nbytes + sum(getattr(self, name).nbytes for name in _COLUMNS)
+        return total + sum(len(t) for t in self.titles)
+
+    def select(self, rows: np.ndarray) -> "CandidateBatch":
+        """
+        Subset of the batch, sharing the channel table.
+
+        Args:
+            rows (np.ndarray): Boolean mask or integer indices.
+
+        Returns:
+            CandidateBatch: The selected rows.
+        """
+        indices = np.flatnonzero(rows) if rows.dtype == bool else rows
+        return CandidateBatch(
+            self.channels,
+            self.video_ids[indices],
+            [self.titles[i] for i in indices.tolist()],
+            {name: getattr(self, name)[indices] for name in _COLUMNS},
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["CandidateBatch"]) -> "CandidateBatch":
+        """
+        Join batches that share a channel table (rows are not deduplicated).
+
+        Raises:
+            ValueError: If no batches are given or their channel tables differ.
+        """
+        if not batches:
+            raise ValueError("At least one batch is required.")
+        channels = batches[0].channels
+        if any(b.channels is not channels for b in batches):
+            raise ValueError("Batches must share a channel table to be joined.")
+        return cls(
+            channels,
+            np.concatenate([b.video_ids for b in batches]),
+            [t for b in batches for t in b.titles],
+            {name: np.concatenate([getattr(b, name) for b in batches]) for name in _COLUMNS},
+        )
+
+    def viral_scores(self, config: DiscoveryConfig, now: Optional[float] = None) -> np.ndarray:
+        """
+        Composite viral score per candidate (SPEC §4.1).
+
+        View and comment velocity and Reddit score are normalized by the
+        batch maximum, so score a batch per niche. Comment velocity and
+        recency are derived the same way as in the weight optimizer.
+
+        Args:
+            config (DiscoveryConfig): Scoring weights and lookback window.
+            now (Optional[float]): Current Unix time (default: now).
+
+        Returns:
+            np.ndarray: float64 scores in [0, 1].
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.float64)
+        now = time.time() if now is None else now
+        views = self.view_count.astype(np.float64)
+        velocity = self.view_velocity.astype(np.float64)
+        safe_views = np.maximum(views, 1.0)
+        like_ratio = np.where(views > 0, self.like_count / safe_views, 0.0)
+        comment_velocity = np.where(views > 0, velocity * self.comment_count / safe_views, 0.0)
+        age_hours = np.where(self.published_at > 0, (now - self.published_at) / 3600.0, config.lookback_hours)
+        recency = 1.0 - np.clip(age_hours / config.lookback_hours, 0.0, 1.0)
+
+        def norm(values: np.ndarray) -> np.ndarray:
+            return values / max(float(values.max()), 1e-9)
+
+        return (
+            config.scoring_weight_view_velocity * norm(velocity)
+            + config.scoring_weight_reddit * norm(self.reddit_score.astype(np.float64))
+            + config.scoring_weight_like_ratio * np.clip(like_ratio, 0.0, 1.0)
+            + config.scoring_weight_comment_velocity * norm(comment_velocity)
+            + config.scoring_weight_recency * recency
+        )
+
+    def known_mask(self, session: Session) -> np.ndarray:
+        """
+        Rows whose video is already in the database, hot or archived.
+
+        Args:
+            session (Session): SQLAlchemy Session instance.
+
+        Returns:
+            np.ndarray: Boolean mask, one entry per row.
+        """
+        ids = [video_id.decode() for video_id in self.video_ids]
+        known = get_known_video_ids(session, ids)
+        return np.fromiter((video_id in known for video_id in ids), dtype=bool, count=len(ids))
+
+    def rank(
+        self,
+        config: DiscoveryConfig,
+        n: Optional[int] = None,
+        now: Optional[float] = None,
+        exclude: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Indices of the best candidates that pass ``min_views`` and ``min_viral_score``.
+
+        Args:
+            config (DiscoveryConfig): Thresholds and weights.
+            n (Optional[int]): How many to return (default: ``max_candidates_per_niche``).
+            now (Optional[float]): Current Unix time (default: now).
+            exclude (Optional[np.ndarray]): Boolean mask of rows that may not be
+                picked (e.g., ``known_mask``), applied before the top ``n`` cut
+                so excluded rows do not take places from the rest.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row indices, best first, and their scores.
+        """
+        n = config.max_candidates_per_niche if n is None else n
+        scores = self.viral_scores(config, now)
+        if n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        passing = (self.view_count >= config.min_views) & (scores >= config.min_viral_score)
+        if exclude is not None:
+            passing &= ~exclude
+        eligible = np.flatnonzero(passing)
+        if eligible.size > n:
+            eligible = eligible[np.argpartition(-scores[eligible], n - 1)[:n]]
+        order = eligible[np.argsort(-scores[eligible], kind="stable")]
+        return order, scores[order]
+
+    def to_discovered_videos(
+        self, indices: Iterable[int], scores: Iterable[float], niche: str
+    ) -> List[DiscoveredVideo]:
+        """
+        Materialize ORM rows for selected candidates only.
+
+        Rank with ``exclude=known_mask(session)`` so videos already in the
+        database are not inserted and processed again.
+
+        Args:
+            indices (Iterable[int]): Rows to convert (e.g., from ``rank``).
+            scores (Iterable[float]): Viral score for each row.
+            niche (str): Niche the rows were ranked for.
+
+        Returns:
+            List[DiscoveredVideo]: Unsaved ORM instances.
+        """
+        discovered_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = []
+        for i, score in zip(indices, scores):
+            i = int(i)
+            video_id = self.video_ids[i].decode()
+            channel = int(self.channel_idx[i])
+            rows.append(DiscoveredVideo(
+                video_id=video_id,
+                title=self.titles[i],
+                channel_name=self.channels.names[channel],
+                channel_id=self.channels.ids[channel],
+                url=f"https://www.youtube.com/watch?v={video_id}",
+                category_id=int(self.category_id[i]) or None,
+                duration_seconds=int(self.duration_seconds[i]) or None,
+                view_count=int(self.view_count[i]),
+                like_count=int(self.like_count[i]),
+                comment_count=int(self.comment_count[i]),
+                view_velocity=float(self.view_velocity[i]),
+                viral_score=float(score),
+                niche=niche,
+                discovery_source=source_label(int(self.sources[i])),
+                discovered_at=discovered_at,
+            ))
+        return rows
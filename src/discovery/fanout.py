@@ -0,0 +1,216 @@
+"""
+Concurrent discovery across YouTube regions, search queries and subreddits.
+
+Each region, query and subreddit is its own producer. Pages within one
+producer follow each other (the next page token comes from the previous
+response), but all producers run at once and only wait on their API's shared
+token bucket. Pages are pushed onto a bounded queue as they arrive, so the
+caller can feed them into a ``CandidateBatchBuilder`` while slower sources are
+still fetching.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, List, NamedTuple, Optional, Sequence
+
+import aiohttp
+
+from src.config import DiscoveryConfig
+from src.discovery.candidates import (
+    SOURCE_REDDIT,
+    SOURCE_SEARCH,
+    CandidateBatch,
+    CandidateBatchBuilder,
+    RawCandidate,
+)
+from src.discovery.http import ConditionalClient
+from src.discovery.reddit_source import RedditPost, RedditSource
+from src.discovery.youtube_source import YouTubeSource
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
+from src.utils.rate_limit import TokenBucket
+
+logger = get_logger(__name__)
+
+_DONE = object()
+
+
+class SourcePage(NamedTuple):
+    """Candidates from one page of one source."""
+    origin: str
+    candidates: List[RawCandidate]
+
+
+def trending_origin(region: str) -> str:
+    """Origin label for a region's trending chart."""
+    return f"trending:{region}"
+
+
+def search_origin(query: str) -> str:
+    """Origin label for a YouTube search query."""
+    return f"search:{query}"
+
+
+def reddit_origin(subreddit: str) -> str:
+    """Origin label for a subreddit listing."""
+    return f"r/{subreddit}"
+
+
+class DiscoveryFanout:
+    """Runs every discovery source concurrently behind per-API rate limits."""
+
+    def __init__(self, youtube: YouTubeSource, reddit: RedditSource, config: DiscoveryConfig,
+                 queue_size: int = 64):
+        self.youtube = youtube
+        self.reddit = reddit
+        self.config = config
+        self.queue_size = queue_size
+
+    @classmethod
+    def from_config(cls, session: aiohttp.ClientSession, config: DiscoveryConfig) -> "DiscoveryFanout":
+        """
+        Build sources with one bucket per API from the discovery config.
+
+        Create this once and reuse it for every niche so all of them draw
+        from the same buckets and quota counter.
+
+        Args:
+            session (aiohttp.ClientSession): Session for all requests.
+            config (DiscoveryConfig): Discovery settings.
+
+        Returns:
+            DiscoveryFanout: The fan-out engine.
+        """
+        client = ConditionalClient(session)
+        youtube = YouTubeSource(
+            client,
+            config.youtube_api_key,
+            TokenBucket(config.youtube_requests_per_second),
+            config.youtube_daily_quota_limit,
+        )
+        reddit = RedditSource(
+            client,
+            TokenBucket.per_minute(config.reddit_requests_per_minute),
+            config.reddit_user_agent,
+            config.reddit_min_score,
+        )
+        return cls(youtube, reddit, config)
+
+    async def _trending(self, region: str, emit) -> None:
+        async for page in self.youtube.trending(region):
+            await emit(page)
+
+    async def _search(self, query: str, published_after: datetime, emit) -> None:
+        ids = await self.youtube.search(query, published_after)
+        if ids:
+            await emit(await self.youtube.videos(ids, SOURCE_SEARCH))
+
+    async def _subreddit(self, subreddit: str, emit) -> None:
+        async for posts in self.reddit.listing(subreddit, pages=self.config.reddit_listing_pages):
+            await emit(await self._enrich(posts))
+
+    async def _enrich(self, posts: Sequence[RedditPost]) -> List[RawCandidate]:
+        """Look up YouTube statistics for the videos Reddit posts link to."""
+        scores = {}
+        for post in posts:
+            scores[post.video_id] = max(scores.get(post.video_id, 0), post.score)
+        return await self.youtube.videos(list(scores), SOURCE_REDDIT, scores)
+
+    async def stream(
+        self,
+        regions: Iterable[str],
+        subreddits: Iterable[str],
+        search_queries: Iterable[str] = (),
+        published_after: Optional[datetime] = None,
+    ) -> AsyncIterator[SourcePage]:
+        """
+        Yield candidate pages from all sources as soon as each one arrives.
+
+        A failing source is logged and skipped; the others keep going. If the
+        caller stops iterating early, the remaining requests are cancelled.
+
+        Args:
+            regions (Iterable[str]): Trending chart regions.
+            subreddits (Iterable[str]): Subreddits to read.
+            search_queries (Iterable[str]): YouTube search queries.
+            published_after (Optional[datetime]): Search cutoff (default:
+                ``lookback_hours`` ago).
+
+        Yields:
+            SourcePage: One page of candidates and the source it came from.
+        """
+        if published_after is None:
+            published_after = datetime.now(timezone.utc) - timedelta(hours=self.config.lookback_hours)
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+
+        def emitter(origin: str):
+            async def emit(page: List[RawCandidate]) -> None:
+                if page:
+                    await queue.put(SourcePage(origin, page))
+            return emit
+
+        async def guarded(origin: str, coro) -> None:
+            try:
+                await coro
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                increment("discovery_source_errors")
+                logger.error(f"Discovery source {origin} failed: {e}")
+
+        jobs = []
+        for region in regions:
+            origin = trending_origin(region)
+            jobs.append(guarded(origin, self._trending(region, emitter(origin))))
+        for query in search_queries:
+            origin = search_origin(query)
+            jobs.append(guarded(origin, self._search(query, published_after, emitter(origin))))
+        for subreddit in subreddits:
+            origin = reddit_origin(subreddit)
+            jobs.append(guarded(origin, self._subreddit(subreddit, emitter(origin))))
+
+        async def produce() -> None:
+            try:
+                await asyncio.gather(*jobs)
+            finally:
+                await queue.put(_DONE)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                page = await queue.get()
+                if page is _DONE:
+                    break
+                yield page
+        finally:
+            if not producer.done():
+                producer.cancel()
+                # Cancelled producers still post the sentinel; make room for it.
+                while not queue.empty():
+                    queue.get_nowait()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    @timed("discovery_fanout")
+    async def discover(
+        self,
+        regions: Iterable[str],
+        subreddits: Iterable[str],
+        search_queries: Iterable[str] = (),
+        builder: Optional[CandidateBatchBuilder] = None,
+    ) -> CandidateBatch:
+        """
+        Collect every source into one candidate batch.
+
+        Args:
+            regions (Iterable[str]): Trending chart regions.
+            subreddits (Iterable[str]): Subreddits to read.
+            search_queries (Iterable[str]): YouTube search queries.
+            builder (Optional[CandidateBatchBuilder]): Builder to add to (e.g.,
+                one sharing a channel table with other batches).
+
+        Returns:
+            CandidateBatch: The merged candidates.
+        """
+        builder = builder if builder is not None else CandidateBatchBuilder()
+        async for page in self.stream(regions, subreddits, search_queries):
+            builder.extend(page.candidates)
+        return builder.build()
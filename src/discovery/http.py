@@ -0,0 +1,121 @@
+"""
+Rate-limited JSON client with conditional requests for discovery APIs.
+
+Responses that carry an ``ETag`` or ``Last-Modified`` header are remembered
+per URL, and the next request for the same URL sends ``If-None-Match`` /
+``If-Modified-Since``. A ``304 Not Modified`` is answered from the stored
+body. ``429`` and ``5xx`` responses are retried after ``Retry-After`` (or an
+exponential delay), and the API's bucket is drained for that long so other
+callers back off too.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+from urllib.parse import urlencode
+
+import aiohttp
+
+from src.utils.logging import get_logger
+from src.utils.metrics import increment
+from src.utils.rate_limit import TokenBucket
+
+logger = get_logger(__name__)
+
+MAX_CACHED_VALIDATORS = 1024
+
+
+class HTTPError(RuntimeError):
+    """Raised when an API returns an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class _Validated(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: Any
+
+
+def _retry_delay(headers: Any, attempt: int) -> float:
+    """Seconds to wait before retrying, from ``Retry-After`` or exponential backoff."""
+    try:
+        return max(float(headers.get("Retry-After", "")), 0.0)
+    except ValueError:
+        return float(2 ** attempt)
+
+
+class ConditionalClient:
+    """GETs JSON through a shared session, honouring rate limits and cache validators."""
+
+    def __init__(self, session: aiohttp.ClientSession, max_retries: int = 3):
+        self.session = session
+        self.max_retries = max_retries
+        self._validators: "OrderedDict[str, _Validated]" = OrderedDict()
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        limiter: Optional[TokenBucket] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
+        """
+        GET a JSON document.
+
+        Args:
+            url (str): Endpoint URL.
+            params (Optional[Dict[str, Any]]): Query parameters.
+            limiter (Optional[TokenBucket]): Bucket for this API.
+            headers (Optional[Dict[str, str]]): Extra request headers.
+
+        Returns:
+            Any: The decoded body (the stored one on ``304``).
+
+        Raises:
+            HTTPError: On a client error, or when retries are exhausted.
+        """
+        key = f"{url}?{urlencode(sorted((params or {}).items()))}"
+        status, message = 0, ""
+        for attempt in range(self.max_retries + 1):
+            if limiter is not None:
+                await limiter.acquire()
+            request_headers = dict(headers or {})
+            cached = self._validators.get(key)
+            if cached is not None:
+                if cached.etag:
+                    request_headers["If-None-Match"] = cached.etag
+                if cached.last_modified:
+                    request_headers["If-Modified-Since"] = cached.last_modified
+
+            increment("discovery_http_requests")
+            async with self.session.get(url, params=params, headers=request_headers) as resp:
+                status = resp.status
+                if status == 304 and cached is not None:
+                    increment("discovery_http_not_modified")
+                    self._validators.move_to_end(key)
+                    return cached.body
+                if status == 429 or status >= 500:
+                    delay = _retry_delay(resp.headers, attempt)
+                    message = await resp.text()
+                    logger.warning(f"{url} returned {status}; retrying in {delay:.1f}s.")
+                    if limiter is not None:
+                        # The next acquire() waits out the penalty.
+                        limiter.penalize(delay)
+                    else:
+                        await asyncio.sleep(delay)
+                    continue
+                if status >= 400:
+                    raise HTTPError(status, await resp.text())
+                body = await resp.json(content_type=None)
+                etag = resp.headers.get("ETag")
+                last_modified = resp.headers.get("Last-Modified")
+
+            if etag or last_modified:
+                self._validators[key] = _Validated(etag, last_modified, body)
+                self._validators.move_to_end(key)
+                while len(self._validators) > MAX_CACHED_VALIDATORS:
+                    self._validators.popitem(last=False)
+            return body
+        raise HTTPError(status, f"giving up after {self.max_retries + 1} attempts: {message[:200]}")
@@ -0,0 +1,115 @@
+"""
+Niche classification for discovered videos (SPEC §4.1).
+
+Category IDs and keyword matches settle most videos for free. Only videos
+where they disagree or say nothing go to the LLM, and those are sent in
+batches through ``LLMClient.classify_niches_batch``.
+"""
+import re
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Pattern, Sequence
+
+from src.config import ChannelConfig, DiscoveryConfig
+from src.utils.logging import get_logger
+from src.utils.metrics import increment
+
+if TYPE_CHECKING:
+    from src.llm.client import LLMClient
+
+logger = get_logger(__name__)
+
+
+class NicheQuery(NamedTuple):
+    """What the classifier needs to know about a video."""
+    video_id: str
+    title: str
+    description: str = ""
+    category_id: int = 0
+
+
+class NicheClassifier:
+    """Resolves niches by category and keywords, deferring ambiguous videos to the LLM."""
+
+    def __init__(
+        self,
+        channels: Sequence[ChannelConfig],
+        config: DiscoveryConfig,
+        llm: Optional["LLMClient"] = None,
+    ):
+        enabled = [c for c in channels if c.enabled]
+        self.niches: List[str] = list(dict.fromkeys(c.niche for c in enabled))
+        self.llm = llm
+        self._by_category: Dict[int, set] = {}
+        for channel in enabled:
+            self._by_category.setdefault(channel.youtube_category_id, set()).add(channel.niche)
+        self._keywords: Dict[str, Pattern] = {
+            niche: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")\b", re.IGNORECASE)
+            for niche, keywords in config.niche_keywords.items()
+            if niche in self.niches and keywords
+        }
+
+    def prefilter(self, query: NicheQuery) -> Optional[List[str]]:
+        """
+        Classify without the LLM when the answer is obvious.
+
+        The category decides when no keyword points elsewhere; a single
+        keyword niche decides when the category is not a niche category.
+
+        Args:
+            query (NicheQuery): The video.
+
+        Returns:
+            Optional[List[str]]: Niches, or None if the LLM should decide.
+        """
+        by_category = self._by_category.get(query.category_id, set())
+        text = f"{query.title}\n{query.description}"
+        by_keyword = {niche for niche, pattern in self._keywords.items() if pattern.search(text)}
+        if by_category and by_keyword <= by_category:
+            return sorted(by_category)
+        if not by_category and len(by_keyword) == 1:
+            return sorted(by_keyword)
+        return None
+
+    async def classify(self, queries: Sequence[NicheQuery]) -> Dict[str, List[str]]:
+        """
+        Classify videos, batching the ambiguous ones into as few LLM calls as fit.
+
+        Without an LLM client, or if the LLM fails, ambiguous videos get
+        every niche their category or keywords suggest (possibly none).
+
+        Args:
+            queries (Sequence[NicheQuery]): Videos to classify.
+
+        Returns:
+            Dict[str, List[str]]: Niches per video ID.
+        """
+        results: Dict[str, List[str]] = {}
+        ambiguous: Dict[str, NicheQuery] = {}
+        for query in queries:
+            niches = self.prefilter(query)
+            if niches is None:
+                ambiguous[query.video_id] = query
+            else:
+                results[query.video_id] = niches
+        increment("niche_prefilter_resolved", len(results))
+        if ambiguous and self.llm is not None and self.niches:
+            from src.llm.client import LLMError
+
+            try:
+                answered = await self.llm.classify_niches_batch(
+                    {q.video_id: (q.title, q.description) for q in ambiguous.values()}, self.niches
+                )
+            except LLMError as e:
+                logger.error(f"LLM niche classification failed: {e}")
+                answered = {}
+            increment("niche_llm_classified", len(answered))
+            results.update(answered)
+        for video_id, query in ambiguous.items():
+            if video_id not in results:
+                results[video_id] = self._loose_match(query)
+        return results
+
+    def _loose_match(self, query: NicheQuery) -> List[str]:
+        text = f"{query.title}\n{query.description}"
+        niches = set(self._by_category.get(query.category_id, set()))
+        niches.update(niche for niche, pattern in self._keywords.items() if pattern.search(text))
+        return sorted(niches)
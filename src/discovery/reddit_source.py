@@ -1 +1,103 @@
-"""Placeholder: Reddit viral content discovery."""
+"""
+Reddit viral content discovery.
+
+Reads subreddit listings through Reddit's JSON endpoints and keeps posts
+that link to a YouTube video and meet ``reddit_min_score``. Requests go
+through a shared 60 requests/minute bucket.
+"""
+import re
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+from src.discovery.http import ConditionalClient
+from src.utils.logging import get_logger
+from src.utils.rate_limit import TokenBucket
+
+logger = get_logger(__name__)
+
+REDDIT_BASE = "https://www.reddit.com"
+_YOUTUBE_ID_PATTERN = re.compile(
+    r"(?:youtube\.com/(?:watch\?(?:[^#]*&)?v=|shorts/|live/|embed/)|youtu\.be/)([A-Za-z0-9_-]{11})"
+)
+
+
+class RedditPost(NamedTuple):
+    """A Reddit post linking to a YouTube video."""
+    video_id: str
+    title: str
+    score: int
+    subreddit: str
+    created_utc: float
+
+
+def extract_youtube_id(url: str) -> Optional[str]:
+    """
+    Extract the YouTube video ID from a link.
+
+    Args:
+        url (str): Post URL.
+
+    Returns:
+        Optional[str]: The 11-character video ID, or None if not a YouTube link.
+    """
+    match = _YOUTUBE_ID_PATTERN.search(url or "")
+    return match.group(1) if match else None
+
+
+class RedditSource:
+    """Fetches YouTube-linking posts from subreddit listings."""
+
+    def __init__(
+        self,
+        client: ConditionalClient,
+        limiter: TokenBucket,
+        user_agent: str,
+        min_score: int = 100,
+        base_url: str = REDDIT_BASE,
+    ):
+        self.client = client
+        self.limiter = limiter
+        self.user_agent = user_agent
+        self.min_score = min_score
+        self.base_url = base_url.rstrip("/")
+
+    async def listing(
+        self, subreddit: str, sort: str = "hot", pages: int = 2, limit: int = 100
+    ) -> AsyncIterator[List[RedditPost]]:
+        """
+        Yield qualifying posts from a subreddit listing, one page at a time.
+
+        Args:
+            subreddit (str): Subreddit name without ``r/``.
+            sort (str): Listing ("hot", "rising", "top", ...) (default: "hot").
+            pages (int): Maximum pages to follow (default: 2).
+            limit (int): Posts per page, at most 100 (default: 100).
+
+        Yields:
+            List[RedditPost]: Posts on the page that link to YouTube.
+        """
+        after: Optional[str] = None
+        for _ in range(pages):
+            params = {"limit": min(limit, 100), "raw_json": 1}
+            if after:
+                params["after"] = after
+            data = await self.client.get_json(
+                f"{self.base_url}/r/{subreddit}/{sort}.json",
+                params,
+                self.limiter,
+                headers={"User-Agent": self.user_agent},
+            )
+            listing = data.get("data", {})
+            posts = []
+            for child in listing.get("children", []):
+                post = child.get("data", {})
+                video_id = extract_youtube_id(post.get("url", ""))
+                score = int(post.get("score", 0))
+                if video_id and score >= self.min_score:
+                    posts.append(RedditPost(
+                        video_id, post.get("title", ""), score, subreddit, float(post.get("created_utc", 0))
+                    ))
+            if posts:
+                yield posts
+            after = listing.get("after")
+            if not after:
+                break
@@ -0,0 +1,198 @@
+"""
+Discovery cache shared by every niche.
+
+Channels run discovery on staggered schedules but mostly ask for the same
+trending charts and overlapping subreddits. ``SharedDiscoveryCache`` fetches
+the union of all niches' sources once per TTL, classifies every candidate
+into niches in one pass, and answers each niche's run from that snapshot, so
+API calls and quota grow with regions and distinct sources instead of with
+the number of channels.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import ChannelConfig, DiscoveryConfig
+from src.discovery.candidates import CandidateBatch, CandidateBatchBuilder
+from src.discovery.fanout import DiscoveryFanout, reddit_origin, search_origin
+from src.discovery.niche import NicheClassifier, NicheQuery
+from src.utils.logging import get_logger
+from src.utils.metrics import increment
+
+logger = get_logger(__name__)
+
+
+class DiscoverySnapshot:
+    """One fetch of all sources, with each niche's rows precomputed."""
+
+    __slots__ = ("batch", "niche_rows", "fetched_at")
+
+    def __init__(self, batch: CandidateBatch, niche_rows: Dict[str, np.ndarray], fetched_at: float):
+        self.batch = batch
+        self.niche_rows = niche_rows
+        self.fetched_at = fetched_at
+
+    def for_niche(self, niche: str) -> CandidateBatch:
+        """
+        Candidates classified into a niche.
+
+        Args:
+            niche (str): Niche name.
+
+        Returns:
+            CandidateBatch: The niche's rows (empty for an unknown niche).
+        """
+        rows = self.niche_rows.get(niche, np.empty(0, dtype=np.intp))
+        return self.batch.select(rows)
+
+
+class _NicheRules:
+    """What puts a candidate into a niche: its category or the source it came from."""
+
+    __slots__ = ("niches", "categories", "origin_bits")
+
+    def __init__(self, channels: Sequence[ChannelConfig], config: DiscoveryConfig):
+        enabled = [c for c in channels if c.enabled]
+        self.niches: List[str] = list(dict.fromkeys(c.niche for c in enabled))
+        index = {niche: i for i, niche in enumerate(self.niches)}
+        self.categories: Dict[str, List[int]] = {niche: [] for niche in self.niches}
+        self.origin_bits: Dict[str, int] = {}
+        for channel in enabled:
+            bit = 1 << index[channel.niche]
+            self.categories[channel.niche].append(channel.youtube_category_id)
+            for query in channel.youtube_search_queries:
+                self._tag(search_origin(query), bit)
+        for niche, subreddits in config.reddit_subreddits.items():
+            if niche in index:
+                for subreddit in subreddits:
+                    self._tag(reddit_origin(subreddit), 1 << index[niche])
+
+    def _tag(self, origin: str, bit: int) -> None:
+        self.origin_bits[origin] = self.origin_bits.get(origin, 0) | bit
+
+    def sources(self) -> Tuple[List[str], List[str]]:
+        """Distinct search queries and subreddits across all niches."""
+        queries = [o[len("search:"):] for o in self.origin_bits if o.startswith("search:")]
+        subreddits = [o[len("r/"):] for o in self.origin_bits if o.startswith("r/")]
+        return queries, subreddits
+
+    def classify(self, batch: CandidateBatch, bits: np.ndarray) -> Dict[str, np.ndarray]:
+        """Row indices per niche, by category match or niche-specific origin."""
+        rows = {}
+        for i, niche in enumerate(self.niches):
+            member = np.isin(batch.category_id, self.categories[niche]) | ((bits >> i) & 1).astype(bool)
+            rows[niche] = np.flatnonzero(member)
+        return rows
+
+
+class SharedDiscoveryCache:
+    """Fetches discovery sources once per TTL and serves every niche from the result."""
+
+    def __init__(
+        self,
+        fanout: DiscoveryFanout,
+        config: DiscoveryConfig,
+        channels: Sequence[ChannelConfig],
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        classifier: Optional[NicheClassifier] = None,
+    ):
+        self.fanout = fanout
+        self.config = config
+        self.classifier = classifier
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.shared_cache_ttl_minutes * 60.0
+        self._clock = clock
+        self._rules = _NicheRules(channels, config)
+        self._snapshot: Optional[DiscoverySnapshot] = None
+        self._refresh: Optional[asyncio.Future] = None
+
+    @property
+    def niches(self) -> List[str]:
+        """Niches of the enabled channels."""
+        return list(self._rules.niches)
+
+    def invalidate(self) -> None:
+        """Drop the current snapshot so the next request fetches again."""
+        self._snapshot = None
+
+    def _fresh(self) -> bool:
+        return self._snapshot is not None and self._clock() - self._snapshot.fetched_at < self.ttl_seconds
+
+    async def snapshot(self) -> DiscoverySnapshot:
+        """
+        Current snapshot, fetching it if missing or older than the TTL.
+
+        Concurrent callers share a single fetch.
+
+        Returns:
+            DiscoverySnapshot: The snapshot.
+        """
+        if self._fresh():
+            increment("discovery_cache_hits")
+            return self._snapshot
+        if self._refresh is None:
+            increment("discovery_cache_misses")
+            self._refresh = asyncio.ensure_future(self._fetch())
+            self._refresh.add_done_callback(self._clear_refresh)
+        # Shielded so one cancelled niche run does not abort the fetch for the others.
+        return await asyncio.shield(self._refresh)
+
+    def _clear_refresh(self, _: asyncio.Future) -> None:
+        self._refresh = None
+
+    async def get(self, niche: str) -> CandidateBatch:
+        """
+        Candidates for one niche from the shared snapshot.
+
+        Args:
+            niche (str): Niche name.
+
+        Returns:
+            CandidateBatch: The niche's candidates.
+        """
+        return (await self.snapshot()).for_niche(niche)
+
+    async def _fetch(self) -> DiscoverySnapshot:
+        queries, subreddits = self._rules.sources()
+        builder = CandidateBatchBuilder()
+        # Insertion-ordered like the builder's rows, so values line up with the batch.
+        bits: Dict[str, int] = {}
+        async for page in self.fanout.stream(self.config.youtube_regions, subreddits, queries):
+            origin_bit = self._rules.origin_bits.get(page.origin, 0)
+            for candidate in page.candidates:
+                bits[candidate.video_id] = bits.get(candidate.video_id, 0) | origin_bit
+            builder.extend(page.candidates)
+        batch = builder.build()
+        niche_rows = self._rules.classify(batch, np.fromiter(bits.values(), dtype=np.int64, count=len(bits)))
+        if self.classifier is not None:
+            await self._classify_unassigned(batch, niche_rows)
+        self._snapshot = DiscoverySnapshot(batch, niche_rows, self._clock())
+        logger.info(
+            f"Shared discovery fetched {len(batch)} candidates for {len(niche_rows)} niches "
+            f"({', '.join(f'{n}: {len(r)}' for n, r in niche_rows.items())})."
+        )
+        return self._snapshot
+
+    async def _classify_unassigned(self, batch: CandidateBatch, niche_rows: Dict[str, np.ndarray]) -> None:
+        """Run rows no category or source claimed through the keyword/LLM classifier."""
+        assigned = np.zeros(len(batch), dtype=bool)
+        for rows in niche_rows.values():
+            assigned[rows] = True
+        rest = np.flatnonzero(~assigned)
+        if not len(rest):
+            return
+        queries = [
+            NicheQuery(batch.video_ids[i].decode(), batch.titles[i], "", int(batch.category_id[i]))
+            for i in rest.tolist()
+        ]
+        answers = await self.classifier.classify(queries)
+        extra: Dict[str, List[int]] = {niche: [] for niche in niche_rows}
+        for row, query in zip(rest.tolist(), queries):
+            for niche in answers.get(query.video_id, []):
+                if niche in extra:
+                    extra[niche].append(row)
+        for niche, rows in extra.items():
+            if rows:
+                niche_rows[niche] = np.union1d(niche_rows[niche], rows)
@@ -1,6 +1,204 @@
 """
 Discovers viral content from YouTube.
+
+Talks to the YouTube Data API v3 REST endpoints through the shared
+``ConditionalClient``: ``videos.list`` with ``chart=mostPopular`` per region
+(1 quota unit per page), ``search.list`` for recent uploads (100 units) and
+``videos.list`` by ID to fetch statistics for search and Reddit hits.
 """
+import asyncio
+import re
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Sequence
+
+from src.discovery.candidates import SOURCE_SEARCH, SOURCE_TRENDING, RawCandidate
+from src.discovery.http import ConditionalClient
+from src.utils.logging import get_logger
+from src.utils.rate_limit import TokenBucket
+
+logger = get_logger(__name__)
+
+API_BASE = "https://www.googleapis.com/youtube/v3"
+VIDEO_PARTS = "snippet,statistics,contentDetails"
+PAGE_SIZE = 50
+SEARCH_COST = 100
+_DURATION_PATTERN = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
+
+
+class QuotaExceededError(RuntimeError):
+    """Raised when a call would exceed the daily YouTube API quota."""
+
+
+def parse_duration(value: str) -> int:
+    """
+    Convert an ISO 8601 duration (``PT1H2M3S``) to seconds.
+
+    Args:
+        value (str): Duration from ``contentDetails.duration``.
+
+    Returns:
+        int: Seconds, or 0 if the value cannot be parsed.
+    """
+    match = _DURATION_PATTERN.fullmatch(value or "")
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(g) if g else 0 for g in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def parse_timestamp(value: str) -> float:
+    """Convert an RFC 3339 timestamp (``2024-01-01T12:00:00Z``) to a Unix timestamp."""
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def parse_video(item: dict, source: int, reddit_score: int = 0) -> RawCandidate:
+    """
+    Convert a ``videos.list`` item to a candidate.
+
+    Args:
+        item (dict): API resource with snippet, statistics and contentDetails.
+        source (int): ``SOURCE_*`` flag for the candidate.
+        reddit_score (int): Score of the linking Reddit post, if any.
+
+    Returns:
+        RawCandidate: The candidate.
+    """
+    snippet = item.get("snippet", {})
+    stats = item.get("statistics", {})
+    return RawCandidate(
+        video_id=item["id"],
+        title=snippet.get("title", ""),
+        channel_id=snippet.get("channelId", ""),
+        channel_name=snippet.get("channelTitle", ""),
+        source=source,
+        view_count=int(stats.get("viewCount", 0)),
+        like_count=int(stats.get("likeCount", 0)),
+        comment_count=int(stats.get("commentCount", 0)),
+        published_at=parse_timestamp(snippet.get("publishedAt", "")),
+        duration_seconds=parse_duration(item.get("contentDetails", {}).get("duration", "")),
+        category_id=int(snippet.get("categoryId", 0) or 0),
+        reddit_score=reddit_score,
+    )
+
+
 class YouTubeSource:
-    def __init__(self):
-        pass
\ No newline at end of file
+    """YouTube Data API client for trending, search and video lookups."""
+
+    def __init__(
+        self,
+        client: ConditionalClient,
+        api_key: str,
+        limiter: TokenBucket,
+        daily_quota_limit: int = 10000,
+        base_url: str = API_BASE,
+    ):
+        self.client = client
+        self.api_key = api_key
+        self.limiter = limiter
+        self.daily_quota_limit = daily_quota_limit
+        self.base_url = base_url.rstrip("/")
+        self.quota_used = 0
+        self._quota_day = datetime.now(timezone.utc).date()
+
+    def _spend(self, units: int) -> None:
+        """
+        Account for quota before a call.
+
+        Raises:
+            QuotaExceededError: If the call would exceed the daily limit.
+        """
+        today = datetime.now(timezone.utc).date()
+        if today != self._quota_day:
+            self._quota_day, self.quota_used = today, 0
+        if self.quota_used + units > self.daily_quota_limit:
+            raise QuotaExceededError(
+                f"YouTube quota exhausted ({self.quota_used}/{self.daily_quota_limit} units used)"
+            )
+        self.quota_used += units
+
+    async def _get(self, endpoint: str, params: dict, cost: int) -> dict:
+        self._spend(cost)
+        return await self.client.get_json(
+            f"{self.base_url}/{endpoint}", {**params, "key": self.api_key}, self.limiter
+        )
+
+    async def trending(self, region: str, max_results: int = 200) -> AsyncIterator[List[RawCandidate]]:
+        """
+        Yield the most popular videos in a region, one page at a time.
+
+        Args:
+            region (str): ISO 3166 region code (e.g., "US").
+            max_results (int): Stop after this many videos (default: 200).
+
+        Yields:
+            List[RawCandidate]: One page of candidates.
+        """
+        page_token: Optional[str] = None
+        fetched = 0
+        while fetched < max_results:
+            params = {
+                "part": VIDEO_PARTS,
+                "chart": "mostPopular",
+                "regionCode": region,
+                "maxResults": min(PAGE_SIZE, max_results - fetched),
+            }
+            if page_token:
+                params["pageToken"] = page_token
+            data = await self._get("videos", params, cost=1)
+            items = [parse_video(item, SOURCE_TRENDING) for item in data.get("items", [])]
+            if items:
+                yield items
+            fetched += len(items)
+            page_token = data.get("nextPageToken")
+            if not page_token or not items:
+                break
+
+    async def search(self, query: str, published_after: datetime, max_results: int = PAGE_SIZE) -> List[str]:
+        """
+        Find recent uploads matching a query, most viewed first.
+
+        Args:
+            query (str): Search query.
+            published_after (datetime): Only uploads after this time (UTC).
+            max_results (int): Maximum IDs to return (default: 50).
+
+        Returns:
+            List[str]: Video IDs.
+        """
+        data = await self._get("search", {
+            "part": "id",
+            "type": "video",
+            "q": query,
+            "order": "viewCount",
+            "publishedAfter": published_after.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "maxResults": min(max_results, PAGE_SIZE),
+        }, cost=SEARCH_COST)
+        return [item["id"]["videoId"] for item in data.get("items", []) if "videoId" in item.get("id", {})]
+
+    async def videos(
+        self, video_ids: Sequence[str], source: int = SOURCE_SEARCH, reddit_scores: Optional[dict] = None
+    ) -> List[RawCandidate]:
+        """
+        Fetch statistics for videos by ID, 50 per request, requests in parallel.
+
+        Args:
+            video_ids (Sequence[str]): IDs to look up.
+            source (int): ``SOURCE_*`` flag for the candidates.
+            reddit_scores (Optional[dict]): Reddit score per video ID.
+
+        Returns:
+            List[RawCandidate]: Candidates for the IDs that still exist.
+        """
+        ids = list(dict.fromkeys(video_ids))
+        chunks = [ids[i:i + PAGE_SIZE] for i in range(0, len(ids), PAGE_SIZE)]
+        pages = await asyncio.gather(*(
+            self._get("videos", {"part": VIDEO_PARTS, "id": ",".join(chunk), "maxResults": PAGE_SIZE}, cost=1)
+            for chunk in chunks
+        ))
+        scores = reddit_scores or {}
+        return [
+            parse_video(item, source, scores.get(item["id"], 0))
+            for page in pages for item in page.get("items", [])
+        ]
@@ -1 +1,13 @@
-"""Placeholder for src.llm package."""
+"""
+LLM access: the provider-agnostic client and prompt templates.
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "LLMClient": "src.llm.client",
+    "LLMError": "src.llm.client",
+    "PromptLibrary": "src.llm.prompts",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
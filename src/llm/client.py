@@ -1 +1,498 @@
-"""Placeholder: LLM client abstraction."""
+"""
+LLM client abstraction (SPEC §8).
+
+Every LLM call goes through ``LLMClient``. It talks to any OpenAI-compatible
+endpoint, retries the primary provider and then falls back to the secondary
+one. Providers whose circuit breaker is open are skipped, and a request the
+primary has not answered within its rolling p95 latency is hedged to the
+fallback, the first answer winning (see ``src.llm.routing``).
+
+The batch methods pack many videos into one request with a JSON answer keyed
+by item ID; a batch whose answer is truncated or malformed is split in half
+and retried, so a bad estimate costs one extra call rather than the whole
+batch.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from src.config import LLMConfig
+from src.llm.prompts import (
+    NICHE_CLASSIFICATION_BATCH,
+    TRANSCRIPT_ANALYSIS_BATCH,
+    BatchItem,
+    PromptLibrary,
+    estimate_tokens,
+    pack_batches,
+)
+from src.llm.routing import OPEN, CircuitBreaker, LatencyTracker, ProviderRoute
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
+
+logger = get_logger(__name__)
+
+JSON_SYSTEM_PROMPT = "You are a precise assistant. Reply with valid JSON only."
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+# Expected answer size per item, used to size batches against max_tokens.
+NICHE_TOKENS_PER_ITEM = 24
+MOMENT_TOKENS_PER_ITEM = 60
+
+
+class LLMError(RuntimeError):
+    """Raised when every provider fails or returns an unusable answer."""
+
+
+class AnswerError(LLMError):
+    """Raised when a provider answers but the reply is truncated or not valid JSON."""
+
+
+class Completion(NamedTuple):
+    """Text of a chat completion and why generation stopped."""
+    text: str
+    finish_reason: str
+
+
+class Moment(NamedTuple):
+    """A highlight chosen from a transcript."""
+    start: float
+    end: float
+    reason: str
+
+
+def parse_json_reply(text: str) -> Any:
+    """
+    Decode a model's JSON answer, tolerating reasoning blocks and code fences.
+
+    Args:
+        text (str): Raw completion text.
+
+    Returns:
+        Any: The decoded value.
+
+    Raises:
+        ValueError: If no JSON value can be decoded.
+    """
+    text = _CODE_FENCE.sub("", _THINK_BLOCK.sub("", text).strip())
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        start = text.find("{")
+        end = text.rfind("}")
+        if start == -1 or end <= start:
+            raise ValueError(f"No JSON object in reply: {text[:200]!r}")
+        return json.loads(text[start:end + 1])
+
+
+class LLMClient:
+    """Chat completions against the configured providers, with fallback."""
+
+    def __init__(self, config: LLMConfig, prompts: Optional[PromptLibrary] = None):
+        from openai import AsyncOpenAI
+
+        self.config = config
+        self.prompts = prompts if prompts is not None else PromptLibrary(config.prompt_dir)
+        self._routes: List[ProviderRoute] = [
+            ProviderRoute(
+                provider,
+                AsyncOpenAI(
+                    base_url=provider.base_url,
+                    api_key=provider.api_key or "not-needed",
+                    timeout=provider.timeout_seconds,
+                    max_retries=0,
+                ),
+                LatencyTracker(config.latency_window),
+                CircuitBreaker(config.breaker_failure_threshold, config.breaker_reset_seconds),
+            )
+            for provider in (config.primary, config.fallback) if provider is not None
+        ]
+        self._batch_slots = asyncio.Semaphore(config.batch_concurrency)
+
+    @property
+    def max_tokens(self) -> int:
+        """Smallest ``max_tokens`` across providers, so batches fit whichever answers."""
+        return min(route.config.max_tokens for route in self._routes)
+
+    @property
+    def context_window(self) -> int:
+        """Smallest context window across providers."""
+        return min(route.config.context_window for route in self._routes)
+
+    def provider_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Rolling p50/p95 latency and circuit state per provider."""
+        return {route.name: route.stats() for route in self._routes}
+
+    async def _request(self, route: ProviderRoute, params: Dict[str, Any]) -> Completion:
+        increment("llm_requests", provider=route.name)
+        started = time.monotonic()
+        try:
+            response = await route.client.chat.completions.create(**params)
+        except asyncio.CancelledError:
+            route.breaker.release()
+            raise
+        except Exception:
+            increment("llm_errors", provider=route.name)
+            if route.breaker.record_failure():
+                increment("llm_circuit_opened", provider=route.name)
+                logger.warning(f"Circuit for LLM provider {route.name} opened for "
+                               f"{route.breaker.reset_seconds:.0f}s after repeated failures.")
+            raise
+        route.latency.record(time.monotonic() - started)
+        route.breaker.record_success()
+        choice = response.choices[0]
+        return Completion(choice.message.content or "", choice.finish_reason or "stop")
+
+    async def _with_retries(self, route: ProviderRoute, params: Dict[str, Any], errors: List[str]) -> Completion:
+        for attempt in range(route.config.max_retries):
+            try:
+                return await self._request(route, params)
+            except Exception as e:
+                errors.append(f"{route.name}: {e}")
+                logger.warning(f"LLM provider {route.name} attempt {attempt + 1} failed: {e}")
+                if route.breaker.state == OPEN:
+                    break
+                if attempt + 1 < route.config.max_retries:
+                    await asyncio.sleep(min(2 ** attempt, 10))
+        raise LLMError(f"LLM provider {route.name} failed")
+
+    def _hedge_delay(self, route: ProviderRoute) -> Optional[float]:
+        """How long to wait for ``route`` before hedging, or None to never hedge."""
+        if not self.config.hedge_requests or len(self._routes) < 2:
+            return None
+        if len(route.latency) < self.config.hedge_min_samples:
+            return None
+        return max(route.latency.p95, self.config.hedge_min_delay_seconds)
+
+    @staticmethod
+    async def _first_success(tasks: List[asyncio.Future]) -> Optional[Completion]:
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _chat(self, messages: List[dict], json_mode: bool = False, **kwargs: Any) -> Completion:
+        """
+        Send one chat request with routing, hedging and fallback.
+
+        Providers with an open circuit are skipped, and when no circuit lets
+        a request through (closed, or half-open with its trial free) the call
+        fails without one. If the first provider has not answered within its
+        rolling p95 latency, the same request also goes to the next provider
+        and the first successful answer wins; the slower request is cancelled.
+
+        Raises:
+            LLMError: If every circuit is open or every provider fails.
+        """
+        def params_for(route: ProviderRoute) -> Dict[str, Any]:
+            params = {
+                "model": route.config.model,
+                "messages": messages,
+                "max_tokens": route.config.max_tokens,
+                "temperature": route.config.temperature,
+                **kwargs,
+            }
+            if json_mode:
+                params["response_format"] = {"type": "json_object"}
+            return params
+
+        errors: List[str] = []
+        candidates = (route for route in self._routes if route.breaker.allow())
+        first = next(candidates, None)
+        if first is None:
+            increment("llm_circuit_rejections")
+            raise LLMError("All LLM provider circuits are open")
+
+        primary = asyncio.ensure_future(self._with_retries(first, params_for(first), errors))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self._hedge_delay(first))
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            if primary.exception() is None:
+                return primary.result()
+        else:
+            backup = next(candidates, None)
+            if backup is None:
+                tasks = [primary]
+            else:
+                increment("llm_hedged", provider=backup.name)
+                logger.info(f"LLM provider {first.name} slower than its p95; hedging with {backup.name}.")
+                tasks = [primary, asyncio.ensure_future(self._with_retries(backup, params_for(backup), errors))]
+            result = await self._first_success(tasks)
+            if result is not None:
+                if len(tasks) > 1 and tasks[1].done() and not tasks[1].cancelled() and tasks[1].exception() is None:
+                    increment("llm_hedge_wins", provider=backup.name)
+                return result
+
+        for route in candidates:
+            try:
+                return await self._with_retries(route, params_for(route), errors)
+            except LLMError:
+                continue
+        raise LLMError("All LLM providers failed: " + "; ".join(errors[-3:]))
+
+    @staticmethod
+    def _messages(prompt: str, system_prompt: Optional[str]) -> List[dict]:
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    async def complete(self, prompt: str, system_prompt: Optional[str] = None, **kwargs: Any) -> str:
+        """
+        Plain text completion.
+
+        Args:
+            prompt (str): User prompt.
+            system_prompt (Optional[str]): System prompt.
+            **kwargs: Extra chat completion parameters.
+
+        Returns:
+            str: The reply text.
+
+        Raises:
+            LLMError: If every provider fails.
+        """
+        completion = await self._chat(self._messages(prompt, system_prompt), **kwargs)
+        return _THINK_BLOCK.sub("", completion.text).strip()
+
+    async def complete_json(
+        self, prompt: str, system_prompt: Optional[str] = None, schema: Optional[dict] = None, **kwargs: Any
+    ) -> Any:
+        """
+        Completion decoded as JSON.
+
+        Args:
+            prompt (str): User prompt.
+            system_prompt (Optional[str]): System prompt (default: a JSON-only instruction).
+            schema (Optional[dict]): JSON schema appended to the prompt as guidance.
+            **kwargs: Extra chat completion parameters.
+
+        Returns:
+            Any: The decoded reply.
+
+        Raises:
+            AnswerError: If the reply is truncated or not JSON.
+            LLMError: If every provider fails.
+        """
+        if schema is not None:
+            prompt = f"{prompt}\n\nJSON schema:\n{json.dumps(schema)}"
+        completion = await self._chat(
+            self._messages(prompt, system_prompt or JSON_SYSTEM_PROMPT), json_mode=True, **kwargs
+        )
+        if completion.finish_reason == "length":
+            raise AnswerError("Reply was truncated at max_tokens")
+        try:
+            return parse_json_reply(completion.text)
+        except ValueError as e:
+            raise AnswerError(f"Reply is not valid JSON: {e}") from e
+
+    async def classify(self, text: str, categories: Sequence[str], **kwargs: Any) -> str:
+        """
+        Pick one category for a text.
+
+        Args:
+            text (str): Text to classify.
+            categories (Sequence[str]): Allowed labels.
+
+        Returns:
+            str: One of ``categories``.
+
+        Raises:
+            LLMError: If the reply is not one of the categories.
+        """
+        reply = await self.complete(
+            f"Classify the text into exactly one of: {', '.join(categories)}.\n"
+            f"Reply with the category name only.\n\nText:\n{text}",
+            temperature=0.0,
+            **kwargs,
+        )
+        label = reply.strip().strip(".\"'").lower()
+        for category in categories:
+            if category.lower() == label:
+                return category
+        raise LLMError(f"Unexpected category {reply!r}")
+
+    async def summarize(self, text: str, max_length: int = 200, **kwargs: Any) -> str:
+        """
+        Summarize a text.
+
+        Args:
+            text (str): Text to summarize.
+            max_length (int): Maximum characters (default: 200).
+
+        Returns:
+            str: The summary.
+        """
+        summary = await self.complete(
+            f"Summarize the following in at most {max_length} characters.\n\n{text}", **kwargs
+        )
+        return summary[:max_length]
+
+    @timed("llm_batch")
+    async def complete_json_batch(
+        self,
+        template: str,
+        items: Sequence[BatchItem],
+        output_tokens_per_item: int,
+        system_prompt: Optional[str] = None,
+        **context: Any,
+    ) -> Dict[str, dict]:
+        """
+        Run a batch template over many items in as few requests as fit.
+
+        Items are packed so each prompt fits the context window and each
+        answer fits ``max_tokens``. Batches run concurrently up to
+        ``batch_concurrency``. A batch whose answer is truncated, malformed
+        or has none of its items is split in half; items missing from an
+        otherwise usable answer are re-sent together as one smaller batch. An
+        item that fails on its own is left out of the result, as is every
+        item of a batch no provider could answer.
+
+        Args:
+            template (str): Batch template name.
+            items (Sequence[BatchItem]): Items with unique IDs.
+            output_tokens_per_item (int): Expected answer tokens per item.
+            system_prompt (Optional[str]): System prompt.
+            **context: Shared template variables.
+
+        Returns:
+            Dict[str, dict]: Result object per item ID.
+        """
+        if not items:
+            return {}
+        overhead = self.prompts.overhead_tokens(template, **context)
+        system_tokens = estimate_tokens(system_prompt or JSON_SYSTEM_PROMPT)
+        prompt_budget = self.context_window - self.max_tokens - overhead - system_tokens
+        batches = list(pack_batches(
+            items,
+            self.prompts.item_tokens(template, **context),
+            max(prompt_budget, 1),
+            output_tokens_per_item,
+            self.max_tokens,
+            self.config.batch_max_items,
+        ))
+        increment("llm_batch_items", len(items))
+        logger.info(f"Packed {len(items)} items into {len(batches)} {template} requests.")
+        results: Dict[str, dict] = {}
+        await asyncio.gather(*(
+            self._run_batch(template, batch, output_tokens_per_item, system_prompt, context, results)
+            for batch in batches
+        ))
+        return results
+
+    async def _run_batch(
+        self,
+        template: str,
+        batch: List[BatchItem],
+        output_tokens_per_item: int,
+        system_prompt: Optional[str],
+        context: Mapping[str, Any],
+        results: Dict[str, dict],
+    ) -> None:
+        prompt = self.prompts.render_batch(template, batch, **context)
+        max_tokens = min(self.max_tokens, max(256, 2 * output_tokens_per_item * len(batch)))
+        try:
+            async with self._batch_slots:
+                reply = await self.complete_json(prompt, system_prompt, max_tokens=max_tokens, temperature=0.0)
+            wanted = {item.id for item in batch}
+            answered = {
+                str(entry["id"]): entry
+                for entry in (reply.get("results", []) if isinstance(reply, dict) else [])
+                if isinstance(entry, dict) and str(entry.get("id")) in wanted
+            }
+            if not answered:
+                raise AnswerError("answer contains none of the batch's items")
+        except AnswerError as e:
+            if len(batch) == 1:
+                logger.error(f"LLM batch item {batch[0].id} failed: {e}")
+                return
+            logger.warning(f"LLM batch of {len(batch)} failed ({e}); splitting.")
+            increment("llm_batch_splits")
+            middle = len(batch) // 2
+            await asyncio.gather(
+                self._run_batch(template, batch[:middle], output_tokens_per_item, system_prompt, context, results),
+                self._run_batch(template, batch[middle:], output_tokens_per_item, system_prompt, context, results),
+            )
+            return
+        except LLMError as e:
+            # The providers are failing, not the answer: smaller batches would only multiply the failures.
+            logger.error(f"LLM batch of {len(batch)} items failed: {e}")
+            return
+        results.update(answered)
+        missing = [item for item in batch if item.id not in answered]
+        if missing:
+            await self._run_batch(template, missing, output_tokens_per_item, system_prompt, context, results)
+
+    async def classify_niches_batch(
+        self, videos: Mapping[str, Tuple[str, str]], niches: Sequence[str]
+    ) -> Dict[str, List[str]]:
+        """
+        Classify many videos into niches.
+
+        Args:
+            videos (Mapping[str, Tuple[str, str]]): (title, description) per video ID.
+            niches (Sequence[str]): Allowed niche names.
+
+        Returns:
+            Dict[str, List[str]]: Niches per video ID, for the videos the model answered.
+        """
+        allowed = set(niches)
+        items = [
+            BatchItem(video_id, {"title": title, "description": (description or "")[:300]})
+            for video_id, (title, description) in videos.items()
+        ]
+        replies = await self.complete_json_batch(
+            NICHE_CLASSIFICATION_BATCH, items, NICHE_TOKENS_PER_ITEM, niches=list(niches)
+        )
+        return {
+            video_id: [n for n in reply.get("niches", []) if n in allowed]
+            for video_id, reply in replies.items()
+        }
+
+    async def find_moments_batch(
+        self,
+        transcripts: Mapping[str, Tuple[str, str]],
+        min_seconds: float = 15,
+        max_seconds: float = 25,
+    ) -> Dict[str, Moment]:
+        """
+        Pick the best moment from many transcripts (SPEC §4.3, method 2).
+
+        Args:
+            transcripts (Mapping[str, Tuple[str, str]]): (title, timestamped
+                transcript) per video ID.
+            min_seconds (float): Shortest moment (default: 15).
+            max_seconds (float): Longest moment (default: 25).
+
+        Returns:
+            Dict[str, Moment]: Moment per video ID, for valid answers only.
+        """
+        items = [
+            BatchItem(video_id, {"title": title, "transcript": transcript})
+            for video_id, (title, transcript) in transcripts.items()
+        ]
+        replies = await self.complete_json_batch(
+            TRANSCRIPT_ANALYSIS_BATCH, items, MOMENT_TOKENS_PER_ITEM,
+            min_seconds=min_seconds, max_seconds=max_seconds,
+        )
+        moments = {}
+        for video_id, reply in replies.items():
+            try:
+                start, end = float(reply["start"]), float(reply["end"])
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Ignoring malformed moment for {video_id}: {reply}")
+                continue
+            if end > start >= 0:
+                moments[video_id] = Moment(start, end, str(reply.get("reason", "")))
+        return moments
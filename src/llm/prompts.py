@@ -1 +1,141 @@
-"""Placeholder: Prompt templates."""
+"""
+Prompt templates and batch packing for LLM calls.
+
+Templates are Jinja2 files in ``config/prompts/`` (SPEC §8.4). Batch templates
+receive a list of items, each with an ``id`` the model must echo back, and
+ask for a single JSON object ``{"results": [{"id": ..., ...}, ...]}`` so one
+request covers many videos. ``pack_batches`` splits item lists so that each
+request's prompt fits the context window and its answer fits ``max_tokens``.
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Sequence
+
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+NICHE_CLASSIFICATION_BATCH = "niche_classification_batch.j2"
+TRANSCRIPT_ANALYSIS_BATCH = "transcript_analysis_batch.j2"
+
+# Rough English average for BPE tokenizers; only used to size batches.
+CHARS_PER_TOKEN = 4
+
+
+class BatchItem(NamedTuple):
+    """One unit of work inside a batched prompt."""
+    id: str
+    fields: Dict[str, Any]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate for batch sizing.
+
+    Args:
+        text (str): Prompt text.
+
+    Returns:
+        int: Approximate token count (at least 1).
+    """
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def pack_batches(
+    items: Sequence[BatchItem],
+    item_tokens: Callable[[BatchItem], int],
+    prompt_budget: int,
+    output_tokens_per_item: int,
+    max_output_tokens: int,
+    max_items: int,
+) -> Iterator[List[BatchItem]]:
+    """
+    Greedily group items into batches that fit both token budgets.
+
+    An item larger than ``prompt_budget`` on its own still gets a batch of
+    one; truncating it is the caller's job.
+
+    Args:
+        items (Sequence[BatchItem]): Items in order.
+        item_tokens (Callable[[BatchItem], int]): Prompt tokens one item adds.
+        prompt_budget (int): Prompt tokens available for items.
+        output_tokens_per_item (int): Expected answer tokens per item.
+        max_output_tokens (int): The provider's ``max_tokens``.
+        max_items (int): Hard cap on items per batch.
+
+    Yields:
+        List[BatchItem]: One batch.
+    """
+    per_batch = max(1, min(max_items, max_output_tokens // max(output_tokens_per_item, 1)))
+    batch: List[BatchItem] = []
+    used = 0
+    for item in items:
+        cost = item_tokens(item)
+        if batch and (len(batch) >= per_batch or used + cost > prompt_budget):
+            yield batch
+            batch, used = [], 0
+        batch.append(item)
+        used += cost
+    if batch:
+        yield batch
+
+
+class PromptLibrary:
+    """Loads and renders the Jinja2 prompt templates."""
+
+    def __init__(self, prompt_dir: str = "config/prompts"):
+        from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+        self.prompt_dir = Path(prompt_dir)
+        self._env = Environment(
+            loader=FileSystemLoader(str(self.prompt_dir)),
+            undefined=StrictUndefined,
+            keep_trailing_newline=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+
+    def render(self, name: str, **context: Any) -> str:
+        """
+        Render a template.
+
+        Args:
+            name (str): Template file name (e.g., "niche_classification_batch.j2").
+            **context: Template variables.
+
+        Returns:
+            str: The rendered prompt.
+        """
+        return self._env.get_template(name).render(**context).strip()
+
+    def render_batch(self, name: str, items: Sequence[BatchItem], **context: Any) -> str:
+        """
+        Render a batch template over ``items``.
+
+        Args:
+            name (str): Template file name.
+            items (Sequence[BatchItem]): Items, exposed to the template as
+                ``items`` with ``id`` and the item's fields.
+            **context: Shared template variables.
+
+        Returns:
+            str: The rendered prompt.
+        """
+        return self.render(name, items=[{"id": item.id, **item.fields} for item in items], **context)
+
+    def item_tokens(self, name: str, **context: Any) -> Callable[[BatchItem], int]:
+        """
+        Per-item prompt cost for ``pack_batches``, measured by rendering a one-item batch.
+
+        Args:
+            name (str): Batch template file name.
+            **context: Shared template variables.
+
+        Returns:
+            Callable[[BatchItem], int]: Estimated tokens one item adds.
+        """
+        overhead = estimate_tokens(self.render(name, items=[], **context))
+        return lambda item: max(1, estimate_tokens(self.render_batch(name, [item], **context)) - overhead)
+
+    def overhead_tokens(self, name: str, **context: Any) -> int:
+        """Tokens the template costs with no items."""
+        return estimate_tokens(self.render(name, items=[], **context))
@@ -0,0 +1,136 @@
+"""
+Latency tracking and circuit breaking for LLM providers.
+
+``LLMClient`` keeps one ``ProviderRoute`` per configured provider. Each
+route records the latency of its successful requests in a rolling window
+(p50/p95 drive request hedging) and owns a circuit breaker that takes a
+provider out of rotation after repeated failures and lets a single trial
+request through once the cool-down has passed.
+"""
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from src.config import LLMProviderConfig
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class LatencyTracker:
+    """Rolling window of request latencies in seconds."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """Add one latency sample."""
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The ``q``-th percentile (0-100), or None without samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        # Linear interpolation between closest ranks.
+        rank = (len(ordered) - 1) * q / 100.0
+        low = int(rank)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+    @property
+    def p50(self) -> Optional[float]:
+        """Median latency."""
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        """95th-percentile latency."""
+        return self.percentile(95)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; half-opens after ``reset_seconds``."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half_open``."""
+        if self._opened_at is None:
+            return CLOSED
+        if self._clock() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self) -> bool:
+        """
+        Whether a request may be sent now. In the half-open state only one
+        trial request is let through until it reports back.
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """
+        Count a failure.
+
+        Returns:
+            bool: True if this failure opened (or re-opened) the circuit.
+        """
+        self._failures += 1
+        was_trial = self._trial_running
+        self._trial_running = False
+        if was_trial or self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give back a half-open trial that was cancelled before it finished."""
+        self._trial_running = False
+
+
+class ProviderRoute:
+    """A provider's config and client with its latency window and breaker."""
+
+    def __init__(self, config: LLMProviderConfig, client: Any, latency: LatencyTracker, breaker: CircuitBreaker):
+        self.config = config
+        self.client = client
+        self.latency = latency
+        self.breaker = breaker
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency percentiles, sample count and breaker state, for status reports."""
+        return {
+            "p50": self.latency.p50,
+            "p95": self.latency.p95,
+            "samples": len(self.latency),
+            "circuit": self.breaker.state,
+        }
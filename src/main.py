@@ -1,3 +1,296 @@
 """
 Main entry point for the Last SiX Hours automated YouTube content pipeline.
-"""
\ No newline at end of file
+
+Each role is a subcommand that imports only the subsystems it uses, so
+one-off commands (``init-db``, ``status``) start without loading aiohttp,
+NumPy or the Telegram library:
+
+    python -m src.main init-db
+    python -m src.main status --limit 20
+    python -m src.main serve-review
+    python -m src.main optimize-weights
+    python -m src.main simulate-schedule --channels 12 --weeks 4
+    python -m src.main maintain-db
+    python -m src.main run
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+DEFAULT_CONFIG_PATH = "config/config.yaml"
+
+
+def _database_path(args: argparse.Namespace) -> str:
+    """Database location: ``--database`` or ``{working_dir}/data/viral_channel.db``."""
+    if args.database:
+        return args.database
+    from src.config import load_config
+
+    return os.path.join(load_config(args.config).general.working_dir, "data", "viral_channel.db")
+
+
+def _open_database(args: argparse.Namespace, archive: bool = False):
+    """Open the database, with the retention archive attached if ``archive``."""
+    from src.database import archive_path_for, init_db
+
+    path = _database_path(args)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return init_db(path, archive_path_for(path) if archive else None)
+
+
+async def _wait_for_shutdown() -> None:
+    """Block until SIGINT or SIGTERM."""
+    import asyncio
+    import signal
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+
+def cmd_init_db(args: argparse.Namespace) -> int:
+    """Create the database schema and exit."""
+    _open_database(args)
+    print(f"Database initialized at {_database_path(args)}")
+    return 0
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    """Print the most recent pipeline runs."""
+    from sqlalchemy import select
+
+    from src.database import PipelineRun, get_session
+
+    session = get_session(_open_database(args))
+    try:
+        runs = session.scalars(
+            select(PipelineRun).order_by(PipelineRun.id.desc()).limit(args.limit)
+        ).all()
+    finally:
+        session.close()
+    if not runs:
+        print("No pipeline runs yet.")
+    for run in runs:
+        print(f"#{run.id:<5} {run.niche:<10} {run.status:<12} "
+              f"{run.cycle_start:%Y-%m-%d %H:%M} {run.youtube_url or ''}")
+    return 0
+
+
+def cmd_optimize_weights(args: argparse.Namespace) -> int:
+    """Propose new discovery scoring weights from channel analytics."""
+    from src.analytics.channel_analytics import AnalyticsStore
+    from src.analytics.weight_optimizer import WeightOptimizer
+    from src.config import load_config
+
+    config = load_config(args.config)
+    store = AnalyticsStore(os.path.join(config.general.working_dir, "data", "analytics.npz"))
+    proposal = WeightOptimizer(_open_database(args), store, config.discovery).propose()
+    for line in proposal.config_diff() or ["No change proposed."]:
+        print(line)
+    return 0
+
+
+def _retention_pass(engine, retention) -> None:
+    from src.database import archive_discovered_videos, get_session, maintain_database
+
+    session = get_session(engine)
+    try:
+        archive_discovered_videos(session, retention.archive_after_days)
+    finally:
+        session.close()
+    maintain_database(engine, retention.vacuum_pages, retention.analysis_limit)
+
+
+def cmd_maintain_db(args: argparse.Namespace) -> int:
+    """Archive old discovery rows and vacuum/analyze the database once."""
+    from src.config import load_config
+
+    _retention_pass(_open_database(args, archive=True), load_config(args.config).retention)
+    return 0
+
+
+async def _maintain_periodically(engine, retention) -> None:
+    """Run the retention pass every ``maintenance_interval_hours``."""
+    import asyncio
+
+    from src.utils.logging import get_logger
+
+    logger = get_logger(__name__)
+    while True:
+        try:
+            await asyncio.to_thread(_retention_pass, engine, retention)
+        except Exception as e:
+            logger.error(f"Database maintenance failed: {e}")
+        await asyncio.sleep(retention.maintenance_interval_hours * 3600)
+
+
+async def _serve_review(args: argparse.Namespace) -> None:
+    from src.config import load_config
+    from src.publishing.file_server import ReviewFileServer
+
+    config = load_config(args.config)
+    server = ReviewFileServer(config.review_server, config.general)
+    await server.start()
+    try:
+        await _wait_for_shutdown()
+    finally:
+        await server.stop()
+
+
+def cmd_simulate_schedule(args: argparse.Namespace) -> int:
+    """Simulate the channel schedules against the concurrency limits."""
+    from datetime import datetime, timedelta
+
+    from src.config import load_config
+    from src.orchestrator.simulator import ScheduleSimulator, StageDurations, channel_schedules
+
+    config = load_config(args.config)
+    limits = {
+        "max_concurrent_pipelines": args.pipelines,
+        "max_concurrent_downloads": args.downloads,
+        "max_concurrent_renders": args.renders,
+        "max_concurrent_tts": args.tts,
+    }
+    scheduler = config.scheduler.model_copy(update={k: v for k, v in limits.items() if v is not None})
+    durations = StageDurations()
+    if args.history_days > 0:
+        since = datetime.utcnow() - timedelta(days=args.history_days)
+        durations = StageDurations.from_history(_open_database(args), since)
+    simulator = ScheduleSimulator(
+        channel_schedules(config.channels, args.channels, args.stagger_minutes),
+        scheduler,
+        config.telegram,
+        durations,
+        downloads_per_run=config.video.downloads_per_run,
+        seed=args.seed,
+    )
+    print(simulator.run(args.weeks * 7).format())
+    return 0
+
+
+def cmd_serve_review(args: argparse.Namespace) -> int:
+    """Serve signed review links until interrupted."""
+    import asyncio
+
+    asyncio.run(_serve_review(args))
+    return 0
+
+
+async def _run(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from src.orchestrator.config_service import ConfigService
+    from src.orchestrator.storage import StorageManager
+    from src.publishing.file_server import ReviewFileServer
+    from src.utils.logging import setup_logging
+    from src.utils.metrics import export_periodically
+
+    engine = _open_database(args, archive=True)
+    service = ConfigService(args.config, engine=engine)
+    config = service.config
+    general = config.general
+    logger = setup_logging(
+        general.log_dir,
+        general.log_level,
+        async_queue=general.log_async,
+        queue_size=general.log_queue_size,
+        overflow=general.log_overflow,
+        per_module_files=general.log_per_module_files,
+    )
+    storage = StorageManager(general, config.storage)
+    server = ReviewFileServer(config.review_server, general)
+
+    service.start()
+    await server.start()
+    maintenance = asyncio.create_task(_maintain_periodically(engine, config.retention))
+    metrics = None
+    if general.metrics_file:
+        metrics = asyncio.create_task(
+            export_periodically(general.metrics_file, general.metrics_export_interval_seconds)
+        )
+    logger.info("Services started.")
+    try:
+        if not await storage.check_free_space():
+            logger.warning("Starting with low disk space on the working directory.")
+        await _wait_for_shutdown()
+    finally:
+        logger.info("Shutting down.")
+        maintenance.cancel()
+        await server.stop()
+        await service.stop()
+        await storage.wait_for_archives()
+        if metrics is not None:
+            # Cancelling writes the final snapshot.
+            metrics.cancel()
+            await asyncio.gather(metrics, return_exceptions=True)
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    """Start the long-running services until interrupted."""
+    import asyncio
+
+    asyncio.run(_run(args))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command-line parser.
+
+    Returns:
+        argparse.ArgumentParser: Parser with one subcommand per role.
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.main", description="Last SiX Hours pipeline")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="Path to config.yaml")
+    parser.add_argument("--database", help="SQLite database path (default: under working_dir)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("init-db", help="Create the database schema").set_defaults(func=cmd_init_db)
+
+    status = sub.add_parser("status", help="Show recent pipeline runs")
+    status.add_argument("--limit", type=int, default=10)
+    status.set_defaults(func=cmd_status)
+
+    sub.add_parser("serve-review", help="Serve review links").set_defaults(func=cmd_serve_review)
+    sub.add_parser(
+        "optimize-weights", help="Propose discovery scoring weights"
+    ).set_defaults(func=cmd_optimize_weights)
+    sub.add_parser("run", help="Start the long-running services").set_defaults(func=cmd_run)
+    sub.add_parser(
+        "maintain-db", help="Archive old discovery rows and vacuum the database"
+    ).set_defaults(func=cmd_maintain_db)
+
+    simulate = sub.add_parser("simulate-schedule", help="Simulate schedules against the concurrency limits")
+    simulate.add_argument("--channels", type=int, help="Channels to simulate (default: the enabled ones)")
+    simulate.add_argument("--weeks", type=float, default=4.0)
+    simulate.add_argument("--pipelines", type=int, help="Override scheduler.max_concurrent_pipelines")
+    simulate.add_argument("--downloads", type=int, help="Override scheduler.max_concurrent_downloads")
+    simulate.add_argument("--renders", type=int, help="Override scheduler.max_concurrent_renders")
+    simulate.add_argument("--tts", type=int, help="Override scheduler.max_concurrent_tts")
+    simulate.add_argument("--stagger-minutes", type=float, default=30.0)
+    simulate.add_argument("--history-days", type=int, default=30,
+                          help="Stage durations from this much history (0: SPEC estimates only)")
+    simulate.add_argument("--seed", type=int, default=0)
+    simulate.set_defaults(func=cmd_simulate_schedule)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Parse arguments and run the selected role.
+
+    Args:
+        argv (Optional[List[str]]): Arguments (default: ``sys.argv[1:]``).
+
+    Returns:
+        int: Process exit code.
+    """
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
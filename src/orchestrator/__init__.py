@@ -1 +1,14 @@
-"""Placeholder for src.orchestrator package."""
+"""
+Orchestration: runtime config, storage management, scheduling and the pipeline.
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "ConfigService": "src.orchestrator.config_service",
+    "InsufficientStorageError": "src.orchestrator.storage",
+    "ScheduleSimulator": "src.orchestrator.simulator",
+    "StorageManager": "src.orchestrator.storage",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
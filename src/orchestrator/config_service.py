@@ -0,0 +1,359 @@
+"""
+Runtime configuration service.
+
+Holds the current ``AppConfig`` for a running process. The YAML file is
+parsed through ``load_config`` (cached on mtime and content hash) and watched
+for edits; ``config_overrides`` rows from the database are applied on top as
+targeted patches that re-validate only the section they touch. Subsystems
+subscribe to the dotted paths they care about and are called when those
+values change, instead of polling.
+
+Merge order (SPEC §7.3): YAML defaults < environment variables < database overrides.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import yaml
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.config import YAML_LOADER, AppConfig, load_config
+from src.database import delete_config_override, get_config_overrides, get_session, set_config_override
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+ChangeCallback = Callable[[AppConfig, Set[str]], None]
+PathSegment = Union[str, int]
+
+
+def parse_override_value(raw: str) -> Any:
+    """
+    Parse an override stored as text into a typed value.
+
+    Values are YAML scalars or flow collections, so "100", "true",
+    "0.25" and "[a, b]" become int, bool, float and list.
+
+    Args:
+        raw (str): The stored value.
+
+    Returns:
+        Any: The parsed value.
+    """
+    return yaml.load(raw, Loader=YAML_LOADER)
+
+
+def _resolve_segment(node: Any, segment: str) -> PathSegment:
+    """
+    Turn one dotted-path segment into an attribute name or list index.
+
+    List elements can be addressed by index or, for models with a ``name``
+    field such as channels, by name.
+
+    Raises:
+        KeyError: If the segment does not exist.
+    """
+    if isinstance(node, BaseModel):
+        if segment not in type(node).model_fields:
+            raise KeyError(segment)
+        return segment
+    if isinstance(node, list):
+        if segment.isdigit() and int(segment) < len(node):
+            return int(segment)
+        for index, item in enumerate(node):
+            if getattr(item, "name", None) == segment:
+                return index
+    raise KeyError(segment)
+
+
+def _child(node: Any, segment: PathSegment) -> Any:
+    return node[segment] if isinstance(segment, int) else getattr(node, segment)
+
+
+def _split_path(config: AppConfig, key: str) -> Tuple[Tuple[PathSegment, ...], str]:
+    """
+    Resolve a dotted key to the path of the model that owns it and the field name.
+
+    Raises:
+        KeyError: If the key does not name a field of a config model.
+    """
+    *parents, field = key.split(".")
+    node: Any = config
+    path: List[PathSegment] = []
+    for segment in parents:
+        resolved = _resolve_segment(node, segment)
+        path.append(resolved)
+        node = _child(node, resolved)
+    if not isinstance(node, BaseModel) or field not in type(node).model_fields:
+        raise KeyError(f"Unknown config key: {key}")
+    return tuple(path), field
+
+
+def _replace(node: Any, path: Tuple[PathSegment, ...], value: Any) -> Any:
+    """Copy-on-write replacement of the node at ``path``; siblings are shared."""
+    if not path:
+        return value
+    head, rest = path[0], path[1:]
+    if isinstance(head, int):
+        items = list(node)
+        items[head] = _replace(items[head], rest, value)
+        return items
+    return node.model_copy(update={head: _replace(getattr(node, head), rest, value)})
+
+
+def patch_config(config: AppConfig, updates: Dict[str, Any]) -> AppConfig:
+    """
+    Apply dotted-path updates, validating only the models that contain them.
+
+    Updates to the same model are validated together, so related fields
+    (e.g., scoring weights that must sum to 1) can change at once. The input
+    config is not modified; unchanged sections are shared with the result.
+
+    Args:
+        config (AppConfig): The config to patch.
+        updates (Dict[str, Any]): New values keyed by dotted path
+            (e.g., ``{"discovery.min_views": 5000}``).
+
+    Returns:
+        AppConfig: The patched config.
+
+    Raises:
+        KeyError: If a key does not name a config field.
+        ValidationError: If a patched model is invalid.
+    """
+    grouped: Dict[Tuple[PathSegment, ...], Dict[str, Any]] = defaultdict(dict)
+    for key, value in updates.items():
+        path, field = _split_path(config, key)
+        grouped[path][field] = value
+
+    for path, fields in grouped.items():
+        model: BaseModel = config
+        for segment in path:
+            model = _child(model, segment)
+        data = {name: getattr(model, name) for name in type(model).model_fields}
+        data.update(fields)
+        # Nested model instances are passed through as-is, so only this
+        # model's own fields and validators run.
+        config = _replace(config, path, type(model).model_validate(data))
+    return config
+
+
+def diff_configs(old: Optional[BaseModel], new: BaseModel, prefix: str = "") -> Set[str]:
+    """
+    List the dotted paths whose values differ between two configs.
+
+    Args:
+        old (Optional[BaseModel]): Previous config (None means everything changed).
+        new (BaseModel): Current config.
+        prefix (str): Path prefix for nested calls.
+
+    Returns:
+        Set[str]: Changed leaf paths; lists are compared as a whole.
+    """
+    if old is new:
+        return set()
+    if old is None:
+        return {f"{prefix}{name}" for name in type(new).model_fields}
+    changed: Set[str] = set()
+    for name in type(new).model_fields:
+        before, after = getattr(old, name), getattr(new, name)
+        if before is after:
+            continue
+        if isinstance(before, BaseModel) and isinstance(after, BaseModel):
+            changed |= diff_configs(before, after, f"{prefix}{name}.")
+        elif before != after:
+            changed.add(f"{prefix}{name}")
+    return changed
+
+
+def _matches(prefix: str, key: str) -> bool:
+    return not prefix or key == prefix or key.startswith(f"{prefix}.")
+
+
+class ConfigService:
+    """Owns the live config: file reloads, DB overrides and change notifications."""
+
+    def __init__(
+        self,
+        path: str = "config/config.yaml",
+        engine: Optional[Engine] = None,
+        poll_interval: float = 2.0,
+    ):
+        self.path = path
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self._base: Optional[AppConfig] = None
+        self._overrides: Dict[str, Any] = {}
+        self._config: Optional[AppConfig] = None
+        self._subscribers: List[Tuple[str, ChangeCallback]] = []
+        self._lock = threading.RLock()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def config(self) -> AppConfig:
+        """The current config, loading it on first access. Treat as read-only."""
+        if self._config is None:
+            self.reload()
+        return self._config
+
+    def subscribe(self, callback: ChangeCallback, prefix: str = "") -> Callable[[], None]:
+        """
+        Call ``callback(config, changed_keys)`` when keys under ``prefix`` change.
+
+        Args:
+            callback (ChangeCallback): Receives the new config and the changed
+                dotted paths under ``prefix``. Must not block. Changes found by
+                the watcher are delivered on a worker thread.
+            prefix (str): Dotted path to watch (e.g., "discovery"); "" watches all.
+
+        Returns:
+            Callable[[], None]: Removes the subscription.
+        """
+        entry = (prefix, callback)
+        self._subscribers.append(entry)
+        return lambda: self._subscribers.remove(entry)
+
+    def _load_overrides(self) -> Dict[str, Any]:
+        if self.engine is None:
+            return dict(self._overrides)
+        session = get_session(self.engine)
+        try:
+            rows = get_config_overrides(session)
+        finally:
+            session.close()
+        return {key: parse_override_value(value) for key, value in rows.items()}
+
+    def _apply_overrides(self, base: AppConfig, overrides: Dict[str, Any]) -> AppConfig:
+        """Patch ``base`` with all overrides, skipping any that no longer apply."""
+        try:
+            return patch_config(base, overrides)
+        except (KeyError, ValidationError):
+            pass
+        config = base
+        for key, value in overrides.items():
+            try:
+                config = patch_config(config, {key: value})
+            except (KeyError, ValidationError) as e:
+                logger.error(f"Ignoring config override {key}={value!r}: {e}")
+        return config
+
+    def _publish(self, new: AppConfig) -> Set[str]:
+        """Swap in a new config and notify subscribers of what changed."""
+        old, self._config = self._config, new
+        changed = diff_configs(old, new)
+        if old is None or not changed:
+            # The initial load is not a change.
+            return changed
+        for prefix, callback in list(self._subscribers):
+            keys = {key for key in changed if _matches(prefix, key)}
+            if not keys:
+                continue
+            try:
+                callback(new, keys)
+            except Exception:
+                logger.exception(f"Config change subscriber for '{prefix or '*'}' failed.")
+        return changed
+
+    def reload(self) -> Set[str]:
+        """
+        Re-read the file (if it changed) and the DB overrides.
+
+        Returns:
+            Set[str]: Dotted paths that changed.
+
+        Raises:
+            FileNotFoundError: If the config file is missing.
+            ValidationError: If the edited file is invalid; the current config is kept.
+        """
+        with self._lock:
+            base = load_config(self.path)
+            overrides = self._load_overrides()
+            if base is self._base and overrides == self._overrides:
+                return set()
+            self._base, self._overrides = base, overrides
+            changed = self._publish(self._apply_overrides(base, overrides))
+        if changed:
+            logger.info(f"Config reloaded; {len(changed)} values changed.")
+        return changed
+
+    def set_override(self, key: str, value: str, updated_by: str = "system") -> Set[str]:
+        """
+        Validate and persist a runtime override, then apply it.
+
+        Args:
+            key (str): Dotted config path (e.g., "discovery.min_views").
+            value (str): New value as YAML text.
+            updated_by (str): Who made the change (default: "system").
+
+        Returns:
+            Set[str]: Dotted paths that changed.
+
+        Raises:
+            KeyError: If the key does not name a config field.
+            ValidationError: If the value is invalid; nothing is stored.
+        """
+        parsed = parse_override_value(value)
+        with self._lock:
+            patched = patch_config(self.config, {key: parsed})
+            if self.engine is not None:
+                session = get_session(self.engine)
+                try:
+                    set_config_override(session, key, value, updated_by)
+                finally:
+                    session.close()
+            self._overrides[key] = parsed
+            return self._publish(patched)
+
+    def clear_override(self, key: str) -> Set[str]:
+        """
+        Remove a runtime override and fall back to the file value.
+
+        Args:
+            key (str): Dotted config path.
+
+        Returns:
+            Set[str]: Dotted paths that changed.
+        """
+        with self._lock:
+            if self.engine is not None:
+                session = get_session(self.engine)
+                try:
+                    delete_config_override(session, key)
+                finally:
+                    session.close()
+            self._overrides.pop(key, None)
+            if self._base is None:
+                self._base = load_config(self.path)
+            return self._publish(self._apply_overrides(self._base, self._overrides))
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                # Each poll stats the file and queries the overrides table, so it
+                # runs off the event loop.
+                await asyncio.to_thread(self.reload)
+            except (FileNotFoundError, ValidationError, yaml.YAMLError) as e:
+                logger.error(f"Config reload failed; keeping the current config: {e}")
+            except SQLAlchemyError as e:
+                logger.error(f"Reading config overrides failed; retrying next poll: {e}")
+
+    def start(self) -> None:
+        """Start watching the config file and overrides in the running event loop."""
+        if self._watch_task is None:
+            if self._config is None:
+                self.reload()
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Stop watching."""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
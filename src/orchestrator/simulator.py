@@ -0,0 +1,423 @@
+"""
+Discrete-event simulation of the multi-channel schedule (SPEC §5.2).
+
+Replays each channel's ``schedule_times_utc`` for a number of days against
+the ``SchedulerConfig`` concurrency limits. Stage durations are drawn from
+measured history (``pipeline_stage_timings`` and answered reviews in the
+review log) and, for stages with too little history, from the SPEC §5.1
+estimates, scaled so a run's expected length matches the recorded
+``started_at``/``completed_at`` of past pipeline runs when there are enough
+of those. A run holds a pipeline slot from discovery through render;
+acquisition also takes download slots, TTS a GPU slot and the render a
+render slot, each granted first come, first served. The review starts when
+the render is done, or when quiet hours end, and has to be answered before
+the channel's next scheduled run. Upload uses no shared resource and does
+not affect the results, so it is not simulated.
+
+Only events are simulated, so weeks of operation take well under a second:
+
+    python -m src.main simulate-schedule --channels 12 --weeks 4 --renders 2
+"""
+import heapq
+import itertools
+import math
+import random
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, Generator, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+from sqlalchemy.engine import Engine
+
+from src.config import ChannelConfig, SchedulerConfig, TelegramConfig
+from src.database import get_session, get_stage_durations
+
+DAY = 86400.0
+
+# SPEC §5.1 estimates in minutes as (low, high, mode), for stages without history.
+DEFAULT_STAGE_MINUTES: Dict[str, Tuple[float, float, float]] = {
+    "discovery": (5, 10, 7.5),
+    "acquisition": (10, 20, 15),
+    "analysis": (5, 15, 10),
+    "script": (1, 2, 1.5),
+    "tts": (3, 5, 4),
+    "render": (5, 10, 7.5),
+    "review": (5, 240, 30),
+}
+STAGES = tuple(DEFAULT_STAGE_MINUTES)
+# Stages a pipeline run spends between starting and finishing, without the human review.
+RUN_STAGES = STAGES[:-1]
+
+
+def parse_time_of_day(value: str) -> float:
+    """Seconds after midnight for an ``HH:MM`` string."""
+    hours, _, minutes = value.partition(":")
+    return (int(hours) * 3600 + int(minutes or 0) * 60) % DAY
+
+
+def _mean(values: Sequence[float]) -> float:
+    return sum(values) / len(values)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """The ``q``-th percentile (0-100) with linear interpolation; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class StageDurations:
+    """
+    Duration distribution per stage: measured samples, or the SPEC estimates.
+
+    Whole-run times under "pipeline" in ``samples`` scale the estimates of
+    the run stages that have no samples of their own, so that the expected
+    run length matches the measured mean.
+    """
+
+    def __init__(self, samples: Optional[Mapping[str, Sequence[float]]] = None, min_samples: int = 1):
+        samples = samples or {}
+        self.samples: Dict[str, List[float]] = {
+            stage: list(values) for stage, values in samples.items()
+            if stage in DEFAULT_STAGE_MINUTES and len(values) >= min_samples
+        }
+        self.estimate_scale = 1.0
+        runs = samples.get("pipeline", ())
+        estimated = [stage for stage in RUN_STAGES if stage not in self.samples]
+        if runs and len(runs) >= min_samples and estimated:
+            measured = sum(_mean(self.samples[stage]) for stage in RUN_STAGES if stage in self.samples)
+            # The mean of a triangular distribution is the mean of (low, high, mode).
+            expected = sum(_mean(DEFAULT_STAGE_MINUTES[stage]) * 60.0 for stage in estimated)
+            remaining = _mean(runs) - measured
+            if remaining > 0:
+                self.estimate_scale = remaining / expected
+
+    @classmethod
+    def from_history(cls, engine: Engine, since: Optional[datetime] = None,
+                     min_samples: int = 20) -> "StageDurations":
+        """
+        Distributions from recorded stage timings, review times and run times.
+
+        Args:
+            engine (Engine): Database with the pipeline history.
+            since (Optional[datetime]): Only use samples after this time (UTC).
+            min_samples (int): Fewer samples than this fall back to the estimate.
+
+        Returns:
+            StageDurations: The distributions.
+        """
+        session = get_session(engine)
+        try:
+            durations = get_stage_durations(session, since)
+        finally:
+            session.close()
+        return cls(durations, min_samples)
+
+    def measured(self) -> List[str]:
+        """Stages drawn from history rather than the estimates; "pipeline" if run times scaled them."""
+        stages = [stage for stage in STAGES if stage in self.samples]
+        return stages + ["pipeline"] if self.estimate_scale != 1.0 else stages
+
+    def sample(self, stage: str, rng: random.Random) -> float:
+        """One duration in seconds."""
+        values = self.samples.get(stage)
+        if values:
+            return rng.choice(values)
+        low, high, mode = DEFAULT_STAGE_MINUTES[stage]
+        scale = self.estimate_scale if stage in RUN_STAGES else 1.0
+        return rng.triangular(low, high, mode) * 60.0 * scale
+
+
+class ChannelSchedule(NamedTuple):
+    """A channel's daily start times in seconds after midnight UTC, sorted."""
+    name: str
+    times: Tuple[float, ...]
+
+    def next_slot(self, t: float) -> float:
+        """The first scheduled start strictly after ``t``."""
+        day = math.floor(t / DAY) * DAY
+        for start in (day + s for s in self.times + tuple(DAY + s for s in self.times)):
+            if start > t:
+                return start
+        return day + 2 * DAY + self.times[0]
+
+
+def channel_schedules(channels: Sequence[ChannelConfig], count: Optional[int] = None,
+                      stagger_minutes: float = 30.0) -> List[ChannelSchedule]:
+    """
+    Schedules of the enabled channels, extended to ``count`` channels.
+
+    Extra channels repeat the configured ones in turn. Each repetition is
+    shifted so the stagger continues past the last configured channel, the
+    way SPEC §4.11 staggers channels by hand.
+
+    Args:
+        channels (Sequence[ChannelConfig]): Configured channels.
+        count (Optional[int]): Channels to simulate (default: the enabled ones).
+        stagger_minutes (float): Offset between consecutive channels (default: 30).
+
+    Returns:
+        List[ChannelSchedule]: One schedule per simulated channel.
+
+    Raises:
+        ValueError: If no enabled channel has schedule times.
+    """
+    base = [
+        ChannelSchedule(c.name, tuple(sorted(parse_time_of_day(t) for t in c.schedule_times_utc)))
+        for c in channels if c.enabled and c.schedule_times_utc
+    ]
+    if not base:
+        raise ValueError("No enabled channel has schedule times to simulate.")
+    count = len(base) if count is None else count
+    schedules = []
+    for i in range(count):
+        template = base[i % len(base)]
+        copy = i // len(base)
+        if copy == 0:
+            schedules.append(template)
+            continue
+        shift = copy * len(base) * stagger_minutes * 60
+        schedules.append(ChannelSchedule(
+            f"{template.name}+{copy}", tuple(sorted((t + shift) % DAY for t in template.times)),
+        ))
+    return schedules
+
+
+class RunResult(NamedTuple):
+    """Outcome of one simulated pipeline run; times in seconds."""
+    channel: str
+    scheduled_at: float
+    start_delay: float
+    queue_delay: float
+    time_to_review: float
+    quiet_hold: float
+    review_timed_out: bool
+    review_missed: bool
+
+
+class _Request(NamedTuple):
+    pool: "_Pool"
+    units: int
+
+
+Process = Generator[Union[float, _Request], None, None]
+
+
+class _Pool:
+    """Counting resource granted in request order; tracks busy unit-seconds and waits."""
+
+    def __init__(self, name: str, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"{name} needs at least one slot")
+        self.name = name
+        self.capacity = capacity
+        self.in_use = 0
+        self.busy = 0.0
+        self.waits: List[float] = []
+        self._since = 0.0
+        self._queue: Deque[Tuple[int, float, Callable[[], None]]] = deque()
+
+    def _account(self, now: float) -> None:
+        self.busy += self.in_use * (now - self._since)
+        self._since = now
+
+    def acquire(self, units: int, now: float, grant: Callable[[], None]) -> None:
+        if not self._queue and self.in_use + units <= self.capacity:
+            self._account(now)
+            self.in_use += units
+            self.waits.append(0.0)
+            grant()
+        else:
+            self._queue.append((units, now, grant))
+
+    def release(self, units: int, now: float) -> None:
+        self._account(now)
+        self.in_use -= units
+        while self._queue and self.in_use + self._queue[0][0] <= self.capacity:
+            waiting, requested_at, grant = self._queue.popleft()
+            self.in_use += waiting
+            self.waits.append(now - requested_at)
+            grant()
+
+    def utilization(self, horizon: float) -> float:
+        return self.busy / (self.capacity * horizon) if horizon > 0 else 0.0
+
+
+class SimulationReport(NamedTuple):
+    """Results of a simulation."""
+    channels: int
+    days: float
+    runs: List[RunResult]
+    utilization: Dict[str, float]
+    pool_waits: Dict[str, List[float]]
+    measured_stages: List[str]
+
+    def summary(self) -> Dict[str, float]:
+        """Headline figures; delays in minutes."""
+        runs = self.runs
+        queue = [r.queue_delay / 60 for r in runs]
+        review = [r.time_to_review / 60 for r in runs]
+        missed = sum(r.review_missed for r in runs)
+        figures = {
+            "runs": float(len(runs)),
+            "queue_delay_p50_min": percentile(queue, 50),
+            "queue_delay_p95_min": percentile(queue, 95),
+            "queue_delay_max_min": max(queue, default=0.0),
+            "time_to_review_p50_min": percentile(review, 50),
+            "time_to_review_p95_min": percentile(review, 95),
+            "review_window_misses": float(missed),
+            "review_window_miss_rate": missed / len(runs) if runs else 0.0,
+            "review_timeouts": float(sum(r.review_timed_out for r in runs)),
+            "quiet_hour_holds": float(sum(r.quiet_hold > 0 for r in runs)),
+        }
+        for name, value in self.utilization.items():
+            figures[f"{name}_utilization"] = value
+        return figures
+
+    def format(self) -> str:
+        """Plain-text report."""
+        s = self.summary()
+        lines = [
+            f"{self.channels} channels, {self.days:g} days, {len(self.runs)} runs "
+            f"(history: {', '.join(self.measured_stages) or 'none, SPEC estimates'})",
+            f"queue delay     p50 {s['queue_delay_p50_min']:6.1f} min  p95 {s['queue_delay_p95_min']:6.1f} min"
+            f"  max {s['queue_delay_max_min']:6.1f} min",
+            f"time to review  p50 {s['time_to_review_p50_min']:6.1f} min  p95 {s['time_to_review_p95_min']:6.1f} min",
+            f"review window   {int(s['review_window_misses'])} missed ({s['review_window_miss_rate']:.1%}), "
+            f"{int(s['review_timeouts'])} timed out, {int(s['quiet_hour_holds'])} held for quiet hours",
+        ]
+        for name, value in self.utilization.items():
+            waits = [w / 60 for w in self.pool_waits[name]]
+            lines.append(f"{name:<15} {value:6.1%} busy, wait p95 {percentile(waits, 95):6.1f} min")
+        return "\n".join(lines)
+
+
+class ScheduleSimulator:
+    """Simulates pipeline runs for a set of channel schedules and concurrency limits."""
+
+    def __init__(
+        self,
+        schedules: Sequence[ChannelSchedule],
+        scheduler: SchedulerConfig,
+        telegram: TelegramConfig,
+        durations: Optional[StageDurations] = None,
+        downloads_per_run: int = 3,
+        seed: int = 0,
+    ):
+        self.schedules = list(schedules)
+        self.scheduler = scheduler
+        self.telegram = telegram
+        self.durations = durations if durations is not None else StageDurations()
+        self.downloads_per_run = downloads_per_run
+        self.seed = seed
+
+    def _after_quiet_hours(self, t: float) -> float:
+        """When a review that is ready at ``t`` can be sent (quiet hours are taken as UTC)."""
+        start, end = self.telegram.quiet_hours_start, self.telegram.quiet_hours_end
+        if start == end:
+            return t
+        hour = (t % DAY) / 3600
+        quiet = (start <= hour or hour < end) if start > end else (start <= hour < end)
+        if not quiet:
+            return t
+        ends = t - t % DAY + end * 3600
+        return ends if ends > t else ends + DAY
+
+    def run(self, days: float) -> SimulationReport:
+        """
+        Simulate every scheduled run that starts within ``days``.
+
+        Runs still in progress at the end are followed to completion.
+
+        Args:
+            days (float): Length of the simulated period.
+
+        Returns:
+            SimulationReport: Per-run results, pool utilization and waits.
+        """
+        rng = random.Random(self.seed)
+        c = self.scheduler
+        pools = {
+            "pipelines": _Pool("pipelines", c.max_concurrent_pipelines),
+            "downloads": _Pool("downloads", c.max_concurrent_downloads),
+            "tts": _Pool("tts", c.max_concurrent_tts),
+            "renders": _Pool("renders", c.max_concurrent_renders),
+        }
+        downloads = min(self.downloads_per_run, c.max_concurrent_downloads)
+        events: List[Tuple[float, int, Process]] = []
+        sequence = itertools.count()
+        results: List[RunResult] = []
+        clock = [0.0]
+
+        def schedule_at(t: float, process: Process) -> None:
+            heapq.heappush(events, (t, next(sequence), process))
+
+        def resume(process: Process) -> None:
+            try:
+                command = next(process)
+            except StopIteration:
+                return
+            if isinstance(command, _Request):
+                command.pool.acquire(command.units, clock[0], lambda: schedule_at(clock[0], process))
+            else:
+                schedule_at(clock[0] + command, process)
+
+        def pipeline(channel: ChannelSchedule, scheduled_at: float) -> Process:
+            sample = self.durations.sample
+            waited_from = clock[0]
+            yield _Request(pools["pipelines"], 1)
+            started_at = clock[0]
+            queued = started_at - waited_from
+            yield sample("discovery", rng)
+            for stage, pool, units in (("acquisition", "downloads", downloads), ("analysis", None, 0),
+                                       ("script", None, 0), ("tts", "tts", 1), ("render", "renders", 1)):
+                if pool is not None:
+                    requested = clock[0]
+                    yield _Request(pools[pool], units)
+                    queued += clock[0] - requested
+                yield sample(stage, rng)
+                if pool is not None:
+                    pools[pool].release(units, clock[0])
+            pools["pipelines"].release(1, clock[0])
+
+            ready_at = clock[0]
+            sent_at = self._after_quiet_hours(ready_at)
+            review = sample("review", rng)
+            timeout = self.telegram.review_timeout_hours * 3600
+            timed_out = review > timeout
+            answered_at = sent_at + min(review, timeout)
+            results.append(RunResult(
+                channel=channel.name,
+                scheduled_at=scheduled_at,
+                start_delay=started_at - scheduled_at,
+                queue_delay=queued,
+                time_to_review=ready_at - scheduled_at,
+                quiet_hold=sent_at - ready_at,
+                review_timed_out=timed_out,
+                review_missed=timed_out or answered_at > channel.next_slot(scheduled_at),
+            ))
+
+        horizon = days * DAY
+        for channel in self.schedules:
+            for day in range(math.ceil(days)):
+                for t in channel.times:
+                    if day * DAY + t < horizon:
+                        schedule_at(day * DAY + t, pipeline(channel, day * DAY + t))
+
+        while events:
+            clock[0], _, process = heapq.heappop(events)
+            resume(process)
+
+        end = max(clock[0], horizon)
+        results.sort(key=lambda r: (r.scheduled_at, r.channel))
+        return SimulationReport(
+            channels=len(self.schedules),
+            days=days,
+            runs=results,
+            utilization={name: pool.utilization(end) for name, pool in pools.items()},
+            pool_waits={name: pool.waits for name, pool in pools.items()},
+            measured_stages=self.durations.measured(),
+        )
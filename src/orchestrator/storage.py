@@ -0,0 +1,330 @@
+"""
+Tiered storage management for the working (NVMe) and archive (HDD) dirs.
+
+Downloads and renders reserve their predicted size on the working tier
+before they start, so concurrent pipelines cannot fill it mid-write. When
+space is short, finished source downloads that no pipeline still holds are
+evicted in least-recently-used order. Final renders move to the archive in
+the background with throttled I/O and a checksum check, and the archive is
+pruned by age.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from src.config import GeneralConfig, StorageConfig
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
+
+logger = get_logger(__name__)
+
+GB = 1024 ** 3
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+
+AlarmCallback = Callable[[str], Awaitable[None]]
+
+
+class InsufficientStorageError(RuntimeError):
+    """Raised when a reservation cannot be satisfied before its timeout."""
+
+
+class DiskUsage(NamedTuple):
+    total: int
+    used: int
+    free: int
+
+
+class Reservation:
+    """Space set aside on the working tier for one download or render."""
+
+    __slots__ = ("nbytes", "path", "purpose")
+
+    def __init__(self, nbytes: int, path: Optional[str], purpose: str):
+        self.nbytes = nbytes
+        self.path = path
+        self.purpose = purpose
+
+    def outstanding(self) -> int:
+        """Bytes reserved but not yet written to ``path``."""
+        written = 0
+        if self.path and os.path.exists(self.path):
+            written = os.path.getsize(self.path)
+        return max(self.nbytes - written, 0)
+
+
+def _sha256(path: str) -> str:
+    """Compute the SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StorageManager:
+    """Admission control, eviction, archival and retention for both storage tiers."""
+
+    def __init__(
+        self,
+        general: GeneralConfig,
+        config: StorageConfig,
+        disk_usage: Callable[[str], DiskUsage] = shutil.disk_usage,
+        on_alarm: Optional[AlarmCallback] = None,
+    ):
+        self.working_dir = general.working_dir
+        self.archive_dir = general.archive_dir
+        self.config = config
+        self._disk_usage = disk_usage
+        self._on_alarm = on_alarm
+        self._reservations: List[Reservation] = []
+        # Finished source downloads in LRU order, with the number of holders.
+        self._sources: "OrderedDict[str, int]" = OrderedDict()
+        self._eviction_listeners: List[Callable[[str], None]] = []
+        self._archive_tasks: Dict[str, asyncio.Task] = {}
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def _cond(self) -> asyncio.Condition:
+        # Created lazily so the manager can be constructed outside a running loop.
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    # -- Prediction -------------------------------------------------------
+
+    def predict_download_bytes(self, duration_seconds: float) -> int:
+        """Predicted size of a source download of the given duration."""
+        return int(duration_seconds * self.config.source_bitrate_mbps * 1_000_000 / 8)
+
+    def predict_render_bytes(self, duration_seconds: float) -> int:
+        """Predicted size of a final render plus its proxy and teaser."""
+        return int(duration_seconds * self.config.render_bitrate_mbps * 1_000_000 / 8 * 1.1)
+
+    # -- Admission --------------------------------------------------------
+
+    def available_bytes(self) -> int:
+        """Free bytes on the working tier minus outstanding reservations and headroom."""
+        free = self._disk_usage(self.working_dir).free
+        outstanding = sum(r.outstanding() for r in self._reservations)
+        return free - outstanding - int(self.config.reserve_headroom_gb * GB)
+
+    def _evict_for(self, needed: int) -> int:
+        """
+        Delete unheld source downloads, oldest use first, until ``needed`` bytes fit.
+
+        Args:
+            needed (int): Bytes the pending reservation requires.
+
+        Returns:
+            int: Bytes freed.
+        """
+        freed = 0
+        for path in [p for p, holders in self._sources.items() if holders == 0]:
+            if self.available_bytes() >= needed:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                freed += size
+                logger.info(f"Evicted source {path} ({size / GB:.2f} GB).")
+                increment("storage_evicted_bytes", size)
+            except FileNotFoundError:
+                pass
+            del self._sources[path]
+            for listener in self._eviction_listeners:
+                listener(path)
+        return freed
+
+    @asynccontextmanager
+    async def reserve(
+        self, nbytes: int, path: Optional[str] = None, purpose: str = "download"
+    ) -> AsyncIterator[Reservation]:
+        """
+        Reserve space on the working tier for the duration of the block.
+
+        Waits (up to ``reservation_timeout_seconds``) for other reservations
+        to finish if eviction alone cannot make room. Bytes already written to
+        ``path`` are no longer counted against the reservation.
+
+        Args:
+            nbytes (int): Predicted size of the output.
+            path (Optional[str]): File the reservation will be written to.
+            purpose (str): Label for logs and metrics (e.g., "download", "render").
+
+        Yields:
+            Reservation: The active reservation.
+
+        Raises:
+            InsufficientStorageError: If the space cannot be reserved in time.
+        """
+        reservation = Reservation(nbytes, path, purpose)
+        deadline = time.monotonic() + self.config.reservation_timeout_seconds
+        async with self._cond:
+            while self.available_bytes() < nbytes:
+                self._evict_for(nbytes)
+                if self.available_bytes() >= nbytes:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise InsufficientStorageError(
+                        f"Could not reserve {nbytes / GB:.2f} GB for {purpose} in {self.working_dir}"
+                    )
+                try:
+                    # Re-check periodically: space can also be freed outside the manager.
+                    await asyncio.wait_for(self._cond.wait(), timeout=min(remaining, 30.0))
+                except asyncio.TimeoutError:
+                    continue
+            self._reservations.append(reservation)
+        increment("storage_reserved_bytes", nbytes, purpose=purpose)
+        try:
+            yield reservation
+        finally:
+            async with self._cond:
+                self._reservations.remove(reservation)
+                self._cond.notify_all()
+
+    # -- Source downloads -------------------------------------------------
+
+    def register_source(self, path: str) -> None:
+        """Mark a finished source download as evictable (most recently used)."""
+        self._sources[path] = self._sources.get(path, 0)
+        self._sources.move_to_end(path)
+
+    def acquire_source(self, path: str) -> None:
+        """Hold a source download so it is not evicted while in use."""
+        self._sources[path] = self._sources.get(path, 0) + 1
+        self._sources.move_to_end(path)
+
+    def release_source(self, path: str) -> None:
+        """Release a hold taken with ``acquire_source``."""
+        if path in self._sources:
+            self._sources[path] = max(self._sources[path] - 1, 0)
+
+    def forget_source(self, path: str) -> None:
+        """Stop tracking a source that was deleted outside the manager."""
+        self._sources.pop(path, None)
+
+    def add_eviction_listener(self, listener: Callable[[str], None]) -> None:
+        """Call ``listener(path)`` after each source file the manager evicts."""
+        self._eviction_listeners.append(listener)
+
+    # -- Archival ---------------------------------------------------------
+
+    def _throttled_move(self, src: str, dest: str) -> str:
+        """
+        Copy ``src`` to ``dest`` at the configured rate, verify, then delete ``src``.
+
+        Returns:
+            str: The destination path.
+
+        Raises:
+            IOError: If the checksum of the copy does not match.
+        """
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_dest = f"{dest}.partial"
+        rate = self.config.archive_throughput_mb_per_sec * 1024 * 1024
+        digest = hashlib.sha256()
+        started = time.monotonic()
+        copied = 0
+        with open(src, "rb") as fin, open(tmp_dest, "wb") as fout:
+            for chunk in iter(lambda: fin.read(COPY_CHUNK_BYTES), b""):
+                fout.write(chunk)
+                digest.update(chunk)
+                copied += len(chunk)
+                ahead = copied / rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+            fout.flush()
+            os.fsync(fout.fileno())
+
+        if _sha256(tmp_dest) != digest.hexdigest():
+            os.remove(tmp_dest)
+            raise IOError(f"Checksum mismatch while archiving {src}")
+        os.replace(tmp_dest, dest)
+        shutil.copystat(src, dest)
+        os.remove(src)
+        increment("storage_archived_bytes", copied)
+        return dest
+
+    def archive(self, path: str, subdir: str = "") -> asyncio.Task:
+        """
+        Move a final render to the archive tier in the background.
+
+        Args:
+            path (str): File on the working tier.
+            subdir (str): Subdirectory of the archive (e.g., the niche).
+
+        Returns:
+            asyncio.Task: Resolves to the archived path.
+        """
+        dest = os.path.join(self.archive_dir, subdir, os.path.basename(path))
+
+        async def _run() -> str:
+            try:
+                with timed("archive_move"):
+                    result = await asyncio.to_thread(self._throttled_move, path, dest)
+                logger.info(f"Archived {path} to {result}.")
+                async with self._cond:
+                    self._cond.notify_all()
+                return result
+            finally:
+                self._archive_tasks.pop(path, None)
+
+        task = asyncio.create_task(_run())
+        self._archive_tasks[path] = task
+        return task
+
+    async def wait_for_archives(self) -> None:
+        """Wait for all background archive moves to finish."""
+        if self._archive_tasks:
+            await asyncio.gather(*self._archive_tasks.values(), return_exceptions=True)
+
+    # -- Retention and health ---------------------------------------------
+
+    def prune_archive(self, now: Optional[float] = None) -> int:
+        """
+        Delete archived files older than ``archive_retention_days``.
+
+        Args:
+            now (Optional[float]): Current time as a Unix timestamp (default: now).
+
+        Returns:
+            int: Number of files deleted.
+        """
+        cutoff = (now or time.time()) - self.config.archive_retention_days * 86400
+        deleted = 0
+        for dirpath, _, filenames in os.walk(self.archive_dir):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        deleted += 1
+                except FileNotFoundError:
+                    continue
+        if deleted:
+            logger.info(f"Pruned {deleted} archived files older than "
+                        f"{self.config.archive_retention_days} days.")
+        return deleted
+
+    async def check_free_space(self) -> bool:
+        """
+        Check the working tier against ``min_free_gb`` and alert if below it.
+
+        Returns:
+            bool: True if there is enough free space.
+        """
+        free_gb = self._disk_usage(self.working_dir).free / GB
+        if free_gb >= self.config.min_free_gb:
+            return True
+        message = (f"Working directory {self.working_dir} has {free_gb:.1f} GB free "
+                   f"(minimum {self.config.min_free_gb:.0f} GB).")
+        logger.error(message)
+        if self._on_alarm is not None:
+            await self._on_alarm(message)
+        return False
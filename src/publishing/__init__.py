@@ -1 +1,12 @@
-"""Placeholder for src.publishing package."""
+"""
+Publishing: Telegram review notifications and the review file server.
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "ReviewFileServer": "src.publishing.file_server",
+    "TelegramNotifier": "src.publishing.telegram_notifier",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
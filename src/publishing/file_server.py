@@ -0,0 +1,140 @@
+"""
+Local HTTP file server for full-video review links.
+
+Serves finished renders from the archive and working directories when they
+are too large to attach to a Telegram message. Files are sent with
+``sendfile`` through aiohttp's ``FileResponse``, which also handles HTTP
+Range requests (seeking in mobile players) and ETag revalidation. Every URL
+is signed with HMAC-SHA256 and expires after ``link_ttl_hours``. When
+``metrics_enabled`` is set, ``/metrics`` is served too, and only to scrapers
+that send the review secret as a bearer token.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from aiohttp import web
+
+from src.config import GeneralConfig, ReviewServerConfig
+from src.utils.logging import get_logger
+from src.utils.metrics import add_metrics_route, increment
+
+logger = get_logger(__name__)
+
+
+class ReviewFileServer:
+    """Serves signed, expiring links to rendered videos inside the running event loop."""
+
+    def __init__(self, config: ReviewServerConfig, general: GeneralConfig):
+        self.config = config
+        self.roots: Dict[str, str] = {
+            "archive": os.path.realpath(general.archive_dir),
+            "working": os.path.realpath(general.working_dir),
+        }
+        secret = config.secret_key
+        if not secret or secret.startswith("${"):
+            logger.warning("No review server secret configured; links will not survive a restart.")
+            secret = secrets.token_hex(32)
+        self._secret = secret.encode()
+        self._runner: Optional[web.AppRunner] = None
+        self.app = web.Application()
+        self.app.router.add_get("/files/{root}/{path:.+}", self._handle_file)
+        if config.metrics_enabled:
+            # The server listens publicly, so counters are not handed to anyone who asks.
+            add_metrics_route(self.app, token=secret)
+
+    def _signature(self, root: str, rel_path: str, expires: int) -> str:
+        """Compute the URL signature for a file and expiry time."""
+        message = f"{root}/{rel_path}:{expires}".encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def _locate(self, path: str) -> Optional[tuple]:
+        """
+        Find the serving root that contains a path.
+
+        Args:
+            path (str): Absolute or relative file path.
+
+        Returns:
+            Optional[tuple]: ``(root_name, relative_path)`` or None if the path
+            is outside every root.
+        """
+        real = os.path.realpath(path)
+        for name, root in self.roots.items():
+            if os.path.commonpath([real, root]) == root and real != root:
+                return name, os.path.relpath(real, root).replace(os.sep, "/")
+        return None
+
+    def sign_url(self, path: str, ttl_hours: Optional[float] = None) -> str:
+        """
+        Create a signed, expiring URL for a file under the archive or working dir.
+
+        Args:
+            path (str): Path of the file to share.
+            ttl_hours (Optional[float]): Link lifetime; defaults to ``link_ttl_hours``.
+
+        Returns:
+            str: Absolute URL on ``public_base_url``.
+
+        Raises:
+            ValueError: If the file is outside the archive and working dirs.
+        """
+        located = self._locate(path)
+        if located is None:
+            raise ValueError(f"Path is outside the served directories: {path}")
+        root, rel_path = located
+        ttl = self.config.link_ttl_hours if ttl_hours is None else ttl_hours
+        expires = int(time.time() + ttl * 3600)
+        signature = self._signature(root, rel_path, expires)
+        base = self.config.public_base_url.rstrip("/")
+        return f"{base}/files/{root}/{quote(rel_path)}?expires={expires}&sig={signature}"
+
+    async def _handle_file(self, request: web.Request) -> web.StreamResponse:
+        """Validate the signature and stream the requested file."""
+        root = request.match_info["root"]
+        rel_path = request.match_info["path"]
+        if root not in self.roots:
+            raise web.HTTPNotFound()
+
+        try:
+            expires = int(request.query.get("expires", ""))
+        except ValueError:
+            raise web.HTTPForbidden(text="Missing or invalid expiry")
+        expected = self._signature(root, rel_path, expires)
+        if not hmac.compare_digest(expected, request.query.get("sig", "")):
+            raise web.HTTPForbidden(text="Invalid signature")
+        if expires < time.time():
+            raise web.HTTPGone(text="Link expired")
+
+        root_dir = self.roots[root]
+        full_path = os.path.realpath(os.path.join(root_dir, rel_path))
+        if os.path.commonpath([full_path, root_dir]) != root_dir:
+            raise web.HTTPForbidden()
+        if not os.path.isfile(full_path):
+            raise web.HTTPNotFound()
+
+        increment("review_file_requests", partial=str("Range" in request.headers).lower())
+        remaining = max(0, int(expires - time.time()))
+        return web.FileResponse(
+            full_path,
+            headers={"Cache-Control": f"private, max-age={remaining}"},
+        )
+
+    async def start(self) -> None:
+        """Start listening on the configured host and port in the current event loop."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config.host, self.config.port)
+        await site.start()
+        logger.info(f"Review file server listening on {self.config.host}:{self.config.port}.")
+
+    async def stop(self) -> None:
+        """Stop the server and release the listening socket."""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("Review file server stopped.")
@@ -1 +1,221 @@
-"""Placeholder: Telegram approval bot."""
+"""
+Telegram review notifications.
+
+Sends the review summary and previews for a rendered video. The teaser is
+sent while the main encode is still running, so the review window opens as
+early as possible; the proxy (or the full file) follows once the render is
+complete.
+"""
+import asyncio
+import os
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+from sqlalchemy.engine import Engine, Row
+
+from src.compilation.compiler import RenderOutputs
+from src.config import TelegramConfig
+from src.database import ReviewLog, get_review_summary_rows, get_session
+from src.utils.logging import get_logger
+from src.utils.metrics import increment, timed
+
+if TYPE_CHECKING:
+    from telegram import Bot
+
+    from src.publishing.file_server import ReviewFileServer
+
+logger = get_logger(__name__)
+
+SEPARATOR = "-" * 50
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    """
+    Format a duration as mm:ss.
+
+    Args:
+        seconds (Optional[float]): Duration in seconds.
+
+    Returns:
+        str: ``mm:ss``, or "rendering" if the duration is not known yet.
+    """
+    if seconds is None:
+        return "rendering"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    return f"{minutes:02d}:{secs:02d}"
+
+
+def format_review_message(rows: Sequence[Row], project_name: str) -> str:
+    """
+    Format the review notification from the rows of ``get_review_summary_rows``.
+
+    Args:
+        rows (Sequence[Row]): Summary rows for a single pipeline run.
+        project_name (str): Project name used in the channel line.
+
+    Returns:
+        str: Plain-text review message.
+
+    Raises:
+        ValueError: If no rows are given.
+    """
+    if not rows:
+        raise ValueError("Pipeline run not found.")
+    head = rows[0]
+    size = (
+        f"{head.video_file_size_bytes / (1024 * 1024):.0f} MB"
+        if head.video_file_size_bytes is not None else "rendering"
+    )
+    lines = [
+        "VIDEO READY FOR REVIEW",
+        SEPARATOR,
+        f"Channel: {project_name}: {head.niche.capitalize()}",
+        f"Coverage: {head.cycle_start:%b %d %Y}, "
+        f"{head.cycle_start:%H:%M}-{head.cycle_end:%H:%M} UTC",
+        f"Duration: {_format_duration(head.video_duration_seconds)}",
+        f"File size: {size}",
+        "",
+        "Clip Summary:",
+    ]
+
+    flags: List[str] = []
+    clips = [row for row in rows if row.rank_position is not None]
+    for position, row in enumerate(clips, start=1):
+        lines.append(
+            f"{position:2d}. (rank {row.rank_position}) \"{row.title}\" "
+            f"by {row.channel_name} -- {row.clip_duration_seconds:.0f}s"
+        )
+        if row.content_id_risk in ("medium", "high"):
+            flags.append(f"- Clip #{position}: {row.content_id_risk} Content ID risk")
+
+    if flags:
+        lines += ["", "Flags:"] + flags
+    lines += ["", "Commands: /approve /reject /hold /skip [numbers] /redo_script"]
+    return "\n".join(lines)
+
+
+class TelegramNotifier:
+    """Sends review summaries and previews to the authorized reviewers."""
+
+    def __init__(
+        self,
+        config: TelegramConfig,
+        engine: Engine,
+        project_name: str = "Last SiX Hours",
+        bot: Optional["Bot"] = None,
+        file_server: Optional["ReviewFileServer"] = None,
+    ):
+        self.config = config
+        self.engine = engine
+        self.project_name = project_name
+        if bot is None:
+            # python-telegram-bot is slow to import; only load it when needed.
+            from telegram import Bot
+            bot = Bot(config.bot_token)
+        self.bot = bot
+        self.file_server = file_server
+
+    def build_review_message(self, pipeline_run_id: int) -> str:
+        """
+        Build the review message for a pipeline run from a single DB query.
+
+        Args:
+            pipeline_run_id (int): The pipeline run to summarize.
+
+        Returns:
+            str: Plain-text review message.
+        """
+        session = get_session(self.engine)
+        try:
+            rows = get_review_summary_rows(session, pipeline_run_id)
+        finally:
+            session.close()
+        return format_review_message(rows, self.project_name)
+
+    def _record_review_sent(self, pipeline_run_id: int) -> None:
+        """
+        Start the review clock by inserting the review_log row, once per run.
+
+        Args:
+            pipeline_run_id (int): The pipeline run under review.
+        """
+        session = get_session(self.engine)
+        try:
+            exists = session.query(ReviewLog.id).filter_by(pipeline_run_id=pipeline_run_id).first()
+            if exists is None:
+                session.add(ReviewLog(pipeline_run_id=pipeline_run_id))
+                session.commit()
+        except Exception as e:
+            logger.error(f"Failed to record review start for run {pipeline_run_id}: {e}")
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @timed("telegram", op="send_video")
+    async def _send_video(self, path: str, caption: str) -> None:
+        """Send a video file to every authorized user."""
+        for user_id in self.config.authorized_user_ids:
+            increment("upload_bytes", os.path.getsize(path), target="telegram")
+            with open(path, "rb") as video:
+                await self.bot.send_video(
+                    chat_id=user_id, video=video, caption=caption, supports_streaming=True
+                )
+
+    @timed("telegram", op="send_message")
+    async def _send_text(self, text: str) -> None:
+        """Send a text message to every authorized user."""
+        for user_id in self.config.authorized_user_ids:
+            await self.bot.send_message(chat_id=user_id, text=text)
+
+    async def send_teaser(self, pipeline_run_id: int, teaser_path: str) -> None:
+        """
+        Send the review summary and the teaser, and start the review clock.
+
+        Intended as the ``on_teaser_ready`` callback of ``VideoCompiler.render``.
+
+        Args:
+            pipeline_run_id (int): The pipeline run under review.
+            teaser_path (str): Path of the teaser preview.
+        """
+        message = await asyncio.to_thread(self.build_review_message, pipeline_run_id)
+        await self._send_text(message)
+        await self._send_video(teaser_path, caption="Preview")
+        await asyncio.to_thread(self._record_review_sent, pipeline_run_id)
+        logger.info(f"Review teaser sent for pipeline run {pipeline_run_id}.")
+
+    async def send_full_video(
+        self,
+        pipeline_run_id: int,
+        outputs: RenderOutputs,
+        full_video_url: Optional[str] = None,
+    ) -> None:
+        """
+        Send the full video once the render is complete.
+
+        The final render is attached if it fits under ``max_upload_bytes``;
+        otherwise the proxy is attached when it fits, and a link to the
+        full-quality file is sent. Without an explicit ``full_video_url`` the
+        link is signed by the review file server, if one is configured.
+
+        Args:
+            pipeline_run_id (int): The pipeline run under review.
+            outputs (RenderOutputs): Files produced by the render.
+            full_video_url (Optional[str]): Link to the full video on the local server.
+        """
+        limit = self.config.max_upload_bytes
+        if os.path.getsize(outputs.final_path) <= limit:
+            await self._send_video(outputs.final_path, caption="Full video")
+        else:
+            if full_video_url is None and self.file_server is not None:
+                full_video_url = self.file_server.sign_url(outputs.final_path)
+            if os.path.exists(outputs.proxy_path) and os.path.getsize(outputs.proxy_path) <= limit:
+                await self._send_video(outputs.proxy_path, caption="Full video (review proxy)")
+            if full_video_url:
+                await self._send_text(f"Full quality: {full_video_url}")
+            else:
+                logger.warning(
+                    f"Final render for run {pipeline_run_id} exceeds the upload limit "
+                    "and no link was provided."
+                )
+        await asyncio.to_thread(self._record_review_sent, pipeline_run_id)
+        logger.info(f"Full video sent for pipeline run {pipeline_run_id}.")
@@ -0,0 +1,12 @@
+"""
+Thumbnails package: best-frame selection and branded composition.
+"""
+from src.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "FrameSelector": "src.thumbnails.frame_selector",
+    "ThumbnailGenerator": "src.thumbnails.generator",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
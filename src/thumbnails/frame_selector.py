@@ -0,0 +1,270 @@
+"""
+Best-frame selection for thumbnails (SPEC §4.7).
+
+The top clip is sampled at 1 fps through one ffmpeg rawvideo pipe at
+thumbnail-analysis resolution, and the whole batch is scored at once in
+NumPy: sharpness (Laplacian variance), saturation, contrast and a
+subject proxy (skin tones plus detail concentrated in the centre). Only the
+winning timestamps are then decoded again at full resolution.
+"""
+import asyncio
+import os
+from typing import Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+from src.compilation.ffmpeg_wrapper import (
+    build_frame_extract_command,
+    build_raw_frames_command,
+    run_ffmpeg_async,
+    run_ffmpeg_pipe,
+)
+from src.compilation.frame_ring import Frame
+from src.config import BrandingConfig
+from src.utils.logging import get_logger
+from src.utils.metrics import timed
+
+logger = get_logger(__name__)
+
+SAMPLE_FPS = 1.0
+# Relative weight of each normalized score in the total.
+WEIGHTS = {"sharpness": 0.35, "saturation": 0.2, "contrast": 0.2, "subject": 0.25}
+# Frames darker or brighter than this (mean luma) are fades or flashes.
+MIN_LUMA, MAX_LUMA = 24.0, 232.0
+# Luma weights (BT.601).
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+class FrameScores(NamedTuple):
+    """Per-frame quality scores, each an array over the sampled frames."""
+    sharpness: np.ndarray
+    saturation: np.ndarray
+    contrast: np.ndarray
+    subject: np.ndarray
+    usable: np.ndarray
+
+    @property
+    def total(self) -> np.ndarray:
+        """Weighted sum of the batch-normalized scores; unusable frames get -1."""
+        total = sum(weight * _normalize(getattr(self, name)) for name, weight in WEIGHTS.items())
+        return np.where(self.usable, total, -1.0)
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    low, high = float(values.min()), float(values.max())
+    if high - low < 1e-9:
+        return np.zeros_like(values, dtype=np.float64)
+    return (values - low) / (high - low)
+
+
+def score_frames(frames: np.ndarray) -> FrameScores:
+    """
+    Score a batch of RGB frames.
+
+    Args:
+        frames (np.ndarray): Frames, shape (n, height, width, 3), uint8.
+
+    Returns:
+        FrameScores: Scores per frame.
+    """
+    rgb = frames.astype(np.float32)
+    luma = rgb @ _LUMA
+    # 4-neighbour Laplacian over the interior of every frame at once.
+    lap = (
+        luma[:, 1:-1, :-2] + luma[:, 1:-1, 2:] + luma[:, :-2, 1:-1] + luma[:, 2:, 1:-1]
+        - 4.0 * luma[:, 1:-1, 1:-1]
+    )
+    sharpness = lap.reshape(len(frames), -1).var(axis=1)
+
+    high = rgb.max(axis=3)
+    low = rgb.min(axis=3)
+    saturation = ((high - low) / np.maximum(high, 1.0)).reshape(len(frames), -1).mean(axis=1)
+
+    flat_luma = luma.reshape(len(frames), -1)
+    contrast = flat_luma.std(axis=1)
+    brightness = flat_luma.mean(axis=1)
+
+    # Skin-tone share in YCbCr (Chai & Ngan ranges) as a cheap face proxy.
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    cb = 128.0 - 0.168736 * r - 0.331264 * g + 0.5 * b
+    cr = 128.0 + 0.5 * r - 0.418688 * g - 0.081312 * b
+    skin = (cb >= 77) & (cb <= 127) & (cr >= 133) & (cr <= 173)
+    h, w = luma.shape[1:]
+    centre = (slice(None), slice(h // 4, h - h // 4), slice(w // 4, w - w // 4))
+    skin_share = skin[centre].reshape(len(frames), -1).mean(axis=1)
+    # Detail concentrated in the middle third suggests a framed subject.
+    energy = np.abs(lap)
+    inner = energy[(slice(None), slice(h // 4, h - h // 4 - 2), slice(w // 4, w - w // 4 - 2))]
+    centre_ratio = inner.reshape(len(frames), -1).mean(axis=1) / np.maximum(
+        energy.reshape(len(frames), -1).mean(axis=1), 1e-6
+    )
+    subject = skin_share + 0.5 * np.clip(centre_ratio - 1.0, 0.0, 1.0)
+
+    usable = (brightness >= MIN_LUMA) & (brightness <= MAX_LUMA)
+    return FrameScores(sharpness, saturation, contrast, subject, usable)
+
+
+def stream_scores(frames: Iterable[Frame], stride: int = 1) -> FrameScores:
+    """
+    ``score_frames`` over a stream, scoring every ``stride``-th frame.
+
+    Works as a ``frame_ring`` consumer, e.g. on a 5 fps ring shared with crop
+    planning, ``stride=5`` scores the same 1 fps samples as ``select``.
+
+    Args:
+        frames (Iterable[Frame]): RGB frames (h, w, 3) in order.
+        stride (int): Score one frame in this many (default: 1).
+
+    Returns:
+        FrameScores: Scores per scored frame.
+    """
+    rows = [score_frames(frame.pixels[None]) for frame in frames if frame.seq % stride == 0]
+    if not rows:
+        return FrameScores(*(np.zeros(0, dtype) for dtype in (np.float32,) * 4 + (bool,)))
+    return FrameScores(*(np.concatenate(column) for column in zip(*rows)))
+
+
+def pick_frames(scores: FrameScores, count: int, min_gap: int = 2) -> List[int]:
+    """
+    Best-scoring frame indices, at least ``min_gap`` samples apart.
+
+    Args:
+        scores (FrameScores): Batch scores.
+        count (int): Frames to pick.
+        min_gap (int): Minimum distance between picks, in samples (default: 2).
+
+    Returns:
+        List[int]: Indices by descending score.
+    """
+    total = scores.total
+    picks: List[int] = []
+    for i in np.argsort(-total, kind="stable").tolist():
+        if len(picks) >= count:
+            break
+        if all(abs(i - p) >= min_gap for p in picks):
+            picks.append(i)
+    return picks
+
+
+class FrameSelector:
+    """Picks and extracts thumbnail frames from a clip."""
+
+    def __init__(self, config: BrandingConfig):
+        self.config = config
+
+    def analysis_size(self, source_width: int, source_height: int) -> Tuple[int, int]:
+        """Frame size for scoring: ``thumbnail_analysis_width`` wide, source aspect, even."""
+        width = min(self.config.thumbnail_analysis_width, source_width)
+        return width, max(2, int(round(width * source_height / source_width / 2)) * 2)
+
+    async def read_frames(self, path: str, start: float, duration: float, width: int, height: int) -> np.ndarray:
+        """
+        Decode 1 fps downscaled RGB frames of a section through one pipe.
+
+        Args:
+            path (str): Source media.
+            start (float): Section start in seconds.
+            duration (float): Section length in seconds.
+            width (int): Frame width.
+            height (int): Frame height.
+
+        Returns:
+            np.ndarray: Frames, shape (n, height, width, 3), uint8.
+
+        Raises:
+            FFmpegError: If ffmpeg fails.
+        """
+        raw = await run_ffmpeg_pipe(build_raw_frames_command(
+            path, start, duration, width, height, SAMPLE_FPS, pixel_format="rgb24",
+        ))
+        frame_bytes = width * height * 3
+        count = len(raw) // frame_bytes
+        return np.frombuffer(raw, dtype=np.uint8, count=count * frame_bytes).reshape(count, height, width, 3)
+
+    @timed("thumbnail_select")
+    async def select(self, path: str, start: float, duration: float, source_width: int,
+                     source_height: int, count: int = 1) -> List[float]:
+        """
+        Timestamps of the best frames in a section.
+
+        Falls back to the section midpoint when no frame is usable.
+
+        Args:
+            path (str): Source media.
+            start (float): Section start in seconds.
+            duration (float): Section length in seconds.
+            source_width (int): Source width in pixels.
+            source_height (int): Source height in pixels.
+            count (int): Frames to pick (default: 1).
+
+        Returns:
+            List[float]: Source timestamps by descending score.
+        """
+        width, height = self.analysis_size(source_width, source_height)
+        frames = await self.read_frames(path, start, duration, width, height)
+        if len(frames) == 0:
+            return [start + duration / 2]
+        return self.pick(score_frames(frames), path, start, duration, count)
+
+    def pick(self, scores: FrameScores, path: str, start: float, duration: float, count: int = 1) -> List[float]:
+        """
+        Timestamps of the best of a section's 1 fps samples, scored elsewhere.
+
+        Args:
+            scores (FrameScores): Scores of the section's samples in order.
+            path (str): Source media, for logging.
+            start (float): Section start in seconds.
+            duration (float): Section length in seconds.
+            count (int): Frames to pick (default: 1).
+
+        Returns:
+            List[float]: Source timestamps by descending score.
+        """
+        picks = [i for i in pick_frames(scores, count) if scores.usable[i]] if len(scores.usable) else []
+        if not picks:
+            logger.info(f"No usable thumbnail frame in {path}; using the midpoint.")
+            return [start + duration / 2]
+        # The fps filter emits the frame nearest to each multiple of 1/SAMPLE_FPS.
+        return [start + i / SAMPLE_FPS for i in picks]
+
+    async def extract(self, path: str, timestamp: float, output_path: str) -> str:
+        """
+        Decode one frame at full resolution.
+
+        Args:
+            path (str): Source media.
+            timestamp (float): Frame time in seconds.
+            output_path (str): Image file to write.
+
+        Returns:
+            str: ``output_path``.
+
+        Raises:
+            FFmpegError: If ffmpeg fails.
+        """
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        await run_ffmpeg_async(build_frame_extract_command(path, timestamp, output_path))
+        return output_path
+
+    async def select_best_frames(self, path: str, start: float, duration: float, source_width: int,
+                                 source_height: int, output_dir: str, count: int = 1) -> List[str]:
+        """
+        Pick the best frames of a section and write them at full resolution.
+
+        Args:
+            path (str): Source media.
+            start (float): Section start in seconds.
+            duration (float): Section length in seconds.
+            source_width (int): Source width in pixels.
+            source_height (int): Source height in pixels.
+            output_dir (str): Directory for the extracted PNGs.
+            count (int): Frames to extract (default: 1).
+
+        Returns:
+            List[str]: Image paths by descending score.
+        """
+        stamps = await self.select(path, start, duration, source_width, source_height, count)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return list(await asyncio.gather(*(
+            self.extract(path, t, os.path.join(output_dir, f"{stem}.{int(t * 1000)}.png")) for t in stamps
+        )))
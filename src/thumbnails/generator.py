@@ -0,0 +1,216 @@
+"""
+Thumbnail composition (SPEC §4.7).
+
+The best frames of the #1 clip come from ``FrameSelector``; this module adds
+the LLM-written caption and ``BrandingConfig`` styling with Pillow and writes
+2-3 variants as 1280x720 JPEGs under 2 MB. Variants differ in frame, caption
+position and caption colour for later A/B testing.
+"""
+import asyncio
+import io
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from src.config import BrandingConfig
+from src.llm.client import LLMClient, LLMError
+from src.thumbnails.frame_selector import FrameSelector
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+THUMBNAIL_SIZE = (1280, 720)
+MAX_BYTES = 2 * 1024 * 1024
+ZOOM = 1.05
+MAX_WORDS = 5
+_JPEG_QUALITIES = (92, 85, 78, 70, 60)
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9'&$%-]*")
+
+
+def clean_caption(text: str, max_words: int = MAX_WORDS) -> str:
+    """
+    Reduce text to at most ``max_words`` upper-case words without emojis or quotes.
+
+    Args:
+        text (str): Raw caption (LLM reply or title).
+        max_words (int): Word limit (default: 5).
+
+    Returns:
+        str: The caption.
+    """
+    words = _WORD.findall(text.splitlines()[0] if text.strip() else "")
+    return " ".join(words[:max_words]).upper()
+
+
+def _wrap(draw: Any, text: str, font: Any, max_width: int) -> List[str]:
+    lines: List[str] = []
+    for word in text.split():
+        candidate = f"{lines[-1]} {word}" if lines else word
+        if lines and draw.textlength(candidate, font=font) <= max_width:
+            lines[-1] = candidate
+        else:
+            lines.append(word)
+    return lines
+
+
+def _font(path: str, size: int) -> Any:
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        logger.warning(f"Font {path} not found; using Pillow's default font.")
+        return ImageFont.load_default(size)
+
+
+class ThumbnailGenerator:
+    """Composes branded thumbnail variants from the best frames of a clip."""
+
+    def __init__(self, config: BrandingConfig, llm: Optional[LLMClient] = None,
+                 selector: Optional[FrameSelector] = None):
+        self.config = config
+        self.llm = llm
+        self.selector = selector or FrameSelector(config)
+
+    async def caption(self, title: str, niche: str) -> str:
+        """
+        Short dramatic caption from the LLM, falling back to the clip title.
+
+        Args:
+            title (str): Title of the #1 clip.
+            niche (str): Channel niche.
+
+        Returns:
+            str: Upper-case caption of at most five words.
+        """
+        if self.llm is not None:
+            try:
+                reply = await self.llm.complete(self.llm.prompts.render("thumbnail_text.j2", title=title, niche=niche))
+                caption = clean_caption(reply)
+                if caption:
+                    return caption
+            except LLMError as e:
+                logger.warning(f"Thumbnail caption request failed: {e}")
+        return clean_caption(title)
+
+    def compose(self, frame_path: str, caption: str, output_path: str, variant: int = 0) -> str:
+        """
+        Build one thumbnail from a full-resolution frame.
+
+        Args:
+            frame_path (str): Extracted frame image.
+            caption (str): Caption text.
+            output_path (str): JPEG to write.
+            variant (int): Layout variant; even puts the caption at the bottom
+                in the primary colour, odd at the top in the secondary colour.
+
+        Returns:
+            str: ``output_path``.
+
+        Raises:
+            ValueError: If no JPEG quality fits under 2 MB.
+        """
+        from PIL import Image, ImageDraw, ImageEnhance, ImageOps
+
+        with Image.open(frame_path) as frame:
+            image = frame.convert("RGB")
+        # Zoom slightly past the target so letterbox bars fall outside the crop.
+        width, height = THUMBNAIL_SIZE
+        image = ImageOps.fit(image, (int(width * ZOOM), int(height * ZOOM)), Image.Resampling.LANCZOS)
+        image = ImageOps.fit(image, THUMBNAIL_SIZE, centering=(0.5, 0.5))
+        image = ImageEnhance.Color(image).enhance(self.config.thumbnail_saturation_boost)
+
+        draw = ImageDraw.Draw(image)
+        font = _font(self.config.font_path, self.config.label_font_size)
+        lines = _wrap(draw, caption, font, int(width * 0.9))
+        line_height = int(self.config.label_font_size * 1.1)
+        block = line_height * len(lines)
+        top = height - block - int(height * 0.08) if variant % 2 == 0 else int(height * 0.06)
+        fill = self.config.primary_color if variant % 2 == 0 else self.config.secondary_color
+        stroke = max(self.config.label_font_size // 12, 2)
+        for i, line in enumerate(lines):
+            x = (width - draw.textlength(line, font=font)) / 2
+            y = top + i * line_height
+            draw.text((x + stroke, y + stroke), line, font=font, fill=self.config.background_color)
+            draw.text((x, y), line, font=font, fill=fill, stroke_width=stroke,
+                      stroke_fill=self.config.background_color)
+
+        image = self._watermark(image, variant)
+        return self._save(image, output_path)
+
+    def _watermark(self, image: Any, variant: int) -> Any:
+        from PIL import Image, ImageDraw
+
+        width, height = image.size
+        margin = int(height * 0.03)
+        if self.config.watermark_path and os.path.exists(self.config.watermark_path):
+            with Image.open(self.config.watermark_path) as mark:
+                mark = mark.convert("RGBA")
+            mark.thumbnail((width // 6, height // 6))
+            alpha = mark.getchannel("A").point(lambda a: int(a * self.config.watermark_opacity))
+            mark.putalpha(alpha)
+            image.paste(mark, (width - mark.width - margin, height - mark.height - margin), mark)
+            return image
+        overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(overlay)
+        font = _font(self.config.font_path, self.config.lower_third_font_size)
+        text = self.config.channel_display_name
+        x = width - draw.textlength(text, font=font) - margin
+        # Keep the mark in the corner opposite the caption.
+        y = margin if variant % 2 == 0 else height - self.config.lower_third_font_size - margin
+        draw.text((x, y), text, font=font, fill=(255, 255, 255, int(255 * self.config.watermark_opacity)),
+                  stroke_width=2, stroke_fill=(0, 0, 0, 160))
+        return Image.alpha_composite(image.convert("RGBA"), overlay).convert("RGB")
+
+    @staticmethod
+    def _save(image: Any, output_path: str) -> str:
+        for quality in _JPEG_QUALITIES:
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+            if buffer.tell() <= MAX_BYTES:
+                os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                with open(output_path, "wb") as f:
+                    f.write(buffer.getvalue())
+                return output_path
+        raise ValueError(f"Thumbnail {output_path} exceeds {MAX_BYTES} bytes at every quality")
+
+    async def generate(
+        self,
+        clip_path: str,
+        start: float,
+        duration: float,
+        media_info: Dict[str, object],
+        title: str,
+        niche: str,
+        output_dir: str,
+    ) -> List[str]:
+        """
+        Select frames from the #1 clip and write the thumbnail variants.
+
+        Args:
+            clip_path (str): Source holding the #1 clip.
+            start (float): Clip start in seconds.
+            duration (float): Clip length in seconds.
+            media_info (Dict[str, object]): ffprobe result for ``clip_path``.
+            title (str): Clip title (caption fallback and LLM context).
+            niche (str): Channel niche.
+            output_dir (str): Directory for frames and thumbnails.
+
+        Returns:
+            List[str]: JPEG paths, best first; the first is the main thumbnail.
+        """
+        frames = await self.selector.select_best_frames(
+            clip_path, start, duration, int(media_info["width"]), int(media_info["height"]),
+            os.path.join(output_dir, "frames"), count=self.config.thumbnail_variants,
+        )
+        caption = await self.caption(title, niche)
+        paths = []
+        for variant in range(self.config.thumbnail_variants):
+            # With fewer usable frames than variants, layouts still differ.
+            frame = frames[variant % len(frames)]
+            name = "thumbnail.jpg" if variant == 0 else f"thumbnail.v{variant + 1}.jpg"
+            paths.append(await asyncio.to_thread(
+                self.compose, frame, caption, os.path.join(output_dir, name), variant
+            ))
+        logger.info(f"Wrote {len(paths)} thumbnail variant(s) to {output_dir} with caption '{caption}'.")
+        return paths
@@ -0,0 +1,37 @@
+"""
+Deferred imports for package-level re-exports (PEP 562).
+
+A package lists the public names it re-exports and the submodule each lives
+in; the submodule (and whatever heavy libraries it pulls in) is imported
+only when the name is first accessed.
+"""
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    Build module-level ``__getattr__`` and ``__dir__`` for lazy re-exports.
+
+    Args:
+        package (str): The package's ``__name__``.
+        exports (Dict[str, str]): Public name -> fully qualified submodule.
+
+    Returns:
+        Tuple[Callable, Callable]: ``__getattr__`` and ``__dir__`` to assign
+        in the package ``__init__``.
+    """
+    def __getattr__(name: str) -> object:
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name), name)
+        # Cache on the package so later lookups bypass __getattr__.
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
@@ -1,25 +1,80 @@
+"""
+Logging setup for the pipeline.
+
+Console output is human-readable and file output is JSON lines. With
+``async_queue=True`` the calling code (including the event loop) only puts
+records on a bounded queue; formatting, file writes and rotation happen in a
+``QueueListener`` thread. When the queue is full, records are either dropped
+(``overflow="drop"``) or the caller waits for space (``overflow="block"``).
+"""
+import atexit
+import json
 import logging
 import os
-import json
-from logging.handlers import RotatingFileHandler
-from typing import Any
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+OVERFLOW_POLICIES = ("drop", "block")
+
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``.
+_STANDARD_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "taskName"}
 
 
-class ConsoleFormatter(logging.Formatter):
+class _CachedTimeFormatter(logging.Formatter):
+    """Formatter that renders each wall-clock second's timestamp only once."""
+
+    _cached_time = (-1, "")
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        second = int(record.created)
+        cached_second, cached = self._cached_time
+        if second == cached_second:
+            return cached
+        stamp = time.strftime(datefmt or TIMESTAMP_FORMAT, self.converter(record.created))
+        # A single tuple assignment, so concurrent handlers never see a torn pair.
+        self._cached_time = (second, stamp)
+        return stamp
+
+
+class ConsoleFormatter(_CachedTimeFormatter):
     """
     Human-readable log formatter for console output.
     Formats logs as: "{timestamp} [{level}] {module}: {message}".
     """
 
     def format(self, record: logging.LogRecord) -> str:
-        timestamp = self.formatTime(record, datefmt="%Y-%m-%dT%H:%M:%SZ")
+        timestamp = self.formatTime(record, datefmt=TIMESTAMP_FORMAT)
         level = record.levelname
         module = record.name
         message = record.getMessage()
         return f"{timestamp} [{level}] {module}: {message}"
 
 
-class JsonFormatter(logging.Formatter):
+def _dumps(obj: dict) -> str:
+    """Serialize a log record dict, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass  # e.g., integers beyond 64 bits; the stdlib handles them
+    return json.dumps(obj, default=str)
+
+
+class JsonFormatter(_CachedTimeFormatter):
     """
     JSON-lines formatter for file output.
     Formats logs as JSON objects with fields:
@@ -27,63 +82,242 @@ class JsonFormatter(logging.Formatter):
     - level
     - module
     - message
-    - extra
+    - extra (all fields passed via ``extra=``)
     """
 
     def format(self, record: logging.LogRecord) -> str:
+        extra = {
+            key: value for key, value in record.__dict__.items()
+            if key not in _STANDARD_RECORD_ATTRS and not key.startswith("_")
+        }
+        # Callers that already nest their fields under "extra" keep working.
+        nested = extra.pop("extra", None)
+        if isinstance(nested, dict):
+            extra = {**nested, **extra}
         log_record = {
-            "timestamp": self.formatTime(record, datefmt="%Y-%m-%dT%H:%M:%SZ"),
+            "timestamp": self.formatTime(record, datefmt=TIMESTAMP_FORMAT),
             "level": record.levelname,
             "module": record.name,
             "message": record.getMessage(),
-            "extra": record.__dict__.get("extra", {}),
+            "extra": extra,
         }
-        return json.dumps(log_record)
+        if record.exc_info:
+            log_record["exception"] = self.formatException(record.exc_info)
+        return _dumps(log_record)
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """Writes to whatever ``sys.stderr`` currently is, so redirection is honoured."""
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    ``QueueHandler`` with an explicit policy for a full queue.
+
+    Only the message is rendered on the calling thread (so that mutable
+    arguments are captured as they were); JSON encoding and exception
+    formatting happen in the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The record is owned by this handler alone (the logger does not
+        # propagate), so it is updated in place rather than copied.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class ModuleFileHandler(logging.Handler):
+    """
+    Routes records to one rotating JSON log file per pipeline module.
+
+    ``viral_channel.src.acquisition.downloader`` is written to
+    ``acquisition.log``; records outside a module go to ``{root_name}.log``.
+    """
+
+    def __init__(self, log_dir: str, root_name: str):
+        super().__init__()
+        self.log_dir = log_dir
+        self.root_name = root_name
+        self._handlers: Dict[str, RotatingFileHandler] = {}
+
+    def module_for(self, logger_name: str) -> str:
+        """
+        Map a logger name to the module log it belongs in.
+
+        Args:
+            logger_name (str): Full logger name.
+
+        Returns:
+            str: Module name used for the log file.
+        """
+        parts = logger_name.split(".")
+        if parts and parts[0] == self.root_name:
+            parts = parts[1:]
+        if parts and parts[0] == "src":
+            parts = parts[1:]
+        return parts[0] if parts and parts[0] else self.root_name
+
+    def emit(self, record: logging.LogRecord) -> None:
+        module = self.module_for(record.name)
+        handler = self._handlers.get(module)
+        if handler is None:
+            handler = RotatingFileHandler(
+                os.path.join(self.log_dir, f"{module}.log"),
+                maxBytes=MAX_LOG_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+            )
+            handler.setFormatter(self.formatter)
+            self._handlers[module] = handler
+        handler.handle(record)
+
+    def close(self) -> None:
+        for handler in self._handlers.values():
+            handler.close()
+        self._handlers.clear()
+        super().close()
+
+
+class _BlockingStopListener(QueueListener):
+    """``QueueListener`` whose stop sentinel waits for room in a full queue."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+# Queue listeners started by setup_logging, keyed by logger name.
+_listeners: Dict[str, QueueListener] = {}
+
+
+def _teardown(logger: logging.Logger) -> None:
+    """Stop the listener and close every handler previously installed on a logger."""
+    for handler in logger.handlers:
+        if isinstance(handler, BoundedQueueHandler) and handler.dropped:
+            # Still queued, so it reaches the files before the listener stops.
+            logger.warning(f"{handler.dropped} log records were dropped because the queue was full.")
+            handler.dropped = 0
+    listener = _listeners.pop(logger.name, None)
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def shutdown_logging() -> None:
+    """Flush and stop all queue listeners. Registered with ``atexit``."""
+    for name in list(_listeners):
+        _teardown(logging.getLogger(name))
+
+
+atexit.register(shutdown_logging)
 
 
 def setup_logging(
     log_dir: str,
     log_level: str = "INFO",
-    module_name: str = "viral_channel"
+    module_name: str = "viral_channel",
+    async_queue: bool = False,
+    queue_size: int = 10000,
+    overflow: str = "drop",
+    per_module_files: bool = False,
 ) -> logging.Logger:
     """
     Configure and return a Logger instance.
 
+    Calling it again replaces the handlers from the previous call, so it never
+    duplicates output.
+
     Args:
         log_dir (str): Directory where log files will be stored.
         log_level (str): Logging level for the console handler (default: "INFO").
         module_name (str): Name of the module for the log file (default: "viral_channel").
+        async_queue (bool): Hand records to a background listener thread
+            instead of writing them on the calling thread (default: False).
+        queue_size (int): Capacity of the record queue when ``async_queue`` is set.
+        overflow (str): "drop" or "block" when the queue is full (default: "drop").
+        per_module_files (bool): Also write one JSON log per module (default: False).
 
     Returns:
         logging.Logger: Configured root logger.
+
+    Raises:
+        RuntimeError: If the log directory cannot be created.
+        ValueError: If ``overflow`` is not a known policy.
     """
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
     try:
         os.makedirs(log_dir, exist_ok=True)
     except OSError as e:
         raise RuntimeError(f"Failed to create log directory {log_dir}: {e}")
 
     logger = logging.getLogger(module_name)
-    if logger.hasHandlers():
-        return logger
-
+    _teardown(logger)
     logger.setLevel(logging.DEBUG)
+    # Our handlers are complete; don't repeat records on root handlers
+    # installed by logging.basicConfig elsewhere.
+    logger.propagate = False
 
     # Console handler
-    console_handler = logging.StreamHandler()
+    console_handler = ConsoleHandler()
     console_handler.setLevel(getattr(logging, log_level.upper(), logging.INFO))
     console_formatter = ConsoleFormatter()
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
 
     # File handler
     log_file = os.path.join(log_dir, f"{module_name}.log")
     file_handler = RotatingFileHandler(
-        log_file, maxBytes=10 * 1024 * 1024, backupCount=5
+        log_file, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT
     )
     file_handler.setLevel(logging.DEBUG)
     file_formatter = JsonFormatter()
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+
+    handlers: List[logging.Handler] = [console_handler, file_handler]
+    if per_module_files:
+        module_handler = ModuleFileHandler(log_dir, module_name)
+        module_handler.setLevel(logging.DEBUG)
+        module_handler.setFormatter(file_formatter)
+        handlers.append(module_handler)
+
+    if async_queue:
+        listener = _BlockingStopListener(
+            queue.Queue(maxsize=queue_size), *handlers, respect_handler_level=True
+        )
+        logger.addHandler(BoundedQueueHandler(listener.queue, overflow=overflow))
+        listener.start()
+        _listeners[module_name] = listener
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     return logger
 
@@ -0,0 +1,322 @@
+"""
+Timing and counter instrumentation for pipeline stages and external calls.
+
+Usage:
+    with timed("ffmpeg", op="render"):
+        ...
+
+    @timed("llm")
+    async def complete(...):
+        ...
+
+    increment("download_bytes", len(chunk))
+
+Labels set with ``metric_labels(niche="gaming")`` apply to every metric
+recorded in the current context (and the asyncio tasks it spawns), so
+stage timings can be broken down per niche. Metrics are exported as JSON
+lines (``export_periodically``, appending a snapshot to a file) and in the
+Prometheus text exposition format (``add_metrics_route``).
+"""
+import asyncio
+import contextvars
+import functools
+import hmac
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.utils.logging import get_logger
+
+logger = get_logger("metrics")
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_context_labels: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar(
+    "metric_labels", default={}
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values."""
+
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        """Return counts per bucket, cumulative as Prometheus expects."""
+        result, running = [], 0
+        for c in self.counts:
+            running += c
+            result.append(running)
+        return result
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters and histograms keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> LabelKey:
+        merged = {**_context_labels.get(), **labels}
+        return tuple(sorted((k, str(v)) for k, v in merged.items()))
+
+    def increment(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name (str): Counter name (e.g., "download_bytes", "cache_hits").
+            value (float): Amount to add (default: 1.0).
+            **labels (str): Extra labels for this series.
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Record a value in a histogram.
+
+        Args:
+            name (str): Histogram name (e.g., "stage_seconds").
+            value (float): Observed value.
+            **labels (str): Extra labels for this series.
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, list]:
+        """
+        Return a JSON-serializable copy of all series.
+
+        Returns:
+            Dict[str, list]: ``counters`` and ``histograms`` lists of series dicts.
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(key), "value": value}
+                for name, series in self._counters.items() for key, value in series.items()
+            ]
+            histograms = [
+                {"name": name, "labels": dict(key), "count": h.count, "sum": h.total,
+                 "buckets": dict(zip(map(str, h.buckets), h.cumulative()))}
+                for name, series in self._histograms.items() for key, h in series.items()
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def export_json_lines(self, path: str) -> None:
+        """
+        Append the current snapshot to a JSON-lines file, one series per line.
+
+        Args:
+            path (str): Destination file.
+        """
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        snap = self.snapshot()
+        with open(path, "a", encoding="utf-8") as f:
+            for kind in ("counters", "histograms"):
+                for series in snap[kind]:
+                    f.write(json.dumps({"timestamp": timestamp, "type": kind[:-1], **series}) + "\n")
+
+    def to_prometheus(self, prefix: str = "viral_channel_") -> str:
+        """
+        Render all series in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): Prefix added to every metric name.
+
+        Returns:
+            str: Exposition text.
+        """
+        def fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(key) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{prefix}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{fmt_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{prefix}{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, h in series.items():
+                    for bound, count in zip(h.buckets, h.cumulative()):
+                        lines.append(f"{metric}_bucket{fmt_labels(key, ('le', f'{bound:g}'))} {count}")
+                    lines.append(f"{metric}_bucket{fmt_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{metric}_sum{fmt_labels(key)} {h.total:g}")
+                    lines.append(f"{metric}_count{fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drop all series."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def increment(name: str, value: float = 1.0, **labels: str) -> None:
+    """Add to a counter in the default registry."""
+    REGISTRY.increment(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Record a histogram value in the default registry."""
+    REGISTRY.observe(name, value, **labels)
+
+
+@contextmanager
+def metric_labels(**labels: str) -> Iterator[None]:
+    """
+    Apply labels to every metric recorded inside the block.
+
+    Args:
+        **labels (str): Labels such as ``niche="gaming"``.
+    """
+    token = _context_labels.set({**_context_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _context_labels.reset(token)
+
+
+class timed:
+    """
+    Time a block or function into the ``stage_seconds`` histogram.
+
+    Works as a context manager and as a decorator for both sync and async
+    functions. Failures are counted in ``stage_errors`` and still timed.
+    """
+
+    def __init__(self, stage: str, registry: Optional[MetricsRegistry] = None, **labels: str):
+        self.stage = stage
+        self.registry = registry or REGISTRY
+        self.labels = labels
+        self._start = 0.0
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self._start
+        self.registry.observe("stage_seconds", elapsed, stage=self.stage, **self.labels)
+        if exc_type is not None:
+            self.registry.increment("stage_errors", stage=self.stage, **self.labels)
+        logger.debug(
+            f"{self.stage} took {elapsed:.3f}s",
+            extra={"stage": self.stage, "seconds": round(elapsed, 6),
+                   "failed": exc_type is not None, **_context_labels.get(), **self.labels},
+        )
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(self.stage, self.registry, **self.labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage, self.registry, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def add_metrics_route(
+    app, registry: Optional[MetricsRegistry] = None, path: str = "/metrics", token: Optional[str] = None
+) -> None:
+    """
+    Expose the registry in Prometheus text format on an aiohttp application.
+
+    Args:
+        app (aiohttp.web.Application): Application to add the route to.
+        registry (Optional[MetricsRegistry]): Registry to expose (default: global).
+        path (str): Route path (default: "/metrics").
+        token (Optional[str]): If given, scrapes must send ``Authorization: Bearer <token>``.
+    """
+    from aiohttp import web
+
+    source = registry or REGISTRY
+    expected = f"Bearer {token}" if token else None
+
+    async def handler(request: web.Request) -> web.Response:
+        if expected is not None and not hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(), expected.encode()
+        ):
+            raise web.HTTPUnauthorized(headers={"WWW-Authenticate": "Bearer"})
+        return web.Response(text=source.to_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app.router.add_get(path, handler)
+
+
+async def export_periodically(path: str, interval_seconds: float, registry: Optional[MetricsRegistry] = None) -> None:
+    """
+    Append a JSON-lines snapshot to ``path`` every ``interval_seconds`` until cancelled.
+
+    A last snapshot is written when the task is cancelled, so a run's final
+    counts reach the file on shutdown.
+
+    Args:
+        path (str): Destination file; its directory is created if needed.
+        interval_seconds (float): Time between snapshots.
+        registry (Optional[MetricsRegistry]): Registry to export (default: global).
+    """
+    source = registry or REGISTRY
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(source.export_json_lines, path)
+            except OSError as e:
+                logger.error(f"Writing metrics to {path} failed: {e}")
+    finally:
+        try:
+            source.export_json_lines(path)
+        except OSError as e:
+            logger.error(f"Writing final metrics to {path} failed: {e}")
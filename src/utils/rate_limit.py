@@ -0,0 +1,71 @@
+"""
+Async token-bucket rate limiting for external APIs.
+
+One bucket per API, shared by every coroutine (and every niche) that calls
+it, so concurrent fan-out never exceeds the provider's limit.
+"""
+import asyncio
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average, with bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def per_minute(cls, requests: float, burst: Optional[float] = None) -> "TokenBucket":
+        """
+        Bucket for a requests-per-minute limit.
+
+        Args:
+            requests (float): Requests allowed per minute.
+            burst (Optional[float]): Largest burst (default: a tenth of the
+                minute's budget, at least 1), so a rolling-window limit is
+                not exhausted in the first second.
+
+        Returns:
+            TokenBucket: The bucket.
+        """
+        return cls(requests / 60.0, burst if burst is not None else max(requests / 10.0, 1.0))
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Wait until ``tokens`` are available and take them. Waiters are served in order.
+
+        Args:
+            tokens (float): Cost of the request (default: 1).
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for ``seconds`` (e.g., after a 429 with Retry-After).
+
+        Args:
+            seconds (float): How long the provider asked us to back off.
+        """
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
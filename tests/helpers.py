@@ -0,0 +1,169 @@
+"""
+Fixtures and fakes shared by more than one test module: storage and download
+fakes, and a local OpenAI-compatible endpoint for LLM client tests.
+
+Import fixtures by name into a test module (``from tests.helpers import general``).
+"""
+import asyncio
+import json
+import os
+import re
+import pytest
+from aiohttp import web
+from src.config import GeneralConfig, LLMConfig, LLMProviderConfig, StorageConfig
+from src.llm.client import LLMClient
+from src.orchestrator.storage import DiskUsage, StorageManager
+
+MB = 1024 * 1024
+ITEM_ID = re.compile(r"^(?:=== )?\[(\w+)\]", re.MULTILINE)
+INFO = {
+    "id": "abcdefghijk",
+    "title": "Big moment",
+    "duration": 3600,
+    "tbr": 4000.0,
+    "heatmap": [{"start_time": i * 36.0, "end_time": (i + 1) * 36.0, "value": 1.0 if i == 50 else 0.1}
+                for i in range(100)],
+}
+
+
+class RecordingYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL: records options and writes the files it would produce."""
+
+    calls = []
+
+    def __init__(self, options):
+        self.options = options
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def sanitize_info(self, info):
+        return info
+
+    def extract_info(self, url, download=True):
+        RecordingYoutubeDL.calls.append(self.options)
+        outtmpl = self.options["outtmpl"]
+        info = dict(INFO)
+        if self.options.get("skip_download"):
+            path = outtmpl.replace("%(id)s", INFO["id"]).replace("%(ext)s", "en.json3")
+            with open(path, "w") as f:
+                f.write('{"events": []}')
+            info["requested_subtitles"] = {"en": {"filepath": path}}
+            return info
+        ext = "m4a" if "audio" in outtmpl else "mp4"
+        path = outtmpl.replace("%(id)s", INFO["id"]).replace("%(ext)s", ext)
+        ranges = self.options.get("download_ranges")
+        seconds = INFO["duration"]
+        if ranges is not None:
+            (section,) = list(ranges(info, self))
+            seconds = section["end_time"] - section["start_time"]
+        with open(path, "wb") as f:
+            f.write(b"\0" * int(seconds * 1000))
+        info["requested_downloads"] = [{"filepath": path}]
+        return info
+
+
+@pytest.fixture
+def general(tmp_path):
+    """Fixture providing working and archive dirs under tmp_path."""
+    (tmp_path / "working").mkdir()
+    (tmp_path / "archive").mkdir()
+    RecordingYoutubeDL.calls = []
+    return GeneralConfig(working_dir=str(tmp_path / "working"), archive_dir=str(tmp_path / "archive"))
+
+
+def fake_disk(working_dir, capacity):
+    """Disk usage whose free space shrinks with the files in ``working_dir``."""
+    def _usage(_path):
+        used = sum(
+            os.path.getsize(os.path.join(d, f))
+            for d, _, files in os.walk(working_dir) for f in files
+        )
+        return DiskUsage(capacity, used, capacity - used)
+    return _usage
+
+
+def make_manager(general, capacity, **overrides):
+    config = StorageConfig(reserve_headroom_gb=0, reservation_timeout_seconds=0.5, **overrides)
+    return StorageManager(general, config, disk_usage=fake_disk(general.working_dir, capacity))
+
+
+def write_file(path, nbytes):
+    with open(path, "wb") as f:
+        f.write(b"\0" * nbytes)
+    return str(path)
+
+
+class StubLLM:
+    """OpenAI-compatible chat endpoint that answers batch prompts by item ID."""
+
+    def __init__(self, truncate_above=None, drop_once=None, fail=False, delay=0.0, empty_above=None):
+        self.prompts = []
+        self.truncate_above = truncate_above
+        self.empty_above = empty_above
+        self.drop_once = drop_once
+        self.fail = fail
+        self.delay = delay
+        self.requests = 0
+
+    async def chat(self, request):
+        body = await request.json()
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return web.json_response({"error": {"message": "down"}}, status=500)
+        prompt = body["messages"][-1]["content"]
+        self.prompts.append(prompt)
+        ids = ITEM_ID.findall(prompt)
+        finish = "stop"
+        if self.truncate_above and len(ids) > self.truncate_above:
+            content, finish = '{"results": [{"id": "', "length"
+        elif self.empty_above and len(ids) > self.empty_above:
+            content = '{"results": []}'
+        else:
+            if self.drop_once in ids:
+                ids.remove(self.drop_once)
+                self.drop_once = None
+            results = [
+                {"id": i, "niches": ["gaming"], "start": 10, "end": 30, "reason": "peak"} for i in ids
+            ]
+            content = "<think>hmm</think>" + json.dumps({"results": results})
+        return web.json_response({
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": finish,
+                         "message": {"role": "assistant", "content": content}}],
+        })
+
+
+def llm_provider(name, port):
+    return LLMProviderConfig(name=name, base_url=f"http://127.0.0.1:{port}/v1", model="stub",
+                             max_tokens=1024, max_retries=1, timeout_seconds=5)
+
+
+async def serve_llm(stubs, scenario, batch_max_items=40, **overrides):
+    runners, ports = [], []
+    for stub in stubs:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", stub.chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        runners.append(runner)
+        ports.append(runner.addresses[0][1])
+    config = LLMConfig(
+        primary=llm_provider("primary", ports[0]),
+        fallback=llm_provider("fallback", ports[1]) if len(ports) > 1 else None,
+        batch_max_items=batch_max_items,
+        **overrides,
+    )
+    try:
+        return await scenario(LLMClient(config))
+    finally:
+        for runner in runners:
+            await runner.cleanup()
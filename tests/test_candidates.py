@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from src.config import DiscoveryConfig
+from src.discovery.candidates import (
+    SOURCE_REDDIT,
+    SOURCE_TRENDING,
+    CandidateBatch,
+    CandidateBatchBuilder,
+    ChannelTable,
+    source_label,
+)
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def config():
+    """Fixture providing discovery settings with low thresholds."""
+    return DiscoveryConfig(reddit_subreddits={}, min_views=1000, min_viral_score=0.0)
+
+
+def add(builder, video_id, channel="UC1", views=10_000, hours_ago=2.0, **kwargs):
+    return builder.add(
+        video_id=video_id,
+        title=f"Title {video_id}",
+        channel_id=channel,
+        channel_name=f"Channel {channel}",
+        source=kwargs.pop("source", SOURCE_TRENDING),
+        view_count=views,
+        published_at=NOW - hours_ago * 3600,
+        view_velocity=views / hours_ago,
+        **kwargs,
+    )
+
+
+def test_builder_merges_duplicates_and_interns_channels():
+    """Test that repeated videos merge into one row and channels are interned."""
+    builder = CandidateBatchBuilder()
+    add(builder, "aaaaaaaaaaa", channel="UC1", views=5000)
+    add(builder, "bbbbbbbbbbb", channel="UC1", views=7000)
+    add(builder, "aaaaaaaaaaa", channel="UC1", views=9000, source=SOURCE_REDDIT, reddit_score=300)
+
+    batch = builder.build()
+    assert len(batch) == 2
+    assert len(batch.channels) == 1
+    assert batch.view_count.tolist() == [9000, 7000]
+    assert batch.reddit_score.tolist() == [300, 0]
+    assert source_label(int(batch.sources[0])) == "youtube_trending,reddit"
+    assert batch.channel_idx.dtype == np.int32
+
+
+def test_rank_applies_thresholds_and_orders_by_score(config):
+    """Test that rank filters by min_views and returns the best first."""
+    builder = CandidateBatchBuilder()
+    add(builder, "slow0000000", views=20_000, hours_ago=5.5)
+    add(builder, "fast0000000", views=90_000, hours_ago=1.0, like_count=9000)
+    add(builder, "tiny0000000", views=10, hours_ago=0.5)
+    batch = builder.build()
+
+    indices, scores = batch.rank(config, n=5, now=NOW)
+    assert [batch.video_ids[i].decode() for i in indices] == ["fast0000000", "slow0000000"]
+    assert scores[0] > scores[1]
+    assert np.all((scores >= 0) & (scores <= 1))
+
+
+def test_rank_limits_to_top_n(config):
+    """Test that only the requested number of candidates is returned."""
+    builder = CandidateBatchBuilder()
+    for i in range(50):
+        add(builder, f"vid{i:08d}", views=1000 + i * 100)
+    indices, scores = builder.build().rank(config, n=3, now=NOW)
+    assert len(indices) == 3
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_select_and_concat_share_channel_table():
+    """Test subsetting and joining batches from the same cycle."""
+    channels = ChannelTable()
+    first, second = CandidateBatchBuilder(channels), CandidateBatchBuilder(channels)
+    add(first, "aaaaaaaaaaa", channel="UC1")
+    add(first, "bbbbbbbbbbb", channel="UC2")
+    add(second, "ccccccccccc", channel="UC2")
+
+    joined = CandidateBatch.concat([first.build(), second.build()])
+    assert len(joined) == 3
+    assert len(channels) == 2
+    subset = joined.select(joined.channel_idx == channels.intern("UC2", ""))
+    assert subset.titles == ["Title bbbbbbbbbbb", "Title ccccccccccc"]
+
+    with pytest.raises(ValueError):
+        CandidateBatch.concat([first.build(), CandidateBatchBuilder().build()])
+
+
+def test_to_discovered_videos_only_for_selected(config):
+    """Test that ORM rows are created for the ranked candidates only."""
+    builder = CandidateBatchBuilder()
+    add(builder, "aaaaaaaaaaa", views=50_000, category_id=20)
+    add(builder, "bbbbbbbbbbb", views=40_000, source=SOURCE_REDDIT, reddit_score=500)
+    batch = builder.build()
+    indices, scores = batch.rank(config, n=1, now=NOW)
+
+    rows = batch.to_discovered_videos(indices, scores, niche="gaming")
+    assert len(rows) == 1
+    row = rows[0]
+    assert row.niche == "gaming"
+    assert row.url == f"https://www.youtube.com/watch?v={row.video_id}"
+    assert row.channel_id == "UC1"
+    assert row.viral_score == pytest.approx(float(scores[0]))
@@ -0,0 +1,133 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+import pytest
+from src.analytics.channel_analytics import (
+    RETENTION_POINTS,
+    AnalyticsStore,
+    ChannelAnalytics,
+    _to_day,
+    estimate_clip_boundaries,
+)
+from src.database import Clip, DiscoveredVideo, PipelineRun, get_session, init_db
+
+TODAY = date(2026, 3, 10)
+
+
+class FakeSource:
+    """In-memory AnalyticsSource recording the requested date ranges."""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch_daily(self, video_id, start, end):
+        self.calls.append((video_id, start, end))
+        days = (end - start).days + 1
+        return [
+            {"day": _to_day(start + timedelta(days=i)), "views": 100, "likes": 5, "comments": 1,
+             "avg_view_duration": 360.0, "ctr": 0.05, "subscribers": 2}
+            for i in range(min(days, 3))
+        ]
+
+    def fetch_retention(self, video_id):
+        return np.linspace(1.0, 0.2, RETENTION_POINTS, dtype=np.float32)
+
+
+class RevisingSource(FakeSource):
+    """Reports every requested day; a day's views grow each time it is fetched again."""
+
+    def __init__(self):
+        super().__init__()
+        self.fetched = {}
+
+    def fetch_daily(self, video_id, start, end):
+        self.calls.append((video_id, start, end))
+        rows = []
+        for i in range((end - start).days + 1):
+            day = _to_day(start + timedelta(days=i))
+            self.fetched[day] = self.fetched.get(day, 0) + 1
+            rows.append({"day": day, "views": 100 * self.fetched[day], "likes": 0, "comments": 0,
+                         "avg_view_duration": 60.0, "ctr": float("nan"), "subscribers": 0})
+        return rows
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Fixture providing a database with one uploaded gaming video and two clips."""
+    engine = init_db(str(tmp_path / "test.db"))
+    session = get_session(engine)
+    run = PipelineRun(
+        niche="gaming", cycle_start=datetime(2026, 3, 1), cycle_end=datetime(2026, 3, 1, 6),
+        youtube_video_id="yt1", video_duration_seconds=100.0,
+    )
+    session.add(run)
+    session.flush()
+    for rank in (1, 2):
+        video = DiscoveredVideo(
+            video_id=f"src{rank}", title="t", channel_name="c", channel_id="c",
+            url="u", niche="gaming",
+        )
+        session.add(video)
+        session.flush()
+        session.add(Clip(
+            pipeline_run_id=run.id, discovered_video_id=video.id, rank_position=rank,
+            start_time_seconds=0.0, end_time_seconds=20.0, clip_duration_seconds=20.0,
+        ))
+    session.commit()
+    session.close()
+    yield engine
+    engine.dispose()
+
+
+def test_estimate_clip_boundaries_spreads_gaps_evenly():
+    """Test that non-clip time is split evenly around the clips."""
+    ratios = estimate_clip_boundaries([20.0, 20.0], 100.0)
+    np.testing.assert_allclose(ratios, [0.2, 0.6], rtol=1e-6)
+
+
+def test_ingest_is_incremental_and_persistent(engine, tmp_path):
+    """Test that a second ingest starts after the stored high-water mark."""
+    source = FakeSource()
+    store_path = str(tmp_path / "analytics.npz")
+    analytics = ChannelAnalytics(engine, AnalyticsStore(store_path), {"gaming": source})
+    assert analytics.ingest(today=TODAY) == 3
+
+    reloaded = ChannelAnalytics(engine, AnalyticsStore(store_path), {"gaming": source})
+    reloaded.ingest(today=TODAY + timedelta(days=2))
+    last_call = source.calls[-1]
+    assert last_call[1] == TODAY - timedelta(days=90) + timedelta(days=3)
+    assert reloaded.store.daily["views"].size == 6
+
+
+def test_provisional_days_are_refetched_and_replaced(engine, tmp_path):
+    """Test that recent days are fetched again and overwrite their earlier figures."""
+    source = RevisingSource()
+    analytics = ChannelAnalytics(engine, AnalyticsStore(str(tmp_path / "analytics.npz")), {"gaming": source})
+    analytics.ingest(today=TODAY)
+    analytics.ingest(today=TODAY + timedelta(days=1))
+    assert source.calls[-1][1:] == (TODAY - timedelta(days=2), TODAY + timedelta(days=1))
+
+    daily = analytics.store.daily
+    assert daily["day"].size == 92 and np.unique(daily["day"]).size == 92
+    views = dict(zip(daily["day"].tolist(), daily["views"].tolist()))
+    assert views[_to_day(TODAY)] == 200
+    assert views[_to_day(TODAY - timedelta(days=3))] == 100
+    assert views[_to_day(TODAY + timedelta(days=1))] == 100
+
+
+def test_aggregations(engine, tmp_path):
+    """Test retention at clip starts, CTR trend and /stats totals."""
+    store = AnalyticsStore(str(tmp_path / "analytics.npz"))
+    analytics = ChannelAnalytics(engine, store, {"gaming": FakeSource()})
+    analytics.ingest(today=TODAY)
+
+    retention = analytics.retention_at_clip_starts("gaming")
+    assert retention[0] == pytest.approx(store.retention[0, 19])
+    assert np.isnan(retention[2])
+
+    trend = analytics.ctr_trend("gaming", days=365, today=TODAY)
+    assert trend["mean"] == pytest.approx(0.05)
+
+    stats = analytics.stats_summary(days=365, today=TODAY)
+    assert stats["gaming"]["views"] == 300
+    assert stats["gaming"]["watch_hours"] == pytest.approx(30.0)
+    assert stats["gaming"]["videos"] == 1
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import pytest
+from unittest.mock import patch
+from src.config import AudioConfig, VideoConfig
+from src.compilation.compiler import VideoCompiler, write_concat_list
+from src.compilation.ffmpeg_wrapper import (
+    _parse_progress_time,
+    build_render_with_previews_command,
+    parse_probe_output,
+)
+
+
+@pytest.fixture
+def segments(tmp_path):
+    """Fixture providing two placeholder segment files."""
+    paths = []
+    for name in ("seg1.mp4", "seg2.mp4"):
+        path = tmp_path / name
+        path.write_bytes(b"")
+        paths.append(str(path))
+    return paths
+
+
+def test_render_command_uses_single_input_and_three_outputs(tmp_path, segments):
+    """Test that the final render, proxy and teaser share one decode."""
+    list_path = write_concat_list(segments, str(tmp_path / "list.ffconcat"))
+    command = build_render_with_previews_command(
+        concat_list_path=list_path,
+        output_path="final.mp4",
+        proxy_path="final.proxy.mp4",
+        teaser_path="final.teaser.mp4",
+        resolution="1920x1080",
+        fps=30,
+        codec="libx264",
+        crf=20,
+        preset="medium",
+        pixel_format="yuv420p",
+        audio_codec="aac",
+        audio_bitrate="192k",
+        sample_rate=48000,
+    )
+    assert command.count("-i") == 1
+    assert command[-1] == "final.teaser.mp4"
+    assert "final.mp4" in command and "final.proxy.mp4" in command
+    graph = command[command.index("-filter_complex") + 1]
+    assert "split=3" in graph and "asplit=3" in graph
+    assert "trim=0:30.0" in graph
+    assert "scale=-2:480" in graph
+    assert "+frag_keyframe+empty_moov+default_base_moof" in command
+
+
+def test_render_command_rejects_bad_resolution(tmp_path, segments):
+    """Test that a malformed resolution raises ValueError."""
+    list_path = write_concat_list(segments, str(tmp_path / "list.ffconcat"))
+    with pytest.raises(ValueError):
+        build_render_with_previews_command(
+            list_path, "a.mp4", "b.mp4", "c.mp4", "1080p", 30, "libx264", 20,
+            "medium", "yuv420p", "aac", "192k", 48000,
+        )
+
+
+def test_parse_progress_time():
+    """Test parsing of ffmpeg -progress lines."""
+    assert _parse_progress_time("out_time_us=32500000") == 32.5
+    assert _parse_progress_time("frame=120") is None
+
+
+def test_parse_probe_output():
+    """Test that ffprobe JSON is reduced to the pipeline fields."""
+    raw = """{"streams": [
+        {"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+         "avg_frame_rate": "30000/1001"},
+        {"codec_type": "audio", "codec_name": "aac", "channels": 2}],
+        "format": {"duration": "61.5"}}"""
+    info = parse_probe_output(raw)
+    assert info["duration"] == 61.5
+    assert info["width"] == 1920
+    assert round(info["fps"], 2) == 29.97
+    assert info["audio_channels"] == 2
+
+
+def test_teaser_callback_fires_before_render_completes(tmp_path, segments):
+    """Test that the teaser callback runs as soon as progress passes the teaser length."""
+    events = []
+
+    async def fake_run(args, timeout, on_progress):
+        for seconds in (10.0, 31.0, 33.0, 40.0, 600.0):
+            await on_progress(seconds)
+            await asyncio.sleep(0)
+            events.append(f"progress {seconds}")
+
+    async def on_teaser_ready(path):
+        events.append(f"teaser {os.path.basename(path)}")
+
+    compiler = VideoCompiler(VideoConfig(), AudioConfig())
+    with patch("src.compilation.compiler.run_ffmpeg_async", fake_run):
+        outputs = asyncio.run(
+            compiler.render(segments, str(tmp_path / "out" / "final.mp4"), on_teaser_ready)
+        )
+
+    assert outputs.proxy_path.endswith("final.proxy.mp4")
+    assert events.index("teaser final.teaser.mp4") < events.index("progress 600.0")
+    assert events.count("teaser final.teaser.mp4") == 1
+    assert not os.path.exists(tmp_path / "out" / "final.ffconcat")
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import shutil
+import pytest
+from pydantic import ValidationError
+from src.config import load_config
+from src.database import get_config_overrides, get_session, init_db
+from src.orchestrator.config_service import ConfigService, diff_configs, patch_config
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    """Fixture providing a writable copy of the shipped config."""
+    path = tmp_path / "config.yaml"
+    shutil.copy("config/config.yaml", path)
+    return str(path)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Fixture providing a fresh database."""
+    return init_db(str(tmp_path / "test.db"))
+
+
+def edit_config(path, old, new):
+    with open(path) as f:
+        text = f.read()
+    assert old in text
+    with open(path, "w") as f:
+        f.write(text.replace(old, new))
+    # Make sure the mtime moves even on coarse-grained filesystems.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_load_config_is_cached_until_file_changes(config_path):
+    """Test that load_config reuses the validated config until the file is edited."""
+    first = load_config(config_path)
+    assert load_config(config_path) is first
+
+    os.utime(config_path)  # touched, content unchanged
+    assert load_config(config_path) is first
+
+    edit_config(config_path, "min_views: 10000", "min_views: 20000")
+    reloaded = load_config(config_path)
+    assert reloaded is not first
+    assert reloaded.discovery.min_views == 20000
+
+
+def test_cached_config_cannot_be_modified_in_place(config_path):
+    """Test that the shared config rejects assignment, so one caller cannot change another's view."""
+    config = load_config(config_path)
+    with pytest.raises(ValidationError):
+        config.discovery.min_views = 1
+    assert load_config(config_path).discovery.min_views == 10000
+
+
+def test_patch_config_shares_unchanged_sections(config_path):
+    """Test that a patch only replaces the models along the patched path."""
+    config = load_config(config_path)
+    patched = patch_config(config, {"discovery.min_views": 5000, "channels.0.enabled": False})
+
+    assert patched.discovery.min_views == 5000
+    assert patched.channels[0].enabled is False
+    assert config.discovery.min_views == 10000
+    assert patched.video is config.video
+    assert diff_configs(config, patched) == {"discovery.min_views", "channels"}
+
+
+def test_patch_config_validates_touched_model(config_path):
+    """Test that patches are validated, including model-level validators."""
+    config = load_config(config_path)
+    with pytest.raises(ValidationError):
+        patch_config(config, {"discovery.min_views": "many"})
+    with pytest.raises(ValidationError):
+        patch_config(config, {"discovery.scoring_weight_reddit": 0.9})
+    with pytest.raises(KeyError):
+        patch_config(config, {"discovery.no_such_field": 1})
+
+    patched = patch_config(config, {
+        "discovery.scoring_weight_reddit": 0.30,
+        "discovery.scoring_weight_recency": 0.10,
+    })
+    assert patched.discovery.scoring_weight_reddit == 0.30
+
+
+def test_override_is_persisted_and_notified(config_path, engine):
+    """Test that overrides are stored in the DB and only notify matching subscribers."""
+    service = ConfigService(config_path, engine=engine)
+    discovery_changes, video_changes = [], []
+    service.subscribe(lambda cfg, keys: discovery_changes.append(keys), prefix="discovery")
+    service.subscribe(lambda cfg, keys: video_changes.append(keys), prefix="video")
+
+    service.set_override("discovery.min_views", "2500", updated_by="telegram")
+
+    assert service.config.discovery.min_views == 2500
+    assert discovery_changes == [{"discovery.min_views"}]
+    assert video_changes == []
+    session = get_session(engine)
+    assert get_config_overrides(session) == {"discovery.min_views": "2500"}
+    session.close()
+
+    # A new process picks the override up from the database.
+    assert ConfigService(config_path, engine=engine).config.discovery.min_views == 2500
+
+    service.clear_override("discovery.min_views")
+    assert service.config.discovery.min_views == 10000
+
+
+def test_invalid_override_is_not_stored(config_path, engine):
+    """Test that a rejected override leaves the DB and the live config untouched."""
+    service = ConfigService(config_path, engine=engine)
+    with pytest.raises(ValidationError):
+        service.set_override("video.crf", "high")
+    session = get_session(engine)
+    assert get_config_overrides(session) == {}
+    session.close()
+
+
+def test_file_edit_keeps_overrides(config_path, engine):
+    """Test that reloading an edited file re-applies overrides on top of it."""
+    service = ConfigService(config_path, engine=engine)
+    service.set_override("discovery.min_views", "2500")
+    changes = []
+    service.subscribe(lambda cfg, keys: changes.append(keys))
+
+    edit_config(config_path, "target_clips: 10", "target_clips: 12")
+    assert service.reload() == {"video.target_clips"}
+    assert service.config.video.target_clips == 12
+    assert service.config.discovery.min_views == 2500
+    assert changes == [{"video.target_clips"}]
+    assert service.reload() == set()
+
+
+def test_watcher_keeps_config_on_invalid_edit(config_path):
+    """Test that the watcher reloads edits and ignores invalid ones."""
+    service = ConfigService(config_path, poll_interval=0.01)
+
+    async def run():
+        service.start()
+        edit_config(config_path, "target_clips: 10", "target_clips: 11")
+        await asyncio.sleep(0.1)
+        assert service.config.video.target_clips == 11
+        edit_config(config_path, "target_clips: 11", "target_clips: eleven")
+        await asyncio.sleep(0.1)
+        await service.stop()
+
+    asyncio.run(run())
+    assert service.config.video.target_clips == 11
+
+
+def test_watcher_survives_database_errors(config_path, engine):
+    """Test that a failing overrides query is logged and the next poll recovers."""
+    service = ConfigService(config_path, engine, poll_interval=0.01)
+
+    async def run():
+        service.start()
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ALTER TABLE config_overrides RENAME TO config_overrides_away")
+        edit_config(config_path, "target_clips: 10", "target_clips: 11")
+        await asyncio.sleep(0.1)
+        assert not service._watch_task.done()
+        assert service.config.video.target_clips == 10
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ALTER TABLE config_overrides_away RENAME TO config_overrides")
+        await asyncio.sleep(0.1)
+        await service.stop()
+
+    asyncio.run(run())
+    assert service.config.video.target_clips == 11
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from src.config import ChannelConfig, DiscoveryConfig
+from src.discovery.candidates import SOURCE_REDDIT, SOURCE_TRENDING, RawCandidate
+from src.discovery.fanout import SourcePage, reddit_origin, trending_origin
+from src.discovery.shared import SharedDiscoveryCache
+
+
+def channel(name, niche, category, enabled=True):
+    return ChannelConfig(
+        name=name,
+        niche=niche,
+        enabled=enabled,
+        youtube_category_id=category,
+        youtube_credentials_file=f"credentials/{niche}.json",
+        schedule_times_utc=["12:00"],
+        voice="en_us_male",
+        hashtags=[],
+        standard_tags=[],
+        youtube_search_queries=[],
+    )
+
+
+def candidate(video_id, category, source=SOURCE_TRENDING):
+    return RawCandidate(video_id, f"Title {video_id}", "UC1", "Channel", source,
+                        view_count=20_000, category_id=category)
+
+
+class RecordingFanout:
+    """Replays fixed pages and records what each fetch asked for."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def stream(self, regions, subreddits, search_queries=()):
+        self.calls.append((list(regions), sorted(subreddits), list(search_queries)))
+        await asyncio.sleep(0.01)
+        yield SourcePage(trending_origin("US"), [candidate("game0000001", 20), candidate("sport000001", 17)])
+        yield SourcePage(trending_origin("US"), [candidate("music000001", 10)])
+        yield SourcePage(reddit_origin("pcgaming"), [candidate("music000001", 10, SOURCE_REDDIT)])
+
+
+@pytest.fixture
+def config():
+    """Fixture providing discovery settings with overlapping subreddits."""
+    return DiscoveryConfig(
+        reddit_subreddits={"gaming": ["gaming", "pcgaming"], "sports": ["sports", "gaming"]},
+        youtube_regions=["US", "GB"],
+    )
+
+
+def test_niches_share_one_fetch_and_are_classified(config):
+    """Test that concurrent niche runs trigger one fetch and get their own rows."""
+    fanout = RecordingFanout()
+    cache = SharedDiscoveryCache(fanout, config, [channel("G", "gaming", 20), channel("S", "sports", 17)])
+
+    async def scenario():
+        return await asyncio.gather(cache.get("gaming"), cache.get("sports"))
+
+    gaming, sports = asyncio.run(scenario())
+    assert len(fanout.calls) == 1
+    regions, subreddits, _ = fanout.calls[0]
+    assert regions == ["US", "GB"]
+    assert subreddits == ["gaming", "pcgaming", "sports"]
+    assert sorted(v.decode() for v in gaming.video_ids) == ["game0000001", "music000001"]
+    assert [v.decode() for v in sports.video_ids] == ["sport000001"]
+    assert gaming.channels is sports.channels
+
+
+def test_snapshot_expires_after_ttl(config):
+    """Test that a stale snapshot is refetched and a fresh one is reused."""
+    now = [0.0]
+    fanout = RecordingFanout()
+    cache = SharedDiscoveryCache(fanout, config, [channel("G", "gaming", 20)],
+                                 ttl_seconds=60, clock=lambda: now[0])
+
+    async def scenario():
+        await cache.get("gaming")
+        now[0] = 59.0
+        await cache.get("gaming")
+        now[0] = 61.0
+        await cache.get("gaming")
+
+    asyncio.run(scenario())
+    assert len(fanout.calls) == 2
+
+
+def test_disabled_channels_are_not_classified(config):
+    """Test that niches without an enabled channel get no rows or sources."""
+    fanout = RecordingFanout()
+    cache = SharedDiscoveryCache(fanout, config, [channel("G", "gaming", 20), channel("S", "sports", 17, False)])
+
+    assert cache.niches == ["gaming"]
+    assert len(asyncio.run(cache.get("sports"))) == 0
+    assert fanout.calls[0][1] == ["gaming", "pcgaming"]
@@ -0,0 +1,171 @@
+import asyncio
+import aiohttp
+import pytest
+from aiohttp import web
+from src.config import DiscoveryConfig
+from src.discovery.candidates import SOURCE_REDDIT, SOURCE_TRENDING
+from src.discovery.fanout import DiscoveryFanout
+from src.discovery.http import ConditionalClient
+from src.discovery.reddit_source import RedditSource, extract_youtube_id
+from src.discovery.youtube_source import YouTubeSource, parse_duration
+from src.utils.rate_limit import TokenBucket
+
+
+def video(video_id, views=50_000):
+    return {
+        "id": video_id,
+        "snippet": {
+            "title": f"Video {video_id}",
+            "channelId": "UC1",
+            "channelTitle": "Channel",
+            "publishedAt": "2024-01-01T00:00:00Z",
+            "categoryId": "20",
+        },
+        "statistics": {"viewCount": str(views), "likeCount": "100", "commentCount": "10"},
+        "contentDetails": {"duration": "PT1M30S"},
+    }
+
+
+TRENDING = {"US": [f"us{i:09d}" for i in range(70)], "GB": ["gb000000000", "us000000000"]}
+
+
+class StubAPI:
+    """Serves canned YouTube and Reddit responses and records requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.fail_once = set()
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/yt/videos", self.videos)
+        app.router.add_get("/r/{sub}/{sort}.json", self.listing)
+        return app
+
+    async def videos(self, request):
+        self.requests.append(request.path_qs)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        if "ids" in self.fail_once:
+            self.fail_once.discard("ids")
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        if "id" in request.query:
+            items = [video(i, 80_000) for i in request.query["id"].split(",")]
+            return web.json_response({"items": items}, headers={"ETag": '"v1"'})
+        if request.query["regionCode"] not in TRENDING:
+            return web.Response(status=400, text="regionCode invalid")
+        ids = TRENDING[request.query["regionCode"]]
+        start = int(request.query.get("pageToken", 0))
+        end = start + int(request.query["maxResults"])
+        body = {"items": [video(i) for i in ids[start:end]]}
+        if end < len(ids):
+            body["nextPageToken"] = str(end)
+        return web.json_response(body)
+
+    async def listing(self, request):
+        self.requests.append(request.path_qs)
+        children = [
+            {"data": {"url": "https://youtu.be/rd000000001", "score": 500, "title": "a"}},
+            {"data": {"url": "https://www.youtube.com/watch?v=rd000000002", "score": 5, "title": "b"}},
+            {"data": {"url": "https://example.com/article", "score": 900, "title": "c"}},
+            {"data": {"url": "https://www.youtube.com/shorts/us000000001", "score": 300, "title": "d"}},
+        ]
+        return web.json_response({"data": {"children": children, "after": None}})
+
+
+async def _run(stub, scenario):
+    runner = web.AppRunner(stub.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = ConditionalClient(session)
+            youtube = YouTubeSource(client, "key", TokenBucket(1000), base_url=f"{base}/yt")
+            reddit = RedditSource(client, TokenBucket(1000), "test-agent", min_score=100, base_url=base)
+            return await scenario(youtube, reddit)
+    finally:
+        await runner.cleanup()
+
+
+def test_parsers():
+    """Test duration and YouTube link parsing."""
+    assert parse_duration("PT1H2M3S") == 3723
+    assert parse_duration("PT45S") == 45
+    assert parse_duration("bogus") == 0
+    assert extract_youtube_id("https://www.youtube.com/watch?feature=x&v=abcdefghijk") == "abcdefghijk"
+    assert extract_youtube_id("https://youtu.be/abcdefghijk?t=3") == "abcdefghijk"
+    assert extract_youtube_id("https://example.com/watch?v=abcdefghijk") is None
+
+
+def test_trending_follows_page_tokens_and_counts_quota():
+    """Test that trending pages are yielded until the chart is exhausted."""
+    stub = StubAPI()
+
+    async def scenario(youtube, reddit):
+        pages = [page async for page in youtube.trending("US")]
+        return pages, youtube.quota_used
+
+    pages, quota = asyncio.run(_run(stub, scenario))
+    assert [len(p) for p in pages] == [50, 20]
+    assert pages[0][0].duration_seconds == 90
+    assert quota == 2
+    assert "pageToken=50" in stub.requests[1]
+
+
+def test_conditional_request_reuses_cached_body_and_retries_429():
+    """Test that a 304 returns the stored body and a 429 is retried."""
+    stub = StubAPI()
+
+    async def scenario(youtube, reddit):
+        stub.fail_once.add("ids")
+        first = await youtube.videos(["abcdefghijk"])
+        second = await youtube.videos(["abcdefghijk"])
+        return first, second
+
+    first, second = asyncio.run(_run(stub, scenario))
+    assert first == second
+    assert first[0].view_count == 80_000
+    assert len(stub.requests) == 3
+
+
+def test_reddit_listing_filters_by_score_and_link():
+    """Test that only YouTube links above the minimum score are kept."""
+    stub = StubAPI()
+
+    async def scenario(youtube, reddit):
+        return [post async for page in reddit.listing("gaming") for post in page]
+
+    posts = asyncio.run(_run(stub, scenario))
+    assert [p.video_id for p in posts] == ["rd000000001", "us000000001"]
+
+
+def test_token_bucket_limits_rate():
+    """Test that acquiring past the burst waits for refill."""
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=5)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(15):
+            await bucket.acquire()
+        return loop.time() - start
+
+    assert asyncio.run(scenario()) == pytest.approx(0.2, abs=0.1)
+
+
+def test_fanout_merges_all_sources_into_one_batch():
+    """Test that trending regions and subreddits stream into one deduplicated batch."""
+    stub = StubAPI()
+    config = DiscoveryConfig(reddit_subreddits={})
+
+    async def scenario(youtube, reddit):
+        fanout = DiscoveryFanout(youtube, reddit, config)
+        return await fanout.discover(["US", "GB", "XX"], ["gaming", "pcgaming"])
+
+    batch = asyncio.run(_run(stub, scenario))
+    ids = [v.decode() for v in batch.video_ids]
+    assert len(ids) == len(set(ids)) == 72
+    both = ids.index("us000000001")
+    assert batch.sources[both] == SOURCE_TRENDING | SOURCE_REDDIT
+    assert batch.reddit_score[both] == 300
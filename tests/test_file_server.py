@@ -0,0 +1,96 @@
+import asyncio
+import aiohttp
+import pytest
+from src.config import GeneralConfig, ReviewServerConfig
+from src.publishing.file_server import ReviewFileServer
+
+PAYLOAD = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    """Fixture providing archive and working dirs with one rendered file."""
+    archive = tmp_path / "archive"
+    working = tmp_path / "working"
+    (archive / "gaming").mkdir(parents=True)
+    working.mkdir()
+    (archive / "gaming" / "final.mp4").write_bytes(PAYLOAD)
+    (tmp_path / "secret.txt").write_text("outside")
+    return GeneralConfig(archive_dir=str(archive), working_dir=str(working))
+
+
+async def _serve(general, scenario, **config):
+    server = ReviewFileServer(
+        ReviewServerConfig(host="127.0.0.1", port=0, secret_key="test-secret", **config), general
+    )
+    await server.start()
+    port = server._runner.addresses[0][1]
+    server.config = server.config.model_copy(update={"public_base_url": f"http://127.0.0.1:{port}"})
+    try:
+        async with aiohttp.ClientSession() as session:
+            return await scenario(server, session)
+    finally:
+        await server.stop()
+
+
+def test_range_request_returns_partial_content(dirs):
+    """Test that a Range request returns 206 with only the requested bytes."""
+    async def scenario(server, session):
+        url = server.sign_url(f"{dirs.archive_dir}/gaming/final.mp4")
+        async with session.get(url, headers={"Range": "bytes=100-199"}) as resp:
+            return resp.status, await resp.read(), resp.headers
+
+    status, body, headers = asyncio.run(_serve(dirs, scenario))
+    assert status == 206
+    assert body == PAYLOAD[100:200]
+    assert headers["Content-Range"] == f"bytes 100-199/{len(PAYLOAD)}"
+
+
+def test_etag_revalidation_returns_not_modified(dirs):
+    """Test that a matching If-None-Match returns 304."""
+    async def scenario(server, session):
+        url = server.sign_url(f"{dirs.archive_dir}/gaming/final.mp4")
+        async with session.get(url) as resp:
+            etag = resp.headers["ETag"]
+            await resp.read()
+        async with session.get(url, headers={"If-None-Match": etag}) as resp:
+            return resp.status
+
+    assert asyncio.run(_serve(dirs, scenario)) == 304
+
+
+def test_tampered_and_expired_links_are_rejected(dirs):
+    """Test that bad signatures return 403 and expired links return 410."""
+    async def scenario(server, session):
+        url = server.sign_url(f"{dirs.archive_dir}/gaming/final.mp4")
+        async with session.get(url.replace("final.mp4", "other.mp4")) as resp:
+            tampered = resp.status
+        expired_url = server.sign_url(f"{dirs.archive_dir}/gaming/final.mp4", ttl_hours=-1)
+        async with session.get(expired_url) as resp:
+            expired = resp.status
+        return tampered, expired
+
+    assert asyncio.run(_serve(dirs, scenario)) == (403, 410)
+
+
+def test_sign_url_rejects_paths_outside_roots(dirs, tmp_path):
+    """Test that only files under the archive and working dirs can be shared."""
+    server = ReviewFileServer(ReviewServerConfig(secret_key="test-secret"), dirs)
+    with pytest.raises(ValueError):
+        server.sign_url(str(tmp_path / "secret.txt"))
+    with pytest.raises(ValueError):
+        server.sign_url(f"{dirs.archive_dir}/../secret.txt")
+
+
+def test_metrics_need_opt_in_and_the_review_secret(dirs):
+    """Test that /metrics is off by default and otherwise needs the secret as a bearer token."""
+    async def scenario(server, session):
+        base = server.config.public_base_url
+        statuses = []
+        for headers in ({}, {"Authorization": "Bearer wrong"}, {"Authorization": "Bearer test-secret"}):
+            async with session.get(f"{base}/metrics", headers=headers) as resp:
+                statuses.append(resp.status)
+        return statuses
+
+    assert asyncio.run(_serve(dirs, scenario)) == [404, 404, 404]
+    assert asyncio.run(_serve(dirs, scenario, metrics_enabled=True)) == [401, 401, 200]
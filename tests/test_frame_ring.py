@@ -0,0 +1,78 @@
+import sys
+import time
+from functools import partial
+import pytest
+from src.compilation.ffmpeg_wrapper import FFmpegError
+from src.compilation.frame_ring import FrameRingError, fan_out
+
+WIDTH, HEIGHT, CHANNELS = 32, 18, 3
+FRAME_BYTES = WIDTH * HEIGHT * CHANNELS
+
+
+def producer(frames, fail=False):
+    """A decoder stand-in writing ``frames`` raw frames, frame i filled with i % 256."""
+    code = (
+        "import sys\n"
+        f"for i in range({frames}):\n"
+        f"    sys.stdout.buffer.write(bytes([i % 256]) * {FRAME_BYTES})\n"
+        "sys.stdout.buffer.flush()\n"
+        f"sys.exit({3 if fail else 0})\n"
+    )
+    return [sys.executable, "-c", code]
+
+
+def checksums(reader, delay=0.0):
+    """Consumer recording each frame's sequence number and fill value, reading in place."""
+    seen = []
+    for frame in reader:
+        assert not frame.pixels.flags.owndata
+        assert frame.pixels.shape == (HEIGHT, WIDTH, CHANNELS)
+        seen.append((frame.seq, int(frame.pixels[0, 0, 0]), int(frame.pixels.max())))
+        time.sleep(delay)
+    return seen
+
+
+def first_frames(reader, count):
+    """Consumer that stops reading after ``count`` frames."""
+    return [frame.seq for frame, _ in zip(reader, range(count))]
+
+
+def broken(reader):
+    """Consumer that fails on the third frame."""
+    for frame in reader:
+        if frame.seq == 2:
+            raise ValueError("bad frame")
+
+
+def run(args, consumers, slots=4):
+    return fan_out(args, WIDTH, HEIGHT, CHANNELS, consumers, slots=slots, stall_timeout=30)
+
+
+def test_every_consumer_sees_every_frame_in_order():
+    """Test fan-out to a fast and a slow consumer through a ring smaller than the stream."""
+    fast, slow = run(producer(40), [checksums, partial(checksums, delay=0.005)], slots=3)
+    expected = [(i, i % 256, i % 256) for i in range(40)]
+    assert fast == expected
+    assert slow == expected
+
+
+def test_consumer_that_stops_early_does_not_block_the_decoder():
+    """Test that frames a consumer does not read are still handed back."""
+    head, everything = run(producer(30), [partial(first_frames, count=5), checksums], slots=2)
+    assert head == [0, 1, 2, 3, 4]
+    assert len(everything) == 30
+
+
+def test_failures_are_reported():
+    """Test that consumer exceptions and decoder failures surface in the caller."""
+    with pytest.raises(FrameRingError, match="bad frame"):
+        run(producer(10), [checksums, broken])
+    with pytest.raises(FFmpegError, match="status 3"):
+        run(producer(5, fail=True), [checksums])
+
+
+def test_empty_stream_and_partial_last_frame():
+    """Test that a stream without a whole frame yields no frames."""
+    assert run(producer(0), [checksums]) == [[]]
+    truncated = [sys.executable, "-c", f"import sys; sys.stdout.buffer.write(b'x' * {FRAME_BYTES - 1})"]
+    assert run(truncated, [checksums]) == [[]]
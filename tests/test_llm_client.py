@@ -0,0 +1,209 @@
+import asyncio
+import pytest
+from src.config import ChannelConfig, DiscoveryConfig
+from src.discovery.niche import NicheClassifier, NicheQuery
+from src.llm.client import LLMError, parse_json_reply
+from src.llm.prompts import BatchItem, pack_batches
+from src.llm.routing import CircuitBreaker, LatencyTracker
+from tests.helpers import ITEM_ID, StubLLM, llm_provider, serve_llm
+
+
+def videos(n):
+    return {f"v{i:03d}": (f"Video {i}", "") for i in range(n)}
+
+
+def test_pack_batches_respects_output_and_prompt_budgets():
+    """Test that batches are capped by max_tokens per item and by prompt tokens."""
+    items = [BatchItem(str(i), {}) for i in range(10)]
+    by_output = list(pack_batches(items, lambda item: 10, 1000, 100, 400, 50))
+    assert [len(b) for b in by_output] == [4, 4, 2]
+    by_prompt = list(pack_batches(items, lambda item: 30, 100, 1, 1000, 50))
+    assert [len(b) for b in by_prompt] == [3, 3, 3, 1]
+
+
+def test_parse_json_reply_strips_reasoning_and_fences():
+    """Test that think blocks and code fences around JSON are ignored."""
+    assert parse_json_reply('<think>x</think>\n```json\n{"a": 1}\n```') == {"a": 1}
+    assert parse_json_reply('Sure! {"a": 2} hope that helps') == {"a": 2}
+
+
+def test_batch_classification_uses_few_requests():
+    """Test that 100 videos are classified in three requests."""
+    stub = StubLLM()
+
+    async def scenario(client):
+        return await client.classify_niches_batch(videos(100), ["gaming", "sports"])
+
+    result = asyncio.run(serve_llm([stub], scenario))
+    assert len(result) == 100
+    assert all(niches == ["gaming"] for niches in result.values())
+    assert len(stub.prompts) == 3
+
+
+def test_truncated_batches_are_split_and_missing_items_retried():
+    """Test that a truncated answer splits the batch and a dropped ID is asked again."""
+    stub = StubLLM(truncate_above=10, drop_once="v005")
+
+    async def scenario(client):
+        return await client.find_moments_batch({k: (t, "[0.0] hello") for k, (t, _) in videos(20).items()})
+
+    result = asyncio.run(serve_llm([stub], scenario))
+    assert len(result) == 20
+    assert result["v005"].start == 10 and result["v005"].end == 30
+    # max_tokens packs 17 + 3; the 17 is truncated and split into 8 + 9, then v005 alone.
+    assert sorted(len(ITEM_ID.findall(p)) for p in stub.prompts) == [1, 3, 8, 9, 17]
+
+
+def test_empty_answers_are_split():
+    """Test that a parseable answer with none of the items splits the batch instead of dropping it."""
+    stub = StubLLM(empty_above=4)
+
+    async def scenario(client):
+        return await client.classify_niches_batch(videos(10), ["gaming"])
+
+    result = asyncio.run(serve_llm([stub], scenario))
+    assert len(result) == 10
+    assert sorted(len(ITEM_ID.findall(p)) for p in stub.prompts) == [2, 2, 3, 3, 5, 5, 10]
+
+
+def test_fallback_provider_answers_when_primary_fails():
+    """Test that the fallback provider is used after the primary errors."""
+    primary, fallback = StubLLM(fail=True), StubLLM()
+
+    async def scenario(client):
+        return await client.classify_niches_batch(videos(3), ["gaming"])
+
+    result = asyncio.run(serve_llm([primary, fallback], scenario))
+    assert len(result) == 3
+    assert len(fallback.prompts) == 1
+
+
+def test_provider_outage_fails_the_batch_once():
+    """Test that a batch is not split when every provider errors rather than answers badly."""
+    primary, fallback = StubLLM(fail=True), StubLLM(fail=True)
+
+    async def scenario(client):
+        return await client.classify_niches_batch(videos(16), ["gaming"])
+
+    result = asyncio.run(serve_llm([primary, fallback], scenario))
+    assert result == {}
+    retries = llm_provider("p", 0).max_retries
+    assert primary.requests <= retries and fallback.requests <= retries
+
+
+def test_prefilter_resolves_obvious_videos_without_llm():
+    """Test that category and keyword matches skip the LLM and the rest share one batch."""
+    stub = StubLLM()
+    channels = [
+        ChannelConfig(name=n, niche=n, youtube_category_id=c, youtube_credentials_file="", voice="v",
+                      schedule_times_utc=[], hashtags=[], standard_tags=[], youtube_search_queries=[])
+        for n, c in (("gaming", 20), ("sports", 17))
+    ]
+    config = DiscoveryConfig(reddit_subreddits={}, niche_keywords={"sports": ["highlights"], "gaming": ["speedrun"]})
+    queries = [
+        NicheQuery("cat00000001", "New patch", category_id=20),
+        NicheQuery("kw000000001", "Cup final HIGHLIGHTS", category_id=24),
+        NicheQuery("mixed000001", "Speedrun highlights", category_id=24),
+        NicheQuery("none0000001", "My cat", category_id=15),
+    ]
+
+    async def scenario(client):
+        return await NicheClassifier(channels, config, client).classify(queries)
+
+    result = asyncio.run(serve_llm([stub], scenario))
+    assert result["cat00000001"] == ["gaming"]
+    assert result["kw000000001"] == ["sports"]
+    assert result["mixed000001"] == result["none0000001"] == ["gaming"]
+    assert len(stub.prompts) == 1
+    assert "cat00000001" not in stub.prompts[0]
+
+
+def test_latency_percentiles_and_breaker_states():
+    """Test rolling percentiles and the closed/open/half-open cycle."""
+    latency = LatencyTracker(window=5)
+    assert latency.p95 is None
+    for seconds in (9.0, 1.0, 2.0, 3.0, 4.0, 5.0):
+        latency.record(seconds)
+    assert len(latency) == 5 and latency.p50 == 3.0
+    assert abs(latency.p95 - 4.8) < 1e-9
+
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=lambda: now[0])
+    assert not breaker.record_failure() and breaker.allow()
+    assert breaker.record_failure() and breaker.state == "open" and not breaker.allow()
+    now[0] = 10.0
+    assert breaker.state == "half_open"
+    assert breaker.allow() and not breaker.allow()
+    assert breaker.record_failure() and breaker.state == "open"
+    now[0] = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_slow_primary_is_hedged_to_fallback():
+    """Test that a request slower than the primary's p95 is also sent to the fallback, which wins."""
+    primary, fallback = StubLLM(), StubLLM()
+
+    async def scenario(client):
+        for i in range(5):
+            await client.classify_niches_batch({f"w{i}": ("Warm-up", "")}, ["gaming"])
+        primary.delay = 1.0
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await client.classify_niches_batch(videos(3), ["gaming"])
+        return result, loop.time() - started, client.provider_stats()
+
+    result, elapsed, stats = asyncio.run(serve_llm(
+        [primary, fallback], scenario, hedge_min_samples=5, hedge_min_delay_seconds=0.1,
+    ))
+    assert len(result) == 3
+    assert elapsed < 0.6
+    assert fallback.requests == 1 and primary.requests == 6
+    assert stats["primary"]["samples"] == 5 and stats["fallback"]["samples"] == 1
+
+
+def test_failing_primary_is_skipped_until_breaker_resets():
+    """Test that an open circuit routes straight to the fallback, then lets one trial through."""
+    primary, fallback = StubLLM(fail=True), StubLLM()
+
+    async def scenario(client):
+        for i in range(4):
+            await client.classify_niches_batch({f"v{i}": ("Video", "")}, ["gaming"])
+        skipped = primary.requests
+        await asyncio.sleep(0.3)
+        primary.fail = False
+        await client.classify_niches_batch({"v9": ("Video", "")}, ["gaming"])
+        return skipped, client.provider_stats()
+
+    skipped, stats = asyncio.run(serve_llm(
+        [primary, fallback], scenario, breaker_failure_threshold=2, breaker_reset_seconds=0.2,
+    ))
+    assert skipped == 2
+    assert fallback.requests == 4
+    assert primary.requests == 3
+    assert stats["primary"]["circuit"] == "closed"
+
+
+def test_open_circuits_fail_fast_until_the_trial():
+    """Test that no request is sent while every circuit is open, then one trial per provider."""
+    primary, fallback = StubLLM(fail=True), StubLLM(fail=True)
+
+    async def scenario(client):
+        with pytest.raises(LLMError):
+            await client.complete("hi")
+        sent = primary.requests, fallback.requests
+        for _ in range(3):
+            with pytest.raises(LLMError, match="circuits are open"):
+                await client.complete("hi")
+        assert (primary.requests, fallback.requests) == sent
+        await asyncio.sleep(0.3)
+        primary.fail = False
+        return await client.complete("hi"), sent
+
+    reply, sent = asyncio.run(serve_llm(
+        [primary, fallback], scenario, breaker_failure_threshold=1, breaker_reset_seconds=0.2,
+    ))
+    assert sent == (1, 1)
+    assert primary.requests == 2 and fallback.requests == 1
+    assert reply
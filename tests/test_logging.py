@@ -1,10 +1,18 @@
 import os
 import json
 import logging
+import queue
 import pytest
 from unittest.mock import patch, MagicMock
 from logging.handlers import RotatingFileHandler
-from src.utils.logging import setup_logging, get_logger, ConsoleFormatter, JsonFormatter
+from src.utils.logging import (
+    BoundedQueueHandler,
+    ConsoleFormatter,
+    JsonFormatter,
+    get_logger,
+    setup_logging,
+    shutdown_logging,
+)
 
 
 @pytest.fixture
@@ -103,4 +111,51 @@ def test_console_and_file_handler_log_levels(log_dir, logger_name):
         handler for handler in logger.handlers if isinstance(handler, RotatingFileHandler)
     )
     assert console_handler.level == logging.WARNING
-    assert file_handler.level == logging.DEBUG
\ No newline at end of file
+    assert file_handler.level == logging.DEBUG
+
+def test_async_queue_writes_from_listener_thread(log_dir):
+    """Test that async mode installs only a queue handler and still writes JSON logs."""
+    logger = setup_logging(log_dir=str(log_dir), module_name="async_logger", async_queue=True)
+    assert [type(h) for h in logger.handlers] == [BoundedQueueHandler]
+    logger.info("Queued %s", "message", extra={"key": "value"})
+    shutdown_logging()
+
+    with open(log_dir / "async_logger.log") as f:
+        log_data = json.loads(f.readline())
+    assert log_data["message"] == "Queued message"
+    assert log_data["extra"] == {"key": "value"}
+
+
+def test_bounded_queue_drops_when_full():
+    """Test that the drop policy discards records instead of blocking."""
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1), overflow="drop")
+    record = logging.makeLogRecord({"msg": "x"})
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_bounded_queue_rejects_unknown_policy():
+    """Test that an unknown overflow policy is rejected."""
+    with pytest.raises(ValueError):
+        BoundedQueueHandler(queue.Queue(), overflow="spill")
+
+
+def test_per_module_log_files(log_dir):
+    """Test that records are also routed to one log file per module."""
+    setup_logging(log_dir=str(log_dir), module_name="viral_channel", per_module_files=True)
+    get_logger("src.acquisition.downloader").info("Downloaded")
+    get_logger("metrics").info("Recorded")
+
+    with open(log_dir / "acquisition.log") as f:
+        assert json.loads(f.readline())["message"] == "Downloaded"
+    with open(log_dir / "metrics.log") as f:
+        assert json.loads(f.readline())["message"] == "Recorded"
+    assert (log_dir / "viral_channel.log").read_text().count("\n") == 2
+
+    root = logging.getLogger("viral_channel")
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.propagate = True
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import threading
+import time
+import random
+from src.compilation.loudness import (
+    LoudnessCatalog,
+    LoudnessStats,
+    loudnorm_filter,
+    parse_duration,
+    parse_loudnorm_output,
+)
+from src.compilation.music_library import MusicLibrary
+from src.config import AudioConfig
+from src.database import init_db
+
+STDERR = """Input #0, mp3, from 'track.mp3':
+  Duration: 00:03:12.50, start: 0.025057, bitrate: 320 kb/s
+[Parsed_loudnorm_0 @ 0x55d0]
+{
+	"input_i" : "-14.20",
+	"input_tp" : "-0.40",
+	"input_lra" : "7.10",
+	"input_thresh" : "-24.48",
+	"output_i" : "-31.62",
+	"output_tp" : "-17.76",
+	"output_lra" : "6.90",
+	"output_thresh" : "-41.89",
+	"normalization_type" : "dynamic",
+	"target_offset" : "-0.38"
+}
+"""
+STATS = LoudnessStats(-14.2, 7.1, -0.4, -24.48, -0.38, -32.0)
+
+
+class CountingMeasure:
+    """Stands in for the ffmpeg measurement pass, counting calls and concurrency."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.paths = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, path, config, target):
+        with self._lock:
+            self.paths.append(os.path.basename(path))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return STATS._replace(target_lufs=target), 192.5
+
+
+def write_audio(path, payload=b"audio"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(payload)
+    return str(path)
+
+
+def test_parses_loudnorm_summary_and_duration():
+    """Test that the JSON block and duration are read from ffmpeg's stderr."""
+    assert parse_loudnorm_output(STDERR, -32.0) == STATS
+    assert parse_duration(STDERR) == 192.5
+
+
+def test_filter_is_linear_single_pass_with_stored_stats():
+    """Test the linear loudnorm form and its fallbacks."""
+    config = AudioConfig()
+    linear = loudnorm_filter(STATS, -32.0, config)
+    assert linear.startswith("loudnorm=I=-32.0:LRA=11.0:TP=-1.5:measured_I=-14.2:")
+    assert "measured_thresh=-24.48:offset=-0.38:linear=true" in linear
+    assert ":offset=0.0:" in loudnorm_filter(STATS, -26.0, config)
+    assert loudnorm_filter(None, -26.0, config) == "loudnorm=I=-26.0:LRA=11.0:TP=-1.5"
+    silent = STATS._replace(integrated_lufs=float("-inf"))
+    assert "linear" not in loudnorm_filter(silent, -26.0, config)
+
+
+def test_catalog_measures_each_asset_once(tmp_path):
+    """Test that concurrent renders share a measurement and later processes read the DB."""
+    engine = init_db(str(tmp_path / "db.sqlite"))
+    clip = write_audio(tmp_path / "clip.mp4")
+    measure = CountingMeasure(delay=0.05)
+    catalog = LoudnessCatalog(AudioConfig(), engine, measure=measure)
+
+    async def run(c):
+        return await asyncio.gather(*(c.filter_for(clip, "clip") for _ in range(5)))
+
+    filters = asyncio.run(run(catalog))
+    assert len(set(filters)) == 1 and "linear=true" in filters[0]
+    assert measure.paths == ["clip.mp4"]
+
+    restarted = LoudnessCatalog(AudioConfig(), engine, measure=measure)
+    assert asyncio.run(restarted.stats(clip, -26.0)) == STATS._replace(target_lufs=-26.0)
+    assert len(measure.paths) == 1
+
+    os.utime(clip, ns=(1, 1))
+    asyncio.run(restarted.stats(clip, -26.0))
+    assert len(measure.paths) == 2
+
+
+def test_music_index_is_parallel_and_incremental(tmp_path):
+    """Test that indexing runs measurements in parallel and only re-measures changed files."""
+    music = tmp_path / "music"
+    for mood, count in (("energetic", 4), ("chill", 2)):
+        for i in range(count):
+            write_audio(music / mood / f"{mood}{i}.mp3")
+    (music / "notes.txt").write_text("not a mood dir")
+    config = AudioConfig(music_dir=str(music), music_index_path=str(music / "index.json"), loudness_workers=3)
+    measure = CountingMeasure(delay=0.05)
+
+    library = MusicLibrary(config, measure=measure)
+    assert asyncio.run(library.refresh()) == (6, 0, 0)
+    assert 1 < measure.max_active <= 3
+    assert library.moods() == ["chill", "energetic"]
+
+    reloaded = MusicLibrary(config, measure=measure)
+    assert asyncio.run(reloaded.refresh()) == (0, 0, 0)
+    os.remove(music / "chill" / "chill1.mp3")
+    os.utime(music / "energetic" / "energetic0.mp3", ns=(1, 1))
+    assert asyncio.run(reloaded.refresh()) == (1, 1, 0)
+    assert len(measure.paths) == 7
+
+    track = reloaded.pick("energetic", min_duration=120, exclude=["energetic/energetic1.mp3"],
+                          rng=random.Random(0))
+    assert track.mood == "energetic" and track.path != "energetic/energetic1.mp3"
+    assert track.duration == 192.5
+    assert "linear=true" in reloaded.filter_for(track)
+    assert reloaded.pick("dramatic") is None
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import pytest
+from src.main import build_parser, main
+
+HEAVY_MODULES = ["sqlalchemy", "pydantic", "aiohttp", "telegram", "numpy", "yt_dlp", "asyncio"]
+
+
+def loaded_modules(statement):
+    """Return which heavy modules a fresh interpreter has loaded after ``statement``."""
+    code = f"import sys; {statement}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+def test_parser_roles():
+    """Test that each role parses to its handler."""
+    parser = build_parser()
+    args = parser.parse_args(["--database", "x.db", "status", "--limit", "3"])
+    assert args.command == "status"
+    assert args.limit == 3
+    assert args.database == "x.db"
+    args = parser.parse_args(["simulate-schedule", "--channels", "12", "--renders", "2"])
+    assert (args.channels, args.renders, args.pipelines, args.weeks) == (12, 2, None, 4.0)
+    assert parser.parse_args(["maintain-db"]).command == "maintain-db"
+    with pytest.raises(SystemExit):
+        parser.parse_args([])
+
+
+def test_main_module_import_is_lightweight():
+    """Test that importing the entry point loads no heavy dependency."""
+    assert loaded_modules("import src.main") == []
+
+
+def test_package_exports_are_lazy():
+    """Test that packages defer their submodules until a name is accessed."""
+    assert loaded_modules("import src.publishing, src.compilation, src.analytics") == []
+    assert "aiohttp" in loaded_modules("from src.publishing import ReviewFileServer")
+
+
+def test_init_db_and_status(tmp_path, capsys):
+    """Test the one-off database roles."""
+    database = str(tmp_path / "data" / "test.db")
+    assert main(["--database", database, "init-db"]) == 0
+    assert (tmp_path / "data" / "test.db").exists()
+    assert main(["--database", database, "status"]) == 0
+    assert "No pipeline runs yet." in capsys.readouterr().out
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+import pytest
+from src.utils.logging import JsonFormatter
+from src.utils.metrics import MetricsRegistry, export_periodically, metric_labels, timed
+
+
+@pytest.fixture
+def registry():
+    """Fixture providing an empty registry."""
+    return MetricsRegistry()
+
+
+def test_timed_context_manager_records_histogram_and_errors(registry):
+    """Test that timed blocks are observed and failures are counted."""
+    with timed("ffmpeg", registry):
+        pass
+    with pytest.raises(RuntimeError):
+        with timed("ffmpeg", registry):
+            raise RuntimeError("boom")
+
+    snap = registry.snapshot()
+    histogram = snap["histograms"][0]
+    assert histogram["name"] == "stage_seconds"
+    assert histogram["labels"] == {"stage": "ffmpeg"}
+    assert histogram["count"] == 2
+    assert snap["counters"] == [{"name": "stage_errors", "labels": {"stage": "ffmpeg"}, "value": 1.0}]
+
+
+def test_timed_decorator_and_context_labels(registry):
+    """Test decorating sync and async functions with niche labels from the context."""
+    @timed("llm", registry)
+    async def complete():
+        return "ok"
+
+    @timed("tts", registry)
+    def synthesize():
+        return "ok"
+
+    async def run():
+        with metric_labels(niche="gaming"):
+            await asyncio.gather(complete(), complete())
+            synthesize()
+
+    asyncio.run(run())
+    series = {h["labels"]["stage"]: h for h in registry.snapshot()["histograms"]}
+    assert series["llm"]["count"] == 2
+    assert series["llm"]["labels"]["niche"] == "gaming"
+    assert series["tts"]["labels"]["niche"] == "gaming"
+
+
+def test_prometheus_exposition(registry):
+    """Test the Prometheus text format for counters and histograms."""
+    registry.increment("download_bytes", 1024, niche="sports")
+    registry.observe("stage_seconds", 0.2, stage="download")
+    text = registry.to_prometheus()
+
+    assert '# TYPE viral_channel_download_bytes_total counter' in text
+    assert 'viral_channel_download_bytes_total{niche="sports"} 1024' in text
+    assert 'viral_channel_stage_seconds_bucket{stage="download",le="0.25"} 1' in text
+    assert 'viral_channel_stage_seconds_bucket{stage="download",le="0.1"} 0' in text
+    assert 'viral_channel_stage_seconds_count{stage="download"} 1' in text
+
+
+def test_export_json_lines(registry, tmp_path):
+    """Test that each series is written as one JSON line."""
+    registry.increment("cache_hits", source="heatmap")
+    registry.observe("stage_seconds", 1.5, stage="upload")
+    path = tmp_path / "metrics.jsonl"
+    registry.export_json_lines(str(path))
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert {line["type"] for line in lines} == {"counter", "histogram"}
+    assert all("timestamp" in line for line in lines)
+
+
+def test_export_periodically_writes_a_final_snapshot_on_cancel(registry, tmp_path):
+    """Test that the export task appends per interval and once more when cancelled."""
+    registry.increment("uploads")
+    path = tmp_path / "logs" / "metrics.jsonl"
+
+    async def run():
+        task = asyncio.create_task(export_periodically(str(path), 0.01, registry))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) >= 2
+    assert all(line["name"] == "uploads" for line in lines)
+
+
+def test_json_formatter_keeps_top_level_extra_fields():
+    """Test that fields passed via extra= are kept without nesting."""
+    record = logging.LogRecord("viral_channel.test", logging.INFO, __file__, 1, "msg", None, None)
+    record.stage = "download"
+    record.seconds = 1.25
+    data = json.loads(JsonFormatter().format(record))
+    assert data["extra"] == {"stage": "download", "seconds": 1.25}
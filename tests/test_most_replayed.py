@@ -0,0 +1,141 @@
+import asyncio
+from pathlib import Path
+import aiohttp
+import numpy as np
+from aiohttp import web
+from src.analysis.most_replayed import (
+    Heatmap,
+    HeatmapScanner,
+    MostReplayedAnalyzer,
+    find_peaks,
+    parse_markers,
+)
+from src.config import VideoConfig
+
+FIXTURES = Path(__file__).parent / "fixtures" / "most_replayed"
+PAGES = {
+    "oldlayout01": "watch_heat_markers.html",
+    "newlayout01": "watch_macro_markers.html",
+    "noheatmap01": "watch_no_heatmap.html",
+}
+TRAILER = b"<!-- comments, related videos and scripts -->" * 100_000
+
+
+class WatchPages:
+    """Serves saved watch pages followed by megabytes of trailing HTML."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.page_bytes = 0
+
+    async def watch(self, request):
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            name = PAGES.get(request.query["v"], PAGES["noheatmap01"])
+            body = (FIXTURES / name).read_bytes() + TRAILER
+            self.page_bytes = len(body)
+            resp = web.StreamResponse()
+            resp.content_type = "text/html"
+            await resp.prepare(request)
+            for i in range(0, len(body), 16 * 1024):
+                await resp.write(body[i:i + 16 * 1024])
+            await resp.write_eof()
+            return resp
+        finally:
+            self.active -= 1
+
+
+async def _run(pages, scenario, config=None, clock=None):
+    app = web.Application()
+    app.router.add_get("/watch", pages.watch)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/watch"
+    try:
+        async with aiohttp.ClientSession() as session:
+            kwargs = {"clock": clock} if clock else {}
+            analyzer = MostReplayedAnalyzer(session, config or VideoConfig(), watch_url=url, **kwargs)
+            return await scenario(analyzer)
+    finally:
+        await runner.cleanup()
+
+
+def test_scanner_handles_keys_split_across_chunks():
+    """Test that the scanner finds markers fed one byte at a time."""
+    html = (FIXTURES / "watch_heat_markers.html").read_bytes()
+    scanner = HeatmapScanner()
+    done = False
+    for i in range(len(html)):
+        done = scanner.feed(html[i:i + 1])
+        if done:
+            break
+    assert done
+    heatmap = parse_markers(*scanner.result)
+    assert len(heatmap.starts) == 100
+    assert heatmap.duration == 200.0
+
+
+def test_both_layouts_parse_and_peak_at_the_replayed_part():
+    """Test old and new page layouts and that the peak covers the replayed segment."""
+    pages = WatchPages()
+
+    async def scenario(analyzer):
+        return await analyzer.find_moments(["oldlayout01", "newlayout01", "noheatmap01"])
+
+    peaks = asyncio.run(_run(pages, scenario))
+    assert set(peaks) == {"oldlayout01", "newlayout01"}
+    old, new = peaks["oldlayout01"][0], peaks["newlayout01"][0]
+    assert old.start <= 120 <= old.end and old.end - old.start == 20
+    assert new.start <= 60 <= new.end
+
+
+def test_streaming_stops_after_markers():
+    """Test that only a small prefix of a multi-megabyte page is read."""
+    pages = WatchPages()
+
+    async def scenario(analyzer):
+        await analyzer.fetch("oldlayout01")
+        return analyzer.bytes_read
+
+    bytes_read = asyncio.run(_run(pages, scenario))
+    assert bytes_read < 200_000 < pages.page_bytes
+
+
+def test_cache_ttl_and_concurrency_limit():
+    """Test that cached IDs skip the network until the TTL passes and downloads are bounded."""
+    pages = WatchPages(delay=0.05)
+    now = [0.0]
+    config = VideoConfig(most_replayed_concurrency=2, most_replayed_cache_ttl_hours=1)
+
+    async def scenario(analyzer):
+        ids = [f"vid{i:08d}" for i in range(6)] + ["oldlayout01"] * 3
+        first = await analyzer.fetch_many(ids)
+        await analyzer.fetch_many(ids)
+        after_hit = pages.requests
+        now[0] = 3601.0
+        await analyzer.fetch("oldlayout01")
+        return first, after_hit
+
+    first, after_hit = asyncio.run(_run(pages, scenario, config, clock=lambda: now[0]))
+    assert first["vid00000000"] is None and first["oldlayout01"] is not None
+    assert after_hit == 7
+    assert pages.requests == 8
+    assert pages.max_active <= 2
+
+
+def test_find_peaks_returns_non_overlapping_windows():
+    """Test that top-k peaks do not overlap and rank by mean intensity."""
+    starts = np.arange(0, 100, 1.0)
+    intensity = np.zeros(100, dtype=np.float32)
+    intensity[20:25] = 1.0
+    intensity[70:75] = 0.5
+    peaks = find_peaks(Heatmap(starts, np.ones(100), intensity), length=5, top_k=2)
+    assert [(p.start, p.end) for p in peaks] == [(20.0, 25.0), (70.0, 75.0)]
+    assert peaks[0].score > peaks[1].score
@@ -0,0 +1,169 @@
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from src.config import DiscoveryConfig
+from src.discovery.candidates import SOURCE_TRENDING, CandidateBatchBuilder
+from src.database import (
+    Clip,
+    DiscoveredVideo,
+    PipelineRun,
+    archive_discovered_videos,
+    archive_path_for,
+    get_discovery_daily_stats,
+    get_known_video_ids,
+    get_pending_videos,
+    get_session,
+    init_db,
+    maintain_database,
+)
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def video(video_id, days_old, processed, niche="gaming", source="reddit", score=1.0):
+    """A discovered video ``days_old`` days before NOW."""
+    return DiscoveredVideo(
+        video_id=video_id, title=f"Video {video_id} " + "x" * 200, channel_name="c", channel_id="UC1",
+        url=f"https://youtu.be/{video_id}", niche=niche, discovery_source=source, viral_score=score,
+        view_count=1000, view_velocity=10.0, discovered_at=NOW - timedelta(days=days_old), processed=processed,
+    )
+
+
+@pytest.fixture
+def session(tmp_path):
+    """Session on a database with the retention archive attached."""
+    path = str(tmp_path / "viral_channel.db")
+    session = get_session(init_db(path, archive_path_for(path)))
+    yield session
+    session.close()
+
+
+def test_old_processed_rows_move_to_the_archive(session):
+    """Test which rows move, and that stats and dedup see archived rows."""
+    session.add_all([
+        video("old_used", 40, 1),
+        video("old_skipped", 40, 2, score=3.0),
+        video("old_rejected", 45, 3, source=None),
+        video("old_pending", 40, 0),
+        video("recent_skipped", 5, 2),
+        video("old_in_clip", 40, 1),
+    ])
+    session.commit()
+    run = PipelineRun(niche="gaming", cycle_start=NOW, cycle_end=NOW)
+    session.add(run)
+    session.commit()
+    clip_video = session.query(DiscoveredVideo).filter_by(video_id="old_in_clip").one()
+    session.add(Clip(pipeline_run_id=run.id, discovered_video_id=clip_video.id, rank_position=1,
+                     start_time_seconds=0.0, end_time_seconds=10.0, clip_duration_seconds=10.0))
+    session.commit()
+    stats = get_discovery_daily_stats(session)
+
+    assert archive_discovered_videos(session, 30, now=NOW, batch_size=2) == 3
+    hot = {v.video_id for v in session.query(DiscoveredVideo)}
+    assert hot == {"old_pending", "recent_skipped", "old_in_clip"}
+    archived = {row[0] for row in session.execute(text("SELECT video_id FROM archive.discovered_videos"))}
+    assert archived == {"old_used", "old_skipped", "old_rejected"}
+    assert get_discovery_daily_stats(session) == stats
+    assert get_known_video_ids(session, ["old_used", "old_pending", "new"]) == {"old_used", "old_pending"}
+    assert [v.video_id for v in get_pending_videos(session, "gaming")] == ["old_pending"]
+    assert archive_discovered_videos(session, 30, now=NOW) == 0
+
+    # A video discovered again and processed again replaces its archived copy.
+    session.add(video("old_used", 35, 2))
+    session.commit()
+    assert archive_discovered_videos(session, 30, now=NOW) == 1
+    counts = {(row.day, row.processed): row.videos for row in get_discovery_daily_stats(session, niche="gaming")}
+    assert sum(counts.values()) == len(hot) + 4
+
+
+def test_archived_videos_are_not_rediscovered(session):
+    """Test that known candidates are excluded before the top-N cut, so unseen ones still get a place."""
+    session.add_all([video("aaaaaaaaaaa", 40, 1), video("bbbbbbbbbbb", 1, 2)])
+    session.commit()
+    assert archive_discovered_videos(session, 30, now=NOW) == 1
+
+    builder = CandidateBatchBuilder()
+    for video_id, velocity in (("aaaaaaaaaaa", 90_000.0), ("bbbbbbbbbbb", 80_000.0), ("ccccccccccc", 10_000.0)):
+        builder.add(video_id=video_id, title=video_id, channel_id="UC1", channel_name="c",
+                    source=SOURCE_TRENDING, view_count=50_000, published_at=NOW.timestamp() - 3600,
+                    view_velocity=velocity)
+    batch = builder.build()
+    config = DiscoveryConfig(reddit_subreddits={}, min_viral_score=0.0)
+    assert batch.known_mask(session).tolist() == [True, True, False]
+    indices, scores = batch.rank(config, n=1, now=NOW.timestamp(), exclude=batch.known_mask(session))
+    rows = batch.to_discovered_videos(indices, scores, "gaming")
+    assert [row.video_id for row in rows] == ["ccccccccccc"]
+    session.add_all(rows)
+    session.commit()
+    assert session.query(DiscoveredVideo).filter_by(video_id="aaaaaaaaaaa").count() == 0
+
+
+def test_archiving_needs_an_attached_archive(tmp_path):
+    """Test that retention refuses to delete rows it has nowhere to put."""
+    session = get_session(init_db(str(tmp_path / "plain.db")))
+    try:
+        with pytest.raises(ValueError, match="archive"):
+            archive_discovered_videos(session, 30)
+        assert get_known_video_ids(session, ["x"]) == set()
+    finally:
+        session.close()
+
+
+def test_pending_and_retention_queries_use_partial_indexes(session):
+    """Test that, with statistics, the hot paths search the partial indexes."""
+    session.add_all(video(f"done{i}", i % 90, 1 + i % 3) for i in range(300))
+    session.add_all(video(f"new{i}", 0, 0) for i in range(5))
+    session.commit()
+    maintain_database(session.get_bind())
+    pending = session.query(DiscoveredVideo).filter(
+        DiscoveredVideo.niche == "gaming", DiscoveredVideo.processed == text("0")
+    )
+    sql = str(pending.statement.compile(compile_kwargs={"literal_binds": True}))
+    plan = " ".join(str(row[-1]) for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert "idx_discovered_videos_processed" in plan
+    plan = " ".join(str(row[-1]) for row in session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM discovered_videos WHERE processed != 0 AND discovered_at < '2026-01-01'"
+    )))
+    assert "idx_discovered_videos_archivable" in plan
+
+
+def test_full_processed_index_is_replaced(tmp_path):
+    """Test that a database with the old full processed index gets the partial one."""
+    path = str(tmp_path / "old.db")
+    init_db(path).dispose()
+    connection = sqlite3.connect(path)
+    connection.execute("DROP INDEX idx_discovered_videos_processed")
+    connection.execute("CREATE INDEX idx_discovered_videos_processed ON discovered_videos (processed)")
+    connection.commit()
+    connection.close()
+    init_db(path).dispose()
+    connection = sqlite3.connect(path)
+    sql = connection.execute("SELECT sql FROM sqlite_master WHERE name = 'idx_discovered_videos_processed'").fetchone()
+    connection.close()
+    assert "WHERE processed = 0" in sql[0]
+
+
+def test_maintenance_frees_pages_incrementally(session, tmp_path):
+    """Test bounded incremental vacuum, and the one-off conversion of an old database."""
+    session.add_all(video(f"v{i}", 60, 2) for i in range(2000))
+    session.commit()
+    archive_discovered_videos(session, 30, now=NOW)
+    engine = session.get_bind()
+    assert maintain_database(engine, vacuum_pages=10)["main"] == 10
+    assert maintain_database(engine)["main"] > 10
+    assert maintain_database(engine)["main"] == 0
+
+    legacy = str(tmp_path / "legacy.db")
+    connection = sqlite3.connect(legacy)
+    connection.execute("CREATE TABLE t (x TEXT)")
+    connection.executemany("INSERT INTO t VALUES (?)", [("y" * 500,)] * 500)
+    connection.commit()
+    connection.execute("DELETE FROM t")
+    connection.commit()
+    connection.close()
+    maintain_database(init_db(legacy))
+    connection = sqlite3.connect(legacy)
+    assert connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert connection.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    connection.close()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+from src.acquisition.sections import SectionDownloader, section_range
+from src.config import VideoConfig
+from tests.helpers import MB, RecordingYoutubeDL, general, make_manager
+
+
+def test_section_range_pads_and_clamps():
+    """Test that padding is added and clamped to the source bounds."""
+    assert section_range(10, 30, 100, 5) == (5, 35)
+    assert section_range(2, 30, 100, 5) == (0, 35)
+    assert section_range(90, 99, 100, 5) == (85, 100)
+    assert section_range(90, 99, 0, 5) == (85, 104)
+
+
+def test_probe_fetches_captions_heatmap_and_optional_audio(general):
+    """Test that phase one skips the video and reads heatmap and captions."""
+    downloader = SectionDownloader(VideoConfig(), general, ydl_factory=RecordingYoutubeDL)
+    probe = asyncio.run(downloader.probe("abcdefghijk", with_audio=True))
+    assert probe.duration == 3600 and probe.bitrate_kbps == 4000.0
+    assert probe.subtitle_path.endswith("abcdefghijk.en.json3")
+    assert probe.audio_path.endswith("abcdefghijk.audio.m4a")
+    assert probe.heatmap.intensity.argmax() == 50
+    first, audio = RecordingYoutubeDL.calls
+    assert first["skip_download"] and first["subtitlesformat"] == "json3"
+    assert audio["format"] == VideoConfig().probe_audio_format
+
+
+def test_acquire_downloads_only_the_padded_clip(general):
+    """Test that phase two downloads the chosen range plus padding under a reservation."""
+    storage = make_manager(general, capacity=1024 * MB)
+    config = VideoConfig(section_padding_seconds=5)
+    downloader = SectionDownloader(config, general, storage=storage, ydl_factory=RecordingYoutubeDL)
+
+    async def choose(probe):
+        return 1800.0, 1830.0
+
+    section = asyncio.run(downloader.acquire("abcdefghijk", choose))
+    assert (section.start, section.end) == (1795.0, 1835.0)
+    assert os.path.getsize(section.path) == 40_000
+    assert section.path in storage._sources
+    probe = asyncio.run(downloader.probe("abcdefghijk"))
+    assert downloader.predict_bytes(probe, 40) == int(4000 * 125 * 40 * 1.2)
+    assert RecordingYoutubeDL.calls[1]["format"] == config.source_format
+
+
+def test_sources_over_the_length_limit_are_skipped(general):
+    """Test that an over-long source stops after the probe."""
+    downloader = SectionDownloader(VideoConfig(max_source_duration_seconds=600), general,
+                                   ydl_factory=RecordingYoutubeDL)
+
+    async def choose(probe):
+        raise AssertionError("should not be asked for a range")
+
+    assert asyncio.run(downloader.acquire("abcdefghijk", choose)) is None
+    assert len(RecordingYoutubeDL.calls) == 1
+
+
+def test_shared_slots_cap_downloads_across_runs(general):
+    """Test that per-run limits allow parallel downloads and shared slots cap them process-wide."""
+    running, peak = [0], [0]
+
+    class SlowYoutubeDL(RecordingYoutubeDL):
+        def extract_info(self, url, download=True):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            running[0] -= 1
+            return super().extract_info(url, download)
+
+    shared = asyncio.Semaphore(1)
+
+    async def run():
+        downloaders = [SectionDownloader(VideoConfig(downloads_per_run=2), general, ydl_factory=SlowYoutubeDL,
+                                         shared_slots=shared) for _ in range(2)]
+        probe = await downloaders[0].probe("abcdefghijk")
+        await asyncio.gather(*(
+            d.download_section(probe, 60.0 * i, 60.0 * i + 30) for i, d in enumerate(downloaders * 2)
+        ))
+
+    asyncio.run(run())
+    assert peak[0] == 1
@@ -0,0 +1,170 @@
+import random
+import time
+from datetime import datetime, timedelta
+import pytest
+from src.config import ChannelConfig, SchedulerConfig, TelegramConfig
+from src.database import PipelineRun, ReviewLog, get_session, init_db, record_stage_timing
+from src.orchestrator.simulator import (
+    DEFAULT_STAGE_MINUTES,
+    RUN_STAGES,
+    ChannelSchedule,
+    ScheduleSimulator,
+    StageDurations,
+    channel_schedules,
+    percentile,
+)
+
+MINUTE = 60.0
+
+
+def channel(name, *times, enabled=True):
+    """A channel config with only the scheduling fields that matter here."""
+    return ChannelConfig(
+        name=name, niche=name, enabled=enabled, youtube_category_id=20,
+        youtube_credentials_file="creds.json", schedule_times_utc=list(times), voice="v",
+        hashtags=[], standard_tags=[], youtube_search_queries=[],
+    )
+
+
+def fixed(review_minutes=10.0, render_minutes=10.0):
+    """Durations of one minute per stage, plus the given render and review times."""
+    samples = {stage: [MINUTE] for stage in DEFAULT_STAGE_MINUTES}
+    samples["render"] = [render_minutes * MINUTE]
+    samples["review"] = [review_minutes * MINUTE]
+    return StageDurations(samples)
+
+
+def telegram(**kwargs):
+    """Telegram settings without quiet hours unless given."""
+    kwargs.setdefault("quiet_hours_start", 0)
+    kwargs.setdefault("quiet_hours_end", 0)
+    return TelegramConfig(bot_token="t", authorized_user_ids=[1], **kwargs)
+
+
+def test_single_channel_runs_without_queueing():
+    """Test that one channel never waits and render utilization is exact."""
+    schedules = [ChannelSchedule("a", (6 * 3600.0, 18 * 3600.0))]
+    report = ScheduleSimulator(schedules, SchedulerConfig(), telegram(), fixed()).run(days=7)
+    assert len(report.runs) == 14
+    assert all(r.queue_delay == 0 and r.start_delay == 0 for r in report.runs)
+    assert all(r.time_to_review == pytest.approx(15 * MINUTE) for r in report.runs)
+    assert report.summary()["review_window_misses"] == 0
+    assert report.utilization["renders"] == pytest.approx(14 * 10 * MINUTE / (7 * 86400))
+
+
+def test_render_contention_and_second_worker():
+    """Test that simultaneous runs queue on one render slot and not on two."""
+    schedules = [ChannelSchedule(name, (12 * 3600.0,)) for name in ("a", "b")]
+    one = ScheduleSimulator(schedules, SchedulerConfig(), telegram(), fixed()).run(days=3)
+    delays = sorted(r.queue_delay for r in one.runs)
+    assert delays == [0.0, 0.0, 0.0, 10 * MINUTE, 10 * MINUTE, 10 * MINUTE]
+    # Three download slots per run out of four: the second run waits a minute
+    # to download, which shortens its wait for the render slot.
+    assert max(one.pool_waits["downloads"]) == 1 * MINUTE
+    assert max(one.pool_waits["renders"]) == 9 * MINUTE
+
+    scheduler = SchedulerConfig(max_concurrent_renders=2)
+    two = ScheduleSimulator(schedules, scheduler, telegram(), fixed()).run(days=3)
+    assert max(two.pool_waits["renders"]) == 0
+    assert sorted(r.queue_delay for r in two.runs)[-1] == 1 * MINUTE
+    assert two.utilization["renders"] == pytest.approx(one.utilization["renders"] / 2)
+
+
+def test_review_window_misses():
+    """Test review timeouts, late answers and quiet-hour holds."""
+    schedules = [ChannelSchedule("a", (1 * 3600.0, 3 * 3600.0))]
+    late = ScheduleSimulator(schedules, SchedulerConfig(), telegram(), fixed(review_minutes=110)).run(days=1)
+    # The 01:00 run is answered after the 03:00 slot; the 03:00 run has until 01:00 tomorrow.
+    assert [r.review_missed for r in late.runs] == [True, False]
+    assert not any(r.review_timed_out for r in late.runs)
+
+    timeout = ScheduleSimulator(schedules, SchedulerConfig(), telegram(), fixed(review_minutes=200)).run(days=1)
+    assert all(r.review_timed_out and r.review_missed for r in timeout.runs)
+
+    quiet = telegram(quiet_hours_start=23, quiet_hours_end=7)
+    held = ScheduleSimulator(schedules, SchedulerConfig(), quiet, fixed()).run(days=1)
+    assert held.runs[0].quiet_hold == pytest.approx(6 * 3600 - 15 * MINUTE)
+    assert held.runs[0].review_missed
+    assert held.summary()["quiet_hour_holds"] == 2
+
+
+def test_durations_from_history(tmp_path):
+    """Test that measured stages replace the estimates once there are enough samples."""
+    engine = init_db(str(tmp_path / "history.db"))
+    session = get_session(engine)
+    now = datetime.utcnow()
+    run = PipelineRun(niche="gaming", cycle_start=now, cycle_end=now, status="completed")
+    session.add(run)
+    session.commit()
+    for i in range(5):
+        record_stage_timing(session, run.id, "render", now - timedelta(minutes=i), 400.0 + i)
+    record_stage_timing(session, run.id, "tts", now, 99.0)
+    session.add(ReviewLog(pipeline_run_id=run.id, sent_at=now - timedelta(minutes=30), responded_at=now))
+    session.commit()
+    session.close()
+
+    durations = StageDurations.from_history(engine, min_samples=1)
+    assert durations.measured() == ["tts", "render", "review"]
+    assert durations.samples["review"] == [pytest.approx(1800.0)]
+
+    durations = StageDurations.from_history(engine, min_samples=5)
+    assert durations.measured() == ["render"]
+    rng = random.Random(1)
+    assert 400 <= durations.sample("render", rng) <= 404
+    low, high, _ = DEFAULT_STAGE_MINUTES["tts"]
+    assert low * MINUTE <= durations.sample("tts", rng) <= high * MINUTE
+
+
+def test_channel_schedules_extend_with_stagger():
+    """Test that extra channels continue the stagger after the configured ones."""
+    channels = [channel("a", "12:00"), channel("b", "12:30"), channel("off", "13:00", enabled=False)]
+    schedules = channel_schedules(channels, count=5, stagger_minutes=30)
+    assert [s.name for s in schedules] == ["a", "b", "a+1", "b+1", "a+2"]
+    assert [s.times[0] / 3600 for s in schedules] == [12.0, 12.5, 13.0, 13.5, 14.0]
+    assert schedules[0].next_slot(12 * 3600.0) == 86400 + 12 * 3600.0
+    with pytest.raises(ValueError):
+        channel_schedules([channel("off", "13:00", enabled=False)])
+
+
+def test_weeks_of_many_channels_simulate_quickly():
+    """Test that four weeks of twelve channels take well under a few seconds."""
+    channels = [channel(f"c{i}", "06:00", "12:00", "18:00", "23:30") for i in range(4)]
+    schedules = channel_schedules(channels, count=12)
+    started = time.perf_counter()
+    report = ScheduleSimulator(schedules, SchedulerConfig(), TelegramConfig(
+        bot_token="t", authorized_user_ids=[1]), seed=7).run(days=28)
+    assert time.perf_counter() - started < 5
+    assert len(report.runs) == 12 * 4 * 28
+    summary = report.summary()
+    assert 0 < summary["renders_utilization"] <= 1
+    assert summary["queue_delay_p95_min"] >= summary["queue_delay_p50_min"]
+    assert "renders" in report.format()
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+
+
+def test_run_times_calibrate_estimated_stages(tmp_path):
+    """Test that without stage timings, finished runs scale the estimates to their mean length."""
+    engine = init_db(str(tmp_path / "runs.db"))
+    session = get_session(engine)
+    now = datetime.utcnow()
+    for i in range(4):
+        started = now - timedelta(hours=i + 1)
+        run = PipelineRun(niche="gaming", cycle_start=started, cycle_end=started, status="completed",
+                          started_at=started, completed_at=started + timedelta(minutes=110 + 20 * (i % 2)))
+        session.add(run)
+        session.commit()
+        # Time spent waiting for the reviewer is not run time.
+        session.add(ReviewLog(pipeline_run_id=run.id, sent_at=started + timedelta(minutes=50),
+                              responded_at=started + timedelta(minutes=110)))
+    session.add(PipelineRun(niche="gaming", cycle_start=now, cycle_end=now, started_at=now))
+    session.commit()
+    session.close()
+
+    durations = StageDurations.from_history(engine, min_samples=4)
+    assert durations.measured() == ["review", "pipeline"]
+    expected = sum(sum(DEFAULT_STAGE_MINUTES[stage]) / 3 for stage in RUN_STAGES)
+    assert durations.estimate_scale == pytest.approx(60 / expected)
+    rng = random.Random(3)
+    runs = [sum(durations.sample(stage, rng) for stage in RUN_STAGES) for _ in range(2000)]
+    assert sum(runs) / len(runs) == pytest.approx(60 * MINUTE, rel=0.05)
+    assert StageDurations.from_history(engine, min_samples=5).estimate_scale == 1.0
@@ -0,0 +1,124 @@
+import re
+import numpy as np
+import pytest
+from src.compilation.ffmpeg_wrapper import build_vertical_crop_command
+from src.compilation.frame_ring import Frame
+from src.compilation.smart_crop import (
+    CropPlan,
+    SmartCropPlanner,
+    column_saliency,
+    crop_width_for,
+    keyframes,
+    stream_saliency,
+)
+from src.config import VideoConfig
+
+SOURCE_W, SOURCE_H = 1920, 1080
+
+
+def moving_subject(seconds, fps=5.0, width=160, height=90, x_from=20, x_to=140):
+    """Noisy static background with a bright block sliding across the frame."""
+    rng = np.random.default_rng(7)
+    background = rng.integers(40, 60, size=(height, width), dtype=np.uint8)
+    count = int(seconds * fps)
+    frames = np.repeat(background[None], count, axis=0)
+    for i, x in enumerate(np.linspace(x_from, x_to, count).astype(int)):
+        frames[i, 30:60, x - 6:x + 6] = 250
+    return frames
+
+
+def evaluate(expression, t):
+    """Evaluate the subset of ffmpeg's expression language the planner emits."""
+    python = re.sub(r"\bif\(", "_if(", expression)
+    return eval(python, {
+        "_if": lambda cond, a, b: a if cond else b,
+        "lt": lambda a, b: a < b,
+        "clip": lambda v, lo, hi: min(max(v, lo), hi),
+        "t": t,
+    })
+
+
+def test_crop_width_matches_output_aspect():
+    """Test that a 1080p source gets a full-height 9:16 window."""
+    assert crop_width_for(1920, 1080, "1080x1920") == 608
+    assert crop_width_for(400, 1080, "1080x1920") == 400
+    with pytest.raises(ValueError):
+        crop_width_for(1920, 1080, "vertical")
+
+
+def test_plan_follows_the_moving_subject():
+    """Test that the crop window tracks a subject moving left to right."""
+    planner = SmartCropPlanner(VideoConfig(smart_crop_max_pan_per_second=1.0))
+    plan = planner.plan_frames(moving_subject(12), SOURCE_W, SOURCE_H)
+    assert plan.crop_width == 608 and plan.crop_height == SOURCE_H
+    start, middle, end = plan.x_at([1.0, 6.0, 11.0])
+    assert start < middle < end
+    subject_x = (20 + 120 * 11 / 12) * SOURCE_W / 160
+    assert end <= subject_x <= end + plan.crop_width
+    assert len(plan.times) < 60
+
+
+def test_streamed_saliency_matches_batch():
+    """Test that frame-by-frame saliency (gray or RGB) plans the same crop as the batch."""
+    frames = moving_subject(6)
+    streamed = stream_saliency(Frame(i, f) for i, f in enumerate(frames))
+    np.testing.assert_allclose(streamed, column_saliency(frames), rtol=1e-5)
+    rgb = stream_saliency(Frame(i, np.repeat(f[..., None], 3, axis=2)) for i, f in enumerate(frames))
+    np.testing.assert_allclose(rgb, streamed, rtol=1e-3)
+    planner = SmartCropPlanner(VideoConfig())
+    batch = planner.plan_frames(frames, SOURCE_W, SOURCE_H)
+    plan = planner.plan_saliency(streamed, SOURCE_W, SOURCE_H)
+    np.testing.assert_allclose(plan.x_at([0.5, 3.0, 5.5]), batch.x_at([0.5, 3.0, 5.5]), atol=1.0)
+
+
+def test_pan_speed_is_limited():
+    """Test that a subject jumping across the frame produces a gradual pan."""
+    config = VideoConfig(smart_crop_max_pan_per_second=0.1, smart_crop_smoothing_seconds=0.2)
+    frames = np.concatenate([moving_subject(4, x_from=15, x_to=25), moving_subject(4, x_from=135, x_to=145)])
+    plan = SmartCropPlanner(config).plan_frames(frames, SOURCE_W, SOURCE_H)
+    t = np.arange(0, 8, 0.2)
+    speed = np.abs(np.diff(plan.x_at(t))) / 0.2
+    assert speed.max() <= 0.1 * SOURCE_W * 1.05
+    assert plan.x_at(7.9) > plan.x_at(0.0) + 500
+
+
+def test_static_shot_stays_centred():
+    """Test that a shot without motion keeps a centred crop."""
+    frames = np.full((25, 90, 160), 128, dtype=np.uint8)
+    plan = SmartCropPlanner(VideoConfig()).plan_frames(frames, SOURCE_W, SOURCE_H)
+    assert np.allclose(plan.x_at([0.0, 2.5, 5.0]), (SOURCE_W - 608) / 2)
+    assert "if(" not in plan.expression()
+
+
+def test_expression_matches_keyframed_path():
+    """Test that the emitted ffmpeg expression evaluates to the planned path."""
+    planner = SmartCropPlanner(VideoConfig(smart_crop_max_pan_per_second=1.0))
+    plan = planner.plan_frames(moving_subject(20, x_from=10, x_to=150), SOURCE_W, SOURCE_H)
+    expression = plan.expression()
+    for t in np.linspace(-0.5, 21.0, 200):
+        assert evaluate(expression, t) == pytest.approx(float(plan.x_at(t)), abs=0.2)
+    assert plan.filter().startswith("crop=w=608:h=1080:x='")
+
+
+def test_keyframes_keep_path_within_tolerance():
+    """Test that decimated keyframes reproduce the path within tolerance."""
+    times = np.arange(200) / 5.0
+    values = 300 + 200 * np.sin(times / 3)
+    keep = keyframes(times, values, tolerance=2.0)
+    assert keep[0] == 0 and keep[-1] == 199 and len(keep) < 60
+    assert np.abs(np.interp(times, times[keep], values[keep]) - values).max() <= 2.0
+
+
+def test_vertical_command_is_one_full_resolution_pass(tmp_path):
+    """Test that the render applies the crop path in a single encode."""
+    source = tmp_path / "clip.mp4"
+    source.write_bytes(b"")
+    plan = CropPlan(608, 1080, np.array([0.0, 10.0]), np.array([0.0, 600.0]))
+    command = build_vertical_crop_command(
+        str(source), "short.mp4", 12.0, 30.0, plan.filter(), "1080x1920", 30,
+        "libx264", 20, "medium", "yuv420p", "aac", "192k",
+    )
+    assert command.count("-i") == 1
+    video_filter = command[command.index("-vf") + 1]
+    assert video_filter.startswith("crop=w=608:h=1080:x='0.0+60.0000*(clip(t,0.000,10.000)-0.000)'")
+    assert "scale=1080:1920" in video_filter
@@ -0,0 +1,201 @@
+import asyncio
+import os
+import pytest
+from src.acquisition.sections import SectionDownloader
+from src.acquisition.source_store import SourceKey, SourceStore
+from src.config import StorageConfig, VideoConfig
+from src.utils.metrics import REGISTRY
+from tests.helpers import MB, RecordingYoutubeDL, general, make_manager, write_file
+
+HOUR = 3600.0
+
+
+class CountingProbe:
+    """Stands in for ffprobe and counts how often it runs."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return {"duration": 30.0, "width": 1920, "height": 1080}
+
+
+def fetcher(nbytes, counter, delay=0.0):
+    async def fetch(stem):
+        counter.append(stem)
+        await asyncio.sleep(delay)
+        return write_file(f"{stem}.mp4", nbytes)
+    return fetch
+
+
+def test_concurrent_acquires_share_one_download(general):
+    """Test that runs asking for the same key at once trigger a single fetch."""
+    probe = CountingProbe()
+    store = SourceStore(general, StorageConfig(), prober=probe)
+    key = SourceKey("abcdefghijk", "bv*+ba", 10_000, 40_000)
+    fetched = []
+
+    async def run():
+        return await asyncio.gather(*(
+            store.acquire(key, f"run-{i}", fetcher(1000, fetched, delay=0.05)) for i in range(4)
+        ))
+
+    entries = asyncio.run(run())
+    assert len(fetched) == 1 and probe.calls == 1
+    assert len({e.path for e in entries}) == 1
+    assert store.references(key) == {"run-0", "run-1", "run-2", "run-3"}
+    assert entries[0].media_info["width"] == 1920
+
+
+def test_sidecar_metadata_survives_restart(general):
+    """Test that a new store reuses files and ffprobe results from an earlier process."""
+    probe = CountingProbe()
+    key = SourceKey("abcdefghijk", "bv*+ba")
+    fetched = []
+    first = SourceStore(general, StorageConfig(), prober=probe)
+    asyncio.run(first.acquire(key, "run-1", fetcher(1000, fetched)))
+
+    second = SourceStore(general, StorageConfig(), prober=probe)
+    entry = asyncio.run(second.acquire(key, "run-2", fetcher(1000, fetched)))
+    assert len(fetched) == 1 and probe.calls == 1
+    assert entry.media_info["duration"] == 30.0
+
+
+def test_held_entries_survive_disk_pressure(general):
+    """Test that eviction skips referenced entries and drops the sidecar of evicted ones."""
+    storage = make_manager(general, capacity=4 * MB)
+    store = SourceStore(general, storage.config, storage=storage, prober=CountingProbe())
+    held, idle = SourceKey("heldvideo01", "f"), SourceKey("idlevideo01", "f")
+    fetched = []
+
+    async def run():
+        await store.acquire(held, "run-1", fetcher(MB, fetched))
+        await store.acquire(idle, "run-2", fetcher(MB, fetched))
+        store.release_run("run-2")
+        async with storage.reserve(5 * MB // 2, purpose="render"):
+            pass
+
+    asyncio.run(run())
+    assert store.get(held) is not None
+    assert store.get(idle) is None
+    assert not os.path.exists(os.path.join(store.root, idle.digest + ".json"))
+
+
+def test_prune_removes_only_old_unreferenced_entries(general):
+    """Test that age-based pruning keeps recent and referenced entries."""
+    now = [0.0]
+    store = SourceStore(general, StorageConfig(source_max_age_hours=24), prober=CountingProbe(),
+                        clock=lambda: now[0])
+    old, held, recent = (SourceKey(v, "f") for v in ("oldvideo001", "heldvideo01", "newvideo001"))
+    fetched = []
+
+    async def run():
+        await store.acquire(old, "run-1", fetcher(100, fetched))
+        await store.acquire(held, "run-2", fetcher(100, fetched))
+        store.release_run("run-1")
+        now[0] = 20 * HOUR
+        await store.acquire(recent, "run-3", fetcher(100, fetched))
+        store.release_run("run-3")
+
+    asyncio.run(run())
+    assert store.prune(now=30 * HOUR) == 100
+    assert store.get(old) is None
+    assert store.get(held) is not None and store.get(recent) is not None
+
+
+def test_section_downloader_reuses_stored_sections(general):
+    """Test that a second run choosing the same range is served from the store."""
+    storage = make_manager(general, capacity=1024 * MB)
+    store = SourceStore(general, storage.config, storage=storage, prober=CountingProbe())
+    downloader = SectionDownloader(VideoConfig(), general, storage=storage,
+                                   ydl_factory=RecordingYoutubeDL, store=store)
+
+    async def choose(probe):
+        return 1800.0, 1830.0
+
+    async def run():
+        first = await downloader.acquire("abcdefghijk", choose, run_id="run-1")
+        second = await downloader.acquire("abcdefghijk", choose, run_id="run-2")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.path == second.path and first.path.startswith(store.root)
+    downloads = [c for c in RecordingYoutubeDL.calls if not c.get("skip_download")]
+    assert len(downloads) == 1
+    assert storage._sources[first.path] == 2
+
+
+def test_failed_fetch_leaves_no_partial_files(general):
+    """Test that a download or probe failure removes what the fetch wrote."""
+    store = SourceStore(general, StorageConfig(), prober=CountingProbe())
+
+    async def broken_download(stem):
+        write_file(f"{stem}.mp4.part", 100)
+        write_file(f"{stem}.f137.mp4", 100)
+        raise RuntimeError("connection reset")
+
+    def broken_probe(path):
+        raise ValueError("no video stream")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.acquire(SourceKey("abcdefghijk", "bv*+ba"), "run-1", broken_download))
+    store._prober = broken_probe
+    with pytest.raises(ValueError):
+        asyncio.run(store.acquire(SourceKey("abcdefghijk", "bv*+ba"), "run-1", fetcher(100, [])))
+    assert os.listdir(store.root) == []
+
+
+def test_joined_downloads_are_not_counted_twice(general):
+    """Test that only the run whose fetch ran records downloaded seconds."""
+    store = SourceStore(general, StorageConfig(), prober=CountingProbe())
+    downloader = SectionDownloader(VideoConfig(), general, ydl_factory=RecordingYoutubeDL, store=store)
+
+    async def choose(probe):
+        return 1800.0, 1830.0
+
+    async def run():
+        return await asyncio.gather(*(
+            downloader.acquire("abcdefghijk", choose, run_id=f"run-{i}") for i in range(3)
+        ))
+
+    REGISTRY.reset()
+    sections = asyncio.run(run())
+    counted = {c["name"]: c["value"] for c in REGISTRY.snapshot()["counters"]}
+    assert counted["acquisition_section_seconds"] == pytest.approx(sections[0].end - sections[0].start)
+    assert counted["source_store_misses"] == 1
+
+
+def test_new_entry_is_held_before_a_reservation_can_run(general):
+    """Test that a reservation scheduled as the file is registered cannot evict it."""
+    storage = make_manager(general, capacity=1500)
+    store = SourceStore(general, storage.config, storage=storage, prober=CountingProbe())
+    key = SourceKey("abcdefghijk", "bv*+ba", 0, 30_000)
+    register = storage.register_source
+    reservations = []
+
+    async def reserve_render():
+        try:
+            async with storage.reserve(1000, purpose="render"):
+                pass
+        except Exception as e:
+            return e
+
+    def register_then_reserve(path):
+        register(path)
+        reservations.append(asyncio.ensure_future(reserve_render()))
+
+    storage.register_source = register_then_reserve
+
+    async def run():
+        entries = await asyncio.gather(
+            store.acquire(key, "run-1", fetcher(1000, [], delay=0.01)),
+            store.acquire(key, "run-2", fetcher(1000, [])),
+        )
+        return entries, await reservations[0]
+
+    (entry, joined), refused = asyncio.run(run())
+    assert entry is joined and os.path.exists(entry.path)
+    assert storage._sources[entry.path] == 2
+    assert store.references(key) == {"run-1", "run-2"}
+    assert refused is not None
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+import pytest
+from src.config import StorageConfig
+from src.orchestrator.storage import GB, DiskUsage, InsufficientStorageError, StorageManager
+from tests.helpers import MB, general, make_manager, write_file
+
+
+def test_reservation_counts_against_available_space(general):
+    """Test that outstanding reservations reduce available space until written."""
+    manager = make_manager(general, capacity=10 * MB)
+    target = os.path.join(general.working_dir, "out.mp4")
+
+    async def run():
+        async with manager.reserve(4 * MB, path=target):
+            assert manager.available_bytes() == 6 * MB
+            write_file(target, 1 * MB)
+            # 1 MB written: 3 MB still outstanding plus the file on disk
+            assert manager.available_bytes() == 6 * MB
+        assert manager.available_bytes() == 9 * MB
+
+    asyncio.run(run())
+
+
+def test_reservation_evicts_unheld_sources_in_lru_order(general):
+    """Test that eviction removes the least recently used unheld sources first."""
+    manager = make_manager(general, capacity=10 * MB)
+    old = write_file(os.path.join(general.working_dir, "old.mp4"), 3 * MB)
+    held = write_file(os.path.join(general.working_dir, "held.mp4"), 3 * MB)
+    recent = write_file(os.path.join(general.working_dir, "recent.mp4"), 3 * MB)
+    for path in (old, held, recent):
+        manager.register_source(path)
+    manager.acquire_source(held)
+    manager.register_source(recent)
+
+    async def run():
+        async with manager.reserve(3 * MB):
+            pass
+
+    asyncio.run(run())
+    assert not os.path.exists(old)
+    assert os.path.exists(held)
+    assert os.path.exists(recent)
+
+
+def test_reservation_waits_for_release(general):
+    """Test that a reservation blocks until a concurrent one is released."""
+    manager = make_manager(general, capacity=10 * MB)
+    order = []
+
+    async def first():
+        async with manager.reserve(8 * MB, purpose="render"):
+            order.append("first-start")
+            await asyncio.sleep(0.05)
+        order.append("first-end")
+
+    async def second():
+        await asyncio.sleep(0.01)
+        async with manager.reserve(8 * MB):
+            order.append("second-start")
+
+    async def run():
+        await asyncio.gather(first(), second())
+
+    asyncio.run(run())
+    assert order == ["first-start", "first-end", "second-start"]
+
+
+def test_reservation_times_out(general):
+    """Test that an unsatisfiable reservation raises InsufficientStorageError."""
+    manager = make_manager(general, capacity=1 * MB)
+
+    async def run():
+        async with manager.reserve(2 * MB):
+            pass
+
+    with pytest.raises(InsufficientStorageError):
+        asyncio.run(run())
+
+
+def test_archive_moves_and_verifies(general):
+    """Test that archiving copies the file, preserves mtime and removes the source."""
+    manager = make_manager(general, capacity=10 * MB, archive_throughput_mb_per_sec=1000)
+    src = write_file(os.path.join(general.working_dir, "final.mp4"), 2 * MB)
+    os.utime(src, (1_000_000, 1_000_000))
+
+    async def run():
+        return await manager.archive(src, subdir="history")
+
+    dest = asyncio.run(run())
+    assert dest == os.path.join(general.archive_dir, "history", "final.mp4")
+    assert os.path.getsize(dest) == 2 * MB
+    assert os.path.getmtime(dest) == 1_000_000
+    assert not os.path.exists(src)
+    assert not os.path.exists(f"{dest}.partial")
+
+
+def test_prune_archive_by_age(general):
+    """Test that archived files older than the retention period are deleted."""
+    manager = make_manager(general, capacity=10 * MB, archive_retention_days=30)
+    now = time.time()
+    old = write_file(os.path.join(general.archive_dir, "old.mp4"), 10)
+    new = write_file(os.path.join(general.archive_dir, "new.mp4"), 10)
+    os.utime(old, (now - 31 * 86400, now - 31 * 86400))
+
+    assert manager.prune_archive(now) == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+
+
+def test_free_space_alarm(general):
+    """Test that the alarm fires when free space drops below min_free_gb."""
+    messages = []
+
+    async def alarm(message):
+        messages.append(message)
+
+    manager = StorageManager(
+        general,
+        StorageConfig(min_free_gb=50),
+        disk_usage=lambda _: DiskUsage(100 * GB, 60 * GB, 40 * GB),
+        on_alarm=alarm,
+    )
+    assert asyncio.run(manager.check_free_space()) is False
+    assert len(messages) == 1
+    assert "40.0 GB free" in messages[0]
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import event
+from src.config import TelegramConfig
+from src.compilation.compiler import RenderOutputs
+from src.database import (
+    Clip,
+    DiscoveredVideo,
+    PipelineRun,
+    ReviewLog,
+    get_session,
+    init_db,
+)
+from src.publishing.telegram_notifier import TelegramNotifier
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Fixture providing a database with one pipeline run and three clips."""
+    engine = init_db(str(tmp_path / "test.db"))
+    session = get_session(engine)
+    run = PipelineRun(
+        niche="gaming",
+        cycle_start=datetime(2026, 2, 28, 12, 0),
+        cycle_end=datetime(2026, 2, 28, 18, 0),
+    )
+    session.add(run)
+    session.flush()
+    for rank in (1, 2, 3):
+        video = DiscoveredVideo(
+            video_id=f"vid{rank}",
+            title=f"Clip title {rank}",
+            channel_name=f"creator{rank}",
+            channel_id=f"chan{rank}",
+            url=f"https://youtube.com/watch?v=vid{rank}",
+            niche="gaming",
+        )
+        session.add(video)
+        session.flush()
+        session.add(Clip(
+            pipeline_run_id=run.id,
+            discovered_video_id=video.id,
+            rank_position=rank,
+            start_time_seconds=0.0,
+            end_time_seconds=20.0,
+            clip_duration_seconds=20.0,
+            content_id_risk="high" if rank == 2 else "low",
+        ))
+    session.commit()
+    session.close()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def notifier(engine):
+    """Fixture providing a notifier with a mocked bot."""
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    bot.send_video = AsyncMock()
+    config = TelegramConfig(bot_token="token", authorized_user_ids=[42], max_upload_bytes=100)
+    return TelegramNotifier(config, engine, bot=bot)
+
+
+def test_review_message_uses_single_query(engine, notifier):
+    """Test that the clip summary is built from one SELECT in countdown order."""
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    message = notifier.build_review_message(1)
+
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+    assert message.index("(rank 3)") < message.index("(rank 2)") < message.index("(rank 1)")
+    assert "Duration: rendering" in message
+    assert "- Clip #2: high Content ID risk" in message
+
+
+def test_send_teaser_starts_review_clock(engine, notifier, tmp_path):
+    """Test that sending the teaser records the review start exactly once."""
+    teaser = tmp_path / "final.teaser.mp4"
+    teaser.write_bytes(b"0" * 10)
+
+    asyncio.run(notifier.send_teaser(1, str(teaser)))
+    asyncio.run(notifier.send_teaser(1, str(teaser)))
+
+    session = get_session(engine)
+    assert session.query(ReviewLog).filter_by(pipeline_run_id=1).count() == 1
+    session.close()
+    assert notifier.bot.send_video.await_count == 2
+
+
+def test_send_full_video_falls_back_to_proxy_and_link(notifier, tmp_path):
+    """Test that an oversized render sends the proxy and the full-quality link."""
+    final = tmp_path / "final.mp4"
+    proxy = tmp_path / "final.proxy.mp4"
+    final.write_bytes(b"0" * 1000)
+    proxy.write_bytes(b"0" * 50)
+    outputs = RenderOutputs(str(final), str(proxy), str(tmp_path / "final.teaser.mp4"))
+
+    asyncio.run(notifier.send_full_video(1, outputs, full_video_url="http://host/v"))
+
+    sent_path = notifier.bot.send_video.await_args.kwargs["video"].name
+    assert sent_path == str(proxy)
+    notifier.bot.send_message.assert_awaited_once_with(chat_id=42, text="Full quality: http://host/v")
@@ -0,0 +1,129 @@
+import asyncio
+import numpy as np
+import pytest
+from src.compilation.ffmpeg_wrapper import build_raw_frames_command
+from src.config import BrandingConfig
+from src.llm.prompts import PromptLibrary
+from src.compilation.frame_ring import Frame
+from src.thumbnails.frame_selector import FrameSelector, pick_frames, score_frames, stream_scores
+from src.thumbnails.generator import ThumbnailGenerator, clean_caption
+
+
+def frame(kind, height=72, width=128):
+    """Synthetic RGB frames with known properties."""
+    rng = np.random.default_rng(3)
+    if kind == "black":
+        return np.zeros((height, width, 3), np.uint8)
+    if kind == "flat":
+        return np.full((height, width, 3), 120, np.uint8)
+    if kind == "blurry":
+        ramp = np.linspace(60, 180, width, dtype=np.float32)
+        return np.repeat(np.repeat(ramp[None, :, None], height, axis=0), 3, axis=2).astype(np.uint8)
+    if kind == "busy":
+        return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    if kind == "face":
+        image = np.full((height, width, 3), 90, np.uint8)
+        image[18:54, 44:84] = (224, 172, 140)
+        image[30:34, 54:60] = 20
+        image[30:34, 68:74] = 20
+        return image
+    raise ValueError(kind)
+
+
+class CannedSelector(FrameSelector):
+    """FrameSelector whose ffmpeg pipe is replaced by prepared frames."""
+
+    def __init__(self, config, frames):
+        super().__init__(config)
+        self.frames = frames
+
+    async def read_frames(self, path, start, duration, width, height):
+        return self.frames
+
+
+class ScriptedLLM:
+    """Just enough of LLMClient for caption requests."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = PromptLibrary("config/prompts")
+        self.prompt = None
+
+    async def complete(self, prompt, system_prompt=None, **kwargs):
+        self.prompt = prompt
+        return self.reply
+
+
+def test_scores_prefer_sharp_colourful_frames():
+    """Test sharpness, saturation and contrast on frames with known properties."""
+    frames = np.stack([frame("flat"), frame("blurry"), frame("busy"), frame("face")])
+    scores = score_frames(frames)
+    assert scores.sharpness[2] > scores.sharpness[1] > scores.sharpness[0]
+    assert scores.saturation[2] > scores.saturation[0]
+    assert scores.contrast[0] == 0
+    assert scores.subject[3] > scores.subject[2]
+
+
+def test_streamed_scores_match_batch_at_stride():
+    """Test that scoring every second streamed frame equals scoring those frames at once."""
+    frames = np.stack([frame(kind) for kind in ("flat", "busy", "blurry", "face", "black", "busy")])
+    streamed = stream_scores((Frame(i, f) for i, f in enumerate(frames)), stride=2)
+    batch = score_frames(frames[::2])
+    for got, expected in zip(streamed, batch):
+        np.testing.assert_allclose(got, expected, rtol=1e-5)
+    assert len(stream_scores([]).usable) == 0
+
+
+def test_fades_are_never_picked():
+    """Test that black frames are unusable and picks keep a minimum gap."""
+    frames = np.stack([frame("black"), frame("busy"), frame("busy"), frame("face"), frame("flat")])
+    scores = score_frames(frames)
+    assert not scores.usable[0] and scores.usable[1:].all()
+    picks = pick_frames(scores, count=3, min_gap=2)
+    assert 0 not in picks and all(abs(a - b) >= 2 for a in picks for b in picks if a != b)
+
+
+def test_select_maps_samples_to_timestamps_and_falls_back_to_midpoint():
+    """Test that picks become source timestamps and an all-dark clip uses its midpoint."""
+    config = BrandingConfig()
+    frames = np.stack([frame("flat"), frame("flat"), frame("face"), frame("flat")])
+    stamps = asyncio.run(CannedSelector(config, frames).select("clip.mp4", 100.0, 4.0, 1920, 1080))
+    assert stamps == [102.0]
+    dark = np.stack([frame("black")] * 4)
+    assert asyncio.run(CannedSelector(config, dark).select("clip.mp4", 100.0, 4.0, 1920, 1080)) == [102.0]
+
+
+def test_frames_stream_as_rgb_at_analysis_size(tmp_path):
+    """Test that scoring frames come from one downscaled rgb24 pipe."""
+    source = tmp_path / "clip.mp4"
+    source.write_bytes(b"")
+    selector = FrameSelector(BrandingConfig())
+    width, height = selector.analysis_size(1920, 1080)
+    command = build_raw_frames_command(str(source), 10.0, 30.0, width, height, 1.0, pixel_format="rgb24")
+    assert (width, height) == (256, 144)
+    assert command[command.index("-vf") + 1] == "fps=1.0,scale=256:144:flags=area,format=rgb24"
+    assert command[-3:] == ["-pix_fmt", "rgb24", "pipe:1"]
+
+
+def test_caption_is_short_and_clean():
+    """Test that LLM captions are trimmed to five plain words and fall back to the title."""
+    assert clean_caption('"You Won\'t Believe This Crazy Save!!" 🔥🔥') == "YOU WON'T BELIEVE THIS CRAZY"
+    llm = ScriptedLLM("Goalkeeper Defies Physics 😱")
+    generator = ThumbnailGenerator(BrandingConfig(), llm=llm)
+    assert asyncio.run(generator.caption("Incredible save", "sports")) == "GOALKEEPER DEFIES PHYSICS"
+    assert "No emojis" in llm.prompt and "Incredible save" in llm.prompt
+    assert asyncio.run(ThumbnailGenerator(BrandingConfig()).caption("Dog rides skateboard downhill fast today", "pets")) \
+        == "DOG RIDES SKATEBOARD DOWNHILL FAST"
+
+
+def test_compose_writes_branded_jpeg(tmp_path):
+    """Test that composition yields a 1280x720 JPEG under 2 MB."""
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "frame.png"
+    Image.fromarray(np.repeat(np.repeat(frame("busy"), 15, axis=0), 15, axis=1)).save(source)
+    generator = ThumbnailGenerator(BrandingConfig(font_path=str(tmp_path / "missing.ttf")))
+    for variant in (0, 1):
+        out = generator.compose(str(source), "HUGE UPSET", str(tmp_path / f"thumb{variant}.jpg"), variant)
+        with Image.open(out) as image:
+            assert image.size == (1280, 720) and image.format == "JPEG"
+        assert (tmp_path / f"thumb{variant}.jpg").stat().st_size < 2 * 1024 * 1024
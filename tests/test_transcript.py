@@ -0,0 +1,84 @@
+import asyncio
+import numpy as np
+from src.analysis.transcript import (
+    TranscriptAnalyzer,
+    build_excerpt,
+    parse_json3,
+    segment_scores,
+    select_windows,
+    transcript_token_budget,
+)
+from src.config import LLMConfig, VideoConfig
+from src.llm.client import LLMClient
+from src.llm.prompts import estimate_tokens
+from tests.helpers import StubLLM, llm_provider, serve_llm
+
+
+def json3(minutes, highlight_at=None):
+    events = [{"tStartMs": 0, "dDurationMs": 1000, "segs": [{"utf8": "\n"}]}]
+    for i in range(minutes * 20):
+        start = i * 3000
+        text = f"and then we talked about item number {i} for a while"
+        if highlight_at is not None and abs(start / 1000 - highlight_at) < 10:
+            text = "[Laughter] oh my god no way!"
+        events.append({"tStartMs": start, "dDurationMs": 2800, "segs": [{"utf8": text}]})
+    return {"events": events}
+
+
+def test_parse_json3_builds_indexed_segments():
+    """Test that empty events are skipped and segments index into one text buffer."""
+    transcript = parse_json3(json3(1))
+    assert len(transcript) == 20
+    assert transcript.starts[1] == 3.0
+    assert transcript.segment(2) == "and then we talked about item number 2 for a while"
+    assert transcript.duration == 57 + 2.8
+
+
+def test_windows_find_the_highlight_within_budget():
+    """Test that the marked moment is chosen and the budget is respected."""
+    transcript = parse_json3(json3(60, highlight_at=1800))
+    windows = select_windows(transcript, segment_scores(transcript), 60, top_k=3, token_budget=400)
+    assert sum(w.tokens for w in windows) <= 400
+    best = max(windows, key=lambda w: w.score)
+    assert transcript.starts[best.first] <= 1800 <= transcript.starts[best.last - 1]
+    assert all(a.last <= b.first for a, b in zip(windows, windows[1:]))
+
+
+def test_energy_peaks_steer_window_choice():
+    """Test that audio energy alone can pick the window."""
+    transcript = parse_json3(json3(30))
+    times = np.arange(0, 1800, 1.0)
+    values = np.where(np.abs(times - 900) < 20, 10.0, 1.0)
+    windows = select_windows(transcript, segment_scores(transcript, energy=(times, values)), 30, 1, 10_000)
+    assert transcript.starts[windows[0].first] <= 900 <= transcript.starts[windows[0].last - 1]
+
+
+def test_excerpt_size_is_independent_of_source_length():
+    """Test that 10- and 60-minute sources produce excerpts of similar size."""
+    config = VideoConfig()
+    short = build_excerpt(parse_json3(json3(10, 300)), "", config, token_budget=1000)
+    long = build_excerpt(parse_json3(json3(60, 3000)), "", config, token_budget=1000)
+    assert estimate_tokens(long) <= 1000
+    assert abs(estimate_tokens(long) - estimate_tokens(short)) < 200
+
+
+def test_analyzer_clamps_moments_to_clip_limits():
+    """Test that LLM moments come back clamped to the configured clip length."""
+    stub = StubLLM()
+    transcripts = {"vid00000001": ("Funny", parse_json3(json3(60, 1200)))}
+
+    async def scenario(client):
+        return await TranscriptAnalyzer(client, VideoConfig()).analyze(transcripts)
+
+    moment = asyncio.run(serve_llm([stub], scenario))["vid00000001"]
+    assert (moment.start, moment.end) == (10.0, 30.0)
+    assert "[1200.0]" in stub.prompts[0]
+    assert estimate_tokens(stub.prompts[0]) < 1024
+
+
+def test_token_budget_fits_the_smallest_provider():
+    """Test that excerpts are sized for the fallback when it has the smaller max_tokens."""
+    primary = llm_provider("primary", 1).model_copy(update={"max_tokens": 8192})
+    config = LLMConfig(primary=primary, fallback=llm_provider("fallback", 2))
+    analyzer = TranscriptAnalyzer(LLMClient(config), VideoConfig())
+    assert analyzer.token_budget == transcript_token_budget(1024, VideoConfig().transcript_token_budget_ratio)
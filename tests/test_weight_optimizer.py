@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from src.analytics.channel_analytics import AnalyticsStore
+from src.analytics.weight_optimizer import WeightOptimizer, fit_weights, project_to_simplex
+from src.config import SCORING_WEIGHT_KEYS, DiscoveryConfig
+from src.database import Clip, DiscoveredVideo, PipelineRun, get_session, init_db
+
+
+@pytest.fixture
+def discovery_config():
+    """Fixture providing the default discovery config."""
+    return DiscoveryConfig(reddit_subreddits={"gaming": ["gaming"]})
+
+
+@pytest.fixture
+def history(tmp_path):
+    """Fixture providing 40 uploaded runs whose views track source view velocity."""
+    rng = np.random.default_rng(7)
+    engine = init_db(str(tmp_path / "test.db"))
+    store = AnalyticsStore(str(tmp_path / "analytics.npz"))
+    session = get_session(engine)
+    start = datetime(2026, 1, 1)
+    for r in range(40):
+        cycle_end = start + timedelta(hours=6 * r)
+        run = PipelineRun(
+            niche="gaming", cycle_start=cycle_end - timedelta(hours=6), cycle_end=cycle_end,
+            youtube_video_id=f"yt{r}", video_duration_seconds=600.0,
+        )
+        session.add(run)
+        session.flush()
+        velocity = rng.uniform(100, 10000)
+        for rank in (1, 2, 3):
+            video = DiscoveredVideo(
+                video_id=f"src{r}_{rank}", title="t", channel_name="c", channel_id="c", url="u",
+                niche="gaming", view_count=100000, like_count=int(rng.integers(1000, 5000)),
+                comment_count=int(rng.integers(10, 500)), view_velocity=velocity,
+                discovered_at=cycle_end - timedelta(hours=float(rng.uniform(0, 6))),
+                discovery_source="youtube_trending",
+            )
+            session.add(video)
+            session.flush()
+            session.add(Clip(
+                pipeline_run_id=run.id, discovered_video_id=video.id, rank_position=rank,
+                start_time_seconds=0.0, end_time_seconds=20.0, clip_duration_seconds=20.0,
+            ))
+        index = store.ensure_video(f"yt{r}", "gaming")
+        store.append_daily(index, [{"day": 20000, "views": int(velocity * 10)}])
+    session.commit()
+    session.close()
+    yield engine, store
+    engine.dispose()
+
+
+def test_project_to_simplex():
+    """Test that projection yields non-negative weights summing to 1."""
+    w = project_to_simplex(np.array([0.9, -0.4, 0.8, 0.1, 0.0]))
+    assert np.all(w >= 0)
+    assert w.sum() == pytest.approx(1.0)
+
+
+def test_fit_weights_recovers_dominant_feature():
+    """Test that the fit moves weight onto the informative feature."""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(size=(500, 5))
+    y = X[:, 2]
+    w = fit_weights(X, y, np.full(5, 0.2), l2_to_prior=0.0, iterations=2000)
+    assert w.argmax() == 2
+    assert w.sum() == pytest.approx(1.0)
+
+
+def test_propose_outputs_valid_diff(history, discovery_config):
+    """Test that the proposal is a valid config and favors view velocity."""
+    engine, store = history
+    proposal = WeightOptimizer(engine, store, discovery_config).propose()
+
+    assert proposal.n_samples == 120
+    assert sum(proposal.proposed.values()) == pytest.approx(1.0)
+    assert proposal.proposed["scoring_weight_view_velocity"] > discovery_config.scoring_weight_view_velocity
+    assert proposal.metrics["spearman_proposed"] >= proposal.metrics["spearman_current"]
+    assert any(line.startswith("discovery.scoring_weight_view_velocity") for line in proposal.config_diff())
+    DiscoveryConfig.model_validate({**discovery_config.model_dump(), **proposal.proposed})
+
+
+def test_propose_requires_history(tmp_path, discovery_config):
+    """Test that an empty history raises ValueError."""
+    engine = init_db(str(tmp_path / "empty.db"))
+    store = AnalyticsStore(str(tmp_path / "analytics.npz"))
+    with pytest.raises(ValueError, match="Not enough history"):
+        WeightOptimizer(engine, store, discovery_config).propose()